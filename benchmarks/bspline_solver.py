@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Benchmark the banded Cholesky backends used by
+:func:`pypeit.core.pydl.bspline.workit` on sky-fit sized problems.
+
+Usage::
+
+    python benchmarks/bspline_solver.py --npix 100000 300000 1000000
+"""
+from __future__ import (print_function, absolute_import, division, unicode_literals)
+
+import argparse
+import time
+
+import numpy as np
+
+from pypeit.core import pydl
+
+
+def sky_like_data(npix, nspec=4096, seed=1234):
+    """Fake a global sky fit: sorted wavelengths (in pixels) with a set
+    of narrow emission lines on a smooth continuum."""
+    rng = np.random.RandomState(seed)
+    x = np.sort(rng.uniform(0., nspec, npix))
+    lines = rng.uniform(0., nspec, 50)
+    y = 200. + 50.*np.sin(x/300.)
+    for l in lines:
+        y += 1000.*np.exp(-0.5*((x-l)/1.5)**2)
+    invvar = 1./(y + 10.)
+    y += rng.normal(size=npix)/np.sqrt(invvar)
+    return x, y, invvar
+
+
+def time_solver(sset, x, y, invvar, action, lower, upper, solver, ntrial):
+    best = np.inf
+    for i in range(ntrial):
+        _sset = sset.copy()
+        t0 = time.perf_counter()
+        err, yfit = _sset.workit(x, y, invvar, action, lower, upper, solver=solver)
+        best = min(best, time.perf_counter()-t0)
+    return best, _sset.coeff, yfit
+
+
+def main(args):
+    print('{:>9s} {:>7s} {:>10s} {:>10s} {:>8s} {:>10s}'.format(
+          'npix', 'ncoeff', 'python (s)', 'lapack (s)', 'speedup', 'max |dy|'))
+    for npix in args.npix:
+        x, y, invvar = sky_like_data(npix)
+        sset = pydl.bspline(x, nord=4, bkspace=args.bkspace)
+        action, lower, upper = sset.action(x)
+        t_py, c_py, y_py = time_solver(sset, x, y, invvar, action, lower, upper, 'python',
+                                       args.ntrial)
+        t_la, c_la, y_la = time_solver(sset, x, y, invvar, action, lower, upper, 'lapack',
+                                       args.ntrial)
+        print('{:9d} {:7d} {:10.3f} {:10.3f} {:8.1f} {:10.3e}'.format(
+              npix, c_py.size, t_py, t_la, t_py/t_la, np.max(np.abs(y_py-y_la))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark banded Cholesky backends')
+    parser.add_argument('--npix', type=int, nargs='+', default=[100000, 300000, 1000000],
+                        help='Number of pixels in the fit')
+    parser.add_argument('--bkspace', type=float, default=0.6,
+                        help='Breakpoint spacing in pixels')
+    parser.add_argument('--ntrial', type=int, default=3, help='Number of timing trials')
+    main(parser.parse_args())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Measure the peak memory and run time of
+:func:`pypeit.core.combine.comb_frames` when combining a memory-mapped
+stack of frames in memory and in blocks of rows.
+
+Usage::
+
+    python benchmarks/comb_frames_memory.py --nx 4096 --ny 4096 --nframes 20 --maxmem 1
+"""
+from __future__ import (print_function, absolute_import, division, unicode_literals)
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from pypeit.core import combine
+
+
+def fake_stack(nx, ny, nframes, seed=1234):
+    """Flat-like frames with cosmic rays in a memory-mapped scratch
+    file."""
+    rng = np.random.RandomState(seed)
+    frames = np.memmap(tempfile.TemporaryFile(), dtype=float, mode='w+', shape=(nx,ny,nframes))
+    for i in range(nframes):
+        frames[:,:,i] = 1e4 + 100.*rng.normal(size=(nx,ny))
+        frames[:,:,i].flat[rng.randint(0, nx*ny, nx*ny//2000)] = 5e4
+    return frames
+
+
+def run(frames, maxmem):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    # Without a memory budget, the full stack is read into memory
+    comb_frame = combine.comb_frames(np.array(frames) if maxmem is None else frames,
+                                     saturation=65535., cosmics=20., maxmem=maxmem)
+    dt = time.perf_counter()-t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return comb_frame, dt, peak
+
+
+def main(args):
+    frames = fake_stack(args.nx, args.ny, args.nframes)
+    print('Stack of {0} frames of {1} x {2} pixels: {3:.2f} GB'.format(
+            args.nframes, args.nx, args.ny, frames.nbytes/2**30))
+    comb_full, t_full, m_full = run(frames, None)
+    comb_tile, t_tile, m_tile = run(frames, args.maxmem*2**30)
+    print('{:>10s} {:>10s} {:>14s}'.format('', 'time (s)', 'peak mem (GB)'))
+    print('{:>10s} {:10.2f} {:14.2f}'.format('in memory', t_full, m_full/2**30))
+    print('{:>10s} {:10.2f} {:14.2f}'.format('blocks', t_tile, m_tile/2**30))
+    print('Identical: {0}'.format(np.array_equal(comb_full, comb_tile)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark memory-bounded frame combination')
+    parser.add_argument('--nx', type=int, default=2048, help='Number of rows')
+    parser.add_argument('--ny', type=int, default=2048, help='Number of columns')
+    parser.add_argument('--nframes', type=int, default=10, help='Number of frames')
+    parser.add_argument('--maxmem', type=float, default=0.5, help='Memory budget in GB')
+    main(parser.parse_args())
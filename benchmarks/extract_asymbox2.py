@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Benchmark :func:`pypeit.core.extract.extract_asymbox2` on many curved
+traces against the original pixel-by-pixel gather.
+
+Usage::
+
+    python benchmarks/extract_asymbox2.py --nspec 4096 --ntrace 100
+"""
+from __future__ import (print_function, absolute_import, division, unicode_literals)
+
+import argparse
+import time
+
+import numpy as np
+
+from pypeit.core import extract
+
+
+def gather_loop(image, left_in, right_in):
+    """The window sums of extract_asymbox2 with the original list
+    comprehension gather, for traces with integer spectral positions."""
+    left = left_in.T
+    right = right_in.T
+    nTrace, npix = left.shape
+    nspec, nspat = image.shape
+    ycen_out = np.outer(np.ones(nTrace, dtype=int), np.arange(npix, dtype=int))
+    tempx = int(np.max(right - left) + 3.0)
+    bigleft = np.outer(left[:], np.ones(tempx))
+    bigright = np.outer(right[:], np.ones(tempx))
+    spot = np.outer(np.ones(npix * nTrace), np.arange(tempx)) + bigleft - 1
+    bigy = np.outer(ycen_out[:], np.ones(tempx, dtype='int'))
+    fullspot = np.array(np.fmin(np.fmax(np.round(spot + 1) - 1, 0), nspat - 1), int)
+    fracleft = np.fmax(np.fmin(fullspot - bigleft, 0.5), -0.5)
+    fracright = np.fmax(np.fmin(bigright - fullspot, 0.5), -0.5)
+    bool_mask1 = (spot >= -0.5) & (spot < (nspat - 0.5))
+    bool_mask2 = (bigy >= 0) & (bigy <= (nspec - 1))
+    weight = (np.fmin(np.fmax(fracleft + fracright, 0), 1)) * bool_mask1 * bool_mask2
+    bigy = np.fmin(np.fmax(bigy, 0), nspec - 1)
+    temp = np.array([image[x1, y1] for (x1, y1) in zip(bigy.flatten(), fullspot.flatten())])
+    temp2 = np.reshape(weight.flatten() * temp, (nTrace, npix, tempx))
+    return np.sum(temp2, axis=2).T
+
+
+def fake_traces(nspec, ntrace, nspat, width=7.3, seed=1234):
+    rng = np.random.RandomState(seed)
+    image = rng.normal(size=(nspec, nspat)) + 100.
+    spec = np.arange(nspec, dtype=float)/nspec
+    cen = np.linspace(10., nspat-10., ntrace)[None,:] + 3.*np.sin(2*np.pi*spec)[:,None]
+    return image, cen - width/2., cen + width/2.
+
+
+def main(args):
+    image, left, right = fake_traces(args.nspec, args.ntrace, args.nspat)
+    t0 = time.perf_counter()
+    fext_loop = gather_loop(image, left, right)
+    t_loop = time.perf_counter()-t0
+    t0 = time.perf_counter()
+    fext = extract.extract_asymbox2(image, left, right)
+    t_vec = time.perf_counter()-t0
+    print('{0} traces on {1} x {2} image'.format(args.ntrace, args.nspec, args.nspat))
+    print('{:>10s} {:>12s} {:>8s} {:>10s}'.format('loop (s)', 'vector (s)', 'speedup', 'identical'))
+    print('{:10.2f} {:12.3f} {:8.1f} {:>10s}'.format(t_loop, t_vec, t_loop/t_vec,
+                                                     str(np.array_equal(fext, fext_loop))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark extract_asymbox2')
+    parser.add_argument('--nspec', type=int, default=4096, help='Number of spectral pixels')
+    parser.add_argument('--nspat', type=int, default=2048, help='Number of spatial pixels')
+    parser.add_argument('--ntrace', type=int, default=100, help='Number of traces')
+    main(parser.parse_args())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Validate the single precision image processing mode (``[*][process]
+dtype = float32``) against the default double precision mode on
+simulated frames: frame combination, the variance image and a global
+sky fit of a single slit.
+
+Usage::
+
+    python benchmarks/float32_processing.py --nspec 2048 --nspat 512 --nframes 5
+"""
+from __future__ import (print_function, absolute_import, division, unicode_literals)
+
+import argparse
+import time
+
+import numpy as np
+
+from pypeit.core import combine
+from pypeit.core import procimg
+from pypeit.core import skysub
+
+
+def fake_frames(nspec, nspat, nframes, seed=1234):
+    """Sky-like frames: tilted emission lines, a smooth slit
+    illumination and cosmic rays."""
+    rng = np.random.RandomState(seed)
+    spat = np.arange(nspat) - nspat/2.
+    piximg = np.arange(nspec, dtype=float)[:,None] + 0.02*spat[None,:]
+    sky = 200. + 50.*np.sin(piximg/300.)
+    for l in rng.uniform(0., nspec, 40):
+        sky += 3000.*np.exp(-0.5*((piximg-l)/1.5)**2)
+    model = sky*(1. - 0.2*(spat/nspat)**2)[None,:]
+    frames = np.empty((nspec, nspat, nframes))
+    for i in range(nframes):
+        frames[:,:,i] = model + rng.normal(size=model.shape)*np.sqrt(model + 16.)
+        cr = rng.randint(0, model.size, model.size//2000)
+        frames[:,:,i].flat[cr] += 5e4
+    return frames, piximg/(nspec-1)
+
+
+def process(frames, tilts, dtype):
+    t0 = time.perf_counter()
+    stack = combine.comb_frames(frames.astype(dtype), saturation=65535., method='weightmean',
+                                satpix='reject', cosmics=20., replace='maxnonsat')
+    datasec_img = np.ones(stack.shape, dtype=int)
+    var = procimg.variance_frame(datasec_img, stack, 1., 4.).astype(dtype)
+    ivar = (var > 0.)/(np.abs(var) + (var == 0))
+    nspec, nspat = stack.shape
+    thismask = np.ones(stack.shape, dtype=bool)
+    slit_left = np.full(nspec, 0.)
+    slit_righ = np.full(nspec, nspat-1.)
+    # As in Reduce.global_skysub, the sky model is stored in an image
+    # with the type of the science image
+    sky = np.zeros_like(stack)
+    sky[thismask] = skysub.global_skysub(stack, ivar, tilts, thismask, slit_left, slit_righ)
+    return stack, ivar, sky, time.perf_counter()-t0
+
+
+def main(args):
+    frames, tilts = fake_frames(args.nspec, args.nspat, args.nframes)
+    stack64, ivar64, sky64, t64 = process(frames, tilts, np.float64)
+    stack32, ivar32, sky32, t32 = process(frames, tilts, np.float32)
+    print('Image of {0} x {1} pixels, {2} frames'.format(args.nspec, args.nspat, args.nframes))
+    print('{:>10s} {:>12s} {:>12s} {:>12s}'.format('', 'float64', 'float32', 'max rel diff'))
+    print('{:>10s} {:12.1f} {:12.1f}'.format('stack (MB)', frames.nbytes/2**20,
+                                            frames.nbytes/2**21))
+    print('{:>10s} {:12.2f} {:12.2f}'.format('time (s)', t64, t32))
+    for name, a, b in [('combined', stack64, stack32), ('ivar', ivar64, ivar32),
+                       ('sky', sky64, sky32)]:
+        indx = a != 0
+        print('{:>10s} {:>12s} {:>12s} {:12.2e}'.format(name, str(a.dtype), str(b.dtype),
+              np.max(np.abs(b[indx]-a[indx])/np.abs(a[indx]))))
+    # The sky residuals relative to the noise are what matter for the
+    # science
+    noise = np.sqrt(1./ivar64[ivar64 > 0])
+    dsky = np.abs(sky32 - sky64)[ivar64 > 0]
+    print('Max sky difference relative to the noise: {0:.2e}'.format(np.max(dsky/noise)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Validate float32 image processing')
+    parser.add_argument('--nspec', type=int, default=2048, help='Number of spectral pixels')
+    parser.add_argument('--nspat', type=int, default=256, help='Number of spatial pixels')
+    parser.add_argument('--nframes', type=int, default=5, help='Number of frames to combine')
+    main(parser.parse_args())
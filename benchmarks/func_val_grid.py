@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Benchmark the evaluation of a 2D tilts model on a full detector:
+:func:`pypeit.utils.func_val` on a meshgrid of the image versus the
+separable :func:`pypeit.utils.func_val_grid` used by
+:func:`pypeit.core.tracewave.fit2tilts`.
+
+Usage::
+
+    python benchmarks/func_val_grid.py --npix 1024 2048 4096
+"""
+from __future__ import (print_function, absolute_import, division, unicode_literals)
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from pypeit import utils
+
+
+def timed(func, *args, **kwargs):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    values = func(*args, **kwargs)
+    t = time.perf_counter()-t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return values, t, peak
+
+
+def meshgrid_model(coeff2, nspec, nspat, func2d):
+    spat_img, spec_img = np.meshgrid(np.arange(nspat), np.arange(nspec))
+    return utils.func_val(coeff2, spec_img/(nspec-1.), func2d, x2=spat_img/(nspat-1.),
+                          minx=0.0, maxx=1.0, minx2=0.0, maxx2=1.0)
+
+
+def main(args):
+    rng = np.random.RandomState(1234)
+    coeff2 = 0.01*rng.normal(size=(args.spec_order+1, args.spat_order+1))
+    coeff2[1,0] = 1.
+    print('{:>6s} {:>12s} {:>12s} {:>11s} {:>11s} {:>10s}'.format(
+          'npix', 'mesh (s)', 'grid (s)', 'mesh (MB)', 'grid (MB)', 'max |d|'))
+    for npix in args.npix:
+        mesh, t_mesh, m_mesh = timed(meshgrid_model, coeff2, npix, npix, args.func2d)
+        grid, t_grid, m_grid = timed(utils.func_val_grid, coeff2, np.arange(npix)/(npix-1.),
+                                     np.arange(npix)/(npix-1.), args.func2d, minx=0.0, maxx=1.0,
+                                     minx2=0.0, maxx2=1.0)
+        print('{:6d} {:12.3f} {:12.3f} {:11.1f} {:11.1f} {:10.2e}'.format(
+              npix, t_mesh, t_grid, m_mesh/2**20, m_grid/2**20, np.max(np.abs(mesh-grid))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the 2D tilts model evaluation')
+    parser.add_argument('--npix', type=int, nargs='+', default=[1024, 2048, 4096],
+                        help='Number of pixels on each side of the detector')
+    parser.add_argument('--func2d', type=str, default='legendre2d', help='2D function')
+    parser.add_argument('--spec_order', type=int, default=5, help='Spectral order of the fit')
+    parser.add_argument('--spat_order', type=int, default=4, help='Spatial order of the fit')
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Benchmark :func:`pypeit.core.procimg.lacosmic` with the numba kernels
+against the original scipy implementation on a simulated science
+frame, and check that both give the same cosmic-ray mask.
+
+Usage::
+
+    python benchmarks/lacosmic.py --nspec 4096 --nspat 2048 --nthreads 4
+"""
+from __future__ import (print_function, absolute_import, division, unicode_literals)
+
+import argparse
+import time
+
+import numpy as np
+
+from pypeit.core import procimg
+
+
+def fake_science(nspec, nspat, seed=1234):
+    """Sky lines, an object trace and cosmic rays of various sizes on a
+    noisy background."""
+    rng = np.random.RandomState(seed)
+    spec = np.arange(nspec, dtype=float)[:,None]
+    spat = np.arange(nspat, dtype=float)[None,:]
+    img = 100. + np.zeros((nspec, nspat))
+    for l in rng.uniform(0., nspec, 30):
+        img += 2000.*np.exp(-0.5*((spec-l)/1.5)**2)
+    img += 500.*np.exp(-0.5*((spat-nspat/2.)/3.)**2)
+    img += rng.normal(size=img.shape)*np.sqrt(img)
+    ncr = nspec*nspat//2000
+    x = rng.randint(1, nspec-1, ncr)
+    y = rng.randint(1, nspat-1, ncr)
+    img[x,y] += rng.uniform(500., 2e4, ncr)
+    img[x+1,y] += rng.uniform(0., 1e4, ncr)
+    return img
+
+
+def time_lacosmic(img, fast, ntrial, nthreads=1):
+    best = np.inf
+    for i in range(ntrial):
+        t0 = time.perf_counter()
+        crmask = procimg.lacosmic(1, img, 65535., 0.86, grow=1.5, sigclip=4.5, sigfrac=0.3,
+                                  objlim=3., fast=fast, nthreads=nthreads)
+        best = min(best, time.perf_counter()-t0)
+    return best, crmask
+
+
+def main(args):
+    img = fake_science(args.nspec, args.nspat)
+    # Compile the numba kernels
+    procimg.lacosmic(1, img[:64,:64].copy(), 65535., 0.86)
+    t_scipy, mask_scipy = time_lacosmic(img, False, args.ntrial)
+    t_fast, mask_fast = time_lacosmic(img, True, args.ntrial, nthreads=args.nthreads)
+    print('Image of {0} x {1} pixels; {2} CR pixels'.format(args.nspec, args.nspat,
+                                                          np.sum(mask_fast)))
+    print('{:>10s} {:>10s} {:>8s} {:>10s}'.format('scipy (s)', 'numba (s)', 'speedup',
+                                                 'same mask'))
+    print('{:10.2f} {:10.2f} {:8.1f} {:>10s}'.format(t_scipy, t_fast, t_scipy/t_fast,
+                                                     str(np.array_equal(mask_scipy, mask_fast))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark L.A.Cosmic')
+    parser.add_argument('--nspec', type=int, default=4096, help='Number of spectral pixels')
+    parser.add_argument('--nspat', type=int, default=1024, help='Number of spatial pixels')
+    parser.add_argument('--ntrial', type=int, default=1, help='Number of timing trials')
+    parser.add_argument('--nthreads', type=int, default=1,
+                        help='Number of threads for the numba kernels')
+    main(parser.parse_args())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Benchmark the numba centroiding kernels of
+:func:`pypeit.core.trace_slits.trace_fweight` and
+:func:`pypeit.core.trace_slits.trace_gweight` against the original numpy
+implementation on the iterative slit-edge tracing
+(:func:`pypeit.core.extract.iter_tracefit`, as in
+:class:`pypeit.traceslits.TraceSlits`) and the tilt tracing
+(:func:`pypeit.core.tracewave.trace_tilts_work`) workloads, and check
+that both give the same traces.
+
+Usage::
+
+    python benchmarks/trace_centroid.py --nspec 4096 --nslits 20 --nlines 60
+"""
+from __future__ import (print_function, absolute_import, division, unicode_literals)
+
+import argparse
+import functools
+import time
+
+import numpy as np
+
+from pypeit.core import extract
+from pypeit.core import trace_slits
+from pypeit.core import tracewave
+
+
+def fake_edges(nspec, nslits, seed=1234):
+    """Sobel-like image of the left edges of curved slits."""
+    rng = np.random.RandomState(seed)
+    nspat = 60*nslits
+    spec = np.arange(nspec)/(nspec-1.)
+    edges = 30. + 60.*np.arange(nslits)[None,:] + 5.*(spec[:,None]-0.5)**2
+    spat = np.arange(nspat, dtype=float)
+    siglev = np.zeros((nspec, nspat))
+    for slit in range(nslits):
+        siglev += 50.*np.exp(-0.5*((spat[None,:]-edges[:,slit,None])/1.5)**2)
+    siglev += rng.normal(size=siglev.shape)
+    return siglev, np.round(edges)
+
+
+def fake_arc(nspec, nlines, nspat=150, seed=1234):
+    """Tilted arc lines in a single slit."""
+    rng = np.random.RandomState(seed)
+    spec = np.arange(nspec)[:,None]
+    spat = np.arange(nspat)[None,:]
+    arc = np.full((nspec, nspat), 20.)
+    lines_spec = np.linspace(30, nspec-30, nlines)
+    for line in lines_spec:
+        arc += rng.uniform(2e3, 2e4)*np.exp(-0.5*((spec - line - 0.02*(spat-nspat/2))/1.5)**2)
+    arc += rng.normal(size=arc.shape)*np.sqrt(arc+25.)
+    return arc, lines_spec, np.full(nlines, nspat/2.), np.full(nspec, nspat/2.)
+
+
+def edge_workload(siglev, crutch):
+    trace_fw = extract.iter_tracefit(siglev, crutch, 5, fwhm=9.0, niter=9)[0]
+    return trace_fw, extract.iter_tracefit(siglev, trace_fw, 5, fwhm=3.0, gweight=True,
+                                           niter=6)[0]
+
+
+def tilt_workload(arc, lines_spec, lines_spat, slit_cen):
+    trc = tracewave.trace_tilts_work(arc, lines_spec, lines_spat, np.ones(arc.shape, dtype=bool),
+                                     slit_cen, fwhm=3.0)
+    return trc['tilts'], trc['tilts_err']
+
+
+def timed(workload, args, fast, ntrial):
+    """Run a workload with trace_fweight and trace_gweight in the
+    requested mode."""
+    fweight, gweight = trace_slits.trace_fweight, trace_slits.trace_gweight
+    trace_slits.trace_fweight = functools.partial(fweight, fast=fast)
+    trace_slits.trace_gweight = functools.partial(gweight, fast=fast)
+    try:
+        best = np.inf
+        for i in range(ntrial):
+            t0 = time.perf_counter()
+            result = workload(*args)
+            best = min(best, time.perf_counter()-t0)
+    finally:
+        trace_slits.trace_fweight, trace_slits.trace_gweight = fweight, gweight
+    return best, result
+
+
+def main(args):
+    siglev, crutch = fake_edges(args.nspec, args.nslits)
+    arc, lines_spec, lines_spat, slit_cen = fake_arc(args.nspec, args.nlines)
+    # Compile the numba kernels
+    trace_slits.trace_fweight(siglev, crutch[:10])
+    trace_slits.trace_gweight(siglev, crutch[:10])
+    print('{:>28s} {:>10s} {:>10s} {:>8s} {:>6s}'.format('workload', 'numpy (s)', 'numba (s)',
+                                                         'speedup', 'same'))
+    for name, workload, wargs in [
+            ('edges {0}x{1} slits'.format(args.nspec, args.nslits), edge_workload,
+             (siglev, crutch)),
+            ('tilts {0}x{1} lines'.format(args.nspec, args.nlines), tilt_workload,
+             (arc, lines_spec, lines_spat, slit_cen))]:
+        t_numpy, r_numpy = timed(workload, wargs, False, args.ntrial)
+        t_numba, r_numba = timed(workload, wargs, True, args.ntrial)
+        same = all(np.array_equal(a, b) for a, b in zip(r_numpy, r_numba))
+        print('{:>28s} {:10.2f} {:10.2f} {:8.1f} {:>6s}'.format(name, t_numpy, t_numba,
+                                                                t_numpy/t_numba, str(same)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the trace centroiding kernels')
+    parser.add_argument('--nspec', type=int, default=2048, help='Number of spectral pixels')
+    parser.add_argument('--nslits', type=int, default=20, help='Number of slit edges to trace')
+    parser.add_argument('--nlines', type=int, default=40, help='Number of arc lines to trace')
+    parser.add_argument('--ntrial', type=int, default=1, help='Number of trials to time')
+    main(parser.parse_args())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Benchmark the FFT grid search of
+:func:`pypeit.core.wavecal.wvutils.xcorr_shift_stretch` against the
+original differential evolution optimizer on shifted and stretched
+copies of fake arc spectra, as cross-correlated by
+:func:`pypeit.core.wavecal.autoid.reidentify`.
+
+Usage::
+
+    python benchmarks/xcorr_shift_stretch.py --nspec 2048 --ntrial 10
+"""
+from __future__ import (print_function, absolute_import, division, unicode_literals)
+
+import argparse
+import time
+
+import numpy as np
+
+from pypeit.core.wavecal import wvutils
+
+
+def fake_arc(nspec, nlines, rng):
+    pix = np.arange(nspec)
+    arc = np.zeros(nspec)
+    for cen, amp in zip(rng.uniform(20, nspec-20, nlines), rng.uniform(100., 1000., nlines)):
+        arc += amp*np.exp(-0.5*((pix-cen)/1.5)**2)
+    return arc
+
+
+def main(args):
+    rng = np.random.RandomState(1234)
+    print('{:>8s} {:>8s} | {:>8s} {:>8s} {:>7s} {:>7s} | {:>8s} {:>8s} {:>7s} {:>7s}'.format(
+          'shift', 'stretch', 'DE shft', 'DE str', 'DE cc', 'DE (s)', 'FFT shft', 'FFT str', 'FFT cc',
+          'FFT (s)'))
+    t_de, t_fft = 0., 0.
+    for i in range(args.ntrial):
+        arc = fake_arc(args.nspec, args.nlines, rng)
+        shift, stretch = rng.uniform(-0.02, 0.02)*args.nspec, rng.uniform(0.97, 1.03)
+        arc_ss = wvutils.shift_and_stretch(arc, shift, stretch) + rng.normal(size=args.nspec)
+        # Smooth and ceiling once, as reidentify does with the archive features
+        y1 = wvutils.smooth_ceil_cont(arc_ss, 1.0, percent_ceil=80.0, sigdetect=10.0, fwhm=3.5)
+        y2 = wvutils.smooth_ceil_cont(arc, 1.0, percent_ceil=80.0, sigdetect=10.0, fwhm=3.5)
+        results = []
+        for method in ['differential_evolution', 'fft']:
+            t0 = time.perf_counter()
+            results += [wvutils.xcorr_shift_stretch(arc_ss, arc, fwhm=3.5, seed=i, y1=y1, y2=y2,
+                                                    method=method)]
+            results += [time.perf_counter()-t0]
+        t_de += results[1]
+        t_fft += results[3]
+        print('{:8.2f} {:8.5f} | {:8.2f} {:8.5f} {:7.4f} {:7.2f} | {:8.2f} {:8.5f} {:7.4f} {:7.2f}'.format(
+              shift, stretch, *(results[0][1:4] + (results[1],) + results[2][1:4] + (results[3],))))
+    print('Total: differential evolution {:.2f} s, FFT {:.2f} s, speedup {:.1f}'.format(
+          t_de, t_fft, t_de/t_fft))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the shift/stretch optimizers')
+    parser.add_argument('--nspec', type=int, default=2048, help='Number of spectral pixels')
+    parser.add_argument('--nlines', type=int, default=60, help='Number of arc lines')
+    parser.add_argument('--ntrial', type=int, default=5, help='Number of spectra')
+    main(parser.parse_args())
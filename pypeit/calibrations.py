@@ -11,6 +11,7 @@ from astropy.table import Table
 
 from pypeit import msgs
 from pypeit.core import pixels
+from pypeit import imagecache
 from pypeit import masterframe
 from pypeit import arcimage
 from pypeit import biasframe
@@ -34,6 +35,101 @@ from pypeit.spectrographs.util import load_spectrograph
 from pypeit import debugger
 
 
+class CalibrationCache(imagecache.ImageCache):
+    """
+    In-memory store of the calibrations built (or loaded) during a run,
+    e.g. the bias, the slit traces (`tslits_dict`), the wavelength
+    calibration, the tilts (`tilts_dict`), the flats and the wavelength
+    image, such that they are handed back to all the frames of a
+    calibration group.
+
+    The calibrations are keyed by the master key of the calibration
+    group, the detector and the calibration type.  Unlike the images of
+    :class:`pypeit.imagecache.ImageCache`, they are added explicitly
+    with :func:`set` instead of being built by :func:`get`, but they
+    share the same least-recently-used eviction once the memory budget
+    is exceeded; :func:`evicted` tells whether a calibration was
+    dropped, in which case its master frame can be reloaded from disk.
+
+    Args:
+        maxmem (:obj:`int`, optional):
+            Maximum number of bytes of the arrays held in memory.
+
+    Attributes:
+        hits (int): Number of calibrations returned from the cache.
+        misses (int): Number of calibrations added to the cache.
+    """
+    def __init__(self, maxmem=2**31):
+        super(CalibrationCache, self).__init__(maxmem=maxmem)
+        # Calibrations added since the cache was created, as opposed to
+        # those copied by subset
+        self._added = set()
+
+    def keys(self):
+        return list(self._images.keys())
+
+    def get(self, master_key, det, ftype):
+        """
+        Return a calibration held in memory.
+
+        Args:
+            master_key (str): Master key of the calibration group.
+            det (int): 1-indexed detector number.
+            ftype (str): Calibration type, e.g. 'trace'.
+
+        Returns:
+            object: The calibration.
+
+        Raises:
+            KeyError: Raised if the calibration is not in memory.
+        """
+        key = (master_key, det, ftype)
+        with self._lock:
+            value = self._images[key]
+            self._images.move_to_end(key)
+            self.hits += 1
+        return value
+
+    def set(self, master_key, det, ftype, value):
+        """
+        Add a calibration, dropping the least recently used
+        calibrations as needed to stay within the memory budget.
+        """
+        key = (master_key, det, ftype)
+        with self._lock:
+            self.misses += 1
+            self._added.add(key)
+            self._add(key, value)
+
+    def evicted(self, master_key, det, ftype):
+        """Whether a calibration was dropped from memory."""
+        return (master_key, det, ftype) in self._evicted
+
+    def subset(self, det):
+        """
+        Return a new cache with the calibrations of a single detector,
+        held in memory or dropped from it.
+        """
+        cache = CalibrationCache(maxmem=self.maxmem)
+        with self._lock:
+            for key, value in self._images.items():
+                if key[1] == det:
+                    cache._images[key] = value
+            cache._evicted = set([key for key in self._evicted if key[1] == det])
+        return cache
+
+    def update(self, cache):
+        """
+        Merge the calibrations added to a cache returned by
+        :func:`subset`, e.g. by the process reducing a single detector.
+        """
+        for key in cache.keys():
+            if key in cache._added:
+                self.set(*key, value=cache._images[key])
+        with self._lock:
+            self._evicted.update([key for key in cache._evicted if key not in self._images])
+
+
 class Calibrations(object):
     """
     This class is primarily designed to guide the generation of
@@ -41,7 +137,7 @@ class Calibrations(object):
 
     To avoid rebuilding MasterFrames that were generated during this execution
     of PypeIt, the class performs book-keeping of these master frames and
-    holds that info in self.calib_dict
+    holds them in memory in self.calib_cache (see :class:`CalibrationCache`)
 
     Args:
         fitstbl (:class:`pypeit.metadata.PypeItMetaData`):
@@ -75,7 +171,8 @@ class Calibrations(object):
         par
         redux_path
         master_dir
-        calib_dict
+        calib_cache (:class:`CalibrationCache`):
+            The calibrations held in memory.
         det
         frame (:obj:`int`):
             0-indexed row of the frame being calibrated in
@@ -113,8 +210,13 @@ class Calibrations(object):
         self.redux_path = os.getcwd() if redux_path is None else redux_path
         self.master_dir = masterframe.set_master_dir(self.redux_path, self.spectrograph, self.par)
 
+        # Cache of the derived images (tilts, wavelength, etc.)
+        imagecache.image_cache.configure(maxmem=int(self.par['image_cache_mem']*2**30),
+                                         spill_dir=self.master_dir if self.par['image_cache_spill']
+                                                        else None)
+
         # Attributes
-        self.calib_dict = {}
+        self.calib_cache = CalibrationCache(maxmem=int(self.par['calib_cache_mem']*2**30))
         self.det = None
         self.frame = None
         self.binning = None
@@ -148,31 +250,22 @@ class Calibrations(object):
 
     def check_for_previous(self, ftype, master_key):
         """
-        Check to see whether the master file(s) have been
-        built during this run of PypeIt.
-        If so, we will likely either load from memory or hard-drive
-
-        calib_dict is nested as:
-           [master_key][ftype]
-
-        If the ftype has not yet been generated, an empty dict is prepared
-           self.calib_dict[master_key][ftype] = {}
+        Check to see whether the calibration has been built during this
+        run of PypeIt.  If so, it is either handed back from memory or
+        its master frame is reloaded from the hard-drive.
 
         Args:
             ftype (str): Type of calibration frame
             master_key (str): Master key naming
 
         Returns:
-             bool: True = Built previously
-        """
-        previous = False
-        if master_key in self.calib_dict.keys():
-            if ftype in self.calib_dict[master_key].keys():
-                previous = True
-        else:  # Prep for saving
-            self.calib_dict[master_key] = {}
-        # Return
-        return previous
+             bool, bool: True if the calibration is held in
+             :attr:`calib_cache`; True if it was built but dropped from
+             memory and its master frame was saved to disk
+        """
+        in_memory = (master_key, self.det, ftype) in self.calib_cache
+        prev_build = self.save_masters and self.calib_cache.evicted(master_key, self.det, ftype)
+        return in_memory, prev_build
 
     def set_config(self, frame, det, par=None):
         """
@@ -220,10 +313,10 @@ class Calibrations(object):
         self.arc_master_key = self.fitstbl.master_key(arc_rows[0], det=self.det)
         self.master_key_dict['arc'] = self.arc_master_key
 
-        prev_build = self.check_for_previous('arc', self.arc_master_key)
-        if prev_build:
+        in_memory, prev_build = self.check_for_previous('arc', self.arc_master_key)
+        if in_memory:
             # Previously calculated
-            self.msarc = self.calib_dict[self.arc_master_key]['arc']
+            self.msarc = self.calib_cache.get(self.arc_master_key, self.det, 'arc')
             return self.msarc
 
         # Instantiate with everything needed to generate the image (in case we do)
@@ -243,7 +336,7 @@ class Calibrations(object):
                                           steps=self.arcImage.steps)
 
         # Save & return
-        self.calib_dict[self.arc_master_key]['arc'] = self.msarc
+        self.calib_cache.set(self.arc_master_key, self.det, 'arc', self.msarc)
         return self.msarc
 
     def get_bias(self):
@@ -271,9 +364,9 @@ class Calibrations(object):
         self.master_key_dict['bias'] = self.bias_master_key
 
         # Grab from internal dict (or hard-drive)?
-        prev_build = self.check_for_previous('bias', self.bias_master_key)
-        if prev_build:
-            self.msbias = self.calib_dict[self.bias_master_key]['bias']
+        in_memory, prev_build = self.check_for_previous('bias', self.bias_master_key)
+        if in_memory:
+            self.msbias = self.calib_cache.get(self.bias_master_key, self.det, 'bias')
             msgs.info("Reloading the bias from the internal dict")
             return self.msbias
 
@@ -296,7 +389,7 @@ class Calibrations(object):
                                            steps=self.biasFrame.steps)
 
         # Save & return
-        self.calib_dict[self.bias_master_key]['bias'] = self.msbias
+        self.calib_cache.set(self.bias_master_key, self.det, 'bias', self.msbias)
         return self.msbias
 
     def get_bpm(self):
@@ -322,9 +415,9 @@ class Calibrations(object):
         self.bpm_master_key = self.fitstbl.master_key(self.frame, det=self.det)
         self.master_key_dict['bpm'] = self.bpm_master_key
 
-        prev_build = self.check_for_previous('bpm', self.bpm_master_key)
-        if prev_build:
-            self.msbpm = self.calib_dict[self.bpm_master_key]['bpm']
+        in_memory, _ = self.check_for_previous('bpm', self.bpm_master_key)
+        if in_memory:
+            self.msbpm = self.calib_cache.get(self.bpm_master_key, self.det, 'bpm')
             return self.msbpm
 
         # Always use the shape!
@@ -340,7 +433,7 @@ class Calibrations(object):
         # Build it
         self.msbpm = self.spectrograph.bpm(shape=self.shape, filename=sci_image_files[0], det=self.det)
         # Record it
-        self.calib_dict[self.bpm_master_key]['bpm'] = self.msbpm
+        self.calib_cache.set(self.bpm_master_key, self.det, 'bpm', self.msbpm)
         # Return
         return self.msbpm
 
@@ -390,11 +483,10 @@ class Calibrations(object):
 
         self.master_key_dict['flat'] = self.pixflat_master_key
         # Return already generated data
-        prev_build1 = self.check_for_previous('normpixelflat', self.pixflat_master_key)
-        prev_build2 = self.check_for_previous('illumflat', self.pixflat_master_key)
-        if np.all([prev_build1, prev_build2]):
-            self.mspixflatnrm = self.calib_dict[self.pixflat_master_key]['normpixelflat']
-            self.msillumflat = self.calib_dict[self.pixflat_master_key]['illumflat']
+        in_memory, prev_build = self.check_for_previous('flats', self.pixflat_master_key)
+        if in_memory:
+            self.mspixflatnrm, self.msillumflat \
+                    = self.calib_cache.get(self.pixflat_master_key, self.det, 'flats')
             return self.mspixflatnrm, self.msillumflat
 
         # Instantiate
@@ -411,8 +503,8 @@ class Calibrations(object):
         # --- Pixel flats
 
         # 1)  Try to load master files from disk (MasterFrame)?
-        self.mspixflatnrm, _  = self.flatField.master(prev_build=prev_build1)
-        if prev_build2:
+        self.mspixflatnrm, _  = self.flatField.master(prev_build=prev_build)
+        if prev_build:
             self.msillumflat, _ = self.flatField.load_master_illumflat()
 
         # 2) Did the user specify a flat? If so load it in  (e.g. LRISb with pixel flat)?
@@ -442,6 +534,9 @@ class Calibrations(object):
                 msgs.info('Using slit boundary tweaks from IllumFlat and updated tilts image')
                 self.tslits_dict = self.flatField.tslits_dict
                 self.tilts_dict = self.flatField.tilts_dict
+                self.calib_cache.set(self.trace_master_key, self.det, 'trace', self.tslits_dict)
+                self.calib_cache.set(self.arc_master_key, self.det, 'tilts',
+                                     (self.tilts_dict, self.wt_maskslits))
 
             # Save to Masters
             if self.save_masters:
@@ -482,8 +577,8 @@ class Calibrations(object):
                 msgs.warn('You are not illumination flat fielding your data!')
 
         # Save & return
-        self.calib_dict[self.pixflat_master_key]['normpixelflat'] = self.mspixflatnrm
-        self.calib_dict[self.pixflat_master_key]['illumflat'] = self.msillumflat
+        self.calib_cache.set(self.pixflat_master_key, self.det, 'flats',
+                             (self.mspixflatnrm, self.msillumflat))
 
         return self.mspixflatnrm, self.msillumflat
 
@@ -522,9 +617,9 @@ class Calibrations(object):
         self.master_key_dict['trace'] = self.trace_master_key
 
         # Return already generated data
-        prev_build = self.check_for_previous('trace', self.trace_master_key)
-        if prev_build and (not redo):
-            self.tslits_dict = self.calib_dict[self.trace_master_key]['trace']
+        in_memory, prev_build = self.check_for_previous('trace', self.trace_master_key)
+        if in_memory and (not redo):
+            self.tslits_dict = self.calib_cache.get(self.trace_master_key, self.det, 'trace')
             self.maskslits = np.zeros(self.tslits_dict['slit_left'].shape[1], dtype=bool)
             return self.tslits_dict, self.maskslits
 
@@ -577,7 +672,7 @@ class Calibrations(object):
             #self.tslits_dict = self.traceSlits._fill_tslits_dict()
 
         # Save, initialize maskslits, and return
-        self.calib_dict[self.trace_master_key]['trace'] = self.tslits_dict
+        self.calib_cache.set(self.trace_master_key, self.det, 'trace', self.tslits_dict)
         self.maskslits = np.zeros(self.tslits_dict['slit_left'].shape[1], dtype=bool)
 
         return self.tslits_dict, self.maskslits
@@ -603,15 +698,15 @@ class Calibrations(object):
         self._chk_set(['arc_master_key', 'det', 'par'])
 
         # Return existing data
-        prev_build = self.check_for_previous('wave', self.arc_master_key)
-        if prev_build:
-            self.mswave = self.calib_dict[self.arc_master_key]['wave']
+        in_memory, prev_build = self.check_for_previous('wave', self.arc_master_key)
+        if in_memory:
+            self.mswave = self.calib_cache.get(self.arc_master_key, self.det, 'wave')
             return self.mswave
 
         # No wavelength calibration requested
         if self.par['wavelengths']['reference'] == 'pixel':
             self.mswave = self.tilts_dict['tilts'] * (self.tilts_dict['tilts'].shape[0]-1.0)
-            self.calib_dict[self.arc_master_key]['wave'] = self.mswave
+            self.calib_cache.set(self.arc_master_key, self.det, 'wave', self.mswave)
             return self.mswave
 
         # Instantiate
@@ -629,7 +724,7 @@ class Calibrations(object):
             self.waveImage.save_master(self.mswave, steps=self.waveImage.steps)
 
         # Save & return
-        self.calib_dict[self.arc_master_key]['wave'] = self.mswave
+        self.calib_cache.set(self.arc_master_key, self.det, 'wave', self.mswave)
 
         return self.mswave
 
@@ -652,10 +747,10 @@ class Calibrations(object):
         self._chk_set(['arc_master_key', 'det', 'calib_ID', 'par'])
 
         # Return existing data
-        prev_build = self.check_for_previous('wavecalib', self.arc_master_key)
-        if prev_build:
-            self.wv_calib = self.calib_dict[self.arc_master_key]['wavecalib']
-            self.wv_maskslits = self.calib_dict[self.arc_master_key]['wvmask']
+        in_memory, prev_build = self.check_for_previous('wavecalib', self.arc_master_key)
+        if in_memory:
+            self.wv_calib, self.wv_maskslits \
+                    = self.calib_cache.get(self.arc_master_key, self.det, 'wavecalib')
             self.maskslits += self.wv_maskslits
             return self.wv_calib, self.maskslits
 
@@ -695,8 +790,8 @@ class Calibrations(object):
         self.maskslits += self.wv_maskslits
 
         # Save & return
-        self.calib_dict[self.arc_master_key]['wavecalib'] = self.wv_calib
-        self.calib_dict[self.arc_master_key]['wvmask'] = self.wv_maskslits
+        self.calib_cache.set(self.arc_master_key, self.det, 'wavecalib',
+                             (self.wv_calib, self.wv_maskslits))
         # Return
         return self.wv_calib, self.maskslits
 
@@ -725,10 +820,10 @@ class Calibrations(object):
         self._chk_set(['arc_master_key', 'det', 'calib_ID', 'par'])
 
         # Return existing data
-        prev_build = self.check_for_previous('tilts_dict', self.arc_master_key)
-        if prev_build:
-            self.tilts_dict = self.calib_dict[self.arc_master_key]['tilts_dict']
-            self.wt_maskslits = self.calib_dict[self.arc_master_key]['wtmask']
+        in_memory, prev_build = self.check_for_previous('tilts', self.arc_master_key)
+        if in_memory:
+            self.tilts_dict, self.wt_maskslits \
+                    = self.calib_cache.get(self.arc_master_key, self.det, 'tilts')
             self.maskslits += self.wt_maskslits
             return self.tilts_dict, self.maskslits
 
@@ -750,8 +845,8 @@ class Calibrations(object):
             self.wt_maskslits = np.zeros_like(self.maskslits, dtype=bool)
 
         # Save & return
-        self.calib_dict[self.arc_master_key]['tilts_dict'] = self.tilts_dict
-        self.calib_dict[self.arc_master_key]['wtmask'] = self.wt_maskslits
+        self.calib_cache.set(self.arc_master_key, self.det, 'tilts',
+                             (self.tilts_dict, self.wt_maskslits))
         self.maskslits += self.wt_maskslits
         return self.tilts_dict, self.maskslits
 
@@ -6,12 +6,26 @@ import numpy as np
 
 from pypeit import msgs
 
+# Peak working memory of comb_frames in units of the size of a block of
+# rows, including the copy of the block itself.  Measured with
+# tracemalloc, _comb_frames_block needs 6-7.5 times the block size
+# depending on the combination method and the data type.
+_COMB_WORKSPACE = 9
+
+
 def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None,
                      maskvalue=1048577, method='weightmean', satpix='reject', cosmics=None,
-                     n_lohi=[0,0], sig_lohi=[3.,3.], replace='maxnonsat'):
+                     n_lohi=[0,0], sig_lohi=[3.,3.], replace='maxnonsat', maxmem=None):
     """
     Combine several frames
 
+    Every rejection and combination step only operates along the frame
+    axis, such that the frames can be combined in blocks of rows.  When
+    `maxmem` is provided, or the frames are provided as a list of 2D
+    arrays (e.g. memory-mapped images), the frames are combined in row
+    blocks sized so that the working memory stays below `maxmem`.  The
+    result is identical to combining the full stack at once.
+
     .. todo::
         - Make better use of np.ma.MaskedArray objects throughout?
         - More testing of replacement code necessary?
@@ -19,8 +33,10 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
 
     Parameters
     ----------
-    frames_arr : ndarray (3D)
-      Array of frames to be combined
+    frames_arr : ndarray (3D), list
+      Array of frames to be combined, with shape (nx, ny, nframes), or
+      a list of nframes 2D arrays with shape (nx, ny).  The 3D array
+      is modified in place unless it is combined in row blocks.
     weights : str, or None (optional)
       How should the frame combination by weighted (not currently
       implemented)
@@ -39,6 +55,9 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
       Method for handling saturated pixels
     saturation : float, optional
       Saturation value;  only required for some choices of reject['replace']
+    maxmem : float, optional
+      Maximum memory in bytes to use for the combination.  If None and
+      frames_arr is a 3D array, the full stack is combined at once.
 
     Returns
     -------
@@ -53,11 +72,22 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
     # Check the number of frames
     if frames_arr is None:
         msgs.error("No '{0:s}' frames were given to comb_frames to combine".format(printtype))
-    (sz_x, sz_y, num_frames) = np.shape(frames_arr)
+    if isinstance(frames_arr, (list, tuple)):
+        num_frames = len(frames_arr)
+        if num_frames == 0:
+            msgs.error("No '{0:s}' frames were given to comb_frames to combine".format(printtype))
+        (sz_x, sz_y) = np.shape(frames_arr[0])
+        if np.any([np.shape(f) != (sz_x, sz_y) for f in frames_arr]):
+            msgs.error('All {0:s} frames must have the same shape.'.format(printtype))
+        dtype = np.result_type(*[f.dtype for f in frames_arr])
+    else:
+        (sz_x, sz_y, num_frames) = np.shape(frames_arr)
+        dtype = frames_arr.dtype
     if num_frames == 1:
         msgs.info("Only one frame to combine!")
         msgs.info("Returning input frame")
-        return frames_arr[:, :, 0]
+        return np.asarray(frames_arr[0]) if isinstance(frames_arr, (list, tuple)) \
+                    else frames_arr[:, :, 0]
     else:
         msgs.info("Combining {0:d} {1:s} frames".format(num_frames, printtype))
 
@@ -70,6 +100,97 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
                    + msgs.newline() + 'There are {0:d} frames '.format(num_frames)
                    + 'and n_lohi will reject {0:d} low and {1:d} high values.'.format(
                                                                 n_lohi[0], n_lohi[1]))
+    # Check the methods before any work is done
+    if replace not in ['min', 'max', 'mean', 'median', 'weightmean', 'maxnonsat']:
+        msgs.error("You must specify what to do in case all pixels are rejected")
+    if replace == 'weightmean':
+        msgs.work("No weights are implemented yet")
+    if satpix not in ['force', 'reject', 'nothing']:
+        msgs.error('Option \'{0}\' '.format(satpix)
+                   + 'for dealing with saturated pixels was not recognised.')
+    if method not in ['mean', 'median', 'weightmean']:
+        msgs.error("Combination type '{0:s}' is unknown".format(method))
+
+    msgs.info("Finding saturated and non-linear pixels")
+    msgs.info("Rejecting cosmic rays" if cosmics > 0.0 else "Not rejecting cosmic rays")
+    if n_lohi[0] > 0:
+        msgs.info("Rejecting {0:d} deviant low pixels".format(n_lohi[0]))
+    if n_lohi[1] > 0:
+        msgs.info("Rejecting {0:d} deviant high pixels".format(n_lohi[1]))
+    if n_lohi[0] <= 0 and n_lohi[1] <= 0:
+        msgs.info("Not rejecting any low/high pixels")
+    # TODO: sig_lohi (what was level) is not actually used, instead this
+    # just selects if cosmics should be used.  Is this intentional?  Why
+    # not just do: `if cosmics > 0:`?
+    msgs.info("Rejecting deviant pixels" if sig_lohi[0] > 0.0 or sig_lohi[1] > 0.0
+                else "Not rejecting deviant pixels")
+    msgs.info("Combining frames with a {0:s} operation".format(method))
+    msgs.info("Replacing completely masked pixels with the {0:s} value of the input "
+              "frames".format(replace))
+    if satpix == 'force':
+        msgs.info("Applying saturated pixels to final combined image")
+
+    # Make sure the returned array is the correct type; single
+    # precision input stays single precision
+    out_dtype = np.result_type(dtype, np.float32)
+    combine_kwargs = dict(saturation=saturation, maskvalue=maskvalue, method=method,
+                          satpix=satpix, cosmics=cosmics, n_lohi=n_lohi, sig_lohi=sig_lohi,
+                          replace=replace)
+
+    nrows = sz_x if maxmem is None else comb_block_rows(sz_y, num_frames, dtype, maxmem)
+    if not isinstance(frames_arr, (list, tuple)) and nrows >= sz_x:
+        # Combine the full stack at once
+        comb_frame = np.array(_comb_frames_block(frames_arr, **combine_kwargs), dtype=out_dtype)
+    else:
+        # Combine the frames in blocks of rows.  The blocks are always
+        # copied so that memory-mapped input is only read.
+        nrows = min(nrows, sz_x)
+        msgs.info("Combining in {0:d} blocks of {1:d} rows".format(-(-sz_x//nrows), nrows))
+        comb_frame = np.empty((sz_x, sz_y), dtype=out_dtype)
+        for r0 in range(0, sz_x, nrows):
+            r1 = min(r0+nrows, sz_x)
+            block = np.stack([f[r0:r1] for f in frames_arr], axis=2).astype(dtype, copy=False) \
+                        if isinstance(frames_arr, (list, tuple)) else np.array(frames_arr[r0:r1])
+            comb_frame[r0:r1] = _comb_frames_block(block, **combine_kwargs)
+
+    ##############
+    # And return a 2D numpy array
+    msgs.info("{0:d} {1:s} frames combined successfully!".format(num_frames, printtype))
+    return comb_frame
+
+
+def comb_block_rows(ny, nframes, dtype, maxmem):
+    """
+    Return the number of rows of a frame stack that can be combined at
+    once by :func:`comb_frames` within a given memory budget.
+
+    Args:
+        ny (:obj:`int`):
+            Number of pixels along the second (fastest) image axis.
+        nframes (:obj:`int`):
+            Number of frames to combine.
+        dtype (:obj:`numpy.dtype`):
+            Data type of the frames.
+        maxmem (:obj:`float`):
+            Maximum memory in bytes.
+
+    Returns:
+        int: The number of rows; at least one.
+    """
+    itemsize = np.result_type(dtype, np.float32).itemsize
+    return max(1, int(maxmem // (_COMB_WORKSPACE*ny*nframes*itemsize)))
+
+
+def _comb_frames_block(frames_arr, saturation=None, maskvalue=1048577, method='weightmean',
+                       satpix='reject', cosmics=None, n_lohi=[0,0], sig_lohi=[3.,3.],
+                       replace='maxnonsat'):
+    """
+    Combine a 3D stack of frames along its last axis.
+
+    This does the work for :func:`comb_frames`, which checks the input
+    and reports the steps.  The input array is modified in place.
+    """
+    (sz_x, sz_y, num_frames) = np.shape(frames_arr)
 
     # Calculate the values to be used if all frames are rejected in some pixels
     if replace == 'min':
@@ -81,18 +202,14 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
     elif replace == 'median':
         allrej_arr = np.median(frames_arr, axis=2)
     elif replace == 'weightmean':
-        msgs.work("No weights are implemented yet")
         allrej_arr = frames_arr.copy()
         allrej_arr = masked_weightmean(allrej_arr, maskvalue)
     elif replace == 'maxnonsat':
         allrej_arr = frames_arr.copy()
         allrej_arr = maxnonsat(allrej_arr, saturation)
-    else:
-        msgs.error("You must specify what to do in case all pixels are rejected")
 
     ################
     # Saturated Pixels
-    msgs.info("Finding saturated and non-linear pixels")
     if satpix == 'force':
         # If a saturated pixel is in one of the frames, force them to
         # all have saturated pixels
@@ -105,18 +222,11 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
     elif satpix == 'reject':
         # Ignore saturated pixels in frames if possible
         frames_arr[frames_arr > saturation] = maskvalue
-    elif satpix == 'nothing':
-        # Don't do anything special for saturated pixels (Hopefully the
-        # user has specified how to deal with them below!)
-        pass
-    else:
-        msgs.error('Option \'{0}\' '.format(satpix)
-                   + 'for dealing with saturated pixels was not recognised.')
 
     ################
     # Cosmic Rays
     if cosmics > 0.0:
-        msgs.info("Rejecting cosmic rays")  # Use a robust statistic
+        # Use a robust statistic
         masked_fa = np.ma.MaskedArray(frames_arr, mask=frames_arr==maskvalue)
         medarr = np.ma.median(masked_fa, axis=2)
         stdarr = 1.4826*np.ma.median(np.ma.absolute(masked_fa - medarr[:,:,None]), axis=2)
@@ -125,8 +235,6 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
         frames_arr[indx] = maskvalue
         # Delete unecessary arrays
         del medarr, stdarr
-    else:
-        msgs.info("Not rejecting cosmic rays")
 
     ################
     # Low and High pixel rejection --- Masks *additional* pixels
@@ -136,7 +244,6 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
         # First reject low pixels
         frames_arr = np.sort(frames_arr, axis=2)
         if n_lohi[0] > 0:
-            msgs.info("Rejecting {0:d} deviant low pixels".format(n_lohi[0]))
             while rejlo > 0:
                 xi, yi = np.indices(sz_x, sz_y)
                 frames_arr[xi, yi, np.argmin(frames_arr, axis=2)] = maskvalue
@@ -145,7 +252,6 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
 
         # Now reject high pixels
         if n_lohi[1] > 0:
-            msgs.info("Rejecting {0:d} deviant high pixels".format(n_lohi[1]))
             frames_arr[np.where(frames_arr == maskvalue)] *= -1
             while rejhi > 0:
                 xi, yi = np.indices(sz_x, sz_y)
@@ -159,17 +265,11 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
 #		if reject['lowhigh'][1] > 0:
 #			msgs.info("Rejecting {0:d} deviant high pixels".format(reject['lowhigh'][1]))
 #			masktemp[:,:,-reject['lowhigh'][0]:] = True
-    else:
-        msgs.info("Not rejecting any low/high pixels")
 
     ################
     # Deviant Pixels
-    # TODO: sig_lohi (what was level) is not actually used, instead this
-    # just selects if cosmics should be used.  Is this intentional?  Why
-    # not just do: `if cosmics > 0:`?
     if sig_lohi[0] > 0.0 or sig_lohi[1] > 0.0:
-        msgs.info("Rejecting deviant pixels")  # Use a robust statistic
-
+        # Use a robust statistic
         masked_fa = np.ma.MaskedArray(frames_arr, mask=frames_arr==maskvalue)
         medarr = np.ma.median(masked_fa, axis=2)
         stdarr = 1.4826*np.ma.median(np.ma.absolute(masked_fa - medarr[:,:,None]), axis=2)
@@ -180,12 +280,9 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
 
         # Delete unecessary arrays
         del medarr, stdarr
-    else:
-        msgs.info("Not rejecting deviant pixels")
 
     ##############
     # Combine the arrays
-    msgs.info("Combining frames with a {0:s} operation".format(method))
     if method == 'mean':
         comb_frame = np.ma.mean(np.ma.MaskedArray(frames_arr, mask=frames_arr==maskvalue), axis=2)
     elif method == 'median':
@@ -193,12 +290,9 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
     elif method == 'weightmean':
         comb_frame = frames_arr.copy()
         comb_frame = masked_weightmean(comb_frame, maskvalue)
-    else:
-        msgs.error("Combination type '{0:s}' is unknown".format(method))
 
     ##############
     # If any pixels are completely masked, apply user-specified function
-    msgs.info("Replacing completely masked pixels with the {0:s} value of the input frames".format(replace))
     indx = comb_frame == maskvalue
     comb_frame[indx] = allrej_arr[indx]
     # Delete unecessary arrays
@@ -207,14 +301,8 @@ def comb_frames(frames_arr, printtype=None, frametype='Unknown', saturation=None
     ##############
     # Apply the saturated pixels:
     if satpix == 'force':
-        msgs.info("Applying saturated pixels to final combined image")
         comb_frame[setsat] = saturation # settings.spect[dnum]['saturation']
 
-    ##############
-    # And return a 2D numpy array
-    msgs.info("{0:d} {1:s} frames combined successfully!".format(num_frames, printtype))
-    # Make sure the returned array is the correct type
-    comb_frame = np.array(comb_frame, dtype=np.float)
     return comb_frame
 
 
@@ -117,10 +117,12 @@ def extract_asymbox2(image,left_in,right_in,ycen = None,weight_image = None):
     maxwindow = np.max(right - left)
     tempx = np.int(maxwindow + 3.0)
 
-    bigleft = np.outer(left[:], np.ones(tempx))
-    bigright = np.outer(right[:], np.ones(tempx))
-    spot = np.outer(np.ones(npix * nTrace), np.arange(tempx)) + bigleft - 1
-    bigy = np.outer(ycen_out[:], np.ones(tempx, dtype='int'))
+    # The window of each trace position is along the second axis; the
+    # positions are broadcast over it
+    bigleft = left.reshape(-1,1)
+    bigright = right.reshape(-1,1)
+    spot = np.arange(tempx)[None,:] + bigleft - 1
+    bigy = ycen_out.reshape(-1,1)
 
     fullspot = np.array(np.fmin(np.fmax(np.round(spot + 1) - 1, 0), nspat - 1), int)
     fracleft = np.fmax(np.fmin(fullspot - bigleft, 0.5), -0.5)
@@ -135,19 +137,18 @@ def extract_asymbox2(image,left_in,right_in,ycen = None,weight_image = None):
     del fracright
     bigy = np.fmin(np.fmax(bigy, 0), nspec - 1)
 
-    if weight_image != None:
-        temp = np.array([weight_image[x1, y1] * image[x1, y1] for (x1, y1) in zip(bigy.flatten(), fullspot.flatten())])
-        temp2 = np.reshape(weight.flatten() * temp, (nTrace, npix, tempx))
+    # Gather the pixels in each window; same flattening order as the
+    # window weights
+    temp = image[bigy, fullspot]
+    if weight_image is not None:
+        temp_wi = weight_image[bigy, fullspot]
+        temp2 = np.reshape(weight * (temp_wi * temp), (nTrace, npix, tempx))
         fextract = np.sum(temp2, axis=2)
-        temp_wi = np.array([weight_image[x1, y1] for (x1, y1) in zip(bigy.flatten(), fullspot.flatten())])
-        temp2_wi = np.reshape(weight.flatten() * temp_wi, (nTrace, npix, tempx))
+        temp2_wi = np.reshape(weight * temp_wi, (nTrace, npix, tempx))
         f_ivar = np.sum(temp2_wi, axis=2)
         fextract = fextract / (f_ivar + (f_ivar == 0)) * (f_ivar > 0)
     else:
-        # Might be more pythonic way to code this. I needed to switch the flattening order in order to get
-        # this to work
-        temp = np.array([image[x1, y1] for (x1, y1) in zip(bigy.flatten(), fullspot.flatten())])
-        temp2 = np.reshape(weight.flatten() * temp, (nTrace, npix, tempx))
+        temp2 = np.reshape(weight * temp, (nTrace, npix, tempx))
         fextract = np.sum(temp2, axis=2)
 
     # IDL version model functionality not implemented yet
@@ -1300,12 +1301,15 @@ def iter_tracefit(image, xinit_in, ncoeff, inmask = None, trc_inmask = None, fwh
         title_text = 'Flux Weighted'
 
     xfit1 = np.copy(xinit)
+    # The masked image and its inverse variance do not change between iterations
+    image_msk = image*inmask
+    invvar_msk = inmask.astype(float)
 
     for iiter in range(niter):
         if gweight:
-            xpos1, xerr1 = trace_slits.trace_gweight(image*inmask,xfit1, invvar=inmask.astype(float),sigma=fwhm/2.3548)
+            xpos1, xerr1 = trace_slits.trace_gweight(image_msk,xfit1, invvar=invvar_msk,sigma=fwhm/2.3548)
         else:
-            xpos1, xerr1 = trace_slits.trace_fweight(image*inmask,xfit1, invvar = inmask.astype(float), radius = fwhm_vec[iiter])
+            xpos1, xerr1 = trace_slits.trace_fweight(image_msk,xfit1, invvar = invvar_msk, radius = fwhm_vec[iiter])
 
         # Do not do any kind of masking based on xerr1. Trace fitting is much more robust when masked pixels are simply
         # replaced by the tracing crutch
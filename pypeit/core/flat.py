@@ -189,7 +189,7 @@ def fit_flat(flat, tilts_dict, tslits_dict_in, slit, inmask = None,
     # Get the thismask_in and input slit bounadries from the tslits_dict
     slit_left_in = tslits_dict_in['slit_left'][:,slit]
     slit_righ_in = tslits_dict_in['slit_righ'][:,slit]
-    thismask_in = pixels.tslits2mask(tslits_dict_in) == slit
+    thismask_in = pixels.slit_layout(tslits_dict_in).mask(slit)
 
     # Compute some things using the original slit boundaries and thismask_in
 
@@ -209,10 +209,14 @@ def fit_flat(flat, tilts_dict, tslits_dict_in, slit, inmask = None,
     ximg = (spat_img - slit_left_img)/slitwidth_img
 
     # Create a wider slitmask image with shift pixels padded on each side
-    slitmask_pad = pixels.tslits2mask(tslits_dict_in, pad = pad)
-    thismask = (slitmask_pad == slit) # mask enclosing the wider slit bounadries
-    # Create a tilts image using this padded thismask, rather than using the original thismask_in slit pixels
-    tilts = tracewave.fit2tilts(shape, tilts_dict['coeffs'], tilts_dict['func2d'])
+    thismask = pixels.slit_layout(tslits_dict_in, pad=pad).mask(slit) # mask enclosing the wider slit bounadries
+    # Create a tilts image using this padded thismask, rather than using the original thismask_in slit pixels.
+    # The tilts of this slit are only evaluated on the columns that can hold its padded pixels.
+    spat_min = int(np.clip(np.floor(np.amin(slit_left_in) - pad) - 1, 0, nspat))
+    spat_max = int(np.clip(np.ceil(np.amax(slit_righ_in) + pad) + 2, 0, nspat))
+    bbox = (slice(None), slice(spat_min, spat_max))
+    tilts = np.zeros(shape, dtype=float)
+    tilts[bbox] = tracewave.fit2tilts(shape, tilts_dict['coeffs'], tilts_dict['func2d'], bbox=bbox)
     piximg = tilts * (nspec-1)
     pixvec = np.arange(nspec)
 
@@ -319,8 +323,7 @@ def fit_flat(flat, tilts_dict, tslits_dict_in, slit, inmask = None,
         tslits_dict_out = copy.deepcopy(tslits_dict_in)
         tslits_dict_out['slit_left'][:,slit] = slit_left_out
         tslits_dict_out['slit_righ'][:,slit] = slit_righ_out
-        slitmask_out = pixels.tslits2mask(tslits_dict_out)
-        thismask_out = (slitmask_out == slit)
+        thismask_out = pixels.slit_layout(tslits_dict_out).mask(slit)
         ximg_out, edgmask_out = pixels.ximg_and_edgemask(slit_left_out, slit_righ_out, thismask_out, trim_edg=trim_edg)
         # Note that nothing changes with the tilts, since these were already extrapolated across the whole image.
     else:
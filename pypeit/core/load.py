@@ -3,6 +3,8 @@
 from __future__ import (print_function, absolute_import, division, unicode_literals)
 
 import os
+import gzip
+import json
 
 import numpy as np
 
@@ -373,3 +375,126 @@ def waveids(fname):
         pass
     return pixels
 
+
+
+def load_headers(filename, numhead):
+    """
+    Read the headers of the first numhead extensions of a fits file.
+
+    The file is opened only once and the data are not read.
+
+    Args:
+        filename (str):
+            Name of the fits file
+        numhead (int):
+            Number of extensions to read
+
+    Returns:
+        list: List of numhead :obj:`fits.Header` objects; None for the
+        extensions that could not be read.
+    """
+    headarr = [None]*numhead
+    try:
+        hdu = fits.open(filename)
+    except:
+        return headarr
+    for k in range(numhead):
+        try:
+            headarr[k] = hdu[k].header
+        except:
+            pass
+    hdu.close()
+    return headarr
+
+
+class HeaderCache(object):
+    """
+    Persistent cache of the fits headers of raw files.
+
+    The headers are keyed by the absolute path of each file, and are
+    only used if the size and modification time of the file have not
+    changed since they were cached.  The cache is a gzipped json file.
+
+    Args:
+        cache_file (str):
+            Name of the cache file.  It is read if it exists.
+
+    Attributes:
+        cache (dict):
+            Cached entries, each a dict with the size, mtime and the
+            headers (as strings) of a file.
+        modified (bool):
+            The cache has changed since it was read.
+    """
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.cache = {}
+        self.modified = False
+        if os.path.isfile(self.cache_file):
+            try:
+                with gzip.open(self.cache_file, 'rt') as f:
+                    self.cache = json.load(f)
+            except:
+                msgs.warn('Could not read header cache {0}; starting a new one.'.format(
+                          self.cache_file))
+                self.cache = {}
+
+    @staticmethod
+    def _stat(filename):
+        stat = os.stat(filename)
+        return stat.st_size, stat.st_mtime
+
+    def get(self, filename, numhead):
+        """
+        Get the cached headers of a file.
+
+        Args:
+            filename (str):
+                Name of the fits file
+            numhead (int):
+                Number of extensions needed
+
+        Returns:
+            list: List of numhead :obj:`fits.Header` objects, or None
+            if the file is not in the cache or has changed.
+        """
+        entry = self.cache.get(os.path.abspath(filename))
+        if entry is None or len(entry['headers']) < numhead:
+            return None
+        try:
+            size, mtime = self._stat(filename)
+        except OSError:
+            return None
+        if entry['size'] != size or entry['mtime'] != mtime:
+            return None
+        return [fits.Header.fromstring(h) for h in entry['headers'][:numhead]]
+
+    def set(self, filename, headarr):
+        """
+        Add the headers of a file to the cache.
+
+        Args:
+            filename (str):
+                Name of the fits file
+            headarr (list):
+                List of :obj:`fits.Header` objects.  Must not include
+                unreadable extensions.
+        """
+        size, mtime = self._stat(filename)
+        self.cache[os.path.abspath(filename)] = dict(size=size, mtime=mtime,
+                                                     headers=[h.tostring() for h in headarr])
+        self.modified = True
+
+    def write(self):
+        """
+        Write the cache file, if it has been modified.
+        """
+        if not self.modified:
+            return
+        # Write to a temporary file first so that an interrupted write
+        # does not corrupt the cache
+        tmp_file = self.cache_file + '.tmp'
+        with gzip.open(tmp_file, 'wt') as f:
+            json.dump(self.cache, f)
+        os.replace(tmp_file, self.cache_file)
+        self.modified = False
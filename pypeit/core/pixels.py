@@ -2,6 +2,8 @@
 """
 from __future__ import (print_function, absolute_import, division, unicode_literals)
 
+import hashlib
+
 import numpy as np
 
 from pypeit import msgs
@@ -165,33 +167,359 @@ def tslits2mask(tslits_dict, pad=None):
       that this pixel does not belong to any slit.
     """
 
-    # This little bit of code allows the input lord and rord to either be (nspec, nslit) arrays or a single
-    # vectors of size (nspec)
+    # The mask is rasterized once from the slit intervals and cached
+    # with the tslits_dict; return a copy so that the cached mask can't
+    # be changed by the caller
+    return slit_layout(tslits_dict, pad=pad).slitmask.copy()
+
 
-    slit_left = tslits_dict['slit_left']
-    slit_righ = tslits_dict['slit_righ']
-    nslits = tslits_dict['nslits']
-    nspec = tslits_dict['nspec']
-    nspat = tslits_dict['nspat']
-    spec_min = tslits_dict['spec_min']
-    spec_max = tslits_dict['spec_max']
+def slit_layout(tslits_dict, pad=None):
+    """
+    Return the :class:`SlitLayout` of the slits in a tslits_dict.
+
+    The layout is cached in the tslits_dict (under the key
+    'slit_layout') for each padding, such that the slit mask and the
+    pixels of each slit are only computed once.  The cache is emptied
+    when the slit edges in the tslits_dict change, and it is not
+    copied with the tslits_dict.
+
+    Args:
+        tslits_dict (dict):
+            Slit edges and image size; see
+            :func:`pypeit.traceslits.TraceSlits._fill_tslits_dict`.
+        pad (int or float, optional):
+            Pad the slits on both sides by this number of pixels.  If
+            None, use tslits_dict['pad'].
+
+    Returns:
+        :class:`SlitLayout`: The slit layout.
+    """
     if pad is None:
         pad = tslits_dict['pad']
+    fingerprint = tslits_fingerprint(tslits_dict)
+    cache = tslits_dict.get('slit_layout')
+    if not isinstance(cache, SlitLayoutCache) or cache.fingerprint != fingerprint:
+        cache = SlitLayoutCache(fingerprint)
+        tslits_dict['slit_layout'] = cache
+    if pad not in cache:
+        cache[pad] = SlitLayout.from_tslits_dict(tslits_dict, pad=pad)
+    return cache[pad]
 
-    slitmask = np.full((nspec, nspat),-1,dtype=int)
-    spat_img, spec_img = np.meshgrid(np.arange(nspat), np.arange(nspec))
 
-    for islit in range(nslits):
-        left_trace_img = np.outer(slit_left[:,islit], np.ones(nspat))  # left slit boundary replicated spatially
-        righ_trace_img = np.outer(slit_righ[:,islit], np.ones(nspat))  # left slit boundary replicated spatially
-        thismask = (spat_img > (left_trace_img - pad)) & (spat_img < (righ_trace_img + pad)) & \
-                   (spec_img >= spec_min[islit]) & (spec_img <= spec_max[islit])
-        if not np.any(thismask):
-            msgs.warn("There are no pixels in slit {:d}".format(islit))
-            continue
-        slitmask[thismask] = islit
+def tslits_fingerprint(tslits_dict):
+    """
+    Hash of the entries of a tslits_dict that set the slit layout.
+    """
+    fingerprint = hashlib.sha1()
+    for key in ['slit_left', 'slit_righ', 'spec_min', 'spec_max']:
+        fingerprint.update(np.ascontiguousarray(tslits_dict[key], dtype=float).data)
+    fingerprint.update(np.array([tslits_dict['nspec'], tslits_dict['nspat']]).data)
+    return fingerprint.hexdigest()
 
-    return slitmask
+
+class SlitLayoutCache(dict):
+    """
+    Dictionary with the :class:`SlitLayout` objects of a set of slit
+    edges for different paddings; see :func:`slit_layout`.
+
+    Copies and pickles of the cache are empty.
+
+    Args:
+        fingerprint (str, optional):
+            Hash of the slit edges for which the layouts are valid.
+    """
+    def __init__(self, fingerprint=None):
+        super(SlitLayoutCache, self).__init__()
+        self.fingerprint = fingerprint
+
+    def __copy__(self):
+        return SlitLayoutCache()
+
+    def __deepcopy__(self, memo):
+        return SlitLayoutCache()
+
+    def __reduce__(self):
+        return (SlitLayoutCache, ())
+
+
+class SlitLayout(object):
+    """
+    Per-row spatial intervals of the slits on a detector
+
+    Pixel ``(spec, spat)`` belongs to a slit if ``slit_left - pad < spat
+    < slit_righ + pad`` at row ``spec`` and the row is within the
+    spectral range of the slit.  These conditions define a half-open
+    interval of columns, ``lo[spec,slit] <= spat < hi[spec,slit]``, for
+    each row of each slit, such that the slit mask image is rasterized
+    in a time proportional to the number of pixels in the slits.  Where
+    padded slits overlap, the pixels are assigned to the later slit.
+
+    Args:
+        slit_left (ndarray):
+            Left slit edges, shape (nspec, nslits) or (nspec,)
+        slit_righ (ndarray):
+            Right slit edges, shape (nspec, nslits) or (nspec,)
+        nspat (int):
+            Number of spatial pixels of the image
+        spec_min, spec_max (ndarray, optional):
+            Inclusive spectral range of each slit.  Default is all rows.
+        pad (int or float, optional):
+            Pad the slits on both sides by this number of pixels.
+
+    Attributes:
+        lo, hi (ndarray, int):
+            First and one past the last column of each slit in each
+            row, shape (nspec, nslits); equal for rows without pixels.
+    """
+    def __init__(self, slit_left, slit_righ, nspat, spec_min=None, spec_max=None, pad=0):
+        slit_left = np.asarray(slit_left, dtype=float)
+        slit_righ = np.asarray(slit_righ, dtype=float)
+        if slit_left.ndim == 1:
+            slit_left = slit_left[:,None]
+            slit_righ = slit_righ[:,None]
+        self.nspec, self.nslits = slit_left.shape
+        self.nspat = nspat
+        self.shape = (self.nspec, self.nspat)
+
+        left = slit_left - pad
+        righ = slit_righ + pad
+        spec_vec = np.arange(self.nspec)[:,None]
+        good = np.invert(np.isnan(left) | np.isnan(righ))
+        if spec_min is not None:
+            good &= spec_vec >= np.asarray(spec_min)[None,:]
+        if spec_max is not None:
+            good &= spec_vec <= np.asarray(spec_max)[None,:]
+        # Columns with spat > left and spat < righ
+        self.lo = np.zeros(left.shape, dtype=int)
+        self.hi = np.zeros(left.shape, dtype=int)
+        self.lo[good] = np.clip(np.floor(left[good])+1, 0, nspat)
+        self.hi[good] = np.clip(np.ceil(righ[good]), 0, nspat)
+        self.hi = np.fmax(self.hi, self.lo)
+
+        self._slitmask = None
+        self._index = None
+
+    @classmethod
+    def from_tslits_dict(cls, tslits_dict, pad=None):
+        """
+        Instantiate the layout from a tslits_dict; see
+        :func:`slit_layout` for the cached layout of a tslits_dict.
+        """
+        return cls(tslits_dict['slit_left'], tslits_dict['slit_righ'], tslits_dict['nspat'],
+                   spec_min=tslits_dict['spec_min'], spec_max=tslits_dict['spec_max'],
+                   pad=tslits_dict['pad'] if pad is None else pad)
+
+    def interval_pixels(self, slit):
+        """
+        Flattened (row-major) indices of the pixels within the
+        intervals of a slit, including those assigned to a later
+        overlapping slit.
+        """
+        rows = np.where(self.hi[:,slit] > self.lo[:,slit])[0]
+        n = self.hi[rows,slit] - self.lo[rows,slit]
+        start = rows*self.nspat + self.lo[rows,slit]
+        # Concatenated ranges start[i]:start[i]+n[i]
+        return np.repeat(start - np.cumsum(n) + n, n) + np.arange(np.sum(n))
+
+    @property
+    def slitmask(self):
+        """
+        Read-only image assigning each pixel to a slit; -1 for pixels
+        not in any slit.  See :func:`tslits2mask`.
+        """
+        if self._slitmask is None:
+            slitmask = np.full(self.shape, -1, dtype=int)
+            for islit in range(self.nslits):
+                indx = self.interval_pixels(islit)
+                if indx.size == 0:
+                    msgs.warn("There are no pixels in slit {:d}".format(islit))
+                    continue
+                slitmask.flat[indx] = islit
+            slitmask.flags.writeable = False
+            self._slitmask = slitmask
+        return self._slitmask
+
+    @property
+    def index(self):
+        """
+        :class:`SlitIndex` with the pixels of each slit in
+        :attr:`slitmask`.
+        """
+        if self._index is None:
+            self._index = SlitIndex(self.slitmask, nslits=self.nslits)
+        return self._index
+
+    def bbox(self, slit):
+        """
+        Bounding box of the intervals of a slit as a tuple of slices.
+        """
+        rows = np.where(self.hi[:,slit] > self.lo[:,slit])[0]
+        if rows.size == 0:
+            return slice(0, 0), slice(0, 0)
+        return slice(rows[0], rows[-1]+1), \
+               slice(self.lo[rows,slit].min(), self.hi[rows,slit].max())
+
+    def pixels(self, slit):
+        """
+        Flattened (row-major) indices of the pixels assigned to a slit;
+        identical to ``SlitIndex(slitmask).pixels(slit)``.
+        """
+        indx = self.interval_pixels(slit)
+        return indx[self.slitmask.flat[indx] == slit]
+
+    def mask(self, slit):
+        """
+        Boolean image of the pixels assigned to a slit; identical to
+        ``slitmask == slit``, but only the bounding box of the slit is
+        searched.
+        """
+        thismask = np.zeros(self.shape, dtype=bool)
+        bbox = self.bbox(slit)
+        thismask[bbox] = self.slitmask[bbox] == slit
+        return thismask
+
+
+class SlitIndex(object):
+    """
+    Pixel geometry of the slits on a detector
+
+    The pixels of each slit are found once from a slit mask image (see
+    :func:`tslits2mask`), so that per-slit operations can work on the
+    flattened pixel indices or on the bounding box of the slit instead
+    of comparing the full slit mask image against every slit.
+
+    The pixel indices of each slit are in row-major order, such that
+    ``image.ravel()[slit_index.pixels(slit)]`` is identical to
+    ``image[slitmask == slit]``.
+
+    Args:
+        slitmask (ndarray, int):
+            Image assigning each pixel to a slit; -1 for pixels not in
+            any slit.
+        nslits (int, optional):
+            Number of slits.  If None, set by the maximum of slitmask.
+
+    Attributes:
+        shape (tuple):
+            Shape of the slit mask image
+        nslits (int):
+            Number of slits
+        npix (ndarray, int):
+            Number of pixels in each slit
+        spec_min, spec_max, spat_min, spat_max (ndarray, int):
+            Inclusive bounding box of each slit; -1 for slits without
+            any pixels
+    """
+    def __init__(self, slitmask, nslits=None):
+        self.shape = slitmask.shape
+        self.nslits = int(slitmask.max())+1 if nslits is None else nslits
+        flat_slitmask = slitmask.ravel()
+        # A stable sort keeps the pixels of each slit in row-major
+        # order; sorting 16-bit integers is much faster
+        if self.nslits < np.iinfo(np.int16).max:
+            flat_slitmask = flat_slitmask.astype(np.int16)
+        srt = np.argsort(flat_slitmask, kind='stable')
+        ends = np.searchsorted(flat_slitmask[srt], np.arange(self.nslits+1))
+        self._pixels = [srt[ends[i]:ends[i+1]] for i in range(self.nslits)]
+
+        self.npix = np.diff(ends)
+        self.spec_min = np.full(self.nslits, -1, dtype=int)
+        self.spec_max = np.full(self.nslits, -1, dtype=int)
+        self.spat_min = np.full(self.nslits, -1, dtype=int)
+        self.spat_max = np.full(self.nslits, -1, dtype=int)
+        for slit in np.where(self.npix > 0)[0]:
+            spec, spat = np.divmod(self._pixels[slit], self.shape[1])
+            self.spec_min[slit], self.spec_max[slit] = spec[0], spec[-1]
+            self.spat_min[slit], self.spat_max[slit] = spat.min(), spat.max()
+
+    @staticmethod
+    def from_tslits_dict(tslits_dict, pad=None):
+        """
+        Return the index of the slits in a tslits_dict; see
+        :func:`slit_layout`.
+        """
+        return slit_layout(tslits_dict, pad=pad).index
+
+    def pixels(self, slit):
+        """
+        Flattened (row-major) indices of the pixels in a slit.
+        """
+        return self._pixels[slit]
+
+    def bbox(self, slit):
+        """
+        Bounding box of a slit as a tuple of slices, such that
+        ``image[slit_index.bbox(slit)]`` is a view of the image
+        containing all the pixels of the slit.
+        """
+        if self.npix[slit] == 0:
+            return slice(0, 0), slice(0, 0)
+        return slice(self.spec_min[slit], self.spec_max[slit]+1), \
+               slice(self.spat_min[slit], self.spat_max[slit]+1)
+
+    def spat_range(self, slit, slit_left, slit_righ):
+        """
+        Range of spatial pixels (columns) that contains a slit
+
+        The range includes all the pixels in the slit and all the pixels
+        touched by :func:`ximg_and_edgemask` for these slit edges, so
+        that running that function (or
+        :func:`pypeit.core.skysub.global_skysub`) on the columns
+        ``x0:x1`` of the image, with the edges shifted by ``x0``, gives
+        identical results to running it on the full image.
+
+        Args:
+            slit (int):
+                Slit number
+            slit_left (ndarray):
+                Left slit edge, shape (nspec,)
+            slit_righ (ndarray):
+                Right slit edge, shape (nspec,)
+
+        Returns:
+            int, int: First and one past the last column of the slit
+        """
+        nspat = self.shape[1]
+        cols = [np.clip(np.ceil(slit_left).astype(int), 0, nspat-1),
+                np.clip(slit_righ.astype(int), 0, nspat-1)]
+        if self.npix[slit] > 0:
+            cols += [[self.spat_min[slit], self.spat_max[slit]]]
+        cols = np.concatenate(cols)
+        return int(cols.min()), int(cols.max())+1
+
+    def mask(self, slit, bbox=None):
+        """
+        Boolean mask of the pixels in a slit within a sub-array of the
+        image.
+
+        Args:
+            slit (int):
+                Slit number
+            bbox (tuple, optional):
+                Tuple of two slices selecting the sub-array.  Must
+                contain all the pixels of the slit.  Default is the
+                bounding box of the slit.
+
+        Returns:
+            ndarray: Boolean mask with the shape of ``image[bbox]``
+        """
+        if bbox is None:
+            bbox = self.bbox(slit)
+        s0, s1, _ = bbox[0].indices(self.shape[0])
+        x0, x1, _ = bbox[1].indices(self.shape[1])
+        thismask = np.zeros((s1-s0, x1-x0), dtype=bool)
+        spec, spat = np.divmod(self._pixels[slit], self.shape[1])
+        thismask[spec-s0, spat-x0] = True
+        return thismask
+
+    def full_mask(self, slit):
+        """
+        Boolean mask of the pixels in a slit with the shape of the full
+        image; identical to ``slitmask == slit``.
+        """
+        thismask = np.zeros(self.shape, dtype=bool)
+        thismask.flat[self._pixels[slit]] = True
+        return thismask
 
 
 def pix_to_amp(naxis0, naxis1, datasec, numamplifiers):
@@ -4,6 +4,8 @@ from __future__ import (print_function, absolute_import, division, unicode_liter
 
 import astropy.stats
 import numpy as np
+import numba as nb
+from concurrent import futures
 from scipy import signal, ndimage
 from pypeit import msgs
 from pypeit import utils
@@ -214,13 +216,21 @@ def sn_frame(slf, sciframe, idx):
 
 
 def lacosmic(det, sciframe, saturation, nonlinear, varframe=None, maxiter=1, grow=1.5,
-             remove_compact_obj=True, sigclip=5.0, sigfrac=0.3, objlim=5.0):
+             remove_compact_obj=True, sigclip=5.0, sigfrac=0.3, objlim=5.0, fast=True,
+             nthreads=1):
     """
     Identify cosmic rays using the L.A.Cosmic algorithm
     U{http://www.astro.yale.edu/dokkum/lacosmic/}
     (article : U{http://arxiv.org/abs/astro-ph/0108003})
     This routine is mostly courtesy of Malte Tewes
 
+    By default, the Laplacian, median filters and mask growth use the
+    numba kernels :func:`lacosmic_laplacian`, :func:`median_filter` and
+    binary dilation instead of the scipy convolutions and median
+    filters of the original implementation.  Both give the same mask;
+    the original implementation is used if `fast` is False or the image
+    has non-finite values.
+
     Args:
         det:
         sciframe:
@@ -233,6 +243,10 @@ def lacosmic(det, sciframe, saturation, nonlinear, varframe=None, maxiter=1, gro
         sigclip:
         sigfrac:
         objlim:
+        fast (bool, optional):
+            Use the numba kernels.
+        nthreads (int, optional):
+            Number of threads used by the numba kernels.
 
     Returns:
         ndarray: mask of cosmic rays (0=no CR, 1=CR)
@@ -261,17 +275,24 @@ def lacosmic(det, sciframe, saturation, nonlinear, varframe=None, maxiter=1, gro
     # Define the kernels
     laplkernel = np.array([[0.0, -1.0, 0.0], [-1.0, 4.0, -1.0], [0.0, -1.0, 0.0]])  # Laplacian kernal
     growkernel = np.ones((3,3))
+    # Select the implementation of the filters
+    fast &= np.all(np.isfinite(sciframe))
+    medfilt = (lambda img, size: median_filter(img, size, nthreads=nthreads)) if fast \
+                else lambda img, size: ndimage.filters.median_filter(img, size=size, mode='mirror')
     for i in range(1, maxiter+1):
         msgs.info("Convolving image with Laplacian kernel")
         # Subsample, convolve, clip negative values, and rebin to original size
-        subsam = utils.subsample(scicopy)
-        conved = signal.convolve2d(subsam, laplkernel, mode="same", boundary="symm")
-        cliped = conved.clip(min=0.0)
-        lplus = utils.rebin_evlist(cliped, np.array(cliped.shape)/2.0)
+        if fast:
+            lplus = lacosmic_laplacian(scicopy, nthreads=nthreads)
+        else:
+            subsam = utils.subsample(scicopy)
+            conved = signal.convolve2d(subsam, laplkernel, mode="same", boundary="symm")
+            cliped = conved.clip(min=0.0)
+            lplus = utils.rebin_evlist(cliped, np.array(cliped.shape)/2.0)
 
         msgs.info("Creating noise model")
         # Build a custom noise map, and compare  this to the laplacian
-        m5 = ndimage.filters.median_filter(scicopy, size=5, mode='mirror')
+        m5 = medfilt(scicopy, 5)
         if varframe is None:
             noise = np.sqrt(np.abs(m5))
         else:
@@ -282,7 +303,7 @@ def lacosmic(det, sciframe, saturation, nonlinear, varframe=None, maxiter=1, gro
         s = lplus / (2.0 * noise)  # Note that the 2.0 is from the 2x2 subsampling
 
         # Remove the large structures
-        sp = s - ndimage.filters.median_filter(s, size=5, mode='mirror')
+        sp = s - medfilt(s, 5)
 
         msgs.info("Selecting candidate cosmic rays")
         # Candidate cosmic rays (this will include HII regions)
@@ -302,8 +323,8 @@ def lacosmic(det, sciframe, saturation, nonlinear, varframe=None, maxiter=1, gro
         msgs.info("Building fine structure image")
 
         # We build the fine structure image :
-        m3 = ndimage.filters.median_filter(scicopy, size=3, mode='mirror')
-        m37 = ndimage.filters.median_filter(m3, size=7, mode='mirror')
+        m3 = medfilt(scicopy, 3)
+        m37 = medfilt(m3, 7)
         f = m3 - m37
         f /= noise
         f = f.clip(min=0.01)
@@ -325,7 +346,8 @@ def lacosmic(det, sciframe, saturation, nonlinear, varframe=None, maxiter=1, gro
         msgs.info("Finding neighboring pixels affected by cosmic rays")
 
         # We grow these cosmics a first time to determine the immediate neighborhod  :
-        growcosmics = np.cast['bool'](signal.convolve2d(np.cast['float32'](cosmics), growkernel, mode="same", boundary="symm"))
+        growcosmics = ndimage.binary_dilation(cosmics, structure=growkernel.astype(bool)) \
+                        if fast else np.cast['bool'](signal.convolve2d(np.cast['float32'](cosmics), growkernel, mode="same", boundary="symm"))
 
         # From this grown set, we keep those that have sp > sigmalim
         # so obviously not requiring sp/f > objlim, otherwise it would be pointless
@@ -333,7 +355,8 @@ def lacosmic(det, sciframe, saturation, nonlinear, varframe=None, maxiter=1, gro
 
         # Now we repeat this procedure, but lower the detection limit to sigmalimlow :
 
-        finalsel = np.cast['bool'](signal.convolve2d(np.cast['float32'](growcosmics), growkernel, mode="same", boundary="symm"))
+        finalsel = ndimage.binary_dilation(growcosmics, structure=growkernel.astype(bool)) \
+                        if fast else np.cast['bool'](signal.convolve2d(np.cast['float32'](growcosmics), growkernel, mode="same", boundary="symm"))
         finalsel = np.logical_and(sp > sigcliplow, finalsel)
 
         # Unmask saturated pixels:
@@ -413,31 +436,182 @@ def cr_screen(a, mask_value=0.0, spatial_axis=1):
     return np.ma.divide(d, mada[:,None]).filled(mask_value)
 
 
-def grow_masked(img, grow, growval):
+def lacosmic_laplacian(img, nthreads=1):
+    """
+    Compute the positive part of the Laplacian of an image, as done by
+    L.A.Cosmic.
 
-    if not np.any(img == growval):
-        return img
+    L.A.Cosmic subsamples the image by 2x2, convolves it with the
+    Laplacian kernel (with symmetric boundaries), clips the negative
+    values and averages the result back to the original sampling.  Each
+    subsampled pixel only depends on the original pixel and two of its
+    neighbors, such that this is computed without building the
+    subsampled image, in the same floating-point order as the
+    convolution.
 
-    _img = img.copy()
-    sz_x, sz_y = img.shape
-    d = int(1+grow)
-    rsqr = grow*grow
+    Args:
+        img (`numpy.ndarray`_):
+            2D image; must have finite values.
+        nthreads (:obj:`int`, optional):
+            Number of threads used to process blocks of rows.
+
+    Returns:
+        `numpy.ndarray`_: The double precision image with the mean
+        positive Laplacian of the four subsampled pixels of each pixel.
+    """
+    lplus = np.empty(img.shape, dtype=np.float64)
+    _row_blocks(_lacosmic_laplacian, img, lplus, (), nthreads)
+    return lplus
+
+
+def median_filter(img, size, nthreads=1):
+    """
+    Median filter an image with a square window and mirrored
+    boundaries.
+
+    Gives the same result as::
+
+        scipy.ndimage.median_filter(img, size=size, mode='mirror')
+
+    but uses a numba kernel that selects the median of the windows of
+    each row with branchless comparisons.  The scipy function is used
+    if the image has NaN values or is smaller than the window.
+
+    Args:
+        img (`numpy.ndarray`_):
+            2D image.
+        size (:obj:`int`):
+            Odd size of the window.
+        nthreads (:obj:`int`, optional):
+            Number of threads used to process blocks of rows.
+
+    Returns:
+        `numpy.ndarray`_: The filtered image.
+    """
+    if size % 2 != 1:
+        msgs.error('Median filter size must be odd.')
+    if np.any(np.isnan(img)) or np.any(np.array(img.shape) <= size//2):
+        return ndimage.filters.median_filter(img, size=size, mode='mirror')
+    filt = np.empty_like(img)
+    _row_blocks(_median_filter, img, filt, (size,), nthreads)
+    return filt
+
+
+def _row_blocks(kernel, img, out, args, nthreads):
+    """
+    Run a numba kernel that fills rows [i0,i1) of `out` from `img`
+    over blocks of rows in `nthreads` threads.
+
+    The kernels release the GIL.  Threads are used instead of numba's
+    parallel loops, which are not safe in processes forked by
+    :func:`pypeit.utils.pool_map`.
+    """
+    img = np.ascontiguousarray(img)
+    nx = img.shape[0]
+    if nthreads is None or nthreads <= 1 or nx < 2*nthreads:
+        kernel(img, *args, 0, nx, out)
+        return
+    edges = np.linspace(0, nx, nthreads+1).astype(int)
+    with futures.ThreadPoolExecutor(max_workers=nthreads) as executor:
+        jobs = [executor.submit(kernel, img, *args, i0, i1, out)
+                    for i0, i1 in zip(edges[:-1], edges[1:])]
+        for job in jobs:
+            job.result()
+
+
+@nb.jit(nopython=True, cache=True, nogil=True)
+def _lacosmic_laplacian(img, i0, i1, lplus):
+    nx, ny = img.shape
+    for i in range(i0, i1):
+        iu = max(i-1, 0)
+        id = min(i+1, nx-1)
+        for j in range(ny):
+            v = np.float64(img[i,j])
+            u = np.float64(img[iu,j])
+            d = np.float64(img[id,j])
+            l = np.float64(img[i,max(j-1, 0)])
+            r = np.float64(img[i,min(j+1, ny-1)])
+            # Terms are added as ordered by the convolution: the lower
+            # then right neighbors, the center and the left then upper
+            # neighbors
+            c00 = ((-v + -v) + 4.0*v) + -l + -u
+            c01 = ((-v + -r) + 4.0*v) + -v + -u
+            c10 = ((-d + -v) + 4.0*v) + -l + -v
+            c11 = ((-d + -r) + 4.0*v) + -v + -v
+            c00 = c00 if c00 > 0. else 0.
+            c01 = c01 if c01 > 0. else 0.
+            c10 = c10 if c10 > 0. else 0.
+            c11 = c11 if c11 > 0. else 0.
+            lplus[i,j] = ((c00 + c10) + (c01 + c11))/2.0/2.0
+
+
+@nb.jit(nopython=True, cache=True)
+def _mirror(i, n):
+    if i < 0:
+        return -i
+    if i >= n:
+        return 2*(n-1)-i
+    return i
+
+
+@nb.jit(nopython=True, cache=True)
+def _compare_swap(w, i, j):
+    for k in range(w.shape[1]):
+        a = w[i,k]
+        b = w[j,k]
+        w[i,k] = min(a, b)
+        w[j,k] = max(a, b)
+
+
+@nb.jit(nopython=True, cache=True, nogil=True)
+def _median_filter(img, size, i0, i1, filt):
+    nx, ny = img.shape
+    h = size//2
+    npix = size*size
+    mid = npix//2
+    jj = np.empty(ny+2*h, dtype=np.int64)
+    for j in range(ny+2*h):
+        jj[j] = _mirror(j-h, ny)
+    w = np.empty((npix, ny), dtype=img.dtype)
+    for i in range(i0, i1):
+        # Window values of all pixels in the row
+        for a in range(size):
+            ii = _mirror(i-h+a, nx)
+            for b in range(size):
+                for j in range(ny):
+                    w[a*size+b,j] = img[ii,jj[j+b]]
+        # Forgetful selection: the minimum and maximum of any mid+2
+        # values cannot be the median, such that they are discarded and
+        # replaced by the next value until one value is left
+        lo = 0
+        hi = mid+1
+        for t in range(mid+2, npix+1):
+            for k in range(lo+1, hi+1):
+                _compare_swap(w, lo, k)
+            for k in range(lo+1, hi):
+                _compare_swap(w, k, hi)
+            lo += 1
+            if t < npix:
+                w[hi,:] = w[t,:]
+            else:
+                hi -= 1
+        filt[i,:] = w[lo,:]
+
+
+def grow_masked(img, grow, growval):
+    """
+    Set all pixels within a radius `grow` of any pixel with value
+    `growval` to `growval`.
+    """
+    mask = img == growval
+    if not np.any(mask):
+        return img
 
     # Grow any masked values by the specified amount
-    for x in range(sz_x):
-        for y in range(sz_y):
-            if img[x,y] != growval:
-                continue
-
-            mnx = 0 if x-d < 0 else x-d
-            mxx = x+d+1 if x+d+1 < sz_x else sz_x
-            mny = 0 if y-d < 0 else y-d
-            mxy = y+d+1 if y+d+1 < sz_y else sz_y
-
-            for i in range(mnx,mxx):
-                for j in range(mny, mxy):
-                    if (i-x)*(i-x)+(j-y)*(j-y) <= rsqr:
-                        _img[i,j] = growval
+    d = int(1+grow)
+    x, y = np.mgrid[-d:d+1,-d:d+1]
+    _img = img.copy()
+    _img[ndimage.binary_dilation(mask, structure=x*x+y*y <= grow*grow)] = growval
     return _img
 
 
@@ -6,6 +6,7 @@ from __future__ import (print_function, absolute_import, division, unicode_liter
 
 import numpy as np
 from warnings import warn
+from scipy.linalg import lapack
 
 from pypeit import msgs
 from pypeit import debugger
@@ -406,7 +407,7 @@ class bspline(object):
                      xmax=self.xmax,
                      funcname=self.funcname))
 
-    def fit(self, xdata, ydata, invvar, x2=None):
+    def fit(self, xdata, ydata, invvar, x2=None, solver='lapack'):
         """Calculate a B-spline in the least-squares sense.
 
         Fit is based on two variables: x which is sorted and spans a large range
@@ -423,6 +424,10 @@ class bspline(object):
             Inverse variance of `ydata`.
         x2 : :class:`numpy.ndarray`, optional
             Orthogonal dependent variable for 2d fits.
+        solver : :class:`str`, optional
+            Banded Cholesky backend used to solve the normal equations;
+            see :data:`cholesky_solvers`.  'python' is the reference
+            implementation.
 
         Returns
         -------
@@ -432,40 +437,25 @@ class bspline(object):
             -1 indicates dropped breakpoints, 0 is success, and positive
             integers indicate ill-conditioned breakpoints.
         """
+        band, solve = get_cholesky_solver(solver)
         goodbk = self.mask[self.nord:]
         nn = goodbk.sum()
         if nn < self.nord:
             yfit = np.zeros(ydata.shape, dtype='f')
             return (-2, yfit)
         nfull = nn * self.npoly
-        bw = self.npoly * self.nord
         a1, lower, upper = self.action(xdata, x2=x2)
-        foo = np.tile(invvar, bw).reshape(bw, invvar.size).transpose()
-        a2 = a1 * foo
-        alpha = np.zeros((bw, nfull+bw), dtype='d')
-        beta = np.zeros((nfull+bw,), dtype='d')
-        bi = np.arange(bw, dtype='i4')
-        bo = np.arange(bw, dtype='i4')
-        for k in range(1, bw):
-            bi = np.append(bi, np.arange(bw-k, dtype='i4')+(bw+1)*k)
-            bo = np.append(bo, np.arange(bw-k, dtype='i4')+bw*k)
-        for k in range(nn-self.nord+1):
-            itop = k*self.npoly
-            ibottom = min(itop, nfull) + bw - 1
-            ict = upper[k] - lower[k] + 1
-            if ict > 0:
-                work = np.dot(a1[lower[k]:upper[k]+1, :].T, a2[lower[k]:upper[k]+1, :])
-                wb = np.dot(ydata[lower[k]:upper[k]+1], a2[lower[k]:upper[k]+1, :])
-                alpha.T.flat[bo+itop*bw] += work.flat[bi]
-                beta[itop:ibottom+1] += wb
+        a2 = a1 * invvar[:,None]
+        alpha, beta = band_normal_equations(a1, a2, ydata, lower[:nn-self.nord+1],
+                                            upper[:nn-self.nord+1], self.npoly, nfull)
         min_influence = 1.0e-10 * invvar.sum() / nfull
-        errb = cholesky_band(alpha, mininf=min_influence)  # ,verbose=True)
+        errb = band(alpha, mininf=min_influence)  # ,verbose=True)
         if isinstance(errb[0], int) and errb[0] == -1:
             a = errb[1]
         else:
             yfit, foo = self.value(xdata, x2=x2, action=a1, upper=upper, lower=lower)
             return (self.maskpoints(errb[0]), yfit)
-        errs = cholesky_solve(a, beta)
+        errs = solve(a, beta)
         if isinstance(errs[0], int) and errs[0] == -1:
             sol = errs[1]
         else:
@@ -657,11 +647,12 @@ class bspline(object):
             goodcoeff = self.coeff[:, coeffbk]
         else:
             goodcoeff = self.coeff[coeffbk]
-        # maskthis = np.zeros(xwork.shape,dtype=xwork.dtype)
-        for i in range(n-self.nord+1):
-            ict = upper[i] - lower[i] + 1
-            if ict > 0:
-                yfit[lower[i]:upper[i]+1] = np.dot(action[lower[i]:upper[i]+1, :], (goodcoeff.flatten('F'))[i*self.npoly+spot])
+        # Evaluate all breakpoint intervals at once: each row of the
+        # action matrix is dotted with the coefficients of its interval
+        kk, rows = band_rows(lower[:n-self.nord+1], upper[:n-self.nord+1])
+        if rows.size > 0:
+            coeff_rows = goodcoeff.flatten('F')[(kk*self.npoly)[:,None] + spot[None,:]]
+            yfit[rows] = np.sum(action[rows,:]*coeff_rows, axis=1)
         yy = yfit.copy()
         yy[xsort] = yfit
         mask = np.ones(x.shape, dtype='bool')
@@ -732,7 +723,49 @@ class bspline(object):
         else:
             return -2
 
-    def workit(self, xdata, ydata, invvar, action,lower,upper):
+    def normal_equations(self, ydata, invvar, action, lower, upper, rows=None):
+        """Assemble the banded normal equations solved by :func:`workit`.
+
+        Parameters
+        ----------
+        ydata : :class:`numpy.ndarray`
+            Dependent variable.
+        invvar : :class:`numpy.ndarray`
+            Weight of each row, normally the inverse variance of `ydata`.
+            Negative weights are allowed, which removes the contribution of
+            those rows from normal equations assembled previously.
+        action : :class:`numpy.ndarray`
+            Banded correlation matrix
+        lower  : :class:`numpy.ndarray`
+            A list of pixel positions, each corresponding to the first occurence of position greater than breakpoint indx
+        upper  : :class:`numpy.ndarray`
+            Same as lower, but denotes the upper pixel positions
+        rows : :class:`numpy.ndarray`, optional
+            Sorted indices of the rows to include.  If None, all rows are
+            used.  Used to update the normal equations when only a few
+            rows change weight.
+
+        Returns
+        -------
+        :func:`tuple`
+            The normal matrix in lower band storage and the right-hand
+            side; see :func:`band_normal_equations`.
+        """
+        nn = self.mask[self.nord:].sum()
+        nfull = nn * self.npoly
+        lower = lower[:nn-self.nord+1]
+        upper = upper[:nn-self.nord+1]
+        if rows is not None:
+            # Re-index the interval ranges to the selected rows
+            lower = np.searchsorted(rows, lower)
+            upper = np.searchsorted(rows, upper, side='right') - 1
+            ydata = ydata[rows]
+            invvar = invvar[rows]
+            action = action[rows,:]
+        return band_normal_equations(action, action*invvar[:,None], ydata, lower, upper,
+                                     self.npoly, nfull)
+
+    def workit(self, xdata, ydata, invvar, action, lower, upper, solver='lapack', normal=None):
         """An internal routine for bspline_extract and bspline_radial which solve a general
         banded correlation matrix which is represented by the variable "action".  This routine
         only solves the linear system once, and stores the coefficients in sset. A non-zero return value
@@ -753,6 +786,13 @@ class bspline(object):
             A list of pixel positions, each corresponding to the first occurence of position greater than breakpoint indx
         upper  : :class:`numpy.ndarray`
             Same as lower, but denotes the upper pixel positions
+        solver : :class:`str`, optional
+            Banded Cholesky backend used to solve the normal equations;
+            see :data:`cholesky_solvers`.  'python' is the reference
+            implementation.
+        normal : :func:`tuple`, optional
+            The normal equations for this `invvar`, as returned by
+            :func:`normal_equations`.  If None, they are assembled here.
 
         Returns
         -------
@@ -764,6 +804,7 @@ class bspline(object):
                 -2 is failure, should abort
 
         """
+        band, solve = get_cholesky_solver(solver)
         goodbk = self.mask[self.nord:]
         nn = goodbk.sum()
         if nn < self.nord:
@@ -771,40 +812,23 @@ class bspline(object):
             yfit = np.zeros(ydata.shape, dtype='f')
             return (-2, yfit)
         nfull = nn * self.npoly
-        bw = self.npoly * self.nord
-        foo = np.sqrt(np.tile(invvar, bw).reshape(bw, invvar.size).transpose())
-        a2 = action * foo
-        #a2 = action*np.sqrt(np.outer(invvar,np.ones(bw)))
-
-        alpha = np.zeros((bw, nfull+bw), dtype='d')
-        beta = np.zeros((nfull+bw,), dtype='d')
-        bi = np.arange(bw, dtype='i4')
-        bo = np.arange(bw, dtype='i4')
-        for k in range(1, bw):
-            bi = np.append(bi, np.arange(bw-k, dtype='i4')+(bw+1)*k)
-            bo = np.append(bo, np.arange(bw-k, dtype='i4')+bw*k)
-        for k in range(nn-self.nord+1):
-            itop = k*self.npoly
-            ibottom = min(itop, nfull) + bw - 1
-            try:
-                ict = upper[k] - lower[k] + 1
-            except:
-                debugger.set_trace()
-            if ict > 0:
-                work = np.dot(a2[lower[k]:upper[k]+1, :].T, a2[lower[k]:upper[k]+1, :])
-                wb = np.dot(ydata[lower[k]:upper[k]+1]*np.sqrt(invvar[lower[k]:upper[k]+1]), a2[lower[k]:upper[k]+1, :])
-                alpha.T.flat[bo+itop*bw] += work.flat[bi]
-                beta[itop:ibottom+1] += wb
+        if normal is None:
+            sqrt_invvar = np.sqrt(invvar)
+            a2 = action * sqrt_invvar[:,None]
+            alpha, beta = band_normal_equations(a2, a2, ydata*sqrt_invvar, lower[:nn-self.nord+1],
+                                                upper[:nn-self.nord+1], self.npoly, nfull)
+        else:
+            alpha, beta = normal
         min_influence = 1.0e-10 * invvar.sum() / nfull
         # Right now we are not returning the covariance, although it may arise that we should
         covariance = alpha
-        errb = cholesky_band(alpha, mininf=min_influence)  # ,verbose=True)
+        errb = band(alpha, mininf=min_influence)  # ,verbose=True)
         if isinstance(errb[0], int) and errb[0] == -1: # successful cholseky_band returns -1
             a = errb[1]
         else:
             yfit, foo = self.value(xdata, x2=xdata, action=action, upper=upper, lower=lower)
             return (self.maskpoints(errb[0]), yfit)
-        errs = cholesky_solve(a, beta)
+        errs = solve(a, beta)
         if isinstance(errs[0], int) and errs[0] == -1:
             sol = errs[1]
         else:
@@ -828,6 +852,85 @@ class bspline(object):
 
 
 
+def band_rows(lower, upper):
+    """Expand the (lower, upper) row ranges of the breakpoint intervals.
+
+    Parameters
+    ----------
+    lower : :class:`numpy.ndarray`
+        First row of each breakpoint interval.
+    upper : :class:`numpy.ndarray`
+        Last row of each breakpoint interval.  Intervals with
+        ``upper < lower`` are empty.
+
+    Returns
+    -------
+    :func:`tuple`
+        The interval index and the row index of every row in a
+        non-empty interval, ordered by interval.
+    """
+    ict = np.fmax(upper - lower + 1, 0)
+    kk = np.repeat(np.arange(ict.size), ict)
+    rows = np.arange(kk.size) + np.repeat(lower - np.cumsum(ict) + ict, ict)
+    return kk, rows
+
+
+def band_normal_equations(lhs, rhs, ydata, lower, upper, npoly, nfull):
+    """Assemble the banded normal equations of a b-spline least-squares fit.
+
+    For each breakpoint interval ``k`` the Gram block
+    ``lhs[lower[k]:upper[k]+1].T @ rhs[lower[k]:upper[k]+1]`` is added to
+    the normal matrix starting at row ``k*npoly``.  Rather than looping
+    over the intervals, every band element is computed for all intervals
+    at once with a segmented sum over the row ranges, and the blocks are
+    accumulated into the lower band storage used by :func:`cholesky_band`.
+
+    Parameters
+    ----------
+    lhs : :class:`numpy.ndarray`
+        Weighted action matrix, shape (ndata, bandwidth).
+    rhs : :class:`numpy.ndarray`
+        Weighted action matrix, shape (ndata, bandwidth).  The normal
+        matrix is ``lhs.T @ rhs`` restricted to the band.
+    ydata : :class:`numpy.ndarray`
+        Weighted data; the right-hand side is ``ydata @ rhs``.
+    lower : :class:`numpy.ndarray`
+        First row of each breakpoint interval.
+    upper : :class:`numpy.ndarray`
+        Last row of each breakpoint interval.  Intervals with
+        ``upper < lower`` are skipped.
+    npoly : :class:`int`
+        Number of polynomial terms per breakpoint.
+    nfull : :class:`int`
+        Number of coefficients.
+
+    Returns
+    -------
+    :func:`tuple`
+        The normal matrix in lower band storage, shape (bandwidth,
+        nfull+bandwidth), and the right-hand side, shape (nfull+bandwidth,).
+    """
+    bw = lhs.shape[1]
+    alpha = np.zeros((bw, nfull+bw), dtype='d')
+    beta = np.zeros((nfull+bw,), dtype='d')
+    indx = np.where(upper - lower + 1 > 0)[0]
+    if indx.size == 0:
+        return alpha, beta
+    itop = indx*npoly
+    # Bracket each interval by its first and one-past-last row.  The
+    # odd elements of the reduceat output are discarded; the extra
+    # trailing zero keeps upper+1 a valid index.
+    seg = np.zeros(2*indx.size, dtype=int)
+    seg[0::2] = lower[indx]
+    seg[1::2] = upper[indx]+1
+    segsum = lambda v: np.add.reduceat(np.append(v, 0.), seg)[0::2]
+    for i in range(bw):
+        beta[itop+i] += segsum(ydata*rhs[:,i])
+        for j in range(bw-i):
+            alpha[j,itop+i] += segsum(lhs[:,i]*rhs[:,i+j])
+    return alpha, beta
+
+
 def cholesky_band(l, mininf=0.0):
     """Compute Cholesky decomposition of banded matrix.
 
@@ -912,6 +1015,111 @@ def cholesky_solve(a, bb):
     return (-1, b)
 
 
+def cholesky_band_lapack(l, mininf=0.0):
+    """Compute Cholesky decomposition of banded matrix using LAPACK.
+
+    This is a compiled drop-in replacement for :func:`cholesky_band`
+    that calls the LAPACK routine ``dpbtrf``.  The input uses the same
+    lower band storage, ``l[i,j] = A[j+i,j]``, including the ``bw``
+    columns of padding at the end, and the return values follow the
+    same conventions.
+
+    Parameters
+    ----------
+    l : :class:`numpy.ndarray`
+        A matrix on which to perform the Cholesky decomposition.
+    mininf : :class:`float`, optional
+        Entries in the `l` matrix are considered negative if they are less
+        than this value (default 0.0).
+
+    Returns
+    -------
+    :func:`tuple`
+        If problems were detected, the first item will be the index or
+        indexes where the problem was detected, and the second item will simply
+        be the input matrix.  If no problems were detected, the first item
+        will be -1, and the second item will be the Cholesky decomposition.
+    """
+    lower = l.copy()
+    bw, nn = lower.shape
+    n = nn - bw
+    negative = lower[0, 0:n] <= mininf
+    if negative.any():
+        msgs.warn('Found {:d}'.format(len(negative.nonzero()[0])) +
+                  ' bad entries: ' + str(negative.nonzero()[0]))
+        return (negative.nonzero()[0], l)
+    c, info = lapack.dpbtrf(lower[:, 0:n], lower=1)
+    if info < 0:
+        raise ValueError('Illegal value in argument {:d} of dpbtrf.'.format(-info))
+    # dpbtrf stops at the first non-positive pivot but lets NaNs through,
+    # so check both to match the failure column of cholesky_band
+    bad = np.logical_not(np.all(np.isfinite(c), axis=0))
+    if info > 0:
+        bad[info-1:] = True
+    if bad.any():
+        j = int(bad.nonzero()[0][0])
+        msgs.warn('NaN found in cholesky_band.')
+        return (j, l)
+    lower[:, 0:n] = c
+    return (-1, lower)
+
+
+def cholesky_solve_lapack(a, bb):
+    """Solve the equation Ax=b where A is a Cholesky-banded matrix using LAPACK.
+
+    Compiled drop-in replacement for :func:`cholesky_solve` that calls the
+    LAPACK routine ``dpbtrs``.  `a` should be the output of
+    :func:`cholesky_band_lapack` (or :func:`cholesky_band`).
+
+    Parameters
+    ----------
+    a : :class:`numpy.ndarray`
+        :math:`A` in :math:`A x = b`.
+    bb : :class:`numpy.ndarray`
+        :math:`b` in :math:`A x = b`.
+
+    Returns
+    -------
+    :func:`tuple`
+        A tuple containing the status and the result of the solution.  The
+        status is always -1.
+    """
+    b = bb.copy()
+    bw = a.shape[0]
+    n = b.shape[0] - bw
+    x, info = lapack.dpbtrs(a[:, 0:n], b[0:n], lower=1)
+    if info < 0:
+        raise ValueError('Illegal value in argument {:d} of dpbtrs.'.format(-info))
+    b[0:n] = x
+    return (-1, b)
+
+
+cholesky_solvers = {'python': (cholesky_band, cholesky_solve),
+                    'lapack': (cholesky_band_lapack, cholesky_solve_lapack)}
+"""Available backends for the banded Cholesky factorization and solution
+used by :func:`bspline.fit` and :func:`bspline.workit`.  The 'python'
+backend is the reference implementation."""
+
+
+def get_cholesky_solver(solver):
+    """Return the (factorization, solution) functions for a Cholesky backend.
+
+    Parameters
+    ----------
+    solver : :class:`str`
+        Name of the backend; must be a key of :data:`cholesky_solvers`.
+
+    Returns
+    -------
+    :func:`tuple`
+        The banded Cholesky factorization and solution functions.
+    """
+    if solver not in cholesky_solvers.keys():
+        raise ValueError('Unknown Cholesky solver {0}.  Options are: {1}'.format(
+                         solver, ', '.join(cholesky_solvers.keys())))
+    return cholesky_solvers[solver]
+
+
 def iterfit(xdata, ydata, invvar=None, inmask = None, upper=5, lower=5, x2=None,
             maxiter=10, nord = 4, bkpt = None, fullbkpt = None, kwargs_bspline={}, kwargs_reject={}):
     """Iteratively fit a b-spline set to data, with rejection.
@@ -883,6 +883,73 @@ def local_skysub_extract(sciimg, sciivar, tilts, waveimg, global_sky, rn2_img, t
 
 
 
+def local_skysub_extract_slit(slit_index, slit, sciimg, sciivar, tilts, waveimg, global_sky, rn2_img, mask,
+                              slit_left, slit_righ, sobjs, spat_pix=None, box_rad=7, **kwargs):
+    """
+    Perform local sky subtraction and extraction of the objects on one
+    slit, using only the columns of the images that contain the slit.
+
+    The columns are those of :func:`pypeit.core.pixels.SlitIndex.spat_range`,
+    widened to hold the boxcar apertures of the objects.  The slit edges,
+    the object traces and ``spat_pix`` are shifted to the sub-images, and
+    the traces and spatial limits of the objects are shifted back, such
+    that the results are the same as :func:`local_skysub_extract` on the
+    full images.
+
+    Args:
+        slit_index (:class:`pypeit.core.pixels.SlitIndex`):
+            Pixels of the slits.
+        slit (int):
+            Slit (or order) index.
+        sciimg, sciivar, tilts, waveimg, global_sky, rn2_img (ndarray):
+            Full images; see :func:`local_skysub_extract`.
+        mask (ndarray):
+            Bit mask image; only the pixels with ``mask == 0`` are used.
+        slit_left, slit_righ (ndarray):
+            Slit edges, shape (nspec,).
+        sobjs (:class:`pypeit.specobjs.SpecObjs`):
+            Objects on the slit; modified in place.
+        spat_pix (ndarray, optional):
+            Spatial pixel coordinates; see :func:`local_skysub_extract`.
+        box_rad (float, optional):
+            Boxcar radius in pixels.
+        **kwargs:
+            Passed to :func:`local_skysub_extract`.
+
+    Returns:
+        tuple: The sub-array of the slit (a tuple of slices), the mask of
+        the slit pixels within it, and the sky, object, inverse variance
+        and extraction mask of these pixels.
+    """
+    nspat = sciimg.shape[1]
+    x0, x1 = slit_index.spat_range(slit, slit_left, slit_righ)
+    traces = np.array([spec.trace_spat for spec in sobjs])
+    x0 = int(np.clip(min(x0, np.floor(traces.min() - box_rad) - 1), 0, nspat))
+    x1 = int(np.clip(max(x1, np.ceil(traces.max() + box_rad) + 2), 0, nspat))
+    box = (slice(None), slice(x0, x1))
+    thismask = slit_index.mask(slit, bbox=box)
+    inmask = (mask[box] == 0) & thismask
+
+    # Work in the coordinates of the sub-images
+    trace_spat = [spec.trace_spat for spec in sobjs]
+    for spec in sobjs:
+        spec.trace_spat = spec.trace_spat - x0
+    shifted = [spec.trace_spat for spec in sobjs]
+    try:
+        result = local_skysub_extract(sciimg[box], sciivar[box], tilts[box], waveimg[box], global_sky[box],
+                                      rn2_img[box], thismask, slit_left - x0, slit_righ - x0, sobjs,
+                                      spat_pix=None if spat_pix is None else spat_pix[box] - x0,
+                                      inmask=inmask, box_rad=box_rad, **kwargs)
+    finally:
+        for spec, trace, shift in zip(sobjs, trace_spat, shifted):
+            # Traces not refit are restored as they were
+            spec.trace_spat = trace if spec.trace_spat is shift else spec.trace_spat + x0
+    for spec in sobjs:
+        spec.min_spat += x0
+        spec.max_spat += x0
+    return (box, thismask) + result
+
+
 def ech_local_skysub_extract(sciimg, sciivar, mask, tilts, waveimg, global_sky, rn2img, tslits_dict, sobjs, order_vec,
                              spat_pix=None, fit_fwhm=False, min_snr=2.0,bsp=0.6, extract_maskwidth=4.0, trim_edg=(3,3),
                              std=False, prof_nsigma=None, niter=4, box_rad_order=7, sigrej=3.5, bkpts_optimal=True,
@@ -912,7 +979,7 @@ def ech_local_skysub_extract(sciimg, sciivar, mask, tilts, waveimg, global_sky,
 
         # Allocate the images that are needed
         # Initialize to mask in case no objects were found
-        slitmask = pixels.tslits2mask(tslits_dict)
+        slit_index = pixels.SlitIndex.from_tslits_dict(tslits_dict)
         outmask = np.copy(mask)
         extractmask = (mask == 0)
         # TODO case of no objects found should be properly dealt with by local_skysub_extract
@@ -1023,17 +1090,18 @@ def ech_local_skysub_extract(sciimg, sciivar, mask, tilts, waveimg, global_sky,
                         spec.fwhm = sobjs[indx_bri].fwhm
 
             thisobj = (sobjs.ech_orderindx == iord) # indices of objects for this slit
-            thismask = (slitmask == iord) # pixels for this slit
-            # True  = Good, False = Bad for inmask
-            inmask = (mask == 0) & thismask
-            # Local sky subtraction and extraction
-            skymodel[thismask], objmodel[thismask], ivarmodel[thismask], extractmask[thismask] = local_skysub_extract(
-                sciimg, sciivar, tilts, waveimg, global_sky,rn2img, thismask,
+            # Local sky subtraction and extraction on the columns of the order
+            box, thismask, skymodel_ord, objmodel_ord, ivarmodel_ord, extractmask_ord = local_skysub_extract_slit(
+                slit_index, iord, sciimg, sciivar, tilts, waveimg, global_sky, rn2img, mask,
                 tslits_dict['slit_left'][:,iord],tslits_dict['slit_righ'][:, iord], sobjs[thisobj], spat_pix=spat_pix,
-                inmask=inmask,std = std, bsp=bsp, extract_maskwidth=extract_maskwidth, trim_edg=trim_edg,
+                std = std, bsp=bsp, extract_maskwidth=extract_maskwidth, trim_edg=trim_edg,
                 prof_nsigma=prof_nsigma, niter=niter, box_rad=box_rad_order[iord], sigrej=sigrej, bkpts_optimal=bkpts_optimal,
                 sn_gauss=sn_gauss, model_full_slit=model_full_slit, model_noise=model_noise, debug_bkpts=debug_bkpts,
                 show_resids=show_resids, show_profile=show_profile)
+            skymodel[box][thismask] = skymodel_ord
+            objmodel[box][thismask] = objmodel_ord
+            ivarmodel[box][thismask] = ivarmodel_ord
+            extractmask[box][thismask] = extractmask_ord
             # update the FWHM fitting vector for the brighest object
             indx = (sobjs.ech_objid == uni_objid[ibright]) & (sobjs.ech_orderindx == iord)
             fwhm_here[iord] = np.median(sobjs[indx].fwhmfit)
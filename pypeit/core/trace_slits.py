@@ -8,6 +8,7 @@ import copy
 from collections import Counter
 
 import numpy as np
+import numba as nb
 
 from scipy import ndimage
 from scipy.special import erf
@@ -2663,7 +2664,7 @@ def trace_crude_init(image, xinit0, ypass, invvar=None, nave=5, radius=3.0,maxsh
     return xset, xerr
 
 
-def trace_fweight(fimage, xinit_in, radius = 3.0, ycen=None, invvar=None):
+def trace_fweight(fimage, xinit_in, radius = 3.0, ycen=None, invvar=None, fast=True):
 
     ''' Routine to recenter a trace using flux-weighted centroiding.
 
@@ -2693,6 +2694,10 @@ def trace_fweight(fimage, xinit_in, radius = 3.0, ycen=None, invvar=None):
          centroiding with a varaible radius. If an array is input it must have the same size and shape as xinit_in, i.e.
          a 2-d  array with shape (nspec, nTrace) array, or a 1-d array with shape (nspec) for the case of a single trace.
 
+    fast: bool, default = True
+         Compute the weighted sums of all the traces in a single pass over the centroiding window with the numba
+         kernel _fweight_sums, instead of the original numpy implementation. Both give identical results.
+
     Returns
     -------
     xnew:   ndarray
@@ -2773,7 +2778,10 @@ def trace_fweight(fimage, xinit_in, radius = 3.0, ycen=None, invvar=None):
 #        raise ValueError('Number of elements in xinit npix = {:d} does not match spectral dimension of '
 #                         'input image {:d}'.format(npix,fimage.shape[0]))
 
-    if invvar is None:
+    if not isinstance(radius_out, (int, float)):
+        radius_out = radius_out.flatten()
+
+    if invvar is None and not fast:
         invvar = np.zeros_like(fimage) + 1.
 
     x1 = xinit - radius_out + 0.5
@@ -2783,31 +2791,35 @@ def trace_fweight(fimage, xinit_in, radius = 3.0, ycen=None, invvar=None):
 
     fullpix = int(np.maximum(np.min(ix2-ix1)-1,0))
 
-    sumw = np.zeros_like(xinit)
-    sumxw = np.zeros_like(xinit)
-    sumwt = np.zeros_like(xinit)
-    sumsx1 = np.zeros_like(xinit)
-    sumsx2 = np.zeros_like(xinit)
-    qbad = np.zeros_like(xinit,dtype=bool)
-
-    # Compute
-    for ii in range(0,fullpix+3):
-        spot = ix1 - 1 + ii
-        ih = np.clip(spot,0,nx-1)
-        xdiff = spot - xinit
-        #
-        wt = np.clip(radius_out - np.abs(xdiff) + 0.5,0,1) * ((spot >= 0) & (spot < nx))
-        sumw = sumw + fimage[ycen_out,ih] * wt
-        sumwt = sumwt + wt
-        sumxw = sumxw + fimage[ycen_out,ih] * xdiff * wt
-        var_term = wt**2 / (invvar[ycen_out,ih] + (invvar[ycen_out,ih] == 0))
-        sumsx2 = sumsx2 + var_term
-        sumsx1 = sumsx1 + xdiff**2 * var_term
-        #qbad = qbad or (invvar[ycen_out,ih] <= 0)
-        #qbad = np.any([qbad, invvar[ycen_out,ih] <= 0], axis=0)
-        qbad = qbad | (invvar[ycen_out,ih] <= 0)
-
-
+    if fast:
+        sumw, sumxw, sumsx1, sumsx2, qbad \
+                = _fweight_sums(*_kernel_images(fimage, invvar), xinit.astype(float), ycen_out,
+                                np.zeros(xinit.shape) + radius_out, ix1,
+                                fullpix+3)
+    else:
+        sumw = np.zeros_like(xinit)
+        sumxw = np.zeros_like(xinit)
+        sumwt = np.zeros_like(xinit)
+        sumsx1 = np.zeros_like(xinit)
+        sumsx2 = np.zeros_like(xinit)
+        qbad = np.zeros_like(xinit,dtype=bool)
+
+        # Compute
+        for ii in range(0,fullpix+3):
+            spot = ix1 - 1 + ii
+            ih = np.clip(spot,0,nx-1)
+            xdiff = spot - xinit
+            #
+            wt = np.clip(radius_out - np.abs(xdiff) + 0.5,0,1) * ((spot >= 0) & (spot < nx))
+            sumw = sumw + fimage[ycen_out,ih] * wt
+            sumwt = sumwt + wt
+            sumxw = sumxw + fimage[ycen_out,ih] * xdiff * wt
+            var_term = wt**2 / (invvar[ycen_out,ih] + (invvar[ycen_out,ih] == 0))
+            sumsx2 = sumsx2 + var_term
+            sumsx1 = sumsx1 + xdiff**2 * var_term
+            #qbad = qbad or (invvar[ycen_out,ih] <= 0)
+            #qbad = np.any([qbad, invvar[ycen_out,ih] <= 0], axis=0)
+            qbad = qbad | (invvar[ycen_out,ih] <= 0)
 
     # Fill up
     good = (sumw > 0) &  (~qbad)
@@ -2830,7 +2842,7 @@ def trace_fweight(fimage, xinit_in, radius = 3.0, ycen=None, invvar=None):
     return xnew, xerr
 
 
-def trace_gweight(fimage, xinit_in, sigma = 1.0, ycen = None, invvar=None, maskval=-999999.9):
+def trace_gweight(fimage, xinit_in, sigma = 1.0, ycen = None, invvar=None, maskval=-999999.9, fast=True):
     ''' Routine to recenter a trace using gaussian-weighted centroiding. Specifically the flux in the image is weighted
     by the integral of a Gaussian over a pixel. Port of idlutils trace_gweight.pro algorithm
 
@@ -2859,6 +2871,11 @@ def trace_gweight(fimage, xinit_in, sigma = 1.0, ycen = None, invvar=None, maskv
     invvar: ndarray, default = None
          Inverse variance array for the image. Array with shape (nspec, nspat) matching fimage
 
+    fast: bool, default = True
+         Compute the weighted sums of all the traces in a single pass over the centroiding window with the numba
+         kernel _gweight_sums, instead of the original numpy implementation. Both give identical results for a double
+         precision invvar.
+
     Returns
     -------
     xnew:   ndarray
@@ -2936,34 +2953,45 @@ def trace_gweight(fimage, xinit_in, sigma = 1.0, ycen = None, invvar=None, maskv
 #        raise ValueError('Number of elements in xinit npix = {:d} does not match spectral dimension of '
 #                         'input image {:d}'.format(npix,fimage.shape[0]))
 
-    if invvar is None:
+    if not isinstance(sigma_out, (int, float)):
+        sigma_out = sigma_out.flatten()
+
+    if invvar is None and not fast:
         invvar = np.zeros_like(fimage) + 1.
 
-    var =calc_ivar(invvar)
     # More setting up
     x_int = np.rint(xinit).astype(int)
     nstep = 2*int(3.0*np.max(sigma_out)) - 1
-
-    weight = np.zeros_like(xinit)
-    numer  = np.zeros_like(xinit)
-    numer_var  = np.zeros_like(xinit)
-    meanvar = np.zeros_like(xinit)
-    qbad = np.zeros_like(xinit).astype(bool)
-
     nby2 = nstep//2
-    for i in range(nstep):
-        xh = x_int - nby2 + i
+
+    if fast:
+        # Integral of the Gaussian over each pixel of the window
+        xh = x_int[None,:] - nby2 + np.arange(nstep)[:,None]
         xtemp = (xh - xinit - 0.5)/sigma_out/np.sqrt(2.0)
         g_int = (erf(xtemp+1./sigma_out/np.sqrt(2.0)) - erf(xtemp))/2.
-        xs = np.fmin(np.fmax(xh,0),(nx-1))
-        cur_weight = fimage[ycen_out, xs] * (invvar[ycen_out, xs] > 0) * g_int * ((xh >= 0) & (xh < nx))
-        weight += cur_weight
-        numer += cur_weight * xh
-        numer_var += var[ycen_out,xs]*(invvar[ycen_out, xs] > 0) * (g_int**2) *((xh >= 0) & (xh < nx))
-        # Below is Burles calculation of the error which I'm not following
-        meanvar += cur_weight * cur_weight * (xinit-xh)**2/(invvar[ycen_out, xs] + (invvar[ycen_out, xs] == 0))
-        qbad = qbad | (xh < 0) | (xh >= nx)
-        # bad = np.any([bad, xh < 0, xh >= nx], axis=0)
+        weight, numer, numer_var, qbad \
+                = _gweight_sums(*_kernel_images(fimage, invvar), ycen_out, x_int - nby2, g_int)
+    else:
+        var =calc_ivar(invvar)
+        weight = np.zeros_like(xinit)
+        numer  = np.zeros_like(xinit)
+        numer_var  = np.zeros_like(xinit)
+        meanvar = np.zeros_like(xinit)
+        qbad = np.zeros_like(xinit).astype(bool)
+
+        for i in range(nstep):
+            xh = x_int - nby2 + i
+            xtemp = (xh - xinit - 0.5)/sigma_out/np.sqrt(2.0)
+            g_int = (erf(xtemp+1./sigma_out/np.sqrt(2.0)) - erf(xtemp))/2.
+            xs = np.fmin(np.fmax(xh,0),(nx-1))
+            cur_weight = fimage[ycen_out, xs] * (invvar[ycen_out, xs] > 0) * g_int * ((xh >= 0) & (xh < nx))
+            weight += cur_weight
+            numer += cur_weight * xh
+            numer_var += var[ycen_out,xs]*(invvar[ycen_out, xs] > 0) * (g_int**2) *((xh >= 0) & (xh < nx))
+            # Below is Burles calculation of the error which I'm not following
+            meanvar += cur_weight * cur_weight * (xinit-xh)**2/(invvar[ycen_out, xs] + (invvar[ycen_out, xs] == 0))
+            qbad = qbad | (xh < 0) | (xh >= nx)
+            # bad = np.any([bad, xh < 0, xh >= nx], axis=0)
 
     # Masking
     good = (~qbad) & (weight > 0)
@@ -2986,6 +3014,95 @@ def trace_gweight(fimage, xinit_in, sigma = 1.0, ycen = None, invvar=None, maskv
     # Return
     return xnew, xerr
 
+def _kernel_images(fimage, invvar):
+    """
+    Image and inverse variance arguments of the centroiding kernels:
+    the arrays in native byte order, and whether the inverse variance
+    was provided (if not, the image is passed in its place).
+    """
+    fimage = np.asarray(fimage)
+    fimage = fimage if fimage.dtype.isnative else fimage.astype(fimage.dtype.newbyteorder('='))
+    if invvar is None:
+        return fimage, fimage, False
+    invvar = np.asarray(invvar)
+    invvar = invvar if invvar.dtype.isnative else invvar.astype(invvar.dtype.newbyteorder('='))
+    return fimage, invvar, True
+
+
+@nb.jit(nopython=True, cache=True, nogil=True)
+def _fweight_sums(fimage, invvar, has_invvar, xinit, ycen, radius, ix1, nwin):
+    """
+    Weighted sums of the flux weighted centroiding of trace_fweight,
+    computed trace by trace over the nwin pixels of the window starting
+    at ix1-1, in the same floating-point order as the numpy
+    implementation.
+    """
+    nx = fimage.shape[1]
+    ncen = xinit.size
+    sumw = np.zeros(ncen)
+    sumxw = np.zeros(ncen)
+    sumsx1 = np.zeros(ncen)
+    sumsx2 = np.zeros(ncen)
+    qbad = np.zeros(ncen, dtype=np.bool_)
+    for k in range(ncen):
+        y = ycen[k]
+        for ii in range(nwin):
+            spot = ix1[k] - 1 + ii
+            ih = min(max(spot, 0), nx-1)
+            xdiff = spot - xinit[k]
+            wt = radius[k] - abs(xdiff) + 0.5
+            if wt < 0.:
+                wt = 0.
+            elif wt > 1.:
+                wt = 1.
+            if spot < 0 or spot >= nx:
+                wt = 0.
+            f = fimage[y,ih]
+            iv = invvar[y,ih] if has_invvar else 1.0
+            sumw[k] += f * wt
+            sumxw[k] += f * xdiff * wt
+            var_term = wt*wt / (iv + (1.0 if iv == 0 else 0.0))
+            sumsx2[k] += var_term
+            sumsx1[k] += xdiff*xdiff * var_term
+            if iv <= 0:
+                qbad[k] = True
+    return sumw, sumxw, sumsx1, sumsx2, qbad
+
+
+@nb.jit(nopython=True, cache=True, nogil=True)
+def _gweight_sums(fimage, invvar, has_invvar, ycen, xh0, g_int):
+    """
+    Weighted sums of the Gaussian weighted centroiding of
+    trace_gweight, computed trace by trace over the window of pixels
+    starting at xh0, given the integral of the Gaussian over each pixel
+    g_int with shape (nstep, ncen).
+    """
+    nx = fimage.shape[1]
+    nstep, ncen = g_int.shape
+    weight = np.zeros(ncen)
+    numer = np.zeros(ncen)
+    numer_var = np.zeros(ncen)
+    qbad = np.zeros(ncen, dtype=np.bool_)
+    for k in range(ncen):
+        y = ycen[k]
+        for i in range(nstep):
+            xh = xh0[k] + i
+            xs = min(max(xh, 0), nx-1)
+            inside = 1.0 if (xh >= 0) and (xh < nx) else 0.0
+            f = fimage[y,xs]
+            iv = invvar[y,xs] if has_invvar else 1.0
+            ivpos = 1.0 if iv > 0 else 0.0
+            g = g_int[i,k]
+            cur_weight = f * ivpos * g * inside
+            weight[k] += cur_weight
+            numer[k] += cur_weight * xh
+            var = ivpos / (abs(iv) + (1.0 if iv == 0 else 0.0))
+            numer_var[k] += var * ivpos * (g*g) * inside
+            if inside == 0.:
+                qbad[k] = True
+    return weight, numer, numer_var, qbad
+
+
 def tc_indices(tc_dict):
     """ Quick parser of tc_dict
 
@@ -176,9 +176,6 @@ def trace_tilts_work(arcimg, lines_spec, lines_spat, thismask, slit_cen, inmask=
 
     lines_spat_int = np.round(lines_spat).astype(int)
 
-    spat_min = np.zeros(nlines, dtype=int)
-    spat_max = np.zeros(nlines, dtype=int)
-
     if inmask is None:
         inmask = thismask
 
@@ -209,22 +206,24 @@ def trace_tilts_work(arcimg, lines_spec, lines_spat, thismask, slit_cen, inmask=
     inmask_trans = (inmask * thismask).T.astype(float)
     thismask_trans = thismask.T
 
+    # We sub-image each tilt using a symmetric window about the (integer) spatial location of each line,
+    # which is the slitcen evaluated at the line spectral position.
+    spat_min = lines_spat_int - trace_int  # spat_min is the minium location of the sub-image
+    spat_max = lines_spat_int + trace_int + 1  # spat_max is the maximum location of the sub-image
+
     # 1) Trace the tilts from a guess. If no guess is provided from a previous iteration use trace_crude
+    if do_crude:
+        tilts_crude = trace_tilts_crude(arcimg_trans, inmask_trans, lines_spec, spat_min, spat_max, fwhm,
+                                        nave=tcrude_nave, maxshift0=tcrude_maxshift0, maxshift=tcrude_maxshift,
+                                        maxerr=tcrude_maxerr)
     for iline in range(nlines):
-        # We sub-image each tilt using a symmetric window about the (integer) spatial location of each line,
-        # which is the slitcen evaluated at the line spectral position.
-        spat_min[iline] = lines_spat_int[iline] - trace_int  # spat_min is the minium location of the sub-image
-        spat_max[iline] = lines_spat_int[iline] + trace_int + 1  # spat_max is the maximum location of the sub-image
         min_spat = np.fmax(spat_min[iline], 0)  # These min_spat and max_spat are to prevent leaving the image
         max_spat = np.fmin(spat_max[iline], nspat - 1)
         sub_img = arcimg_trans[min_spat:max_spat, :]
         sub_inmask = inmask_trans[min_spat:max_spat,:]
         sub_thismask = thismask_trans[min_spat:max_spat,:]
         if do_crude: # First time tracing, do a trace crude
-            tilts_guess_now, err_now = trace_slits.trace_crude_init(
-                sub_img, np.array([lines_spec[iline]]), (sub_img.shape[0] - 1) // 2, invvar=sub_inmask, radius=fwhm,
-                nave=tcrude_nave, maxshift0=tcrude_maxshift0, maxshift=tcrude_maxshift, maxerr=tcrude_maxerr)
-            tilts_guess_now=tilts_guess_now.flatten()
+            tilts_guess_now = tilts_crude[iline]
         else:  # A guess was provided, use that as the crutch, but determine if it is a full trace or a sub-trace
             if tilts_guess.shape[0] == nspat:
                 # This is full image size tilt trace, sub-window it
@@ -364,6 +363,56 @@ def trace_tilts_work(arcimg, lines_spec, lines_spat, thismask, slit_cen, inmask=
     return trc_tilt_dict
 
 
+def trace_tilts_crude(arcimg_trans, inmask_trans, lines_spec, spat_min, spat_max, fwhm, nave=5, maxshift0=3.0,
+                      maxshift=3.0, maxerr=1.0):
+    """
+    Crude traces of the arc lines used as the crutch for the first tracing iteration of trace_tilts_work.
+
+    Each line is traced with trace_slits.trace_crude_init in the sub-image of the (transposed) arc image between
+    its spat_min and spat_max. Lines that share the same sub-image are traced together in a single call, which gives
+    the same traces as tracing them one at a time as long as 2*fwhm is an integer: the flux weighted centroiding
+    window of trace_fweight then has the same number of pixels for every line, so the lines do not affect each
+    other. Otherwise the lines are traced one at a time.
+
+    Parameters
+    ----------
+    arcimg_trans: ndarray, float (nspat, nspec)
+       Transposed arc image, masked outside the slit
+    inmask_trans: ndarray, float (nspat, nspec)
+       Transposed input mask, used as the inverse variance for the tracing
+    lines_spec: ndarray, float (nlines,)
+       Spectral pixel location of each line
+    spat_min, spat_max: ndarray, int (nlines,)
+       Spatial extent of the sub-image of each line, before clipping to the image
+    fwhm: float
+       Expected FWHM of the arc lines, used as the centroiding radius
+
+    Returns
+    -------
+    tilts_crude: list of ndarray
+       The crude trace of each line, along the spatial rows of its sub-image
+    """
+    nspat = arcimg_trans.shape[0]
+    batch = float(2*fwhm).is_integer()
+    min_spat = np.fmax(spat_min, 0)
+    max_spat = np.fmin(spat_max, nspat - 1)
+    tilts_crude = [None]*len(lines_spec)
+    if batch:
+        windows = np.unique(np.column_stack((min_spat, max_spat)), axis=0)
+        groups = [np.where((min_spat == lo) & (max_spat == hi))[0] for lo, hi in windows]
+    else:
+        groups = [np.array([iline]) for iline in range(len(lines_spec))]
+    for group in groups:
+        lo, hi = min_spat[group[0]], max_spat[group[0]]
+        sub_img = arcimg_trans[lo:hi, :]
+        tilts_guess, _ = trace_slits.trace_crude_init(sub_img, lines_spec[group], (sub_img.shape[0] - 1) // 2,
+                                                      invvar=inmask_trans[lo:hi, :], radius=fwhm, nave=nave,
+                                                      maxshift0=maxshift0, maxshift=maxshift, maxerr=maxerr)
+        for i, iline in enumerate(group):
+            tilts_crude[iline] = tilts_guess[:, i].copy()
+    return tilts_crude
+
+
 def trace_tilts(arcimg, lines_spec, lines_spat, thismask, slit_cen, inmask=None, gauss=False, fwhm=4.0,spat_order=5, maxdev_tracefit=0.2,
                 sigrej_trace=3.0, max_badpix_frac=0.20, tcrude_nave = 5,
                 npca = 1, coeff_npoly_pca = 2, sigrej_pca = 2.0,debug_pca = False, show_tracefits=False):
@@ -635,7 +684,7 @@ def fit_tilts(trc_tilt_dict, thismask, slit_cen, spat_order=3, spec_order=4, max
 
 
 
-def fit2tilts(shape, coeff2, func2d):
+def fit2tilts(shape, coeff2, func2d, bbox=None):
     """
 
     Parameters
@@ -646,10 +695,14 @@ def fit2tilts(shape, coeff2, func2d):
         result of griddata tilt fit
     func2d: str
         the 2d function used to fit the tilts
+    bbox: tuple of slices, optional
+        Only evaluate the tilts in this sub-array of the image, e.g. the
+        bounding box of a slit from :class:`pypeit.core.pixels.SlitIndex`.
     Returns
     -------
     tilts: ndarray, float
        Image indicating how spectral pixel locations move across the image. This output is used in the pipeline.
+       If bbox is provided, this has the shape of the sub-array.
     """
 
     # Compute the tilts image
@@ -658,8 +711,12 @@ def fit2tilts(shape, coeff2, func2d):
     xnspatmin1 = float(nspat-1)
     spec_vec = np.arange(nspec)
     spat_vec = np.arange(nspat)
-    spat_img, spec_img = np.meshgrid(spat_vec, spec_vec)
-    tilts = utils.func_val(coeff2, spec_img/xnspecmin1, func2d, x2=spat_img/xnspatmin1, minx=0.0, maxx=1.0, minx2=0.0, maxx2=1.0)
+    if bbox is not None:
+        spec_vec = spec_vec[bbox[0]]
+        spat_vec = spat_vec[bbox[1]]
+    # The fit is separable, so evaluate it on the grid rather than on a meshgrid of the image
+    tilts = utils.func_val_grid(coeff2, spec_vec/xnspecmin1, spat_vec/xnspatmin1, func2d, minx=0.0, maxx=1.0,
+                                minx2=0.0, maxx2=1.0)
     # Added this to ensure that tilts are never crazy values due to extrapolation of fits which can break
     # wavelength solution fitting
     tilts = np.fmax(np.fmin(tilts, 1.2),-0.2)
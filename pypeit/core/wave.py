@@ -10,6 +10,7 @@ import copy
 from matplotlib import pyplot as plt
 from matplotlib import gridspec
 
+import scipy.fftpack
 from scipy import interpolate
 
 from astropy import units
@@ -26,6 +27,9 @@ from pypeit import utils
 
 from pypeit import debugger
 
+# Archive sky spectra already loaded by this process
+_archive_skies = {}
+
 
 def load_sky_spectrum(sky_file):
     """
@@ -42,168 +46,292 @@ def load_sky_spectrum(sky_file):
     return sky_spec
 
 
+def load_archive_sky(sky_file):
+    """
+    Load an archive sky spectrum as a flexure reference
+
+    The reference is built once per process for each file and reused
+    by all subsequent calls.
+
+    Args:
+        sky_file: str
+
+    Returns:
+        arx_sky: ArchiveSky
+    """
+    if sky_file not in _archive_skies:
+        _archive_skies[sky_file] = ArchiveSky(load_sky_spectrum(sky_file), sky_file=sky_file)
+    return _archive_skies[sky_file]
+
+
+class ArchiveSky(object):
+    """
+    Archive sky spectrum used as the flexure reference
+
+    The sky lines of the archive are detected, and its dispersion and
+    resolution measured, once when the object is instantiated.  The
+    smoothed versions of the archive that match the resolution of the
+    object sky spectra are cached by kernel width.
+
+    Args:
+        sky_spectrum: XSpectrum1D
+          Archive sky spectrum
+        sky_file: str, optional
+          File the spectrum was read from
+        kernel_step: float, optional
+          The FWHM (in pixels) of the smoothing kernels is rounded to a
+          multiple of kernel_step, so that the smoothed archive spectra
+          can be shared by objects of similar resolution;  0 to smooth
+          with the exact kernel of each object
+        max_smoothed: int, optional
+          Maximum number of smoothed spectra to keep in the cache
+
+    Attributes:
+        spec: XSpectrum1D
+          Archive sky spectrum
+        disp: ndarray
+          Dispersion (Angstrom per pixel)
+        line_idx: ndarray
+          Pixels of the 5 brightest sky lines
+        res: ndarray
+          Resolution (lambda/delta lambda_FWHM) at these lines
+        med_sig2: float
+          Median squared width of these lines (Angstrom^2)
+    """
+    def __init__(self, sky_spectrum, sky_file=None, kernel_step=0.01, max_smoothed=50):
+        self.spec = sky_spectrum
+        self.sky_file = sky_file
+        self.kernel_step = kernel_step
+        self.max_smoothed = max_smoothed
+
+        # Detect and characterize the sky lines once
+        self.disp, self.line_idx, self.res, sig2 = _characterize_sky(sky_spectrum)
+        self.med_sig2 = np.median(sig2)
+        self.med_disp = np.median(self.disp[self.line_idx])
+        self._smoothed = {}
+
+    def smoothed(self, fwhm_pix):
+        """
+        Archive spectrum smoothed by a Gaussian kernel
+
+        Args:
+            fwhm_pix: float
+              FWHM of the kernel in pixels
+
+        Returns:
+            tuple: The smoothed XSpectrum1D and the FWHM of the kernel
+            actually applied
+        """
+        if self.kernel_step > 0:
+            fwhm_pix = np.round(fwhm_pix/self.kernel_step)*self.kernel_step
+        if fwhm_pix <= 0.:
+            return self.spec, 0.
+        if fwhm_pix not in self._smoothed:
+            if len(self._smoothed) >= self.max_smoothed:
+                # Drop the oldest
+                self._smoothed.pop(next(iter(self._smoothed)))
+            self._smoothed[fwhm_pix] = self.spec.gauss_smooth(fwhm_pix)
+        return self._smoothed[fwhm_pix], fwhm_pix
+
+    def flex_shift(self, obj_skyspecs, mxshft=20):
+        """ Calculate the shifts between object sky spectra and the archive
+
+        All the spectra are cross-correlated with the archive in a
+        single FFT pass.
+
+        Parameters
+        ----------
+        obj_skyspecs : list
+          XSpectrum1D sky spectra of the objects
+        mxshft : int, optional
+          Maximum shift (pixels)
+
+        Returns
+        -------
+        flex_dicts : list
+          Flexure info of each object;  None for the objects whose
+          shift could not be measured
+        """
+        msgs.warn("If we use Paranal, cut down on wavelength early on")
+        prep = [self._prepare(obj_skyspec) for obj_skyspec in obj_skyspecs]
+        good = [i for i in range(len(prep)) if prep[i] is not None]
+        flex_dicts = [None]*len(prep)
+        if len(good) == 0:
+            return flex_dicts
+
+        #Cross correlation of spectra, equivalent to
+        # np.correlate(arx_sky_flux, obj_sky_flux, "same")
+        npix = np.array([prep[i]['obj_sky_flux'].size for i in good])
+        nfft = scipy.fftpack.next_fast_len(2*np.amax(npix))
+        arx_flux = np.zeros((len(good), nfft), dtype=float)
+        obj_flux = np.zeros((len(good), nfft), dtype=float)
+        for j, i in enumerate(good):
+            arx_flux[j,:npix[j]] = prep[i]['arx_sky_flux']
+            obj_flux[j,:npix[j]] = prep[i]['obj_sky_flux']
+        allcorr = np.fft.irfft(np.fft.rfft(arx_flux, axis=1)*np.conj(np.fft.rfft(obj_flux, axis=1)),
+                               nfft, axis=1)
+
+        for j, i in enumerate(good):
+            # Zero lag is at the center
+            lag0 = npix[j]//2
+            corr = allcorr[j, (np.arange(npix[j]) - lag0) % nfft]
+
+            #Create array around the max of the correlation function for fitting for subpixel max
+            # Restrict to pixels within maxshift of zero lag
+            max_corr = np.argmax(corr[lag0-mxshft:lag0+mxshft]) + lag0-mxshft
+            subpix_grid = np.linspace(max_corr-3., max_corr+3., 7)
+
+            #Fit a 2-degree polynomial to peak of correlation function
+            fit = utils.func_fit(subpix_grid, corr[subpix_grid.astype(np.int)], 'polynomial', 2)
+            max_fit = -0.5*fit[1]/fit[2]
+
+            #Calculate and apply shift in wavelength
+            shift = float(max_fit)-lag0
+            msgs.info("Flexure correction of {:g} pixels".format(shift))
+
+            flex_dicts[i] = dict(polyfit=fit, shift=shift, subpix=subpix_grid,
+                                 corr=corr[subpix_grid.astype(np.int)],
+                                 sky_spec=prep[i]['obj_skyspec'],
+                                 arx_spec=prep[i]['arx_skyspec'],
+                                 corr_cen=corr.size/2, smooth=prep[i]['smooth'])
+        return flex_dicts
+
+    def _prepare(self, obj_skyspec):
+        """
+        Match the archive to an object sky spectrum, and subtract the
+        continuum of both, before the cross-correlation
+
+        Returns None if the object spectrum cannot be used.
+        """
+        obj_disp, obj_idx, obj_res, obj_sig2 = _characterize_sky(obj_skyspec)
+        if not np.all(np.isfinite(obj_res)):
+            msgs.warn('Failed to measure the resolution of the object spectrum, likely due to error '
+                       'in the wavelength image.')
+            return None
+        msgs.info("Resolution of Archive={0} and Observation={1}".format(np.median(self.res),
+                                                                         np.median(obj_res)))
+
+        # Determine sigma of gaussian for smoothing
+        obj_med_sig2 = np.median(obj_sig2)
+        if obj_med_sig2 >= self.med_sig2:
+            smooth_sig = np.sqrt(obj_med_sig2-self.med_sig2)  # Ang
+            smooth_sig_pix = smooth_sig / self.med_disp
+            arx_skyspec, fwhm_pix = self.smoothed(smooth_sig_pix*2*np.sqrt(2*np.log(2)))
+            smooth_sig_pix = fwhm_pix/(2*np.sqrt(2*np.log(2)))
+        else:
+            msgs.warn("Prefer archival sky spectrum to have higher resolution")
+            arx_skyspec = self.spec
+            smooth_sig_pix = 0.
+            msgs.warn("New Sky has higher resolution than Archive.  Not smoothing")
+
+        #Determine region of wavelength overlap
+        min_wave = max(np.amin(arx_skyspec.wavelength.value), np.amin(obj_skyspec.wavelength.value))
+        max_wave = min(np.amax(arx_skyspec.wavelength.value), np.amax(obj_skyspec.wavelength.value))
+
+        # Define wavelengths of overlapping spectra
+        keep_idx = np.where((obj_skyspec.wavelength.value>=min_wave) &
+                             (obj_skyspec.wavelength.value<=max_wave))[0]
+
+        #Rebin both spectra onto overlapped wavelength range
+        if len(keep_idx) <= 50:
+            msgs.warn("Not enough overlap between sky spectra")
+            return None
+        else: #rebin onto object ALWAYS
+            keep_wave = obj_skyspec.wavelength[keep_idx]
+            arx_skyspec = arx_skyspec.rebin(keep_wave)
+            obj_skyspec = obj_skyspec.rebin(keep_wave)
+            # Trim edges (rebinning is junk there)
+            arx_skyspec.data['flux'][0,:2] = 0.
+            arx_skyspec.data['flux'][0,-2:] = 0.
+            obj_skyspec.data['flux'][0,:2] = 0.
+            obj_skyspec.data['flux'][0,-2:] = 0.
+
+        # Normalize spectra to unit average sky count
+        norm = np.sum(obj_skyspec.flux.value)/obj_skyspec.npix
+        obj_skyspec.flux = obj_skyspec.flux / norm
+        norm2 = np.sum(arx_skyspec.flux.value)/arx_skyspec.npix
+        arx_skyspec.flux = arx_skyspec.flux / norm2
+        if (norm < 0.):
+            msgs.warn("Bad normalization of object in flexure algorithm")
+            msgs.warn("Will try the median")
+            norm = np.median(obj_skyspec.flux.value)
+            if (norm < 0.):
+                msgs.warn("Improper sky spectrum for flexure.  Is it too faint??")
+                return None
+        if (norm2 < 0.):
+            msgs.warn('Bad normalization of archive in flexure. You are probably using wavelengths '
+                       'well beyond the archive.')
+            return None
+
+        # Deal with bad pixels
+        msgs.work("Need to mask bad pixels")
+
+        # Deal with underlying continuum
+        msgs.work("Consider taking median first [5 pixel]")
+        everyn = obj_skyspec.npix // 20
+        bspline_par = dict(everyn=everyn)
+        mask, ct = utils.robust_polyfit(obj_skyspec.wavelength.value, obj_skyspec.flux.value, 3,
+                                        function='bspline', sigma=3., bspline_par=bspline_par)
+        obj_sky_cont = utils.func_val(ct, obj_skyspec.wavelength.value, 'bspline')
+        obj_sky_flux = obj_skyspec.flux.value - obj_sky_cont
+        mask, ct_arx = utils.robust_polyfit(arx_skyspec.wavelength.value, arx_skyspec.flux.value, 3,
+                                            function='bspline', sigma=3., bspline_par=bspline_par)
+        arx_sky_cont = utils.func_val(ct_arx, arx_skyspec.wavelength.value, 'bspline')
+        arx_sky_flux = arx_skyspec.flux.value - arx_sky_cont
+
+        # Consider sharpness filtering (e.g. LowRedux)
+        msgs.work("Consider taking median first [5 pixel]")
+
+        return dict(obj_skyspec=obj_skyspec, arx_skyspec=arx_skyspec, obj_sky_flux=obj_sky_flux,
+                    arx_sky_flux=arx_sky_flux, smooth=smooth_sig_pix)
+
+
+def _characterize_sky(skyspec):
+    """
+    Detect the brightest sky lines of a spectrum and measure their
+    resolution
+
+    Returns:
+        tuple: The dispersion (Angstrom per pixel), the pixels of the
+        5 brightest lines, their resolution (lambda/delta
+        lambda_FWHM) and their squared widths (Angstrom^2)
+    """
+    # Determine the brightest emission lines
+    amp, amp_cont, cent, wid, _, w, yprep, nsig = arc.detect_lines(skyspec.flux.value)
+
+    # Keep only 5 brightest amplitude lines (keep is array of
+    # indices within w of the 5 brightest)
+    keep = np.argsort(amp[w])[-5:]
+
+    # Calculate wavelength (Angstrom per pixel)
+    wave = skyspec.wavelength.value
+    disp = np.append(wave[1]-wave[0], wave[1:]-wave[:-1])
+
+    # Calculate resolution (lambda/delta lambda_FWHM)..maybe don't need
+    # this? can just use sigmas
+    idx = (cent+0.5).astype(np.int)[w][keep]   # The +0.5 is for rounding
+    res = wave[idx]/(disp[idx]*(2*np.sqrt(2*np.log(2)))*wid[w][keep])
+    return disp, idx, res, np.power(disp[idx]*wid[w][keep], 2)
+
+
 def flex_shift(obj_skyspec, arx_skyspec, mxshft=20):
     """ Calculate shift between object sky spectrum and archive sky spectrum
 
     Parameters
     ----------
     obj_skyspec
-    arx_skyspec
+    arx_skyspec : XSpectrum1D or ArchiveSky
+      The archive is smoothed with the exact kernel if it is not an
+      ArchiveSky
 
     Returns
     -------
     flex_dict: dict
       Contains flexure info
     """
-    flex_dict = {}
-    # Determine the brightest emission lines
-    msgs.warn("If we use Paranal, cut down on wavelength early on")
-    arx_amp, arx_amp_cont, arx_cent, arx_wid, _, arx_w, arx_yprep, nsig = arc.detect_lines(arx_skyspec.flux.value)
-    obj_amp, obj_amp_cont, obj_cent, obj_wid, _, obj_w, obj_yprep, nsig_obj= arc.detect_lines(obj_skyspec.flux.value)
-
-    # Keep only 5 brightest amplitude lines (xxx_keep is array of
-    # indices within arx_w of the 5 brightest)
-    arx_keep = np.argsort(arx_amp[arx_w])[-5:]
-    obj_keep = np.argsort(obj_amp[obj_w])[-5:]
-
-    # Calculate wavelength (Angstrom per pixel)
-    arx_disp = np.append(arx_skyspec.wavelength.value[1]-arx_skyspec.wavelength.value[0],
-                         arx_skyspec.wavelength.value[1:]-arx_skyspec.wavelength.value[:-1])
-    #arx_disp = (np.amax(arx_sky.wavelength.value)-np.amin(arx_sky.wavelength.value))/arx_sky.wavelength.size
-    obj_disp = np.append(obj_skyspec.wavelength.value[1]-obj_skyspec.wavelength.value[0],
-                         obj_skyspec.wavelength.value[1:]-obj_skyspec.wavelength.value[:-1])
-    #obj_disp = (np.amax(obj_sky.wavelength.value)-np.amin(obj_sky.wavelength.value))/obj_sky.wavelength.size
-
-    # Calculate resolution (lambda/delta lambda_FWHM)..maybe don't need
-    # this? can just use sigmas
-    arx_idx = (arx_cent+0.5).astype(np.int)[arx_w][arx_keep]   # The +0.5 is for rounding
-    arx_res = arx_skyspec.wavelength.value[arx_idx]/\
-              (arx_disp[arx_idx]*(2*np.sqrt(2*np.log(2)))*arx_wid[arx_w][arx_keep])
-    obj_idx = (obj_cent+0.5).astype(np.int)[obj_w][obj_keep]   # The +0.5 is for rounding
-    obj_res = obj_skyspec.wavelength.value[obj_idx]/ \
-              (obj_disp[obj_idx]*(2*np.sqrt(2*np.log(2)))*obj_wid[obj_w][obj_keep])
-    #obj_res = (obj_sky.wavelength.value[0]+(obj_disp*obj_cent[obj_w][obj_keep]))/(
-    #    obj_disp*(2*np.sqrt(2*np.log(2)))*obj_wid[obj_w][obj_keep])
-
-    if not np.all(np.isfinite(obj_res)):
-        msgs.warn('Failed to measure the resolution of the object spectrum, likely due to error '
-                   'in the wavelength image.')
-        return None
-    msgs.info("Resolution of Archive={0} and Observation={1}".format(np.median(arx_res),
-                                                                     np.median(obj_res)))
-
-    # Determine sigma of gaussian for smoothing
-    arx_sig2 = np.power(arx_disp[arx_idx]*arx_wid[arx_w][arx_keep], 2)
-    obj_sig2 = np.power(obj_disp[obj_idx]*obj_wid[obj_w][obj_keep], 2)
-
-    arx_med_sig2 = np.median(arx_sig2)
-    obj_med_sig2 = np.median(obj_sig2)
-
-    if obj_med_sig2 >= arx_med_sig2:
-        smooth_sig = np.sqrt(obj_med_sig2-arx_med_sig2)  # Ang
-        smooth_sig_pix = smooth_sig / np.median(arx_disp[arx_idx])
-        arx_skyspec = arx_skyspec.gauss_smooth(smooth_sig_pix*2*np.sqrt(2*np.log(2)))
-    else:
-        msgs.warn("Prefer archival sky spectrum to have higher resolution")
-        smooth_sig_pix = 0.
-        msgs.warn("New Sky has higher resolution than Archive.  Not smoothing")
-        #smooth_sig = np.sqrt(arx_med_sig**2-obj_med_sig**2)
-
-    #Determine region of wavelength overlap
-    min_wave = max(np.amin(arx_skyspec.wavelength.value), np.amin(obj_skyspec.wavelength.value))
-    max_wave = min(np.amax(arx_skyspec.wavelength.value), np.amax(obj_skyspec.wavelength.value))
-
-    #Smooth higher resolution spectrum by smooth_sig (flux is conserved!)
-#    if np.median(obj_res) >= np.median(arx_res):
-#        msgs.warn("New Sky has higher resolution than Archive.  Not smoothing")
-        #obj_sky_newflux = ndimage.gaussian_filter(obj_sky.flux, smooth_sig)
-#    else:
-        #tmp = ndimage.gaussian_filter(arx_sky.flux, smooth_sig)
-#        arx_skyspec = arx_skyspec.gauss_smooth(smooth_sig_pix*2*np.sqrt(2*np.log(2)))
-        #arx_sky.flux = ndimage.gaussian_filter(arx_sky.flux, smooth_sig)
-
-    # Define wavelengths of overlapping spectra
-    keep_idx = np.where((obj_skyspec.wavelength.value>=min_wave) &
-                         (obj_skyspec.wavelength.value<=max_wave))[0]
-    #keep_wave = [i for i in obj_sky.wavelength.value if i>=min_wave if i<=max_wave]
-
-    #Rebin both spectra onto overlapped wavelength range
-    if len(keep_idx) <= 50:
-        msgs.warn("Not enough overlap between sky spectra")
-        return None
-    else: #rebin onto object ALWAYS
-        keep_wave = obj_skyspec.wavelength[keep_idx]
-        arx_skyspec = arx_skyspec.rebin(keep_wave)
-        obj_skyspec = obj_skyspec.rebin(keep_wave)
-        # Trim edges (rebinning is junk there)
-        arx_skyspec.data['flux'][0,:2] = 0.
-        arx_skyspec.data['flux'][0,-2:] = 0.
-        obj_skyspec.data['flux'][0,:2] = 0.
-        obj_skyspec.data['flux'][0,-2:] = 0.
-
-    # Normalize spectra to unit average sky count
-    norm = np.sum(obj_skyspec.flux.value)/obj_skyspec.npix
-    obj_skyspec.flux = obj_skyspec.flux / norm
-    norm2 = np.sum(arx_skyspec.flux.value)/arx_skyspec.npix
-    arx_skyspec.flux = arx_skyspec.flux / norm2
-    if (norm < 0.):
-        msgs.warn("Bad normalization of object in flexure algorithm")
-        msgs.warn("Will try the median")
-        norm = np.median(obj_skyspec.flux.value)
-        if (norm < 0.):
-            msgs.warn("Improper sky spectrum for flexure.  Is it too faint??")
-            return None
-    if (norm2 < 0.):
-        msgs.warn('Bad normalization of archive in flexure. You are probably using wavelengths '
-                   'well beyond the archive.')
-        return None
-
-    # Deal with bad pixels
-    msgs.work("Need to mask bad pixels")
-
-    # Deal with underlying continuum
-    msgs.work("Consider taking median first [5 pixel]")
-    everyn = obj_skyspec.npix // 20
-    bspline_par = dict(everyn=everyn)
-    mask, ct = utils.robust_polyfit(obj_skyspec.wavelength.value, obj_skyspec.flux.value, 3,
-                                    function='bspline', sigma=3., bspline_par=bspline_par)
-    obj_sky_cont = utils.func_val(ct, obj_skyspec.wavelength.value, 'bspline')
-    obj_sky_flux = obj_skyspec.flux.value - obj_sky_cont
-    mask, ct_arx = utils.robust_polyfit(arx_skyspec.wavelength.value, arx_skyspec.flux.value, 3,
-                                        function='bspline', sigma=3., bspline_par=bspline_par)
-    arx_sky_cont = utils.func_val(ct_arx, arx_skyspec.wavelength.value, 'bspline')
-    arx_sky_flux = arx_skyspec.flux.value - arx_sky_cont
-
-    # Consider sharpness filtering (e.g. LowRedux)
-    msgs.work("Consider taking median first [5 pixel]")
-
-    #Cross correlation of spectra
-    #corr = np.correlate(arx_skyspec.flux, obj_skyspec.flux, "same")
-    corr = np.correlate(arx_sky_flux, obj_sky_flux, "same")
-
-    #Create array around the max of the correlation function for fitting for subpixel max
-    # Restrict to pixels within maxshift of zero lag
-    lag0 = corr.size//2
-    #mxshft = settings.argflag['reduce']['flexure']['maxshift']
-    max_corr = np.argmax(corr[lag0-mxshft:lag0+mxshft]) + lag0-mxshft
-    subpix_grid = np.linspace(max_corr-3., max_corr+3., 7.)
-
-    #Fit a 2-degree polynomial to peak of correlation function
-    fit = utils.func_fit(subpix_grid, corr[subpix_grid.astype(np.int)], 'polynomial', 2)
-    max_fit = -0.5*fit[1]/fit[2]
-
-    #Calculate and apply shift in wavelength
-    shift = float(max_fit)-lag0
-    msgs.info("Flexure correction of {:g} pixels".format(shift))
-    #model = (fit[2]*(subpix_grid**2.))+(fit[1]*subpix_grid)+fit[0]
-
-    flex_dict = dict(polyfit=fit, shift=shift, subpix=subpix_grid,
-                     corr=corr[subpix_grid.astype(np.int)],
-                     sky_spec=obj_skyspec,
-                     arx_spec=arx_skyspec,
-                     corr_cen=corr.size/2, smooth=smooth_sig_pix)
-    # Return
-    return flex_dict
+    if not isinstance(arx_skyspec, ArchiveSky):
+        arx_skyspec = ArchiveSky(arx_skyspec, kernel_step=0.)
+    return arx_skyspec.flex_shift([obj_skyspec], mxshft=mxshft)[0]
 
 
 '''
@@ -276,30 +404,25 @@ def flexure_obj(specobjs, maskslits, method, sky_file, mxshft=None):
     sv_fdict = None
     msgs.work("Consider doing 2 passes in flexure as in LowRedux")
     # Load Archive
-    sky_spectrum = load_sky_spectrum(sky_file)
+    arx_sky = load_archive_sky(sky_file)
 
     nslits = len(maskslits)
     gdslits = np.where(~maskslits)[0]
 
-    # Loop on objects
-    flex_list = []
-    # Loop over slits, and then over objects here
+    # Collect the sky spectra of all the objects first, so that their
+    # shifts are measured in a single pass
+    slit_objs = []
+    obj_skies = []
     for slit in range(nslits):
-        msgs.info("Working on flexure in slit (if an object was detected): {:d}".format(slit))
         indx = specobjs.slitid == slit
         this_specobjs = specobjs[indx]
-        # Reset
-        flex_dict = dict(polyfit=[], shift=[], subpix=[], corr=[],
-                         corr_cen=[], spec_file=sky_file, smooth=[],
-                         arx_spec=[], sky_spec=[])
+        slit_objs.append([])
         # If no objects on this slit append an empty dictionary
         if slit not in gdslits:
-            flex_list.append(flex_dict.copy())
             continue
         for specobj in this_specobjs:
             if specobj is None:
                 continue
-            msgs.info("Working on flexure for object # {:d}".format(specobj.objid) + "in slit # {:d}".format(specobj.slitid))
             # Using boxcar
             if method in ['boxcar', 'slitcen']:
                 sky_wave = specobj.boxcar['WAVE'] #.to('AA').value
@@ -308,10 +431,24 @@ def flexure_obj(specobjs, maskslits, method, sky_file, mxshft=None):
                 msgs.error("Not ready for this flexure method: {}".format(method))
 
             # Generate 1D spectrum for object
-            obj_sky = xspectrum1d.XSpectrum1D.from_tuple((sky_wave, sky_flux))
+            slit_objs[slit].append((specobj, sky_wave, len(obj_skies)))
+            obj_skies.append(xspectrum1d.XSpectrum1D.from_tuple((sky_wave, sky_flux)))
 
-            # Calculate the shift
-            fdict = flex_shift(obj_sky, sky_spectrum, mxshft=mxshft)
+    # Calculate the shifts
+    fdicts = arx_sky.flex_shift(obj_skies, mxshft=mxshft)
+
+    # Loop on objects
+    flex_list = []
+    # Loop over slits, and then over objects here
+    for slit in range(nslits):
+        msgs.info("Working on flexure in slit (if an object was detected): {:d}".format(slit))
+        # Reset
+        flex_dict = dict(polyfit=[], shift=[], subpix=[], corr=[],
+                         corr_cen=[], spec_file=sky_file, smooth=[],
+                         arx_spec=[], sky_spec=[])
+        for specobj, sky_wave, iobj in slit_objs[slit]:
+            msgs.info("Working on flexure for object # {:d}".format(specobj.objid) + "in slit # {:d}".format(specobj.slitid))
+            fdict = fdicts[iobj]
             if fdict is None:
                 msgs.warn("Flexure shift calculation failed for this spectrum.")
                 if sv_fdict is not None:
@@ -1,7 +1,7 @@
 """ Module for finding patterns in arc line spectra
 """
 from scipy.ndimage.filters import gaussian_filter
-from scipy.spatial import cKDTree
+from concurrent import futures
 import itertools
 import scipy
 from linetools import utils as ltu
@@ -516,8 +516,123 @@ def semi_brute(spec, lines, wv_cen, disp, sigdetect=30., nonlinear_counts = 1e10
     return best_dict, final_fit
 
 
+def arxiv_features(spec_arxiv, wave_soln_arxiv, nspec, sigdetect=5.0, nonlinear_counts=1e10, fwhm=4.0,
+                   debug_peaks=False):
+    """ Compute the features of a set of archival arc spectra that are used by :func:`reidentify`
+
+    Parameters
+    ----------
+    spec_arxiv:  float ndarray shape (nspec_arxiv, narxiv)
+       Archival arc spectra
+    wave_soln_arxiv:  float ndarray shape (nspec_arxiv, narxiv)
+       Wavelength solutions for the archival arc spectra
+    nspec: int
+       Size of the spectra to be reidentified. The archival spectra are resized to this size.
+
+    Optional Parameters
+    -------------------
+    sigdetect, nonlinear_counts, fwhm: float
+       Arc line detection parameters, see :func:`wvutils.arc_lines_from_spec`
+
+    Returns
+    -------
+    features: dict
+       With keys 'spec' and 'wave_soln' (the resized spec_arxiv and wave_soln_arxiv), 'spec_cont_sub' (the continuum
+       subtracted spectra), 'spec_xcorr' (the smoothed and ceilinged spectra used by wvutils.xcorr_shift_stretch),
+       'det' (dict with the pixel locations of the lines detected in each spectrum, keyed by '0', '1', ...) and
+       'wvc' and 'disp' (the central wavelength and dispersion of each spectrum).
+    """
+    spec_arxiv = arc.resize_spec(spec_arxiv, nspec)
+    wave_soln_arxiv = arc.resize_spec(wave_soln_arxiv, nspec)
+    narxiv = spec_arxiv.shape[1]
+
+    features = dict(spec=spec_arxiv, wave_soln=wave_soln_arxiv, spec_cont_sub=np.zeros_like(spec_arxiv),
+                    spec_xcorr=np.zeros_like(spec_arxiv), det={}, wvc=np.zeros(narxiv, dtype=float),
+                    disp=np.zeros(narxiv, dtype=float))
+    for iarxiv in range(narxiv):
+        # Search for lines no matter what to continuum subtract the arxiv arc
+        tcent_arxiv, ecent_arxiv, cut_tcent_arxiv, icut_arxiv, features['spec_cont_sub'][:,iarxiv] = \
+            wvutils.arc_lines_from_spec(spec_arxiv[:,iarxiv], sigdetect=sigdetect,
+                                        nonlinear_counts=nonlinear_counts, fwhm=fwhm, debug=debug_peaks)
+        features['det'][str(iarxiv)] = tcent_arxiv[icut_arxiv]
+        # Input of wvutils.xcorr_shift_stretch, with the smoothing, ceiling and sigdetect used by reidentify
+        features['spec_xcorr'][:,iarxiv] = wvutils.smooth_ceil_cont(spec_arxiv[:,iarxiv], 1.0, percent_ceil=80.0,
+                                                                    sigdetect=10.0, fwhm=fwhm)
+        # Determine the central wavelength and dispersion of wavelength arxiv
+        features['wvc'][iarxiv] = wave_soln_arxiv[nspec//2, iarxiv]
+        features['disp'][iarxiv] = np.median(wave_soln_arxiv[:,iarxiv] - np.roll(wave_soln_arxiv[:,iarxiv], 1))
+    return features
+
+
+def select_arxiv_features(features, indx):
+    """ Select a subset of the spectra of :func:`arxiv_features`, which are renumbered from 0
+
+    Parameters
+    ----------
+    features: dict
+    indx: int or int ndarray
+       Indices of the archival spectra to select
+
+    Returns
+    -------
+    features: dict
+    """
+    indx = np.atleast_1d(indx)
+    subset = dict([(key, features[key][:,indx]) for key in ['spec', 'wave_soln', 'spec_cont_sub', 'spec_xcorr']])
+    subset['wvc'] = features['wvc'][indx]
+    subset['disp'] = features['disp'][indx]
+    subset['det'] = dict([(str(i), features['det'][str(iarxiv)]) for i, iarxiv in enumerate(indx)])
+    return subset
+
+
+# Features of the reid_arxiv files already loaded by this process
+_arxiv_features_cache = {}
+
+
+def load_arxiv_features(reid_arxiv, nspec, sigdetect=5.0, nonlinear_counts=1e10, fwhm=4.0):
+    """ Load the features of a reid_arxiv file computed by :func:`arxiv_features`
+
+    The features are loaded once per process. They are read from the feature cache written alongside the reid_arxiv
+    files (see :func:`waveio.load_reid_arxiv_features`) or, the first time a reid_arxiv file is used with a given
+    spectral size and line detection parameters, computed and written to it.
+
+    Parameters
+    ----------
+    reid_arxiv: str
+       Name of the archival wavelength solution file
+    nspec: int
+       Size of the spectra to be reidentified
+
+    Optional Parameters
+    -------------------
+    sigdetect, nonlinear_counts, fwhm: float
+       Arc line detection parameters, see :func:`wvutils.arc_lines_from_spec`
+
+    Returns
+    -------
+    features: dict
+       The features of all the spectra in the arxiv. Do not modify them, they are shared by every call.
+    """
+    key = (reid_arxiv, nspec, float(sigdetect), float(nonlinear_counts), float(fwhm))
+    if key in _arxiv_features_cache:
+        return _arxiv_features_cache[key]
+    features = waveio.load_reid_arxiv_features(*key)
+    if features is None:
+        msgs.info('Computing the features of the arxiv {0} for nspec={1:d}'.format(reid_arxiv, nspec))
+        wv_calib_arxiv, _ = waveio.load_reid_arxiv(reid_arxiv)
+        narxiv = len([k for k in wv_calib_arxiv.keys() if k.isdigit()])
+        spec_arxiv = np.array([wv_calib_arxiv[str(iarxiv)]['spec'] for iarxiv in range(narxiv)]).T
+        wave_soln_arxiv = np.array([wv_calib_arxiv[str(iarxiv)]['wave_soln'] for iarxiv in range(narxiv)]).T
+        features = arxiv_features(spec_arxiv, wave_soln_arxiv, nspec, sigdetect=sigdetect,
+                                  nonlinear_counts=nonlinear_counts, fwhm=fwhm)
+        waveio.write_reid_arxiv_features(features, *key)
+    _arxiv_features_cache[key] = features
+    return features
+
+
 def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, det_arxiv = None, detections=None, cc_thresh=0.8,cc_local_thresh = 0.8,
-               match_toler=2.0, nlocal_cc=11, nonlinear_counts=1e10,sigdetect=5.0,fwhm=4.0, debug_xcorr=False, debug_reid=False, debug_peaks = False):
+               match_toler=2.0, nlocal_cc=11, nonlinear_counts=1e10,sigdetect=5.0,fwhm=4.0, debug_xcorr=False, debug_reid=False, debug_peaks = False,
+               features=None):
     """ Determine  a wavelength solution for a set of spectra based on archival wavelength solutions
 
     Parameters
@@ -580,6 +695,11 @@ def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, de
     debug_reid: bool, default = False
        Show plots useful for debugging the line reidentification
 
+    features: dict, default = None
+       Features of spec_arxiv_in and wave_soln_arxiv_in for the size of spec, as returned by arxiv_features() or
+       load_arxiv_features(). If this is set, spec_arxiv_in and wave_soln_arxiv_in are not used and the archival spectra
+       are not processed again.
+
     Returns
     -------
     (detections, spec_cont_sub, patt_dict)
@@ -617,20 +737,26 @@ def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, de
     else:
         msgs.error('spec must be a one dimensional numpy array ')
 
-    if spec_arxiv_in.ndim != wave_soln_arxiv_in.ndim:
-        msgs.error('spec arxiv and wave_soln_arxiv must have the same dimensions')
+    if features is None:
+        if spec_arxiv_in.ndim != wave_soln_arxiv_in.ndim:
+            msgs.error('spec arxiv and wave_soln_arxiv must have the same dimensions')
 
-    if spec_arxiv_in.ndim == 1:
-        spec_arxiv1 = spec_arxiv_in.reshape(spec_arxiv_in.size,1)
-        wave_soln_arxiv1 = wave_soln_arxiv_in.reshape(wave_soln_arxiv_in.size,1)
-    elif spec_arxiv_in.ndim == 2:
-        spec_arxiv1 = spec_arxiv_in.copy()
-        wave_soln_arxiv1 = wave_soln_arxiv_in.copy()
-    else:
-        msgs.error('Unrecognized shape for spec_arxiv. It must be either a one dimensional or two dimensional numpy array')
+        if spec_arxiv_in.ndim == 1:
+            spec_arxiv1 = spec_arxiv_in.reshape(spec_arxiv_in.size,1)
+            wave_soln_arxiv1 = wave_soln_arxiv_in.reshape(wave_soln_arxiv_in.size,1)
+        elif spec_arxiv_in.ndim == 2:
+            spec_arxiv1 = spec_arxiv_in.copy()
+            wave_soln_arxiv1 = wave_soln_arxiv_in.copy()
+        else:
+            msgs.error('Unrecognized shape for spec_arxiv. It must be either a one dimensional or two dimensional numpy array')
 
-    spec_arxiv = arc.resize_spec(spec_arxiv1, nspec)
-    wave_soln_arxiv = arc.resize_spec(wave_soln_arxiv1, nspec)
+        # Search for lines no matter what to continuum subtract the arxiv arc, also determine the central wavelength
+        # and dispersion of wavelength arxiv
+        features = arxiv_features(spec_arxiv1, wave_soln_arxiv1, nspec, sigdetect=sigdetect,
+                                  nonlinear_counts=nonlinear_counts, fwhm=fwhm, debug_peaks=debug_peaks)
+
+    spec_arxiv = features['spec']
+    wave_soln_arxiv = features['wave_soln']
 
     nspec_arxiv, narxiv = spec_arxiv.shape
 
@@ -647,27 +773,14 @@ def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, de
     # If the detections were not passed in measure them
     if detections is None:
         detections = tcent[icut]
-
-    spec_arxiv_cont_sub = np.zeros_like(spec_arxiv)
-
-    # Search for lines no matter what to continuum subtract the arxiv arc, also determine the central wavelength and
-    # dispersion of wavelength arxiv
-    det_arxiv1 = {}
-    for iarxiv in range(narxiv):
-        tcent_arxiv, ecent_arxiv, cut_tcent_arxiv, icut_arxiv, spec_cont_sub_now = wvutils.arc_lines_from_spec(
-            spec_arxiv[:,iarxiv], sigdetect=sigdetect,nonlinear_counts=nonlinear_counts, fwhm = fwhm, debug = debug_peaks)
-        spec_arxiv_cont_sub[:,iarxiv] = spec_cont_sub_now
-        det_arxiv1[str(iarxiv)] = tcent_arxiv[icut_arxiv]
+    # Input of the cross-correlation, which is the same for every arxiv spectrum
+    spec_xcorr = wvutils.smooth_ceil_cont(spec_cont_sub, 1.0, percent_ceil=80.0, sigdetect=10.0, fwhm=fwhm)
 
     if det_arxiv is None:
-        det_arxiv = det_arxiv1
+        det_arxiv = features['det']
 
-    wvc_arxiv = np.zeros(narxiv, dtype=float)
-    disp_arxiv = np.zeros(narxiv, dtype=float)
-    # Determine the central wavelength and dispersion of wavelength arxiv
-    for iarxiv in range(narxiv):
-        wvc_arxiv[iarxiv] = wave_soln_arxiv[nspec//2, iarxiv]
-        disp_arxiv[iarxiv] = np.median(wave_soln_arxiv[:,iarxiv] - np.roll(wave_soln_arxiv[:,iarxiv], 1))
+    wvc_arxiv = features['wvc']
+    disp_arxiv = features['disp']
 
     marker_tuple = ('o','v','<','>','8','s','p','P','*','X','D','d','x')
     color_tuple = ('black','green','red','cyan','magenta','blue','darkorange','yellow','dodgerblue','purple','lightgreen','cornflowerblue')
@@ -690,7 +803,7 @@ def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, de
         # Match the peaks between the two spectra. This code attempts to compute the stretch if cc > cc_thresh
         success, shift_vec[iarxiv], stretch_vec[iarxiv], ccorr_vec[iarxiv], _, _ = \
             wvutils.xcorr_shift_stretch(spec_cont_sub, spec_arxiv[:, iarxiv], cc_thresh=cc_thresh, fwhm = fwhm, seed = random_state,
-                                        debug=debug_xcorr)
+                                        debug=debug_xcorr, y1=spec_xcorr, y2=features['spec_xcorr'][:, iarxiv])
         # If cc < cc_thresh or if this optimization failed, don't reidentify from this arxiv spectrum
         if success != 1:
             continue
@@ -1121,16 +1234,15 @@ class ArchiveReid:
         else:
             self.tot_line_list = self.line_lists
 
-        # Read in the wv_calib_arxiv and pull out some relevant quantities
+        # Load the features of the arxiv (resized spectra, wavelength solutions, line detections), which are
+        # computed once and cached alongside the reid_arxiv file
         # ToDO deal with different binnings!
-        self.wv_calib_arxiv, self.par_arxiv = waveio.load_reid_arxiv(self.reid_arxiv)
+        self.arxiv_features = [load_arxiv_features(self.reid_arxiv, self.nspec,
+                                                   sigdetect=self._parse_param(self.par, 'sigdetect', slit),
+                                                   nonlinear_counts=self.nonlinear_counts, fwhm=self.fwhm)
+                               for slit in range(self.nslits)]
         # Determine the number of spectra in the arxiv, check that it matches nslits if this is fixed format.
-        narxiv = len(self.wv_calib_arxiv)
-        for key in self.wv_calib_arxiv.keys():
-            try:
-                test = int(key)
-            except ValueError:
-                narxiv -=1
+        narxiv = self.arxiv_features[0]['spec'].shape[1]
         if self.ech_fix_format and (self.nslits != narxiv):
             msgs.error('You have set ech_fix_format = True, but nslits={:d} != narxiv={:d}'.format(self.nslits,narxiv) + '.' +
                        msgs.newline() + 'The number of orders identified does not match the number of solutions in the arxiv')
@@ -1138,15 +1250,6 @@ class ArchiveReid:
         # Array to hold continuum subtracted arcs
         self.spec_cont_sub = np.zeros_like(self.spec)
 
-        nspec_arxiv = self.wv_calib_arxiv['0']['spec'].size
-        self.spec_arxiv = np.zeros((nspec_arxiv, narxiv))
-        self.wave_soln_arxiv = np.zeros((nspec_arxiv, narxiv))
-        self.det_arxiv = {}
-        xrng = np.arange(nspec_arxiv)
-        for iarxiv in range(narxiv):
-            self.spec_arxiv[:, iarxiv] = self.wv_calib_arxiv[str(iarxiv)]['spec']
-            self.wave_soln_arxiv[:, iarxiv] = self.wv_calib_arxiv[str(iarxiv)]['wave_soln']
-
         # These are the final outputs
         self.all_patt_dict = {}
         self.detections = {}
@@ -1164,12 +1267,13 @@ class ArchiveReid:
 
             sigdetect = self._parse_param(self.par, 'sigdetect', slit)
             cc_thresh = self._parse_param(self.par, 'cc_thresh', slit)
+            features = select_arxiv_features(self.arxiv_features[slit], ind_sp)
             self.detections[str(slit)], self.spec_cont_sub[:,slit], self.all_patt_dict[str(slit)] = \
-                reidentify(self.spec[:,slit], self.spec_arxiv[:,ind_sp], self.wave_soln_arxiv[:,ind_sp],
+                reidentify(self.spec[:,slit], features['spec'], features['wave_soln'],
                            self.tot_line_list, self.nreid_min, cc_thresh=cc_thresh, match_toler=self.match_toler,
                            cc_local_thresh=self.cc_local_thresh, nlocal_cc=self.nlocal_cc, nonlinear_counts=self.nonlinear_counts,
                            sigdetect=sigdetect, fwhm = self.fwhm, debug_peaks = self.debug_peaks, debug_xcorr=self.debug_xcorr,
-                           debug_reid = self.debug_reid)
+                           debug_reid = self.debug_reid, features=features)
             # Check if an acceptable reidentification solution was found
             if not self.all_patt_dict[str(slit)]['acceptable']:
                 self.wv_calib[str(slit)] = {}
@@ -1261,6 +1365,59 @@ class ArchiveReid:
 
 
 
+def _brute_grid_point(grail, shared, slit, tcent_ecent, point, wavedata):
+    """
+    Evaluate one point of the :func:`HolyGrail.run_brute_loop` grid in
+    a process of a :class:`_BruteSearchPool`.
+
+    grail is the stripped copy of the HolyGrail object held by the
+    pool;  its arc spectra and line list are memory-mapped from shared.
+    """
+    grail._spec = np.asarray(shared['spec'])
+    grail._wvdata = np.asarray(shared['wvdata'])
+    return grail.brute_grid_point(slit, tcent_ecent, *point, wavedata=wavedata)
+
+
+class _BruteSearchPool(object):
+    """
+    Process pool used by :func:`HolyGrail.run_brute` to evaluate the
+    pattern-matching grid of each slit concurrently.
+
+    The arc spectra and the sorted line list are shared read-only with
+    the processes through :class:`pypeit.utils.SharedArrays`, so that
+    only the detections of the slit and a stripped copy of the
+    HolyGrail object (the fitting parameters and line tables) are
+    pickled with each grid point.
+
+    Args:
+        grail (HolyGrail): The object running the search
+        nproc (int): Number of processes
+    """
+    def __init__(self, grail, nproc):
+        self.shared = utils.SharedArrays(spec=grail._spec, wvdata=grail._wvdata)
+        self.grail = copy.copy(grail)
+        for attr in ['_spec', '_wvdata', '_par', '_tot_list', '_unknwns']:
+            setattr(self.grail, attr, None)
+        for attr in ['_all_patt_dict', '_all_final_fit', '_det_weak', '_det_stro']:
+            setattr(self.grail, attr, {})
+        self.executor = futures.ProcessPoolExecutor(max_workers=nproc)
+
+    def submit(self, slit, tcent_ecent, point, wavedata=None):
+        """Queue one grid point;  returns its future."""
+        return self.executor.submit(_brute_grid_point, self.grail, self.shared, slit,
+                                    tcent_ecent, point, wavedata)
+
+    def close(self):
+        self.executor.shutdown()
+        self.shared.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 class HolyGrail:
     """ General algorithm to wavelength calibrate spectroscopic data
 
@@ -1273,7 +1430,8 @@ class HolyGrail:
     -------------------
     par : ParSet or dict, default = default parset
        This is the parset par['calibrations']['wavelengths']. A dictionary with the corresponding parameter names also
-       works.
+       works.  Its nproc sets the number of processes used to search the pattern-matching parameter grid of each
+       slit in the brute force algorithm.
     ok_mask : ndarray
       Array of good slits
     islinelist : bool
@@ -1347,6 +1505,7 @@ class HolyGrail:
 
         self._debug = debug
         self._verbose = verbose
+        self._nproc = self._par['nproc'] if 'nproc' in self._par.keys() else 1
 
         # Load the linelist to be used for pattern matching
         if self._islinelist:
@@ -1410,7 +1569,34 @@ class HolyGrail:
             self._ngridd = self._bind.size
         return
 
-    def run_brute_loop(self, slit, tcent_ecent, wavedata=None):
+    def brute_grid_point(self, slit, tcent_ecent, poly, detsrch, lstsrch, pix_tol, wavedata=None):
+        """
+        Pattern match and fit the detections of a slit for one point of
+        the :func:`run_brute_loop` parameter grid
+
+        Returns:
+            tuple: The patterns and final fit dictionaries;  the latter
+            is None if no acceptable solution was found.
+        """
+        # JFH Note that results_brute and solve_slit are running on the same set of detections. I think this is the way
+        # it should be.
+        psols, msols = self.results_brute(tcent_ecent, poly=poly, pix_tol=pix_tol,
+                                          detsrch=detsrch, lstsrch=lstsrch, wavedata=wavedata)
+        return self.solve_slit(slit, psols, msols, tcent_ecent)
+
+    def run_brute_loop(self, slit, tcent_ecent, wavedata=None, pool=None):
+        """
+        Search the pattern-matching parameter space for the best
+        solution of a slit
+
+        The grid points are considered in order until at least idthresh
+        of the lines on either side of the spectrum have been
+        identified.  If a :class:`_BruteSearchPool` is provided, all the
+        grid points are queued at once and evaluated concurrently;  the
+        results are still considered in the order of the grid, and the
+        grid points that have not started at the early return are
+        cancelled, so the solution is the same as the serial search.
+        """
         # Set the parameter space that gets searched
         rng_poly = [3, 4]            # Range of algorithms to check (only trigons+tetragons are supported)
         rng_list = range(3, 6)       # Number of lines to search over for the linelist
@@ -1419,36 +1605,43 @@ class HolyGrail:
         idthresh = 0.5               # Criteria for early return (at least this fraction of lines must have
                                      # an ID on either side of the spectrum)
 
+        grid = list(itertools.product(rng_poly, rng_detn, rng_list, rng_pixt))
+        if pool is None:
+            jobs = []
+            fits = (self.brute_grid_point(slit, tcent_ecent, *point, wavedata=wavedata)
+                        for point in grid)
+        else:
+            jobs = [pool.submit(slit, tcent_ecent, point, wavedata=wavedata) for point in grid]
+            fits = (job.result() for job in jobs)
+
         best_patt_dict, best_final_fit = None, None
-        # Loop through parameter space
-        for poly in rng_poly:
-            for detsrch in rng_detn:
-                for lstsrch in rng_list:
-                    for pix_tol in rng_pixt:
-                        # JFH Note that results_brute and solve_slit are running on the same set of detections. I think this is the way
-                        # it should be.
-                        psols, msols = self.results_brute(tcent_ecent,poly=poly, pix_tol=pix_tol,
-                                                          detsrch=detsrch, lstsrch=lstsrch,wavedata=wavedata)
-                        patt_dict, final_fit = self.solve_slit(slit, psols, msols,tcent_ecent)
-                        if final_fit is None:
-                            # This is not a good solution
-                            continue
-                        # Test if this solution is better than the currently favoured solution
-                        if best_patt_dict is None:
-                            # First time a fit is found
-                            best_patt_dict, best_final_fit = copy.deepcopy(patt_dict), copy.deepcopy(final_fit)
-                            continue
-                        elif final_fit['rms'] < self._rms_threshold:
-                            # Has a better fit been identified (i.e. more lines identified)?
-                            if len(final_fit['pixel_fit']) > len(best_final_fit['pixel_fit']):
-                                best_patt_dict, best_final_fit = copy.deepcopy(patt_dict), copy.deepcopy(final_fit)
-                            # Decide if an early return is acceptable
-                            nlft = np.sum(best_final_fit['tcent'] < best_final_fit['nspec']/2.0)
-                            nrgt = best_final_fit['tcent'].size-nlft
-                            if np.sum(best_final_fit['pixel_fit'] < 0.5)/nlft > idthresh and\
-                                np.sum(best_final_fit['pixel_fit'] >= 0.5) / nrgt > idthresh:
-                                # At least half of the lines on either side of the spectrum have been identified
-                                return best_patt_dict, best_final_fit
+        # Loop through parameter space.  Each grid point returns new
+        # dictionaries, so there is no need to copy the best ones.
+        try:
+            for patt_dict, final_fit in fits:
+                if final_fit is None:
+                    # This is not a good solution
+                    continue
+                # Test if this solution is better than the currently favoured solution
+                if best_patt_dict is None:
+                    # First time a fit is found
+                    best_patt_dict, best_final_fit = patt_dict, final_fit
+                    continue
+                elif final_fit['rms'] < self._rms_threshold:
+                    # Has a better fit been identified (i.e. more lines identified)?
+                    if len(final_fit['pixel_fit']) > len(best_final_fit['pixel_fit']):
+                        best_patt_dict, best_final_fit = patt_dict, final_fit
+                    # Decide if an early return is acceptable
+                    nlft = np.sum(best_final_fit['tcent'] < best_final_fit['nspec']/2.0)
+                    nrgt = best_final_fit['tcent'].size-nlft
+                    if np.sum(best_final_fit['pixel_fit'] < 0.5)/nlft > idthresh and\
+                        np.sum(best_final_fit['pixel_fit'] >= 0.5) / nrgt > idthresh:
+                        # At least half of the lines on either side of the spectrum have been identified
+                        return best_patt_dict, best_final_fit
+        finally:
+            # Drop the grid points that are no longer needed
+            for job in jobs:
+                job.cancel()
 
         return best_patt_dict, best_final_fit
 
@@ -1462,36 +1655,45 @@ class HolyGrail:
         good_fit = np.zeros(self._nslit, dtype=np.bool)
         self._det_weak = {}
         self._det_stro = {}
-        for slit in range(self._nslit):
-            msgs.info("Working on slit: {}".format(slit))
-            if slit not in self._ok_mask:
-                continue
-            # TODO Pass in all the possible params for detect_lines to arc_lines_from_spec, and update the parset
-            # Detect lines, and decide which tcent to use
-            self._all_tcent, self._all_ecent, self._cut_tcent, self._icut, _  =\
-                wvutils.arc_lines_from_spec(self._spec[:, slit].copy(), sigdetect=self._sigdetect, nonlinear_counts = self._nonlinear_counts)
-            self._all_tcent_weak, self._all_ecent_weak, self._cut_tcent_weak, self._icut_weak, _  =\
-                wvutils.arc_lines_from_spec(self._spec[:, slit].copy(), sigdetect=self._sigdetect, nonlinear_counts = self._nonlinear_counts)
-
-            # Were there enough lines?  This mainly deals with junk slits
-            if self._all_tcent.size < min_nlines:
-                msgs.warn("Not enough lines to identify in slit {0:d}!".format(slit))
-                self._det_weak[str(slit)] = [None,None]
-                self._det_stro[str(slit)] = [None,None]
-                # Remove from ok mask
-                oklist = self._ok_mask.tolist()
-                oklist.pop(slit)
-                self._ok_mask = np.array(oklist)
-                continue
-            # Setup up the line detection dicts
-            self._det_weak[str(slit)] = [self._all_tcent_weak[self._icut_weak].copy(),self._all_ecent_weak[self._icut_weak].copy()]
-            self._det_stro[str(slit)] = [self._all_tcent[self._icut].copy(),self._all_ecent[self._icut].copy()]
+        # Search the parameter grid of each slit on a pool of processes.
+        # The intermediate steps are printed and plotted in debug and
+        # verbose mode, so the search is then done serially.
+        pool = _BruteSearchPool(self, self._nproc) \
+                    if self._nproc > 1 and not (self._debug or self._verbose) else None
+        try:
+            for slit in range(self._nslit):
+                msgs.info("Working on slit: {}".format(slit))
+                if slit not in self._ok_mask:
+                    continue
+                # TODO Pass in all the possible params for detect_lines to arc_lines_from_spec, and update the parset
+                # Detect lines, and decide which tcent to use
+                self._all_tcent, self._all_ecent, self._cut_tcent, self._icut, _  =\
+                    wvutils.arc_lines_from_spec(self._spec[:, slit].copy(), sigdetect=self._sigdetect, nonlinear_counts = self._nonlinear_counts)
+                self._all_tcent_weak, self._all_ecent_weak, self._cut_tcent_weak, self._icut_weak, _  =\
+                    wvutils.arc_lines_from_spec(self._spec[:, slit].copy(), sigdetect=self._sigdetect, nonlinear_counts = self._nonlinear_counts)
+
+                # Were there enough lines?  This mainly deals with junk slits
+                if self._all_tcent.size < min_nlines:
+                    msgs.warn("Not enough lines to identify in slit {0:d}!".format(slit))
+                    self._det_weak[str(slit)] = [None,None]
+                    self._det_stro[str(slit)] = [None,None]
+                    # Remove from ok mask
+                    oklist = self._ok_mask.tolist()
+                    oklist.pop(slit)
+                    self._ok_mask = np.array(oklist)
+                    continue
+                # Setup up the line detection dicts
+                self._det_weak[str(slit)] = [self._all_tcent_weak[self._icut_weak].copy(),self._all_ecent_weak[self._icut_weak].copy()]
+                self._det_stro[str(slit)] = [self._all_tcent[self._icut].copy(),self._all_ecent[self._icut].copy()]
 
-            # Run brute force algorithm on the weak lines
-            best_patt_dict, best_final_fit = self.run_brute_loop(slit,self._det_weak[str(slit)])
+                # Run brute force algorithm on the weak lines
+                best_patt_dict, best_final_fit = self.run_brute_loop(slit, self._det_weak[str(slit)], pool=pool)
 
-            # Print preliminary report
-            good_fit[slit] = self.report_prelim(slit, best_patt_dict, best_final_fit)
+                # Print preliminary report
+                good_fit[slit] = self.report_prelim(slit, best_patt_dict, best_final_fit)
+        finally:
+            if pool is not None:
+                pool.close()
 
         # Now that all slits have been inspected, cross match to generate a
         # master list of all lines in every slit, and refit all spectra
@@ -1556,8 +1758,8 @@ class HolyGrail:
         detections : list of lists
         """
 
-        # Load the linelist KD Tree
-        lsttree, lindex = waveio.load_tree(polygon=polygon, numsearch=lstsrch)
+        # Load the linelist patterns
+        lststore, lindex = waveio.load_tree(polygon=polygon, numsearch=lstsrch)
 
         # Set the search error to be 5 pixels
         err = pixtol / self._npix
@@ -1612,20 +1814,13 @@ class HolyGrail:
                 msgs.warn("Patterns can only be generated with 3 <= polygon <= 6")
                 return None
 
-            dettreep = cKDTree(patternp, leafsize=30)
-            dettreem = cKDTree(patternm, leafsize=30)
-
-            # Query the detections tree
-            msgs.info("Querying KD tree patterns (slit {0:d}/{1:d})".format(slit+1, self._nslit))
-            resultp = dettreep.query_ball_tree(lsttree, r=err)
-            resultm = dettreem.query_ball_tree(lsttree, r=err)
+            # Query the linelist patterns with the detection patterns;  this returns the flattened matches (and
+            # their detection pattern) that a ball tree query of the two KD trees would give
+            msgs.info("Querying patterns (slit {0:d}/{1:d})".format(slit+1, self._nslit))
+            flatresp, flatidxp = lststore.query(patternp, err)
+            flatresm, flatidxm = lststore.query(patternm, err)
 
             msgs.info("Identifying wavelengths for each pattern")
-            # First flatten the KD Tree query results so numba can handle the input array
-            flatresp = [item for sublist in resultp for item in sublist]
-            flatresm = [item for sublist in resultm for item in sublist]
-            flatidxp = [ii for ii, sublist in enumerate(resultp) for item in sublist]
-            flatidxm = [ii for ii, sublist in enumerate(resultm) for item in sublist]
             # Obtain the correlate and anti-correlate solutions
             psols = results_kdtree_nb(use_tcentp, self._wvdata, flatresp, flatidxp, indexp,
                                       lindex, indexp.shape[1], self._npix)
@@ -1,20 +1,25 @@
-"""This script is used to generate the KD Tree that is needed for
-the kdtree pattern matching wavelength calibration algorithm. At
+"""This script is used to generate the pattern store that is needed
+for the kdtree pattern matching wavelength calibration algorithm. At
 present, this method is only used for calibrating ThAr lamps.
 
+The patterns of the line list and the indices of their lines are
+written as `.npy` files alongside the line lists, sorted on a grid of
+cells so that they can be searched directly from memory maps (see
+:class:`PatternStore`).  The stores are built on first use by
+:func:`pypeit.core.wavecal.waveio.load_tree`, or ahead of time with the
+`pypeit_build_patterns` script.
+
 You should not run this script unless you know what you're doing,
 since you could mess up the ThAr patterns that are used in the
-wavelength calibration routine. This script should not be called
-from within PypeIt - it should be run as a standalone script, and
-it's only purpose is to generate a KD Tree with the desired patterns.
+wavelength calibration routine.
 """
+import os
 
 from pypeit.core.wavecal import waveio
 from astropy.table import vstack
 import numba as nb
 from scipy.spatial import cKDTree
 import numpy as np
-import pickle
 
 
 @nb.jit(nopython=True, cache=True)
@@ -225,9 +230,8 @@ def hexagon(linelist, numsrch, maxlin):
     return pattern, index
 
 
-def main(polygon, numsearch=8, maxlinear=100.0, use_unknowns=True, leafsize=30, verbose=False,
-         ret_treeindx=False, outname=None, ):
-    """Driving method for generating the KD Tree
+def generate_patterns(polygon, numsearch=8, maxlinear=100.0, use_unknowns=True, verbose=False):
+    """Generate the patterns of the ThAr line list
 
     Parameters
     ----------
@@ -239,8 +243,13 @@ def main(polygon, numsearch=8, maxlinear=100.0, use_unknowns=True, leafsize=30,
       Over how many Angstroms is the solution deemed to be linear
     use_unknowns : bool
       Include unknown lines in the wavelength calibration (these may arise from lines other than Th I/II and Ar I/II)
-    leafsize : int
-      The leaf size of the tree
+
+    Returns
+    -------
+    pattern : ndarray
+      The patterns, shape (npattern, polygon-2)
+    index : ndarray
+      Indices of the lines of each pattern in the sorted line list, shape (npattern, polygon)
     """
 
     # Load the ThAr linelist
@@ -260,34 +269,243 @@ def main(polygon, numsearch=8, maxlinear=100.0, use_unknowns=True, leafsize=30,
 
     if polygon == 3:
         if verbose: print("Generating patterns for a trigon")
-        pattern, index = trigon(wvdata, numsearch, maxlinear)
+        return trigon(wvdata, numsearch, maxlinear)
     elif polygon == 4:
         if verbose: print("Generating patterns for a tetragon")
-        pattern, index = tetragon(wvdata, numsearch, maxlinear)
+        return tetragon(wvdata, numsearch, maxlinear)
     elif polygon == 5:
         if verbose: print("Generating patterns for a pentagon")
-        pattern, index = pentagon(wvdata, numsearch, maxlinear)
+        return pentagon(wvdata, numsearch, maxlinear)
     elif polygon == 6:
         if verbose: print("Generating patterns for a hexagon")
-        pattern, index = hexagon(wvdata, numsearch, maxlinear)
-    else:
-        if verbose: print("Patterns can only be generated with 3 <= polygon <= 6")
-        return None
-
-    if outname is None:
-        outname = '../../data/arc_lines/lists/ThAr_patterns_poly{0:d}_search{1:d}.kdtree'.format(polygon, numsearch)
-    outindx = outname.replace('.kdtree', '.index')
-    print("Generating Tree")
-    tree = cKDTree(pattern, leafsize=leafsize)
-    print("Saving Tree")
-    pickle.dump(tree, open(outname, 'wb'))
-    print("Written KD Tree file:\n{0:s}".format(outname))
-    np.save(outindx, index)
-    print("Written index file:\n{0:s}".format(outindx))
-    #_ = pickle.load(open(outname, 'rb'))
-    #print("loaded successfully")
+        return hexagon(wvdata, numsearch, maxlinear)
+    raise ValueError("Patterns can only be generated with 3 <= polygon <= 6")
+
+
+def pattern_cells(pattern, cellsize):
+    """Flattened index of the grid cell holding each pattern
+
+    The patterns are ratios between 0 and 1;  each dimension is divided
+    in cells of size cellsize.
+
+    Parameters
+    ----------
+    pattern : ndarray
+      Patterns, shape (npattern, ndim)
+    cellsize : float
+      Size of the cells
+
+    Returns
+    -------
+    cells : ndarray
+      int64 cell index of each pattern
+    """
+    ncell = int(np.floor(1.0/cellsize)) + 1
+    coo = np.clip(np.floor(np.asarray(pattern)/cellsize).astype(np.int64), 0, ncell-1)
+    return np.sum(coo*ncell**np.arange(coo.shape[1], dtype=np.int64)[None,:], axis=1)
+
+
+@nb.jit(nopython=True, cache=True)
+def _bisect(cells, cid, right):
+    """First index of cells (sorted) > cid if right, else >= cid"""
+    lo, hi = 0, cells.shape[0]
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if cells[mid] < cid or (right and cells[mid] == cid):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+@nb.jit(nopython=True, cache=True)
+def query_cells(pattern, cells, query, radius, cellsize):
+    """Find all the patterns within radius of each query pattern
+
+    Parameters
+    ----------
+    pattern : ndarray
+      Patterns, shape (npattern, ndim), sorted by cell
+    cells : ndarray
+      Sorted cell of each pattern (see pattern_cells)
+    query : ndarray
+      Query patterns, shape (nquery, ndim)
+    radius : float
+      Maximum Euclidean distance of a match
+    cellsize : float
+      Size of the cells
+
+    Returns
+    -------
+    res : ndarray
+      Index of each match in pattern
+    residx : ndarray
+      Index of the query pattern of each match
+    """
+    ndim = pattern.shape[1]
+    ncell = int(np.floor(1.0/cellsize)) + 1
+    reach = int(np.ceil(radius/cellsize))
+    nside = 2*reach + 1
+    nnb = nside**ndim
+    coo = np.zeros(ndim, dtype=np.int64)
+    res = np.zeros(0, dtype=np.int64)
+    residx = np.zeros(0, dtype=np.int64)
+    # Count the matches first, then fill them in
+    for fill in range(2):
+        cnt = 0
+        for q in range(query.shape[0]):
+            for k in range(ndim):
+                coo[k] = min(max(int(np.floor(query[q,k]/cellsize)), 0), ncell-1)
+            # Loop on the neighbouring cells
+            for inb in range(nnb):
+                cid = 0
+                mult = 1
+                rem = inb
+                valid = True
+                for k in range(ndim):
+                    c = coo[k] + rem % nside - reach
+                    rem //= nside
+                    if c < 0 or c >= ncell:
+                        valid = False
+                        break
+                    cid += c*mult
+                    mult *= ncell
+                if not valid:
+                    continue
+                for j in range(_bisect(cells, cid, False), _bisect(cells, cid, True)):
+                    dist2 = 0.0
+                    for k in range(ndim):
+                        dist2 += (pattern[j,k] - query[q,k])**2
+                    if dist2 <= radius*radius:
+                        if fill == 1:
+                            res[cnt] = j
+                            residx[cnt] = q
+                        cnt += 1
+        if fill == 0:
+            res = np.zeros(cnt, dtype=np.int64)
+            residx = np.zeros(cnt, dtype=np.int64)
+    return res, residx
+
+
+class PatternStore(object):
+    """Patterns of a line list, sorted on a grid of cells
+
+    The arrays are typically memory-mapped from the `.npy` files
+    written by :func:`build_pattern_store`, so that loading the store
+    is immediate and the pages are shared by all processes.
+
+    Parameters
+    ----------
+    pattern : ndarray
+      Patterns, shape (npattern, polygon-2), sorted by cell
+    index : ndarray
+      Indices of the lines of each pattern in the sorted line list
+    cells : ndarray
+      Sorted cell of each pattern (see pattern_cells)
+    cellsize : float
+      Size of the cells
+    """
+    def __init__(self, pattern, index, cells, cellsize):
+        self.pattern = pattern
+        self.index = index
+        self.cells = cells
+        self.cellsize = cellsize
+        self._tree = None
+
+    @property
+    def tree(self):
+        """cKDTree of the patterns, built on first use"""
+        if self._tree is None:
+            self._tree = cKDTree(self.pattern, leafsize=30)
+        return self._tree
+
+    def query(self, patterns, radius):
+        """Find the stored patterns within radius of each of patterns
+
+        This gives the same matches as
+        `cKDTree(patterns).query_ball_tree(self.tree, r=radius)`,
+        flattened.
+
+        Parameters
+        ----------
+        patterns : ndarray
+          Query patterns, shape (nquery, polygon-2)
+        radius : float
+          Maximum Euclidean distance of a match
+
+        Returns
+        -------
+        res : ndarray
+          Index of each match in the store
+        residx : ndarray
+          Index of the query pattern of each match
+        """
+        return query_cells(self.pattern, self.cells, np.asarray(patterns, dtype=float), radius,
+                           self.cellsize)
+
+
+def build_pattern_store(polygon, numsearch=8, maxlinear=100.0, use_unknowns=True, path=None,
+                        verbose=False):
+    """Generate the patterns and write them to a pattern store
+
+    Parameters
+    ----------
+    polygon : int
+      Number of sides to the polygon used in pattern matching
+    numsearch : int
+      Number of adjacent lines to use when deriving patterns
+    maxlinear : float
+      Over how many Angstroms is the solution deemed to be linear
+    use_unknowns : bool
+      Include unknown lines in the wavelength calibration (these may arise from lines other than Th I/II and Ar I/II)
+    path : str, optional
+      Directory for the files; default is the line list directory
+    verbose : bool
+
+    Returns
+    -------
+    store : PatternStore
+    """
+    pattern, index = generate_patterns(polygon, numsearch=numsearch, maxlinear=maxlinear,
+                                       use_unknowns=use_unknowns, verbose=verbose)
+    cells = pattern_cells(pattern, waveio.pattern_cellsize)
+    srt = np.argsort(cells, kind='stable')
+    arrays = dict(pattern=pattern[srt], index=index[srt], cells=cells[srt])
+    files = waveio.pattern_store_files(polygon, numsearch, path=path)
+    # The cells are written last, since they mark a complete store
+    for name in ['pattern', 'index', 'cells']:
+        tmpfile = files[name] + '.{0:d}.tmp'.format(os.getpid())
+        with open(tmpfile, 'wb') as f:
+            np.save(f, arrays[name])
+        os.replace(tmpfile, files[name])
+        if verbose:
+            print("Written {0:s} file:\n{1:s}".format(name, files[name]))
+    return PatternStore(arrays['pattern'], arrays['index'], arrays['cells'], waveio.pattern_cellsize)
+
+
+def main(polygon, numsearch=8, maxlinear=100.0, use_unknowns=True, verbose=False,
+         ret_treeindx=False, path=None):
+    """Driving method for generating the pattern store
+
+    Parameters
+    ----------
+    polygon : int
+      Number of sides to the polygon used in pattern matching
+    numsearch : int
+      Number of adjacent lines to use when deriving patterns
+    maxlinear : float
+      Over how many Angstroms is the solution deemed to be linear
+    use_unknowns : bool
+      Include unknown lines in the wavelength calibration (these may arise from lines other than Th I/II and Ar I/II)
+    ret_treeindx : bool
+      Return the store and the line indices of the patterns
+    path : str, optional
+      Directory for the files; default is the line list directory
+    """
+    store = build_pattern_store(polygon, numsearch=numsearch, maxlinear=maxlinear,
+                                use_unknowns=use_unknowns, path=path, verbose=verbose)
     if ret_treeindx:
-        return tree, index
+        return store, store.index
 
 # Test
 if __name__ == '__main__':
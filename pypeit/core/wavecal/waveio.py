@@ -22,6 +22,18 @@ line_path = resource_filename('pypeit', '/data/arc_lines/lists/')
 nist_path = resource_filename('pypeit','/data/arc_lines/NIST/')
 reid_arxiv_path = resource_filename('pypeit','/data/arc_lines/reid_arxiv/')
 
+# Version of the reid_arxiv feature cache format;  cache files written
+# with another version are rebuilt
+reid_features_version = 1
+
+# Version of the pattern store format of load_tree, and size of its grid
+# cells;  the version is part of the file names
+pattern_store_version = 1
+pattern_cellsize = 0.0025
+
+# Pattern stores already loaded by this process
+_pattern_stores = {}
+
 
 def load_template(arxiv_file, det):
     """
@@ -69,6 +81,96 @@ def load_reid_arxiv(arxiv_file):
 
     return wv_calib_arxiv, par
 
+
+def reid_arxiv_features_file(arxiv_file, nspec, sigdetect, nonlinear_counts, fwhm):
+    """
+    Name of the feature cache file of a reid_arxiv file
+
+    The cache files are kept in the features/ directory alongside the
+    reid_arxiv files, one for each spectral size and line detection
+    parameters.
+
+    Args:
+        arxiv_file: str
+        nspec: int
+        sigdetect: float
+        nonlinear_counts: float
+        fwhm: float
+
+    Returns:
+        str: The cache file name
+    """
+    root = os.path.splitext(os.path.basename(arxiv_file))[0]
+    return os.path.join(reid_arxiv_path, 'features',
+                        '{0}_nspec{1:d}_sig{2:g}_nonlin{3:g}_fwhm{4:g}.npz'.format(
+                            root, nspec, sigdetect, nonlinear_counts, fwhm))
+
+
+def load_reid_arxiv_features(arxiv_file, nspec, sigdetect, nonlinear_counts, fwhm):
+    """
+    Load the features of a reid_arxiv file written by
+    :func:`write_reid_arxiv_features`
+
+    Args:
+        arxiv_file: str
+        nspec: int
+        sigdetect: float
+        nonlinear_counts: float
+        fwhm: float
+
+    Returns:
+        dict or None: The features (see
+        :func:`pypeit.core.wavecal.autoid.arxiv_features`), or None if
+        the cache file does not exist, is older than the reid_arxiv
+        file or was written with another format version.
+    """
+    calibfile = os.path.join(reid_arxiv_path, arxiv_file)
+    featfile = reid_arxiv_features_file(arxiv_file, nspec, sigdetect, nonlinear_counts, fwhm)
+    if not os.path.isfile(featfile) or os.path.getmtime(featfile) < os.path.getmtime(calibfile):
+        return None
+    with np.load(featfile) as f:
+        if int(f['version']) != reid_features_version:
+            return None
+        features = {key: f[key] for key in f.files if key not in ['version', 'det', 'det_nline']}
+        det = np.split(f['det'], np.cumsum(f['det_nline'])[:-1])
+    features['det'] = dict([(str(iarxiv), d) for iarxiv, d in enumerate(det)])
+    return features
+
+
+def write_reid_arxiv_features(features, arxiv_file, nspec, sigdetect, nonlinear_counts, fwhm):
+    """
+    Write the features of a reid_arxiv file to its cache file
+
+    The file is written in place atomically, so that processes
+    calibrating in parallel never read a partial file.  If the data
+    directory is not writable, a warning is issued and the features are
+    not cached on disk.
+
+    Args:
+        features: dict
+          See :func:`pypeit.core.wavecal.autoid.arxiv_features`
+        arxiv_file: str
+        nspec: int
+        sigdetect: float
+        nonlinear_counts: float
+        fwhm: float
+    """
+    featfile = reid_arxiv_features_file(arxiv_file, nspec, sigdetect, nonlinear_counts, fwhm)
+    det = [features['det'][str(iarxiv)] for iarxiv in range(len(features['det']))]
+    arrays = dict([(key, value) for key, value in features.items() if key != 'det'])
+    tmpfile = featfile + '.{0:d}.tmp'.format(os.getpid())
+    try:
+        if not os.path.isdir(os.path.dirname(featfile)):
+            os.makedirs(os.path.dirname(featfile), exist_ok=True)
+        with open(tmpfile, 'wb') as f:
+            np.savez(f, version=reid_features_version, det=np.concatenate(det),
+                     det_nline=np.array([d.size for d in det]), **arrays)
+        os.replace(tmpfile, featfile)
+    except OSError as e:
+        msgs.warn('Could not write the reid_arxiv feature cache {0}: {1}'.format(featfile, e))
+        if os.path.isfile(tmpfile):
+            os.remove(tmpfile)
+
 def load_by_hand():
     """ By-hand line list
     Parameters
@@ -238,8 +340,33 @@ def load_source_table():
     return sources
 
 
-def load_tree(polygon=4, numsearch=20):
-    """ Load a KDTree of ThAr patterns that is stored on disk
+def pattern_store_files(polygon, numsearch, path=None):
+    """
+    Names of the files of a pattern store
+
+    Args:
+        polygon: int
+        numsearch: int
+        path: str, optional
+          Directory of the files; default is the line list directory
+
+    Returns:
+        dict: The file names of the 'pattern', 'index' and 'cells'
+        arrays
+    """
+    root = os.path.join(line_path if path is None else path,
+                        'ThAr_patterns_poly{0:d}_search{1:d}_v{2:d}'.format(polygon, numsearch,
+                                                                            pattern_store_version))
+    return dict([(name, '{0}_{1}.npy'.format(root, name)) for name in ['pattern', 'index', 'cells']])
+
+
+def load_tree(polygon=4, numsearch=20, path=None):
+    """ Load the store of ThAr patterns that is kept on disk
+
+    The pattern arrays are memory-mapped, so loading is immediate and
+    the pages are shared by all processes;  each store is loaded once
+    per process.  If the store does not exist, it is built and saved to
+    disk (see also the `pypeit_build_patterns` script).
 
     Parameters
     ----------
@@ -256,32 +383,31 @@ def load_tree(polygon=4, numsearch=20):
       1 2 3  (in this case line #3 is the right anchor)
       1 2 4  (in this case line #4 is the right anchor)
       1 3 4  (in this case line #4 is the right anchor)
+    path : str, optional
+      Directory of the store; default is the line list directory
 
     Returns
     -------
-    file_load : KDTree instance
-      The KDTree containing the patterns
+    store : :class:`pypeit.core.wavecal.kdtree_generator.PatternStore`
+      The patterns; its `query` method searches them directly, and a
+      KDTree is built on first access of its `tree` attribute
     index : ndarray
-      For each pattern in the KDTree, this array stores the corresponding index in
+      For each pattern in the store, this array stores the corresponding index in
       the linelist
     """
-
-    import pickle
-    filename = pypeit.__path__[0] +\
-               '/data/arc_lines/lists/ThAr_patterns_poly{0:d}_search{1:d}.kdtree'.format(polygon, numsearch)
-    fileindx = pypeit.__path__[0] +\
-               '/data/arc_lines/lists/ThAr_patterns_poly{0:d}_search{1:d}.index.npy'.format(polygon, numsearch)
-    try:
-        file_load = pickle.load(open(filename, 'rb'))
-        index = np.load(fileindx)
-    except FileNotFoundError:
-        msgs.info('The requested KDTree was not found on disk' + msgs.newline() +
-                  'please be patient while the ThAr KDTree is built and saved to disk.')
-        from pypeit.core.wavecal import kdtree_generator
-        file_load, index = kdtree_generator.main(polygon, numsearch=numsearch, verbose=True,
-                                                 ret_treeindx=True, outname=filename)
-
-    return file_load, index
+    from pypeit.core.wavecal import kdtree_generator
+
+    key = (polygon, numsearch, path)
+    if key not in _pattern_stores:
+        files = pattern_store_files(polygon, numsearch, path=path)
+        if not os.path.isfile(files['cells']):
+            msgs.info('The requested pattern store was not found on disk' + msgs.newline() +
+                      'please be patient while the ThAr patterns are built and saved to disk.')
+            kdtree_generator.build_pattern_store(polygon, numsearch=numsearch, path=path)
+        arrays = dict([(name, np.asarray(np.load(files[name], mmap_mode='r'))) for name in files])
+        _pattern_stores[key] = kdtree_generator.PatternStore(arrays['pattern'], arrays['index'],
+                                                            arrays['cells'], pattern_cellsize)
+    return _pattern_stores[key], _pattern_stores[key].index
 
 
 def load_nist(ion):
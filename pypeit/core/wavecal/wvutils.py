@@ -123,6 +123,85 @@ def zerolag_shift_stretch(theta, y1, y2):
     corr_norm = corr_zero/corr_denom
     return -corr_norm
 
+def fft_shift_stretch(y1, y2, shift_bounds, stretch_mnmx, nbatch=64):
+    """ Deterministic coarse-to-fine search for the shift and stretch of y2 that maximize the zero lag
+    cross-correlation with y1 (see zerolag_shift_stretch).
+
+    shift_and_stretch resamples the spectrum to int(nspec*stretch) pixels, so the stretch only takes the discrete values
+    nstretch/nspec. For all of them within stretch_mnmx, the stretched y2 is cross-correlated with y1 by FFT, which gives
+    the objective at every integer shift within shift_bounds (up to the pixels shifted past the end of a compressed
+    spectrum). The best grid point is then polished over the fractional shift, and the neighbouring stretches, with the
+    exact objective.
+
+    Parameters
+    ----------
+    y1 : ndarray
+      Reference spectrum
+    y2 : ndarray
+      Spectrum to be shifted and stretched to match y1
+    shift_bounds : tuple of floats
+      Range of the shifts to search
+    stretch_mnmx : tuple of floats
+      Range of the stretches to search
+    nbatch : int, default = 64
+      Number of stretches cross-correlated at once
+
+    Returns
+    -------
+    shift : float
+    stretch : float
+    corr : float
+      The cross-correlation coefficient for this shift and stretch
+    """
+    nspec = y1.size
+    corr_denom = np.sqrt(np.sum(y1*y1)*np.sum(y2*y2))
+    # All the distinct stretches
+    nstr = np.arange(max(int(nspec*stretch_mnmx[0]), 1), int(nspec*stretch_mnmx[1])+1)
+    # Integer shifts within the bounds
+    lag_lo, lag_hi = int(np.ceil(shift_bounds[0])), int(np.floor(shift_bounds[1]))
+    if lag_hi < lag_lo:
+        lag_lo = lag_hi = int(np.round(np.mean(shift_bounds)))
+
+    # Cross-correlate y1 with each stretched y2 by FFT; with corr[lag] = sum_i y1[i]*y2_str[i-lag], the lag runs from
+    # -(nstr_max-1) at index 0 of the full correlation
+    nfft = scipy.fftpack.next_fast_len(nspec + nstr[-1] - 1)
+    fft1 = np.fft.rfft(y1, nfft)
+    interp2 = scipy.interpolate.interp1d(np.arange(nspec)/float(nspec), y2, kind='quadratic', bounds_error=False,
+                                         fill_value=0.0)
+    lags = np.arange(lag_lo, lag_hi+1)
+    best_corr, best_nstr, best_lag = -np.inf, nstr[0], lags[0]
+    for i0 in range(0, nstr.size, nbatch):
+        batch = nstr[i0:i0+nbatch]
+        y2_str = np.zeros((batch.size, nfft))
+        for j, n in enumerate(batch):
+            # Reversed, so the FFT product is the correlation; lag = index - (nstr_max-1)
+            y2_str[j,nstr[-1]-n:nstr[-1]] = interp2(np.arange(n)/float(n))[::-1]
+        corr = np.fft.irfft(np.fft.rfft(y2_str, nfft, axis=1)*fft1[None,:], nfft, axis=1)
+        corr = corr[:,lags + nstr[-1] - 1]
+        jbest, kbest = np.unravel_index(np.argmax(corr), corr.shape)
+        if corr[jbest,kbest] > best_corr:
+            best_corr, best_nstr, best_lag = corr[jbest,kbest], batch[jbest], lags[kbest]
+
+    # Polish the fractional shift with the exact objective, for the best stretch and its neighbours
+    def stretch_value(n):
+        # Value of the stretch that shift_and_stretch turns into n pixels
+        stretch = n/float(nspec)
+        return stretch if int(nspec*stretch) >= n else np.nextafter(stretch, 2*stretch)
+
+    shift_out, stretch_out, corr_out = float(best_lag), stretch_value(best_nstr), best_corr/corr_denom
+    for n in [best_nstr-1, best_nstr, best_nstr+1]:
+        if n < nstr[0] or n > nstr[-1]:
+            continue
+        stretch = stretch_value(n)
+        result = scipy.optimize.minimize_scalar(lambda shift: zerolag_shift_stretch((shift, stretch), y1, y2),
+                                                bounds=(max(best_lag-1.0, shift_bounds[0]),
+                                                        min(best_lag+1.0, shift_bounds[1])),
+                                                method='bounded', options=dict(xatol=1e-4))
+        if -result.fun > corr_out:
+            shift_out, stretch_out, corr_out = result.x, stretch, -result.fun
+    return shift_out, stretch_out, corr_out
+
+
 def smooth_ceil_cont(inspec1, smooth, percent_ceil = None, use_raw_arc=False,sigdetect = 10.0, fwhm = 4.0):
     """ Utility routine to smooth and apply a ceiling to spectra """
 
@@ -215,12 +294,14 @@ def xcorr_shift(inspec1,inspec2,smooth=1.0,percent_ceil=80.0, use_raw_arc=False,
 
 
 def xcorr_shift_stretch(inspec1, inspec2, cc_thresh=-1.0, smooth=1.0, percent_ceil=80.0, use_raw_arc=False,
-                        shift_mnmx=(-0.05,0.05), stretch_mnmx=(0.95,1.05), sigdetect = 10.0, fwhm = 4.0,debug=False, seed = None):
+                        shift_mnmx=(-0.05,0.05), stretch_mnmx=(0.95,1.05), sigdetect = 10.0, fwhm = 4.0,debug=False, seed = None,
+                        y1=None, y2=None, method='fft'):
 
     """ Determine the shift and stretch of inspec2 relative to inspec1.  This routine computes an initial
     guess for the shift via maximimizing the cross-correlation. It then performs a two parameter search for the shift and stretch
     by optimizing the zero lag cross-correlation between the inspec1 and the transformed inspec2 (shifted and stretched via
-    wvutils.shift_and_stretch()) in a narrow window about the initial estimated shift. The convention for the shift is that
+    wvutils.shift_and_stretch()) in a narrow window about the initial estimated shift. By default this search is done
+    by the deterministic grid search of fft_shift_stretch. The convention for the shift is that
     positive shift means inspec2 is shifted to the right (higher pixel values) relative to inspec1. The convention for the stretch is
     that it is float near unity that increases the size of the inspec2 relative to the original size (which is the size of inspec1)
 
@@ -255,9 +336,16 @@ def xcorr_shift_stretch(inspec1, inspec2, cc_thresh=-1.0, smooth=1.0, percent_ce
       Range to search for the stretch in the optimization. The code may not work well if this range is significantly expanded
       because the linear approximation used to transform the arc starts to break down.
     seed: int or np.random.RandomState, optional, default = None
-       Seed for scipy.optimize.differential_evolution optimizer. If not specified, the calculation will not be repeatable
+       Seed for scipy.optimize.differential_evolution optimizer. If not specified, the calculation will not be repeatable.
+       Only used if method = 'differential_evolution'
     debug = False
        Show plots to the screen useful for debugging.
+    y1, y2: ndarray, optional, default = None
+       inspec1 and/or inspec2 already processed by smooth_ceil_cont with the same smooth, percent_ceil, use_raw_arc,
+       sigdetect and fwhm, e.g. precomputed for the spectra of a wavelength archive. If provided, this step is skipped.
+    method: str, default = 'fft'
+       Optimizer for the shift and stretch: 'fft' for the FFT cross-correlation over the grid of stretches of
+       fft_shift_stretch, or 'differential_evolution' for scipy.optimize.differential_evolution (much slower).
 
     Returns
     -------
@@ -286,8 +374,10 @@ def xcorr_shift_stretch(inspec1, inspec2, cc_thresh=-1.0, smooth=1.0, percent_ce
 
     nspec = inspec1.size
 
-    y1 = smooth_ceil_cont(inspec1,smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc, sigdetect = sigdetect, fwhm = fwhm)
-    y2 = smooth_ceil_cont(inspec2,smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc, sigdetect = sigdetect, fwhm = fwhm)
+    if y1 is None:
+        y1 = smooth_ceil_cont(inspec1,smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc, sigdetect = sigdetect, fwhm = fwhm)
+    if y2 is None:
+        y2 = smooth_ceil_cont(inspec2,smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc, sigdetect = sigdetect, fwhm = fwhm)
 
     # Do the cross-correlation first and determine the initial shift
     shift_cc, corr_cc = xcorr_shift(y1, y2, smooth = None, percent_ceil = None, use_raw_arc = True, sigdetect = sigdetect, fwhm=fwhm, debug = debug)
@@ -296,13 +386,19 @@ def xcorr_shift_stretch(inspec1, inspec2, cc_thresh=-1.0, smooth=1.0, percent_ce
         return -1, shift_cc, 1.0, corr_cc, shift_cc, corr_cc
     else:
         bounds = [(shift_cc + nspec*shift_mnmx[0],shift_cc + nspec*shift_mnmx[1]), stretch_mnmx]
-        # TODO Can we make the differential evolution run faster?
-        result = scipy.optimize.differential_evolution(zerolag_shift_stretch, args=(y1,y2), tol=1e-4,
-                                                       bounds=bounds, disp=False, polish=True, seed=seed)
-        corr_de = -result.fun
-        shift_de = result.x[0]
-        stretch_de = result.x[1]
-        if not result.success:
+        if method == 'fft':
+            shift_de, stretch_de, corr_de = fft_shift_stretch(y1, y2, bounds[0], stretch_mnmx)
+            success = True
+        elif method == 'differential_evolution':
+            result = scipy.optimize.differential_evolution(zerolag_shift_stretch, args=(y1,y2), tol=1e-4,
+                                                           bounds=bounds, disp=False, polish=True, seed=seed)
+            corr_de = -result.fun
+            shift_de = result.x[0]
+            stretch_de = result.x[1]
+            success = result.success
+        else:
+            msgs.error('Unknown shift/stretch optimizer: {0}'.format(method))
+        if not success:
             msgs.warn('Fit for shift and stretch did not converge!')
 
         if(corr_de < corr_cc):
@@ -319,7 +415,7 @@ def xcorr_shift_stretch(inspec1, inspec2, cc_thresh=-1.0, smooth=1.0, percent_ce
             corr_out = corr_de
             shift_out = shift_de
             stretch_out = stretch_de
-            result_out = int(result.success)
+            result_out = int(success)
 
         if debug:
             x1 = np.arange(nspec)
@@ -5,6 +5,7 @@ import numpy as np
 import os
 
 from pypeit import msgs
+from pypeit import utils
 
 from pypeit import processimages
 from pypeit import masterframe
@@ -217,38 +218,46 @@ class FlatField(processimages.ProcessImages, masterframe.MasterFrame):
             self.tslits_dict['slit_left_tweak'] = np.zeros_like(self.tslits_dict['slit_left'])
             self.tslits_dict['slit_righ_tweak'] = np.zeros_like(self.tslits_dict['slit_righ'])
 
-        # Loop on slits
-        for slit in range(self.nslits):
-            msgs.info('Computing flat field image for slit: {:d}/{:d}'.format(slit,self.nslits-1))
-            if self.msbpm is not None:
-                inmask = np.invert(self.msbpm)
-            else:
-                inmask = np.ones_like(self.rawflatimg,dtype=bool)
-
-            # Fit flats for a single slit
-            this_tilts_dict = {'tilts':self.tilts_dict['tilts'], 'coeffs':self.tilts_dict['coeffs'][:,:,slit].copy(),
-                               'slitcen':self.tilts_dict['slitcen'][:,slit].copy(),
-                               'func2d':self.tilts_dict['func2d']}
-            nonlinear_counts = self.spectrograph.detector[self.det - 1]['nonlinear']*\
-                               self.spectrograph.detector[self.det - 1]['saturation']
-            pixelflat, illumflat, flat_model, tilts_out, thismask_out, slit_left_out, slit_righ_out = \
-                flat.fit_flat(self.rawflatimg, this_tilts_dict, self.tslits_dict, slit,
-                              inmask=inmask,
-                              nonlinear_counts=nonlinear_counts,
-                              spec_samp_fine=self.flatpar['spec_samp_fine'], spec_samp_coarse=self.flatpar['spec_samp_coarse'],
-                              spat_samp=self.flatpar['spat_samp'], tweak_slits=self.flatpar['tweak_slits'],
-                              tweak_slits_thresh=self.flatpar['tweak_slits_thresh'],
-                              tweak_slits_maxfrac=self.flatpar['tweak_slits_maxfrac'],debug=debug)
-            self.mspixelflat[thismask_out] = pixelflat[thismask_out]
-            self.msillumflat[thismask_out] = illumflat[thismask_out]
-            self.flat_model[thismask_out] = flat_model[thismask_out]
+        if self.msbpm is not None:
+            inmask = np.invert(self.msbpm)
+        else:
+            inmask = np.ones_like(self.rawflatimg,dtype=bool)
+
+        # Fit the slits, in parallel if requested. The slits can be fit
+        # independently, even when their edges are tweaked: the pixels of
+        # a slit only depend on its own edges and those of the slits
+        # after it (which take precedence, see pixels.SlitLayout), and
+        # those are not tweaked until later.
+        nonlinear_counts = self.spectrograph.detector[self.det - 1]['nonlinear']*\
+                           self.spectrograph.detector[self.det - 1]['saturation']
+        fit_kwargs = dict(nonlinear_counts=nonlinear_counts,
+                          spec_samp_fine=self.flatpar['spec_samp_fine'],
+                          spec_samp_coarse=self.flatpar['spec_samp_coarse'],
+                          spat_samp=self.flatpar['spat_samp'], tweak_slits=self.flatpar['tweak_slits'],
+                          tweak_slits_thresh=self.flatpar['tweak_slits_thresh'],
+                          tweak_slits_maxfrac=self.flatpar['tweak_slits_maxfrac'], debug=debug)
+        nproc = 1 if debug else self.flatpar['nproc']
+        msgs.info('Computing flat field image for {:d} slits using {:d} process(es)'.format(
+                  self.nslits, nproc))
+        with utils.SharedArrays(flat=self.rawflatimg, inmask=inmask) if nproc > 1 else \
+                _LocalArrays(flat=self.rawflatimg, inmask=inmask) as images:
+            slit_args = [(images, self._slit_tilts_dict(slit), self.tslits_dict, slit, fit_kwargs)
+                            for slit in range(self.nslits)]
+            slit_flats = utils.pool_map(_fit_flat_slit, slit_args, nproc=nproc)
+
+        # Assemble the images
+        for slit, (indx, pixelflat, illumflat, flat_model, tilts_out, slit_left_out, slit_righ_out) \
+                in enumerate(slit_flats):
+            self.mspixelflat.flat[indx] = pixelflat
+            self.msillumflat.flat[indx] = illumflat
+            self.flat_model.flat[indx] = flat_model
             # Did we tweak slit boundaries? If so, update the tslits_dict and the tilts_dict
             if self.flatpar['tweak_slits']:
                 self.tslits_dict['slit_left'][:, slit] = slit_left_out
                 self.tslits_dict['slit_righ'][:, slit] = slit_righ_out
                 self.tslits_dict['slit_left_tweak'][:, slit] = slit_left_out
                 self.tslits_dict['slit_righ_tweak'][:, slit] = slit_righ_out
-                final_tilts[thismask_out] = tilts_out[thismask_out]
+                final_tilts.flat[indx] = tilts_out
 
         # If we tweaked the slits update the tilts_dict
         if self.flatpar['tweak_slits']:
@@ -266,6 +275,16 @@ class FlatField(processimages.ProcessImages, masterframe.MasterFrame):
         # Return
         return self.mspixelflat, self.msillumflat
 
+    def _slit_tilts_dict(self, slit):
+        """
+        The tilt fit of one slit, as needed by :func:`pypeit.core.flat.fit_flat`.
+        The tilts image itself is not used by fit_flat and is left out,
+        so that it is not sent to the worker processes.
+        """
+        return {'coeffs':self.tilts_dict['coeffs'][:,:,slit].copy(),
+                'slitcen':self.tilts_dict['slitcen'][:,slit].copy(),
+                'func2d':self.tilts_dict['func2d']}
+
     def show(self, slits=True, wcs_match=True):
         """
         Show all of the flat field products
@@ -287,3 +306,33 @@ class FlatField(processimages.ProcessImages, masterframe.MasterFrame):
                 ginga.show_slits(viewer, ch, self.tslits_dict['slit_left'], self.tslits_dict['slit_righ'], slit_ids)
 
 
+class _LocalArrays(dict):
+    """
+    Stand-in for :class:`pypeit.utils.SharedArrays` when the slits are
+    fit in this process.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def _fit_flat_slit(images, tilts_dict, tslits_dict, slit, kwargs):
+    """
+    Fit the flat of one slit with :func:`pypeit.core.flat.fit_flat`.
+
+    Returns:
+        tuple: The flattened indices of the pixels of the slit (with the
+        tweaked edges), the pixel flat, illumination flat, flat model and
+        tilts at these pixels, and the (tweaked) left and right slit
+        edges.  Only the slit pixels are returned so that the worker
+        processes do not send back full images.
+    """
+    msgs.info('Computing flat field image for slit: {:d}/{:d}'.format(slit, tslits_dict['nslits']-1))
+    pixelflat, illumflat, flat_model, tilts, thismask, slit_left, slit_righ \
+            = flat.fit_flat(images['flat'], tilts_dict, tslits_dict, slit, inmask=images['inmask'],
+                            **kwargs)
+    indx = np.flatnonzero(thismask)
+    return indx, pixelflat.flat[indx], illumflat.flat[indx], flat_model.flat[indx], \
+                tilts.flat[indx], slit_left, slit_righ
@@ -0,0 +1,300 @@
+"""
+Cache of the full-frame images derived from the calibrations of a
+calibration group, e.g. the slitmask image of the slits.
+
+The images are keyed by the master key of the calibration group, the
+name of the image and a hash of the inputs used to build them (e.g. the
+slit edges), such that each image is built only once per
+calibration group, whichever class or function asks for it first::
+
+    from pypeit import imagecache
+    slitmask = imagecache.image_cache.get('slitmask', master_key, pixels.tslits2mask,
+                                          args=(tslits_dict,),
+                                          inputs=(pixels.tslits_fingerprint(tslits_dict),))
+
+Images without a master key are built but not cached.  The images are
+held in memory with least-recently-used eviction once the memory budget
+(by default 0.5 GB, see `[calibrations] image_cache_mem`) is exceeded;
+each process has its own cache, including the processes of
+:func:`pypeit.utils.pool_map`.  If a spill directory is set (usually the
+Masters folder, see :func:`pypeit.calibrations.Calibrations`), the
+images are instead written to `.npy` files and returned as read-only
+memory maps; these files are found again by later runs with the same
+inputs.
+
+Returned images are always read-only; copy them before modifying them.
+"""
+from __future__ import absolute_import, division, print_function
+
+from collections import OrderedDict
+import glob
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+from pypeit import msgs
+
+
+def fingerprint(*items):
+    """
+    Hash a set of inputs used to build a derived image.
+
+    Args:
+        *items:
+            Numpy arrays, scalars, strings, None, or (nested) tuples,
+            lists and dicts of these.  Arrays are hashed by their dtype,
+            shape and data.
+
+    Returns:
+        str: Hexadecimal sha1 digest.
+    """
+    sha = hashlib.sha1()
+    _update_fingerprint(sha, items)
+    return sha.hexdigest()
+
+
+def _update_fingerprint(sha, item):
+    if isinstance(item, np.ndarray):
+        sha.update('ndarray{0}{1}'.format(item.dtype.str, item.shape).encode())
+        sha.update(np.ascontiguousarray(item).data)
+    elif isinstance(item, (tuple, list)):
+        sha.update('{0}{1}'.format(type(item).__name__, len(item)).encode())
+        for i in item:
+            _update_fingerprint(sha, i)
+    elif isinstance(item, dict):
+        sha.update('dict{0}'.format(len(item)).encode())
+        for key in sorted(item.keys(), key=str):
+            _update_fingerprint(sha, key)
+            _update_fingerprint(sha, item[key])
+    elif item is None or isinstance(item, (str, bool, int, float, np.generic)):
+        sha.update('{0}{1!r}'.format(type(item).__name__, item).encode())
+    else:
+        raise TypeError('Cannot fingerprint an object of type {0}'.format(type(item)))
+
+
+def _nbytes(value):
+    """Number of bytes of the arrays in an entry of the cache."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+def _readonly(value):
+    if isinstance(value, tuple):
+        return tuple(_readonly(v) for v in value)
+    value.flags.writeable = False
+    return value
+
+
+class ImageCache(object):
+    """
+    Least-recently-used cache of derived images.
+
+    The entries are held in memory in least-recently-used order and the
+    oldest are dropped once their arrays exceed the memory budget;
+    :class:`pypeit.calibrations.CalibrationCache` uses the same
+    mechanism for the calibrations.
+
+    Args:
+        maxmem (:obj:`int`, optional):
+            Maximum number of bytes of the images held in memory.  Images
+            spilled to disk do not count against this budget.  0
+            disables the cache.
+        spill_dir (:obj:`str`, optional):
+            If provided, write the images to `.npy` files in this
+            directory and hold read-only memory maps instead of the
+            images themselves.
+
+    Attributes:
+        hits (int): Number of images returned from the cache.
+        misses (int): Number of images built.
+    """
+    def __init__(self, maxmem=2**29, spill_dir=None):
+        self.maxmem = maxmem
+        self.spill_dir = spill_dir
+        self._images = OrderedDict()
+        # Keys of the images that are memory maps of spilled files
+        self._spilled = set()
+        # Keys of the images dropped from memory to stay within budget
+        self._evicted = set()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        # The lock cannot be pickled, e.g. to be sent to another process
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def configure(self, maxmem=None, spill_dir=None):
+        """
+        Reset the memory budget and the spill directory; the images
+        already in the cache are kept (subject to the new budget).
+        """
+        with self._lock:
+            if maxmem is not None:
+                self.maxmem = maxmem
+            self.spill_dir = spill_dir
+            self._evict()
+
+    @property
+    def nbytes(self):
+        """Number of bytes of the images held in memory."""
+        return sum(_nbytes(v) for k, v in self._images.items() if k not in self._spilled)
+
+    def __len__(self):
+        return len(self._images)
+
+    def __contains__(self, key):
+        return key in self._images
+
+    def key(self, name, master_key, inputs):
+        """
+        Cache key of an image.
+
+        Args:
+            name (str): Name of the derived image, e.g. 'slitmask'.
+            master_key (str): Master key of the calibration group; can
+                be None.
+            inputs (tuple): Inputs that fully determine the image; see
+                :func:`fingerprint`.
+
+        Returns:
+            tuple: (master_key, name, digest)
+        """
+        return ('none' if master_key is None else master_key), name, fingerprint(*inputs)
+
+    def get(self, name, master_key, func, args=(), kwargs=None, inputs=None):
+        """
+        Return a derived image, building it with ``func(*args,
+        **kwargs)`` if it is not in the cache.
+
+        Args:
+            name (str):
+                Name of the derived image, e.g. 'slitmask'.
+            master_key (str):
+                Master key of the calibration group.  If None, the image
+                is built but not cached.
+            func (callable):
+                Function that builds the image.  It must return an array
+                or a tuple of arrays.
+            args (tuple, optional):
+                Positional arguments of ``func``.
+            kwargs (dict, optional):
+                Keyword arguments of ``func``.
+            inputs (tuple, optional):
+                Inputs that fully determine the image.  If None, the
+                image is keyed by ``args`` and ``kwargs``, which must
+                then be hashable by :func:`fingerprint`.
+
+        Returns:
+            `numpy.ndarray`_ or tuple: The read-only image(s).
+        """
+        kwargs = {} if kwargs is None else kwargs
+        if master_key is None or (self.maxmem <= 0 and self.spill_dir is None):
+            value = func(*args, **kwargs)
+            return _readonly(tuple(value) if isinstance(value, (tuple, list)) else value)
+        key = self.key(name, master_key, (args, kwargs) if inputs is None else inputs)
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return self._images[key]
+            spill_dir = self.spill_dir
+
+        # Build the image outside the lock; threads asking for the same
+        # image at the same time may both build it
+        value = None if spill_dir is None else self._load_spill(key, spill_dir)
+        if value is None:
+            value = func(*args, **kwargs)
+            value = tuple(value) if isinstance(value, (tuple, list)) else value
+            if spill_dir is not None:
+                value = self._spill(key, value, spill_dir)
+            built = True
+        else:
+            built = False
+        value = _readonly(value)
+
+        with self._lock:
+            if built:
+                self.misses += 1
+            else:
+                self.hits += 1
+            if spill_dir is not None:
+                self._spilled.add(key)
+            self._add(key, value)
+        return value
+
+    def clear(self, master_key=None):
+        """
+        Remove the images of one calibration group, or all of them, from
+        memory.  Spilled files are left on disk.
+        """
+        with self._lock:
+            for key in [k for k in self._images.keys()
+                            if master_key is None or k[0] == master_key]:
+                del self._images[key]
+                self._spilled.discard(key)
+
+    def _add(self, key, value):
+        """
+        Add an entry as the most recently used and enforce the memory
+        budget; must be called with the lock held.
+        """
+        self._images[key] = value
+        self._images.move_to_end(key)
+        self._evicted.discard(key)
+        self._evict()
+
+    def _evict(self):
+        nbytes = self.nbytes
+        for key in list(self._images.keys()):
+            if nbytes <= self.maxmem:
+                break
+            if key in self._spilled:
+                continue
+            nbytes -= _nbytes(self._images[key])
+            del self._images[key]
+            self._evicted.add(key)
+
+    @staticmethod
+    def _spill_root(key, spill_dir):
+        master_key, name, digest = key
+        return os.path.join(spill_dir, 'MasterImageCache_{0}_{1}_{2}'.format(
+                            name, master_key, digest[:16]))
+
+    def _spill(self, key, value, spill_dir):
+        if not os.path.isdir(spill_dir):
+            os.makedirs(spill_dir)
+        root = self._spill_root(key, spill_dir)
+        if isinstance(value, tuple):
+            for i, v in enumerate(value):
+                np.save('{0}.{1}.npy'.format(root, i), v)
+        else:
+            np.save(root+'.npy', value)
+        msgs.info('Spilled the {0} image to {1}*.npy'.format(key[1], root))
+        return self._load_spill(key, spill_dir)
+
+    def _load_spill(self, key, spill_dir):
+        root = self._spill_root(key, spill_dir)
+        if os.path.isfile(root+'.npy'):
+            return np.load(root+'.npy', mmap_mode='r')
+        files = sorted(glob.glob(root+'.*.npy'), key=lambda f: int(f.split('.')[-2]))
+        if len(files) == 0:
+            return None
+        return tuple(np.load(f, mmap_mode='r') for f in files)
+
+
+# The cache shared by the calibration classes and the reduction
+image_cache = ImageCache()
@@ -59,6 +59,15 @@ class MasterFrame(object):
         """
         return master_name(self.frametype, self.master_key, self.master_dir)
 
+    @property
+    def float_dtype(self):
+        """
+        Floating point type of the loaded master frames.  Overridden by
+        :class:`pypeit.processimages.ProcessImages` for frames that are
+        also processed images.
+        """
+        return np.dtype(np.float64)
+
     @property
     def mdir(self):
         """
@@ -113,7 +122,7 @@ class MasterFrame(object):
             hdu = fits.open(filename)
             # msgs.info("Master {0:s} frame loaded successfully:".format(hdu[0].header['FRAMETYP'])+msgs.newline()+name)
             head0 = hdu[0].header
-            data = hdu[exten].data.astype(np.float)
+            data = hdu[exten].data.astype(self.float_dtype)
             # List of files used to generate the Master frame (e.g. raw file frames)
             file_list = []
             for key in head0:
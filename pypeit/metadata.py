@@ -8,6 +8,8 @@ from __future__ import unicode_literals
 
 import os
 import io
+import json
+import sqlite3
 import string
 
 import numpy as np
@@ -273,31 +275,50 @@ class PypeItMetaData:
         """
         required_meta = self.spectrograph.meta
 
-        # Build lists to fill
-        data = {k:[] for k in required_meta.keys()}
-
-        ds, fs = [], []
-        for idx, ifile in enumerate(file_list):
+        # Get the metadata of the files already indexed; the index is
+        # not used with user-provided data, which can change the
+        # metadata read from the headers
+        index = None if self.par['rdx']['metadata_index'] is None or usrdata is not None \
+                    else MetadataIndex(self.par['rdx']['metadata_index'])
+        rows = [None]*len(file_list) if index is None \
+                    else index.get_rows(file_list, self.spectrograph.spectrograph)
+        toread = [i for i, row in enumerate(rows) if row is None]
+        if index is not None:
+            msgs.info('Found the metadata of {0}/{1} files in {2}'.format(
+                      len(file_list)-len(toread), len(file_list), index.index_file))
+
+        # Read the fits headers
+        headarrs = self.spectrograph.get_headarrs([file_list[i] for i in toread], strict=strict,
+                                                  nthreads=self.par['rdx']['header_nthreads'],
+                                                  cache_file=self.par['rdx']['header_cache'])
+
+        indexed = []
+        for idx, headarr in zip(toread, headarrs):
             # User data (for frame type)
             if usrdata is not None:
                 usr_row = usrdata[idx]
             else:
                 usr_row = None
-            # Read the fits headers
-            headarr = self.spectrograph.get_headarr(ifile, strict=strict)
-            # Add the directory and file name to the table
-            d,f = os.path.split(ifile)
-            ds.append(d)
-            fs.append(f)
             # Grab Meta
-            for meta_key in data.keys():
-                value = self.spectrograph.get_meta_value(ifile, meta_key, headarr=headarr, required=strict,
-                                                         ignore_bad_header=self.par['rdx']['ignore_bad_headers'],
-                                                         usr_row=usr_row)
-                data[meta_key].append(value)
+            rows[idx] = {}
+            for meta_key in required_meta.keys():
+                rows[idx][meta_key] = self.spectrograph.get_meta_value(file_list[idx], meta_key,
+                                            headarr=headarr, required=strict,
+                                            ignore_bad_header=self.par['rdx']['ignore_bad_headers'],
+                                            usr_row=usr_row)
+            # Only index files with all the headers
+            if not any([isinstance(h, str) for h in headarr]):
+                indexed += [idx]
+        if index is not None:
+            index.set_rows([file_list[i] for i in indexed], [rows[i] for i in indexed],
+                           self.spectrograph.spectrograph)
+            index.close()
+
+        # Collect the metadata columns
+        data = {k:[row[k] for row in rows] for k in required_meta.keys()}
         # File info
-        data['directory'] = ds
-        data['filename'] = fs
+        data['directory'] = [os.path.split(ifile)[0] for ifile in file_list]
+        data['filename'] = [os.path.split(ifile)[1] for ifile in file_list]
         # Additional bits and pieces
         self._add_bkg_pairs(data, 'empty')
         # Validate
@@ -736,7 +757,7 @@ class PypeItMetaData:
         setups, indx = self.get_configuration_names(ignore=ignore, return_index=True)
         return {setup: self.get_setup(i, config_only=True) for setup,i in zip(setups,indx)}
 
-    def unique_configurations(self, ignore_frames=None, force=False):
+    def unique_configurations(self, ignore_frames=None, force=False, known=None):
         """
         Return the unique instrument configurations.
 
@@ -763,6 +784,13 @@ class PypeItMetaData:
                 Force the configurations to be redetermined.  Otherwise
                 the configurations are only determined if
                 :attr:`configs` has not yet been define.
+            known (:obj:`dict`, optional):
+                Configurations identified previously, e.g. by an
+                earlier setup (see :class:`MetadataIndex`).  Frames
+                matching one of these configurations are assigned its
+                identifier, and new configurations are assigned the
+                identifiers that have not been used yet.  Only used if
+                the 'setup' column has not been set.
 
         Returns:
             dict: A nested dictionary, one dictionary per configuration
@@ -823,29 +851,35 @@ class PypeItMetaData:
             msgs.info('All files assumed to be from a single configuration.')
             return self.configs
 
-        # Use the first file to set the first unique configuration
-        self.configs = {}
-        self.configs[cfg_iter[cfg_indx]] = self.get_configuration(indx[0], cfg_keys=cfg_keys)
-        cfg_indx += 1
+        # Skip the identifiers of the configurations identified
+        # previously
+        _known = {} if known is None else known
+        cfg_iter = [c for c in cfg_iter if c not in _known.keys()]
 
-        # Check if any of the other files show a different
-        # configuration.  The check is for *exact* equality, meaning
-        # *any* difference in the values for the keywords listed in
-        # `cfg_keys` will lead to a new configuration.
+        # Check if any of the files show a different configuration.
+        # The first file sets the first unique configuration.  The
+        # check is for *exact* equality, meaning *any* difference in the
+        # values for the keywords listed in `cfg_keys` will lead to a
+        # new configuration.
         # TODO: Add a tolerance for floating point values?
-        for i in indx[1:]:
-            j = 0
-            for c in self.configs.values():
-                if row_match_config(self.table[i], c, self.spectrograph):
-                    break
-                j += 1
-            unique = j == len(self.configs)
-            if unique:
-                if cfg_indx == len(cfg_iter):
-                    msgs.error('Cannot assign more than {0} configurations!'.format(len(cfg_iter)))
-                self.configs[cfg_iter[cfg_indx]] = self.get_configuration(i, cfg_keys=cfg_keys)
-                cfg_indx += 1
-
+        self.configs = {}
+        for i in indx:
+            if any(row_match_config(self.table[i], c, self.spectrograph)
+                        for c in self.configs.values()):
+                continue
+            match = [k for k, c in _known.items()
+                        if row_match_config(self.table[i], c, self.spectrograph)]
+            if len(match) > 0:
+                self.configs[match[0]] = _known[match[0]]
+                continue
+            if cfg_indx == len(cfg_iter):
+                msgs.error('Cannot assign more than {0} configurations!'.format(
+                           len(string.ascii_uppercase)))
+            self.configs[cfg_iter[cfg_indx]] = self.get_configuration(i, cfg_keys=cfg_keys)
+            cfg_indx += 1
+
+        # Order by identifier
+        self.configs = {k: self.configs[k] for k in sorted(self.configs.keys())}
         msgs.info('Found {0} unique configurations.'.format(len(self.configs)))
         return self.configs
 
@@ -1323,6 +1357,78 @@ class PypeItMetaData:
         if 'calib' not in self.keys():
             self['calib'] = str(0)
 
+    def append_frames(self, file_list, ftypes=['science', 'standard'], strict=True):
+        """
+        Type a set of new frames and append those of the requested
+        types to the table, e.g. as the frames are written during the
+        night.
+
+        Each new frame is assigned to the configuration of the table it
+        matches, and to the calibration group of a frame of the same
+        type (or of any science frame) in this configuration; the frames
+        matching none of the configurations are skipped.  Each appended
+        frame gets its own comb_id and no background frames.  The rows
+        already in the table are left untouched.
+
+        Args:
+            file_list (:obj:`list`):
+                The new files.
+            ftypes (:obj:`list`, optional):
+                The frame types to append.
+            strict (:obj:`bool`, optional):
+                Function will fault if a header cannot be read.
+
+        Returns:
+            `numpy.ndarray`_: The indices of the appended rows.
+        """
+        if len(file_list) == 0:
+            return np.array([], dtype=int)
+        new = PypeItMetaData(self.spectrograph, self.par, file_list=file_list, strict=strict)
+        new.get_frame_types(flag_unknown=True)
+        configs = self.unique_configurations()
+
+        keep = []
+        refs = []
+        comb_id = np.amax(self['comb_id']) if len(self) > 0 else 0
+        for i in range(len(new)):
+            ftype = [t for t in ftypes if new.find_frames(t)[i]]
+            if len(ftype) == 0:
+                msgs.info('Skipping {0}: not a {1} frame'.format(new['filename'][i],
+                                                                 ' or '.join(ftypes)))
+                continue
+            setup = [k for k, c in configs.items()
+                        if row_match_config(new.table[i], c, self.spectrograph)]
+            if len(setup) == 0:
+                msgs.warn('Skipping {0}: does not match any configuration'.format(
+                          new['filename'][i]))
+                continue
+            in_setup = self['setup'] == setup[0]
+            ref = np.where(in_setup & self.find_frames(ftype[0]))[0]
+            if len(ref) == 0:
+                ref = np.where(in_setup & self.find_frames('science'))[0]
+            if len(ref) == 0:
+                msgs.warn('Skipping {0}: no calibration group for configuration {1}'.format(
+                          new['filename'][i], setup[0]))
+                continue
+            keep += [i]
+            refs += [ref[0]]
+
+        if len(keep) == 0:
+            return np.array([], dtype=int)
+
+        # Columns set by the setup (e.g. the configuration and the
+        # calibration group) are taken from the reference frames
+        newtbl = new.table[keep]
+        for key in self.keys():
+            if key not in newtbl.keys():
+                newtbl[key] = self[key][refs]
+        newtbl['comb_id'] = comb_id + 1 + np.arange(len(keep))
+        newtbl['bkg_id'] = -1
+        indx = len(self) + np.arange(len(keep))
+        self.table = table.vstack([self.table, newtbl[self.keys()]], join_type='exact',
+                                  metadata_conflicts='silent')
+        return indx
+
     def write_setups(self, ofile, overwrite=True, ignore=None):
         """
         Write the *.setups file.
@@ -1638,6 +1744,150 @@ class PypeItMetaData:
         return self.calib_bitmask.flagged_bits(self['calibbit'][row])
 
 
+class MetadataIndex(object):
+    """
+    Persistent index of the metadata of raw frames and of the
+    configurations assigned to them, kept in an SQLite database.
+
+    The metadata table row of each file is keyed by the absolute path
+    of the file and the name of the spectrograph, and is only used if
+    the size and modification time of the file have not changed since
+    it was indexed.  This allows :class:`PypeItMetaData` to only read
+    the headers of new or modified files when the metadata table is
+    rebuilt; see :func:`PypeItMetaData._build`.
+
+    The index also keeps the configurations identified by an earlier
+    setup, such that their identifiers are kept when new frames are
+    added; see :func:`PypeItMetaData.unique_configurations`.
+
+    Args:
+        index_file (str):
+            Name of the SQLite database.  It is created if it does not
+            exist.
+    """
+    def __init__(self, index_file):
+        self.index_file = index_file
+        try:
+            self._connect()
+        except sqlite3.DatabaseError:
+            msgs.warn('Could not read metadata index {0}; starting a new one.'.format(index_file))
+            os.remove(index_file)
+            self._connect()
+
+    def _connect(self):
+        self.db = sqlite3.connect(self.index_file)
+        try:
+            self.db.execute('CREATE TABLE IF NOT EXISTS frames (path TEXT, spectrograph TEXT, '
+                            'size INTEGER, mtime REAL, meta TEXT, '
+                            'PRIMARY KEY (path, spectrograph))')
+            self.db.execute('CREATE TABLE IF NOT EXISTS configs (spectrograph TEXT, setup TEXT, '
+                            'config TEXT, PRIMARY KEY (spectrograph, setup))')
+            self.db.commit()
+        except sqlite3.DatabaseError:
+            self.db.close()
+            raise
+
+    @staticmethod
+    def _stat(filename):
+        stat = os.stat(filename)
+        return stat.st_size, stat.st_mtime
+
+    @staticmethod
+    def _dumps(values):
+        """Serialize a dictionary of metadata values; numpy scalars
+        are converted to the python types."""
+        return json.dumps({k: v.item() if isinstance(v, np.generic) else v
+                                for k, v in values.items()})
+
+    def get_rows(self, file_list, spectrograph):
+        """
+        Get the indexed metadata of a list of files.
+
+        Args:
+            file_list (list):
+                Names of the files.
+            spectrograph (str):
+                Name of the spectrograph.
+
+        Returns:
+            list: The dictionary with the metadata of each file, or
+            None for the files that are not indexed or have changed.
+        """
+        indexed = {path: (size, mtime, meta) for path, size, mtime, meta
+                    in self.db.execute('SELECT path, size, mtime, meta FROM frames '
+                                       'WHERE spectrograph = ?', (spectrograph,))}
+        rows = [None]*len(file_list)
+        for i, ifile in enumerate(file_list):
+            entry = indexed.get(os.path.abspath(ifile))
+            if entry is None:
+                continue
+            try:
+                stat = self._stat(ifile)
+            except OSError:
+                continue
+            if stat == entry[:2]:
+                rows[i] = json.loads(entry[2])
+        return rows
+
+    def set_rows(self, file_list, rows, spectrograph):
+        """
+        Add the metadata of a list of files to the index.
+
+        Args:
+            file_list (list):
+                Names of the files.
+            rows (list):
+                Dictionary with the metadata of each file.
+            spectrograph (str):
+                Name of the spectrograph.
+        """
+        entries = []
+        for ifile, row in zip(file_list, rows):
+            size, mtime = self._stat(ifile)
+            entries += [(os.path.abspath(ifile), spectrograph, size, mtime, self._dumps(row))]
+        self.db.executemany('INSERT OR REPLACE INTO frames VALUES (?, ?, ?, ?, ?)', entries)
+        self.db.commit()
+
+    def get_configurations(self, spectrograph):
+        """
+        Get the indexed configurations.
+
+        Args:
+            spectrograph (str):
+                Name of the spectrograph.
+
+        Returns:
+            dict: The metadata of each configuration, keyed and sorted
+            by the configuration identifier.
+        """
+        return OrderedDict([(setup, json.loads(config)) for setup, config
+                                in self.db.execute('SELECT setup, config FROM configs WHERE '
+                                                   'spectrograph = ? ORDER BY setup',
+                                                   (spectrograph,))])
+
+    def set_configurations(self, configs, spectrograph):
+        """
+        Set the indexed configurations, replacing all the
+        configurations indexed for the spectrograph.
+
+        Args:
+            configs (dict):
+                The metadata of each configuration, keyed by the
+                configuration identifier; see
+                :func:`PypeItMetaData.unique_configurations`.
+            spectrograph (str):
+                Name of the spectrograph.
+        """
+        self.db.execute('DELETE FROM configs WHERE spectrograph = ?', (spectrograph,))
+        self.db.executemany('INSERT INTO configs VALUES (?, ?, ?)',
+                            [(spectrograph, setup, self._dumps(cfg))
+                                for setup, cfg in configs.items()])
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
 def row_match_config(row, config, spectrograph):
     """
     Queries whether a row from the fitstbl matches the
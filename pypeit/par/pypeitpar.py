@@ -194,7 +194,8 @@ class ProcessImagesPar(ParSet):
     """
     def __init__(self, overscan=None, overscan_par=None, match=None, combine=None, satpix=None,
                  sigrej=None, n_lohi=None, sig_lohi=None, replace=None, lamaxiter=None, grow=None,
-                 rmcompact=None, sigclip=None, sigfrac=None, objlim=None):
+                 rmcompact=None, sigclip=None, sigfrac=None, objlim=None, dtype=None,
+                 combine_maxmem=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -286,6 +287,22 @@ class ProcessImagesPar(ParSet):
         dtypes['objlim'] = [int, float]
         descr['objlim'] = 'Object detection limit in LA cosmics routine'
 
+        defaults['dtype'] = 'float64'
+        options['dtype'] = ProcessImagesPar.valid_dtypes()
+        dtypes['dtype'] = str
+        descr['dtype'] = 'Floating point type of the processed images, inverse variance and ' \
+                         'read noise images.  Using float32 halves their memory footprint at ' \
+                         'the expense of precision; fits still accumulate in float64.  ' \
+                         'Options are: {0}'.format(', '.join(options['dtype']))
+
+        dtypes['combine_maxmem'] = [int, float]
+        descr['combine_maxmem'] = 'Maximum memory in GB used to combine the frames.  If set, ' \
+                                  'the frames are loaded and bias subtracted one at a time ' \
+                                  'into a memory-mapped scratch file in the temporary ' \
+                                  'directory and combined in blocks of rows.  The result is ' \
+                                  'identical to combining all frames in memory.  If None, ' \
+                                  'all frames are held and combined in memory.'
+
         # Instantiate the parameter set
         super(ProcessImagesPar, self).__init__(list(pars.keys()),
                                                values=list(pars.values()),
@@ -302,7 +319,7 @@ class ProcessImagesPar(ParSet):
         k = cfg.keys()
         parkeys = [ 'overscan', 'overscan_par', 'match', 'combine', 'satpix', 'sigrej', 'n_lohi',
                     'sig_lohi', 'replace', 'lamaxiter', 'grow', 'rmcompact', 'sigclip', 'sigfrac',
-                    'objlim' ]
+                    'objlim', 'dtype', 'combine_maxmem' ]
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
@@ -315,6 +332,13 @@ class ProcessImagesPar(ParSet):
         """
         return [ 'polynomial', 'savgol', 'median' ]
 
+    @staticmethod
+    def valid_dtypes():
+        """
+        Return the valid floating point types of the processed images.
+        """
+        return [ 'float64', 'float32' ]
+
     @staticmethod
     def valid_combine_methods():
         """
@@ -343,6 +367,8 @@ class ProcessImagesPar(ParSet):
 
         if self.data['n_lohi'] is not None and len(self.data['n_lohi']) != 2:
             raise ValueError('n_lohi must be a list of two numbers.')
+        if self.data['combine_maxmem'] is not None and self.data['combine_maxmem'] <= 0:
+            raise ValueError('combine_maxmem must be positive.')
         if self.data['sig_lohi'] is not None and len(self.data['sig_lohi']) != 2:
             raise ValueError('n_lohi must be a list of two numbers.')
 
@@ -418,7 +444,8 @@ class FlatFieldPar(ParSet):
     see :ref:`pypeitpar`.
     """
     def __init__(self, method=None, frame=None, illumflatten=None, spec_samp_fine=None, spec_samp_coarse=None,
-                 spat_samp=None, tweak_slits=None, tweak_slits_thresh=None, tweak_slits_maxfrac=None):
+                 spat_samp=None, tweak_slits=None, tweak_slits_thresh=None, tweak_slits_maxfrac=None,
+                 nproc=None):
 
     
         # Grab the parameter names and values from the function
@@ -486,6 +513,11 @@ class FlatFieldPar(ParSet):
                                        'allowed for trimming each (i.e. left and right) slit boundary, i.e. the default is 10% ' \
                                        'which means slits would shrink or grow by at most 20% (10% on each side)'
 
+        defaults['nproc'] = 1
+        dtypes['nproc'] = int
+        descr['nproc'] = 'Number of processes used to fit the flat field of the slits in ' \
+                         'parallel.  The flat image is shared with the processes through ' \
+                         'memory-mapped files.  The result is independent of nproc.'
 
         # Instantiate the parameter set
         super(FlatFieldPar, self).__init__(list(pars.keys()),
@@ -502,7 +534,7 @@ class FlatFieldPar(ParSet):
     def from_dict(cls, cfg):
         k = cfg.keys()
         parkeys = [ 'method', 'frame', 'illumflatten', 'spec_samp_fine', 'spec_samp_coarse', 'spat_samp',
-                    'tweak_slits', 'tweak_slits_thresh', 'tweak_slits_maxfrac']
+                    'tweak_slits', 'tweak_slits_thresh', 'tweak_slits_maxfrac', 'nproc']
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
@@ -538,6 +570,8 @@ class FlatFieldPar(ParSet):
         #                     'pixels, number of repeats')
         #if self.data['method'] == 'bspline' and len(self.data['params']) != 1:
         #    raise ValueError('For bspline method, set params = spacing (integer).')
+        if self.data['nproc'] < 1:
+            raise ValueError('nproc must be at least 1.')
         if self.data['frame'] in FlatFieldPar.valid_frames() or self.data['frame'] is None:
             return
 
@@ -904,7 +938,8 @@ class ReducePar(ParSet):
     see :ref:`pypeitpar`.
     """
     def __init__(self, spectrograph=None, detnum=None, sortroot=None, calwin=None, scidir=None,
-                 qadir=None, redux_path=None, ignore_bad_headers=None):
+                 qadir=None, redux_path=None, ignore_bad_headers=None, header_nthreads=None,
+                 header_cache=None, metadata_index=None, nproc=None, det_nproc=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -943,6 +978,21 @@ class ReducePar(ParSet):
         dtypes['ignore_bad_headers'] = bool
         descr['ignore_bad_headers'] = 'Ignore bad headers (NOT recommended unless you know it is safe).'
 
+        defaults['header_nthreads'] = 8
+        dtypes['header_nthreads'] = int
+        descr['header_nthreads'] = 'Number of threads used to read the headers of the raw files.'
+
+        dtypes['header_cache'] = str
+        descr['header_cache'] = 'File used to cache the headers of the raw files, such that ' \
+                                'only new or modified files are read when the metadata are ' \
+                                'rebuilt.  If None, the headers are not cached.'
+
+        dtypes['metadata_index'] = str
+        descr['metadata_index'] = 'SQLite file used to index the metadata of the raw files and ' \
+                                  'the configurations assigned to them, such that only new or ' \
+                                  'modified files are read when the metadata are rebuilt.  If ' \
+                                  'None, the metadata are not indexed.'
+
         defaults['scidir'] = 'Science'
         dtypes['scidir'] = str
         descr['scidir'] = 'Directory relative to calling directory to write science files.'
@@ -956,6 +1006,20 @@ class ReducePar(ParSet):
         dtypes['redux_path'] = str
         descr['redux_path'] = 'Path to folder for performing reductions.'
 
+        defaults['nproc'] = 1
+        dtypes['nproc'] = int
+        descr['nproc'] = 'Number of processes to use for the steps of the reduction that are ' \
+                         'done independently for each slit (e.g. global sky subtraction), ' \
+                         'and of threads used to reject the cosmic rays of the science frames.  ' \
+                         'The results do not depend on this number.  1 means the slits are ' \
+                         'processed serially.'
+
+        defaults['det_nproc'] = 1
+        dtypes['det_nproc'] = int
+        descr['det_nproc'] = 'Number of processes to use to reduce the detectors of an exposure ' \
+                             'in parallel.  Each process writes its own log file.  1 means the ' \
+                             'detectors are reduced serially.'
+
         # Instantiate the parameter set
         super(ReducePar, self).__init__(list(pars.keys()),
                                         values=list(pars.values()),
@@ -971,7 +1035,8 @@ class ReducePar(ParSet):
 
         # Basic keywords
         parkeys = [ 'spectrograph', 'detnum', 'sortroot', 'calwin', 'scidir', 'qadir',
-                    'redux_path', 'ignore_bad_headers']
+                    'redux_path', 'ignore_bad_headers', 'header_nthreads', 'header_cache',
+                    'metadata_index', 'nproc', 'det_nproc']
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
@@ -994,7 +1059,12 @@ class ReducePar(ParSet):
                 'lbt_mods1r', 'lbt_mods1b', 'lbt_mods2r', 'lbt_mods2b', 'vlt_fors2']
 
     def validate(self):
-        pass
+        if self.data['nproc'] < 1:
+            raise ValueError('nproc must be at least 1.')
+        if self.data['det_nproc'] < 1:
+            raise ValueError('det_nproc must be at least 1.')
+        if self.data['header_nthreads'] < 1:
+            raise ValueError('header_nthreads must be at least 1.')
 
     
 class WavelengthSolutionPar(ParSet):
@@ -1011,7 +1081,7 @@ class WavelengthSolutionPar(ParSet):
                  sigdetect=None, fwhm=None, reid_arxiv = None, nreid_min = None, cc_thresh = None, cc_local_thresh = None,
                  nlocal_cc = None, rms_threshold=None,match_toler=None, func=None, n_first=None, n_final =None,
                  sigrej_first=None, sigrej_final=None,wv_cen=None, disp=None,numsearch=None,nfitpix=None, IDpixels=None,
-                 IDwaves=None, medium=None, frame=None, nsnippet=None):
+                 IDwaves=None, medium=None, frame=None, nsnippet=None, nproc=None):
         # Grab the parameter names and values from the function
         # arguments
         args, _, _, values = inspect.getargvalues(inspect.currentframe())
@@ -1226,6 +1296,13 @@ class WavelengthSolutionPar(ParSet):
         descr['frame'] = 'Frame of reference for the wavelength calibration.  ' \
                          'Options are: {0}'.format(', '.join(options['frame']))
 
+        defaults['nproc'] = 1
+        dtypes['nproc'] = int
+        descr['nproc'] = 'Number of processes used to search the pattern-matching parameter ' \
+                         'grid of the holy-grail algorithm for each slit.  The grid points are ' \
+                         'evaluated concurrently and the early-return criterion is applied in ' \
+                         'the order of the grid, so the result is independent of nproc.'
+
         # Instantiate the parameter set
         super(WavelengthSolutionPar, self).__init__(list(pars.keys()),
                                                     values=list(pars.values()),
@@ -1244,7 +1321,7 @@ class WavelengthSolutionPar(ParSet):
                     'reid_arxiv', 'nreid_min', 'cc_thresh', 'cc_local_thresh', 'nlocal_cc',
                     'rms_threshold', 'match_toler', 'func', 'n_first','n_final', 'sigrej_first', 'sigrej_final',
                     'wv_cen', 'disp', 'numsearch', 'nfitpix','IDpixels', 'IDwaves', 'medium', 'frame',
-                    'nsnippet']
+                    'nsnippet', 'nproc']
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
@@ -1286,7 +1363,8 @@ class WavelengthSolutionPar(ParSet):
         return [ 'heliocentric', 'barycentric' ]
 
     def validate(self):
-        pass
+        if self.data['nproc'] < 1:
+            raise ValueError('nproc must be at least 1.')
 
 
 class TraceSlitsPar(ParSet):
@@ -1516,7 +1594,7 @@ class WaveTiltsPar(ParSet):
         of `disporder`...
     """
     def __init__(self, idsonly=None, tracethresh=None, sig_neigh=None, nfwhm_neigh=None, maxdev_tracefit=None, sigrej_trace=None, spat_order=None, spec_order=None,
-                 func2d=None, maxdev2d=None, sigrej2d=None):
+                 func2d=None, maxdev2d=None, sigrej2d=None, nproc=None):
 
 
         # Grab the parameter names and values from the function
@@ -1599,6 +1677,10 @@ class WaveTiltsPar(ParSet):
         descr['sigrej2d'] = 'Outlier rejection significance determining which pixels on a fit to an arc line tilt ' \
                             'are rejected by the global 2D fit'
 
+        defaults['nproc'] = 1
+        dtypes['nproc'] = int
+        descr['nproc'] = 'Number of processes used to trace and fit the tilts of the slits in parallel.  ' \
+                         'The result is independent of nproc.'
 
         # Right now this is not used the fits are hard wired to be legendre for the individual fits.
         #defaults['function'] = 'legendre'
@@ -1635,7 +1717,8 @@ class WaveTiltsPar(ParSet):
     @classmethod
     def from_dict(cls, cfg):
         k = cfg.keys()
-        parkeys = [ 'idsonly', 'tracethresh', 'sig_neigh', 'maxdev_tracefit', 'sigrej_trace','nfwhm_neigh', 'spat_order', 'spec_order', 'func2d','maxdev2d', 'sigrej2d']
+        parkeys = [ 'idsonly', 'tracethresh', 'sig_neigh', 'maxdev_tracefit', 'sigrej_trace','nfwhm_neigh', 'spat_order', 'spec_order', 'func2d','maxdev2d', 'sigrej2d',
+                    'nproc']
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
@@ -1643,7 +1726,8 @@ class WaveTiltsPar(ParSet):
 
 
     def validate(self):
-        pass
+        if self.data['nproc'] < 1:
+            raise ValueError('nproc must be at least 1.')
 
     #@staticmethod
     #def valid_methods():
@@ -1876,7 +1960,7 @@ class ScienceImagePar(ParSet):
 
     def __init__(self, bspline_spacing=None, boxcar_radius=None, trace_npoly=None,
                  global_sky_std=None, sig_thresh=None, maxnumber=None, sn_gauss=None, model_full_slit=None,
-                 no_poly=None, manual=None, sky_sigrej=None):
+                 no_poly=None, manual=None, sky_sigrej=None, quicklook=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -1951,6 +2035,13 @@ class ScienceImagePar(ParSet):
         dtypes['manual'] = list
         descr['manual'] = 'List of manual extraction parameter sets'
 
+        defaults['quicklook'] = False
+        dtypes['quicklook'] = bool
+        descr['quicklook'] = 'Latency-oriented reduction for quick-look: skip the second pass of ' \
+                             'object finding and global sky subtraction, and extract the objects ' \
+                             'with a Gaussian profile on the global sky model instead of the ' \
+                             'local sky subtraction and profile fitting.'
+
         # Instantiate the parameter set
         super(ScienceImagePar, self).__init__(list(pars.keys()),
                                               values=list(pars.values()),
@@ -1965,7 +2056,7 @@ class ScienceImagePar(ParSet):
         k = cfg.keys()
         #ToDO change to updated param list
         parkeys = ['bspline_spacing', 'boxcar_radius', 'trace_npoly', 'global_sky_std', 'sig_thresh', 'maxnumber', 'sn_gauss',
-                   'model_full_slit', 'no_poly', 'manual', 'sky_sigrej']
+                   'model_full_slit', 'no_poly', 'manual', 'sky_sigrej', 'quicklook']
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
@@ -1990,7 +2081,8 @@ class CalibrationsPar(ParSet):
     def __init__(self, caldir=None, reuse_masters=None, setup=None, trim=None, badpix=None,
                  biasframe=None, darkframe=None, arcframe=None, pixelflatframe=None,
                  pinholeframe=None, traceframe=None, standardframe=None, flatfield=None,
-                 wavelengths=None, slits=None, tilts=None):
+                 wavelengths=None, slits=None, tilts=None, image_cache_mem=None,
+                 image_cache_spill=None, calib_cache_mem=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -2074,6 +2166,35 @@ class CalibrationsPar(ParSet):
         dtypes['tilts'] = [ ParSet, dict ]
         descr['tilts'] = 'Define how to tract the slit tilts using the trace frames'
 
+        defaults['image_cache_mem'] = 0.5
+        dtypes['image_cache_mem'] = [int, float]
+        descr['image_cache_mem'] = 'Memory budget in GB for the full-frame images derived from ' \
+                                   'the calibrations of each calibration group (e.g. the ' \
+                                   'slitmask image) that are cached for reuse; ' \
+                                   'the least recently used images are dropped first.  Each ' \
+                                   'process has its own cache, and this budget adds to ' \
+                                   'calib_cache_mem.  Set to 0 to disable the cache.  ' \
+                                   'See :mod:`pypeit.imagecache`.'
+
+        defaults['image_cache_spill'] = False
+        dtypes['image_cache_spill'] = bool
+        descr['image_cache_spill'] = 'Write the cached derived images to .npy files in the ' \
+                                     'master frame directory and use them as memory maps, ' \
+                                     'instead of holding them in memory.  The files are ' \
+                                     'reused by later runs with the same calibrations.'
+
+        defaults['calib_cache_mem'] = 2.
+        dtypes['calib_cache_mem'] = [int, float]
+        descr['calib_cache_mem'] = 'Memory budget in GB for the calibrations (bias, slit ' \
+                                   'traces, wavelength calibration, tilts, flats, wavelength ' \
+                                   'image) held in memory for reuse by all the frames of a ' \
+                                   'calibration group; the least recently used calibrations ' \
+                                   'are dropped first and their master frames are reloaded ' \
+                                   'from disk when needed again.  This budget adds to ' \
+                                   'image_cache_mem: each process can hold up to ' \
+                                   'calib_cache_mem + image_cache_mem, and each process of ' \
+                                   'the pool set by [rdx] det_nproc has its own budgets.'
+
         # Instantiate the parameter set
         super(CalibrationsPar, self).__init__(list(pars.keys()),
                                               values=list(pars.values()),
@@ -2081,14 +2202,15 @@ class CalibrationsPar(ParSet):
                                               options=list(options.values()),
                                               dtypes=list(dtypes.values()),
                                               descr=list(descr.values()))
-        #self.validate()
+        self.validate()
 
     @classmethod
     def from_dict(cls, cfg):
         k = cfg.keys()
 
         # Basic keywords
-        parkeys = [ 'caldir', 'reuse_masters', 'setup', 'trim', 'badpix' ]
+        parkeys = [ 'caldir', 'reuse_masters', 'setup', 'trim', 'badpix', 'image_cache_mem',
+                    'image_cache_spill', 'calib_cache_mem' ]
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
@@ -2129,6 +2251,12 @@ class CalibrationsPar(ParSet):
     # be called for all the sub parameter sets, but this can do higher
     # level checks, if necessary.
 
+    def validate(self):
+        if self.data['image_cache_mem'] < 0:
+            raise ValueError('The image cache memory budget cannot be negative.')
+        if self.data['calib_cache_mem'] < 0:
+            raise ValueError('The calibration cache memory budget cannot be negative.')
+
     # JFH I'm not sure what to do about this function? Commentingo out for now.
     #def validate(self):
     #    if self.data['masters'] == 'force' \
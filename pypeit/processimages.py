@@ -5,6 +5,7 @@ from __future__ import absolute_import, division, print_function
 import inspect
 import numpy as np
 import os
+import tempfile
 
 #from importlib import reload
 
@@ -162,6 +163,14 @@ class ProcessImages(object):
         self.pixel_flat = None      # passed as an argument to process(), flat_field()
         self.illum_flat = None        # passed as an argument to process(), flat_field()
 
+    @property
+    def float_dtype(self):
+        """
+        Floating point type of the processed images; see the `dtype`
+        parameter of :class:`pypeit.par.pypeitpar.ProcessImagesPar`.
+        """
+        return np.dtype(self.proc_par['dtype'])
+
 #    def _set_files(self, files, check=True):
     def _set_files(self, files, check=False):
         """
@@ -307,44 +316,117 @@ class ProcessImages(object):
         self.oscansec = [None]*self.nfiles
 
         for i in range(self.nfiles):
-            # Load the image data and headers
-            self.raw_images[i], self.headers[i] \
-                    = self.spectrograph.load_raw_frame(self.files[i], det=self.det)
-
-            if self.binning[i] is None:
-                self.binning[i] = self.spectrograph.get_meta_value(self.files[i], 'binning')
-#                self.binning[i] = self.spectrograph.parse_binning(self.headers[i])
-
-            # Get the data sections, one section per amplifier
-            try:
-                datasec, one_indexed, include_end, transpose \
-                        = self.spectrograph.get_image_section(inp=self.headers[i], det=self.det,
-                                                              section='datasec')
-            except:
-                datasec, one_indexed, include_end, transpose \
-                        = self.spectrograph.get_image_section(inp=self.files[i], det=self.det,
-                                                              section='datasec')
-            self.datasec[i] = [parse.sec2slice(sec, one_indexed=one_indexed,
-                                                include_end=include_end, require_dim=2,
-                                                transpose=transpose, binning=self.binning[i])
-                                    for sec in datasec]
-            # Get the overscan sections, one section per amplifier
-            try:
-                oscansec, one_indexed, include_end, transpose \
-                        = self.spectrograph.get_image_section(inp=self.headers[i], det=self.det,
-                                                              section='oscansec')
-            except:
-                oscansec, one_indexed, include_end, transpose \
-                        = self.spectrograph.get_image_section(inp=self.files[i], det=self.det,
-                                                              section='oscansec')
-            # Parse, including handling binning
-            self.oscansec[i] = [parse.sec2slice(sec, one_indexed=one_indexed,
-                                                 include_end=include_end, require_dim=2,
-                                                 transpose=transpose, binning=self.binning[i])
-                                    for sec in oscansec]
+            self.raw_images[i] = self._load_image(i)
         # Include step
         self.steps.append(inspect.stack()[0][3])
 
+    def _load_image(self, i):
+        """
+        Load the header, binning and image sections of the i-th file
+        into the relevant lists and return its image data.
+        """
+        # Load the image data and headers
+        raw_image, self.headers[i] \
+                = self.spectrograph.load_raw_frame(self.files[i], det=self.det,
+                                                   dtype=self.float_dtype)
+
+        if self.binning[i] is None:
+            self.binning[i] = self.spectrograph.get_meta_value(self.files[i], 'binning')
+#            self.binning[i] = self.spectrograph.parse_binning(self.headers[i])
+
+        # Get the data sections, one section per amplifier
+        try:
+            datasec, one_indexed, include_end, transpose \
+                    = self.spectrograph.get_image_section(inp=self.headers[i], det=self.det,
+                                                          section='datasec')
+        except:
+            datasec, one_indexed, include_end, transpose \
+                    = self.spectrograph.get_image_section(inp=self.files[i], det=self.det,
+                                                          section='datasec')
+        self.datasec[i] = [parse.sec2slice(sec, one_indexed=one_indexed,
+                                            include_end=include_end, require_dim=2,
+                                            transpose=transpose, binning=self.binning[i])
+                                for sec in datasec]
+        # Get the overscan sections, one section per amplifier
+        try:
+            oscansec, one_indexed, include_end, transpose \
+                    = self.spectrograph.get_image_section(inp=self.headers[i], det=self.det,
+                                                          section='oscansec')
+        except:
+            oscansec, one_indexed, include_end, transpose \
+                    = self.spectrograph.get_image_section(inp=self.files[i], det=self.det,
+                                                          section='oscansec')
+        # Parse, including handling binning
+        self.oscansec[i] = [parse.sec2slice(sec, one_indexed=one_indexed,
+                                             include_end=include_end, require_dim=2,
+                                             transpose=transpose, binning=self.binning[i])
+                                for sec in oscansec]
+        return raw_image
+
+    def stream_images(self, msbias, trim=True, par=None):
+        """
+        Load and bias subtract the images one at a time.
+
+        This is the memory-bounded alternative to :func:`load_images`
+        followed by :func:`bias_subtract`.  Each bias subtracted image
+        is written to a memory-mapped scratch file (see
+        :func:`_init_proc_images`) and its raw data is released, such
+        that at most one raw image is held in memory.  The raw images
+        are therefore not available afterwards; i.e., all elements of
+        :attr:`raw_images` are None.
+
+        Args:
+            msbias (:obj:`numpy.ndarray`, :obj:`str`):
+                The bias image or the bias subtraction method; see
+                :func:`bias_subtract`.
+            trim (:obj:`bool`, optional):
+                Trim the images to the data sections.
+            par (:class:`pypeit.par.pypeitpar.ProcessImagesPar`, optional):
+                Parameters that replace :attr:`proc_par`.
+        """
+        if par is not None and not isinstance(par, pypeitpar.ProcessImagesPar):
+            raise TypeError('Provided ParSet for must be type ProcessImagesPar.')
+        if par is not None:
+            self.proc_par = par
+
+        # Same initialization as load_images
+        self.raw_images = [None]*self.nfiles
+        self.headers = [None]*self.nfiles
+        self.binning = [None]*self.nfiles
+        self.datasec = [None]*self.nfiles
+        self.oscansec = [None]*self.nfiles
+
+        datasec_img = self.spectrograph.get_datasec_img(self.files[0], det=self.det)
+        msgs.info("Loading and bias subtracting your image(s) one at a time")
+        for kk in range(self.nfiles):
+            temp = self._bias_subtract_image(kk, self._load_image(kk), msbias, trim,
+                                             datasec_img)
+            if kk == 0:
+                self._init_proc_images(temp.shape)
+            self.proc_images[:,:,kk] = temp
+            del temp
+        # Steps
+        self.steps += ['load_images', 'bias_subtract']
+
+    def _init_proc_images(self, shape):
+        """
+        Instantiate :attr:`proc_images` for the loaded images.
+
+        If a combination memory budget is set (``combine_maxmem`` in
+        :attr:`proc_par`) and there is more than one image, the array is
+        memory-mapped to an anonymous scratch file in the default
+        temporary directory, which is removed when the array is
+        deleted.  Combining the images then reads the file in blocks of
+        rows; see :func:`pypeit.core.combine.comb_frames`.
+        """
+        shape = (shape[0], shape[1], self.nloaded)
+        if self.proc_par['combine_maxmem'] is None or self.nloaded == 1:
+            self.proc_images = np.zeros(shape, dtype=self.float_dtype)
+            return
+        msgs.info('Writing the processed images to a memory-mapped scratch file')
+        self.proc_images = np.memmap(tempfile.TemporaryFile(), dtype=self.float_dtype,
+                                     mode='w+', shape=shape)
+
     def apply_gain(self, trim=True):
         """
         Apply gain (instead of ampsec scale)
@@ -372,7 +454,7 @@ class ProcessImages(object):
             gain = [gain]
         self.stack *= procimg.gain_frame(datasec_img,
                                            self.spectrograph.detector[self.det-1]['numamplifiers'],
-                                           gain)
+                                           gain).astype(self.stack.dtype)
         # Step
         self.steps.append(inspect.stack()[0][3])
 
@@ -411,34 +493,38 @@ class ProcessImages(object):
         datasec_img = self.spectrograph.get_datasec_img(self.files[0], det=self.det)
         msgs.info("Bias subtracting your image(s)")
         # Reset proc_images -- Is there any reason we wouldn't??
-        numamplifiers = self.spectrograph.detector[self.det-1]['numamplifiers']
         for kk,image in enumerate(self.raw_images):
-            # Bias subtract (move here from procimg)
-            if isinstance(msbias, np.ndarray):
-                msgs.info("Subtracting bias image from raw frame")
-                # Trim?
-                if trim:
-                    image = procimg.trim_frame(image, datasec_img < 1)
-                temp = image-msbias
-            elif isinstance(msbias, str) and msbias == 'overscan':
-                msgs.info("Using overscan to subtract")
-                temp = procimg.subtract_overscan(image, numamplifiers, self.datasec[kk],
-                                                 self.oscansec[kk],
-                                                 method=self.proc_par['overscan'],
-                                                 params=self.proc_par['overscan_par'])
-                # Trim?
-                if trim:
-                    temp = procimg.trim_frame(temp, datasec_img < 1)
-            else:
-                msgs.error('Could not subtract bias level with the input bias approach.')
+            temp = self._bias_subtract_image(kk, image, msbias, trim, datasec_img)
             # Save
             if kk==0:
                 # Instantiate proc_images
-                self.proc_images = np.zeros((temp.shape[0], temp.shape[1], self.nloaded))
-            self.proc_images[:,:,kk] = temp.copy()
+                self._init_proc_images(temp.shape)
+            self.proc_images[:,:,kk] = temp
         # Step
         self.steps.append(inspect.stack()[0][3])
 
+    def _bias_subtract_image(self, kk, image, msbias, trim, datasec_img):
+        """
+        Bias subtract and trim one raw image; see :func:`bias_subtract`.
+        """
+        # Bias subtract (move here from procimg)
+        if isinstance(msbias, np.ndarray):
+            msgs.info("Subtracting bias image from raw frame")
+            # Trim?
+            if trim:
+                image = procimg.trim_frame(image, datasec_img < 1)
+            return image-msbias
+        if isinstance(msbias, str) and msbias == 'overscan':
+            msgs.info("Using overscan to subtract")
+            numamplifiers = self.spectrograph.detector[self.det-1]['numamplifiers']
+            temp = procimg.subtract_overscan(image, numamplifiers, self.datasec[kk],
+                                             self.oscansec[kk],
+                                             method=self.proc_par['overscan'],
+                                             params=self.proc_par['overscan_par'])
+            # Trim?
+            return procimg.trim_frame(temp, datasec_img < 1) if trim else temp
+        msgs.error('Could not subtract bias level with the input bias approach.')
+
     def combine(self, par=None):
         """
         Combine the processed images
@@ -463,7 +549,9 @@ class ProcessImages(object):
                                              cosmics=self.proc_par['sigrej'],
                                              n_lohi=self.proc_par['n_lohi'],
                                              sig_lohi=self.proc_par['sig_lohi'],
-                                             replace=self.proc_par['replace'])
+                                             replace=self.proc_par['replace'],
+                                             maxmem=None if self.proc_par['combine_maxmem'] is None
+                                                    else self.proc_par['combine_maxmem']*2**30)
         # Step
         self.steps.append(inspect.stack()[0][3])
         return self.stack
@@ -526,12 +614,16 @@ class ProcessImages(object):
             msgs.warn("Images already combined.  Use overwrite=True to do it again.")
             return
 
-        # Load images
-        if 'load_images' not in self.steps:
+        # Load images; with a memory budget for the combination, load
+        # and bias subtract them one at a time
+        if 'load_images' not in self.steps and bias_subtract is not None and self.nfiles > 1 \
+                and self.proc_par['combine_maxmem'] is not None:
+            self.stream_images(bias_subtract, trim=trim)
+        elif 'load_images' not in self.steps:
             self.load_images()
 
         # Bias subtract
-        if bias_subtract is not None:
+        if bias_subtract is not None and 'bias_subtract' not in self.steps:
             self.bias_subtract(bias_subtract, trim=trim)
         elif 'bias_subtract' not in self.steps:
             msgs.warn("Your images have not been bias subtracted!")
@@ -545,7 +637,7 @@ class ProcessImages(object):
                 datasec_img = self.spectrograph.get_datasec_img(self.files[0], det=self.det)
                 temp = procimg.trim_frame(temp, datasec_img < 1)
             # Init proc_images array
-            self.proc_images = np.zeros((temp.shape[0], temp.shape[1], self.nloaded))
+            self._init_proc_images(temp.shape)
             # Load it up
             for kk,image in enumerate(self.raw_images):
                 self.proc_images[:,:,kk] = procimg.trim_frame(image, datasec_img < 1) \
@@ -584,7 +676,8 @@ class ProcessImages(object):
         if trim:
             datasec_img = procimg.trim_frame(datasec_img, datasec_img < 1)
         detector = self.spectrograph.detector[self.det-1]
-        self.rn2img = procimg.rn_frame(datasec_img, detector['gain'], detector['ronoise'], numamplifiers=detector['numamplifiers'])
+        self.rn2img = procimg.rn_frame(datasec_img, detector['gain'], detector['ronoise'],
+                                       numamplifiers=detector['numamplifiers']).astype(self.float_dtype)
 
         self.steps.append(inspect.stack()[0][3])
         # Return
@@ -612,7 +705,8 @@ class ProcessImages(object):
                                                     detector['gain'], detector['ronoise'],
                                                     numamplifiers=detector['numamplifiers'],
                                                     darkcurr=detector['darkcurr'],
-                                                    exptime=self.exptime)
+                                                    exptime=self.exptime).astype(self.float_dtype,
+                                                                                 copy=False)
 
         # Step
         self.steps.append(inspect.stack()[0][3])
@@ -623,7 +717,7 @@ class ProcessImages(object):
     # This is a static method because I need to be able to run it from outside the class and would prefer
     # to not have to create an instance of the class everytime I want to do that.
     @staticmethod
-    def build_crmask(stack, proc_par, det, spectrograph, ivar=None, binning=None):
+    def build_crmask(stack, proc_par, det, spectrograph, ivar=None, binning=None, nthreads=1):
         """
         Generate the CR mask frame
 
@@ -632,6 +726,8 @@ class ProcessImages(object):
         Parameters
         ----------
         varframe : ndarray, optional
+        nthreads : int, optional
+          Number of threads used by procimg.lacosmic
 
         Returns
         -------
@@ -650,7 +746,7 @@ class ProcessImages(object):
                                   remove_compact_obj=proc_par['rmcompact'],
                                   sigclip=proc_par['sigclip'],
                                   sigfrac=proc_par['sigfrac'],
-                                  objlim=proc_par['objlim'])
+                                  objlim=proc_par['objlim'], nthreads=nthreads)
 
         # Return
         return crmask
@@ -736,7 +832,7 @@ class ProcessImages(object):
 
     @classmethod
     def read_stack(cls, files, bias, pixel_flat, bpm, det, proc_par, spectrograph, illum_flat=None, reject_cr=False,
-                   binning=None):
+                   binning=None, nthreads=1):
         """  Utility function for reading in image stacks using ProcessImages
         Parameters
             file_list:
@@ -744,6 +840,7 @@ class ProcessImages(object):
             pixel_flat:
             bpm:
             illum_flat:
+            nthreads: Number of threads used to reject cosmic rays
         Returns:
         """
         nfiles = len(files)
@@ -756,9 +853,9 @@ class ProcessImages(object):
             if ifile == 0:
                 # numpy is row major so stacking will be fastest with nfiles as the first dimensions
                 shape = (nfiles, sciimg.shape[0],sciimg.shape[1])
-                sciimg_stack  = np.zeros(shape)
-                sciivar_stack = np.zeros(shape)
-                rn2img_stack  = np.zeros(shape)
+                sciimg_stack  = np.zeros(shape, dtype=this_proc.float_dtype)
+                sciivar_stack = np.zeros(shape, dtype=this_proc.float_dtype)
+                rn2img_stack  = np.zeros(shape, dtype=this_proc.float_dtype)
                 crmask_stack  = np.zeros(shape,dtype=bool)
                 mask_stack  = np.zeros(shape,this_proc.bitmask.minimum_dtype(asuint=True))
 
@@ -768,7 +865,8 @@ class ProcessImages(object):
             sciivar_stack[ifile,:,:] =  utils.calc_ivar(rawvarframe)
             if reject_cr:
                 crmask_stack[ifile,:,:] = this_proc.build_crmask(sciimg, proc_par, det, spectrograph,
-                                                                 ivar=sciivar_stack[ifile,:,:], binning=binning)
+                                                                 ivar=sciivar_stack[ifile,:,:], binning=binning,
+                                                                 nthreads=nthreads)
             sciimg_stack[ifile,:,:] = sciimg
             # Build read noise squared image
             rn2img_stack[ifile,:,:] = this_proc.build_rn2img()
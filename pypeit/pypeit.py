@@ -9,6 +9,8 @@ from __future__ import unicode_literals
 import time
 #from abc import ABCMeta
 import os
+import glob
+import copy
 import datetime
 import numpy as np
 from collections import OrderedDict
@@ -20,6 +22,7 @@ from pypeit import scienceimage
 from pypeit import specobjs
 from pypeit import ginga
 from pypeit import reduce
+from pypeit import utils
 from pypeit.core import paths
 from pypeit.core import qa
 from pypeit.core import wave
@@ -37,6 +40,96 @@ from pypeit.metadata import PypeItMetaData
 
 from pypeit import debugger
 
+
+def _reduce_detector(pypeit, det, std_outfile, logname):
+    """
+    Reduce a single detector in a separate process; see
+    :func:`PypeIt.reduce_exposure`.
+
+    Each process writes its own log file.
+
+    Returns:
+        tuple: The outputs of :func:`PypeIt.reduce_detector`, followed
+        by the in-memory calibrations, the master keys and the basename
+        needed by the parent process.
+    """
+    msgs.reset(log=logname, verbosity=pypeit.verbosity)
+    msgs.pypeit_file = pypeit.pypeit_file
+    det_dict, vel_corr = pypeit.reduce_detector(det, std_outfile=std_outfile)
+    msgs.reset_log_file(None)
+    return det_dict, vel_corr, pypeit.caliBrate.calib_cache, pypeit.caliBrate.master_key_dict, \
+                pypeit.basename
+
+
+def poll_raw_files(raw_dir, sizes, pattern='*.fits*'):
+    """
+    Find the new, complete files in a raw-data directory.
+
+    A file is only returned once its size is the same in two
+    consecutive calls, such that frames still being written are not
+    read.
+
+    Args:
+        raw_dir (:obj:`str`):
+            Directory to search.
+        sizes (:obj:`dict`):
+            Size of each file at the previous call, updated in place.
+            Files already returned (or to be ignored) have a size of
+            None.
+        pattern (:obj:`str`, optional):
+            Pattern of the file names.
+
+    Returns:
+        list: The sorted list of the new files.
+    """
+    ready = []
+    for f in sorted(glob.glob(os.path.join(raw_dir, pattern))):
+        try:
+            size = os.path.getsize(f)
+        except OSError:
+            # Removed or renamed since the search
+            continue
+        if f not in sizes or (sizes[f] is not None and sizes[f] != size):
+            sizes[f] = size
+        elif sizes[f] == size:
+            ready += [f]
+            sizes[f] = None
+    return ready
+
+
+def append_raw_files(fitstbl, files, logname=None):
+    """
+    Append new raw files to a metadata table, skipping those that
+    cannot be read or typed.
+
+    Each file is appended separately, such that a foreign or corrupt
+    file only prevents its own use.  Because :func:`pypeit.msgs.error`
+    closes the log file, the log is reopened (in append mode) after
+    each failure.
+
+    Args:
+        fitstbl (:class:`pypeit.metadata.PypeItMetaData`):
+            Table to which the frames are appended; modified in place.
+        files (:obj:`list`):
+            Files to append; see
+            :func:`pypeit.metadata.PypeItMetaData.append_frames`.
+        logname (:obj:`str`, optional):
+            Name of the log file to reopen after a failure.
+
+    Returns:
+        `numpy.ndarray`_: The indices of the appended rows in
+        ``fitstbl``.
+    """
+    frames = []
+    for f in files:
+        try:
+            frames += fitstbl.append_frames([f]).tolist()
+        except Exception as e:
+            msgs.reset_log_file(logname, mode='a')
+            msgs.warn('Skipping {0}: {1}'.format(f, e))
+    return np.array(frames, dtype=int)
+
+
 class PypeIt(object):
     """
     This class runs the primary calibration and extraction in PypeIt
@@ -276,6 +369,74 @@ class PypeIt(object):
         self.print_end_time()
 
 
+    def watch(self, raw_dir, pattern='*.fits*', poll=5., max_idle=None):
+        """
+        Quick-look reduction of the frames written to a directory
+        during the night.
+
+        The directory is polled for new files, which are typed and
+        assigned to the configurations and calibration groups of the
+        PypeIt file (see :func:`pypeit.metadata.PypeItMetaData.append_frames`).
+        Each new science or standard frame is reduced and saved as soon
+        as it is complete, reusing the calibrations held in memory by
+        :attr:`caliBrate`; these are only built for the first frame of
+        each calibration group and detector.  For the lowest latency,
+        set ``[scienceimage] quicklook = True``.
+
+        The files already in the PypeIt file are ignored; use
+        :func:`reduce_all` to reduce them.  A file that cannot be
+        typed (see :func:`append_raw_files`) or a frame that fails to be
+        reduced is reported and skipped.
+
+        Args:
+            raw_dir (:obj:`str`):
+                Directory with the raw frames.
+            pattern (:obj:`str`, optional):
+                Pattern of the raw file names.
+            poll (:obj:`float`, optional):
+                Time in seconds between two searches for new files.
+            max_idle (:obj:`float`, optional):
+                Stop after this many seconds without new files.  If
+                None, watch until interrupted.
+        """
+        self.tstart = time.time()
+        # Ignore the files already in the table
+        sizes = dict([(os.path.abspath(f), None)
+                      for f in self.fitstbl.frame_paths(np.arange(len(self.fitstbl)))])
+        msgs.info('Watching {0} for new frames'.format(raw_dir))
+        idle = 0.
+        try:
+            while max_idle is None or idle < max_idle:
+                files = poll_raw_files(os.path.abspath(raw_dir), sizes, pattern=pattern)
+                frames = append_raw_files(self.fitstbl, files, logname=self.logname)
+                if len(frames) == 0:
+                    time.sleep(poll)
+                    idle += poll
+                    continue
+                idle = 0.
+                frame_indx = np.arange(len(self.fitstbl))
+                is_standard = self.fitstbl.find_frames('standard')
+                for frame in frames:
+                    t0 = time.time()
+                    try:
+                        std_outfile = None if is_standard[frame] \
+                                        else self.get_std_outfile(frame_indx[is_standard])
+                        sci_dict = self.reduce_exposure([frame], std_outfile=std_outfile)
+                        self.save_exposure(frame, sci_dict, self.basename)
+                    except Exception as e:
+                        # Keep watching for the next frames
+                        msgs.reset_log_file(self.logname, mode='a')
+                        msgs.warn('Failed to reduce {0}: {1}'.format(
+                                  self.fitstbl['filename'][frame], e))
+                        continue
+                    msgs.info('Reduced {0} in {1:.1f}s'.format(self.fitstbl['filename'][frame],
+                                                                time.time()-t0))
+        except KeyboardInterrupt:
+            msgs.info('Stopped watching {0}'.format(raw_dir))
+
+        # Finish
+        self.print_end_time()
+
     def select_detectors(self):
         """
         Return the 1-indexed list of detectors to reduce.
@@ -341,29 +502,90 @@ class PypeIt(object):
                                 set(np.arange(self.spectrograph.ndet))-set(detectors)])))
 
         # Loop on Detectors
-        for self.det in detectors:
-            msgs.info("Working on detector {0}".format(self.det))
-            sci_dict[self.det] = {}
-            # Calibrate
-            #TODO Is the right behavior to just use the first frame?
-            self.caliBrate.set_config(self.frames[0], self.det, self.par['calibrations'])
-            self.caliBrate.run_the_steps()
-            # Extract
-            # TODO: pass back the background frame, pass in background
-            # files as an argument. extract one takes a file list as an
-            # argument and instantiates science within
-            sci_dict[self.det]['sciimg'], sci_dict[self.det]['sciivar'], sci_dict[self.det]['skymodel'], \
-                sci_dict[self.det]['objmodel'], sci_dict[self.det]['ivarmodel'], sci_dict[self.det]['outmask'], \
-                sci_dict[self.det]['specobjs'], vel_corr \
-                    = self.extract_one(self.frames, self.det, bg_frames = self.bg_frames, std_outfile = std_outfile)
-            if vel_corr is not None:
-                sci_dict['meta']['vel_corr'] = vel_corr
-
-            # JFH TODO write out the background frame?
+        det_nproc = 1 if self.show else self.par['rdx']['det_nproc']
+        if det_nproc > 1 and len(detectors) > 1:
+            # The detectors are independent until they are saved, so
+            # they can be reduced by a pool of processes
+            msgs.info('Reducing {0} detectors using {1} processes'.format(len(detectors),
+                                                                          det_nproc))
+            arglist = [(self._detector_copy(det), det, std_outfile, self._detector_logname(det))
+                       for det in detectors]
+            msgs.flush()
+            for det, (det_dict, vel_corr, calib_cache, master_key_dict, basename) \
+                    in zip(detectors, utils.pool_map(_reduce_detector, arglist, nproc=det_nproc)):
+                sci_dict[det] = det_dict
+                if vel_corr is not None:
+                    sci_dict['meta']['vel_corr'] = vel_corr
+                # Keep the calibrations in memory and the state of the
+                # last detector, as if they were reduced serially
+                self.caliBrate.calib_cache.update(calib_cache)
+                self.caliBrate.master_key_dict = master_key_dict
+                self.basename = basename
+                self.det = det
+        else:
+            for self.det in detectors:
+                sci_dict[self.det], vel_corr = self.reduce_detector(self.det, std_outfile=std_outfile)
+                if vel_corr is not None:
+                    sci_dict['meta']['vel_corr'] = vel_corr
 
         # Return
         return sci_dict
 
+    def reduce_detector(self, det, std_outfile=None):
+        """
+        Calibrate and extract a single detector of the exposure set by
+        :func:`reduce_exposure`.
+
+        Args:
+            det (:obj:`int`):
+                1-indexed detector number
+            std_outfile (:obj:`str`, optional):
+                the name of a file with a previously PypeIt-reduced standard spectrum.
+
+        Returns:
+            dict, float: The dictionary with the primary outputs of
+            extraction for this detector and the velocity correction
+            (None if not applied)
+        """
+        msgs.info("Working on detector {0}".format(det))
+        det_dict = {}
+        # Calibrate
+        #TODO Is the right behavior to just use the first frame?
+        self.caliBrate.set_config(self.frames[0], det, self.par['calibrations'])
+        self.caliBrate.run_the_steps()
+        # Extract
+        # TODO: pass back the background frame, pass in background
+        # files as an argument. extract one takes a file list as an
+        # argument and instantiates science within
+        det_dict['sciimg'], det_dict['sciivar'], det_dict['skymodel'], det_dict['objmodel'], \
+            det_dict['ivarmodel'], det_dict['outmask'], det_dict['specobjs'], vel_corr \
+                = self.extract_one(self.frames, det, bg_frames = self.bg_frames, std_outfile = std_outfile)
+
+        # JFH TODO write out the background frame?
+
+        return det_dict, vel_corr
+
+    def _detector_copy(self, det):
+        """
+        Shallow copy of this object to be sent to the process reducing
+        a single detector.  Only the calibrations of this detector
+        already held in memory are carried along.
+        """
+        pypeit_det = copy.copy(self)
+        pypeit_det.caliBrate = copy.copy(self.caliBrate)
+        pypeit_det.caliBrate.calib_cache = self.caliBrate.calib_cache.subset(det)
+        return pypeit_det
+
+    def _detector_logname(self, det):
+        """
+        Name of the log file written by the process reducing a single
+        detector; None if there is no log file.
+        """
+        if self.logname is None:
+            return None
+        root, ext = os.path.splitext(self.logname)
+        return '{0}_det{1}{2}'.format(root, str(det).zfill(2), ext)
+
     def flexure_correct(self, sobjs, maskslits):
         """
         Correct for flexure
@@ -522,7 +744,8 @@ class PypeIt(object):
                                               ir_redux = self.ir_redux,
                                               par=self.par['scienceframe'],
                                               det=det,
-                                              binning=self.binning)
+                                              binning=self.binning,
+                                              nproc=self.par['rdx']['nproc'])
         # For QA on crash.
         msgs.sciexp = self.sciI
 
@@ -555,7 +778,11 @@ class PypeIt(object):
             self.redux.global_skysub(self.sciimg, self.sciivar, self.caliBrate.tilts_dict['tilts'], skymask=skymask_init,
                                     std=self.std_redux, maskslits=self.maskslits, show=self.show)
 
-        if not self.std_redux:
+        # The quick-look reduction keeps the first pass of object finding
+        quicklook = self.par['scienceimage']['quicklook']
+        if quicklook:
+            self.skymask = skymask_init
+        elif not self.std_redux:
             # Object finding, second pass on frame *with* sky subtraction. Show here if requested
             self.sobjs_obj, self.nobj, self.skymask = \
                 self.redux.find_objects(self.sciimg - self.initial_sky, self.sciivar, std=self.std_redux, ir_redux=self.ir_redux,
@@ -565,15 +792,22 @@ class PypeIt(object):
         # If there are objects, do 2nd round of global_skysub, local_skysub_extract, flexure, geo_motion
         if self.nobj > 0:
             # Global sky subtraction second pass. Uses skymask from object finding
-            self.global_sky = self.initial_sky if self.std_redux else \
+            self.global_sky = self.initial_sky if self.std_redux or quicklook else \
                 self.redux.global_skysub(self.sciimg, self.sciivar, self.caliBrate.tilts_dict['tilts'],
                 skymask=self.skymask, maskslits=self.maskslits, show=self.show)
 
-            self.skymodel, self.objmodel, self.ivarmodel, self.outmask, self.sobjs = \
-            self.redux.local_skysub_extract(self.sciimg, self.sciivar, self.caliBrate.tilts_dict['tilts'], self.caliBrate.mswave,
-                                            self.global_sky, self.rn2img, self.sobjs_obj,
-                                            model_noise=(not self.ir_redux),std = self.std_redux,
-                                            maskslits=self.maskslits, show_profile=self.show,show=self.show)
+            if quicklook:
+                # Extract on the global sky, without local sky subtraction
+                self.skymodel, self.objmodel, self.ivarmodel, self.outmask, self.sobjs = \
+                self.redux.quick_extract(self.sciimg, self.sciivar, self.caliBrate.mswave,
+                                         self.global_sky, self.rn2img, self.sobjs_obj,
+                                         maskslits=self.maskslits, show=self.show)
+            else:
+                self.skymodel, self.objmodel, self.ivarmodel, self.outmask, self.sobjs = \
+                self.redux.local_skysub_extract(self.sciimg, self.sciivar, self.caliBrate.tilts_dict['tilts'], self.caliBrate.mswave,
+                                                self.global_sky, self.rn2img, self.sobjs_obj,
+                                                model_noise=(not self.ir_redux),std = self.std_redux,
+                                                maskslits=self.maskslits, show_profile=self.show,show=self.show)
 
             # Purge out the negative objects if this was a near-IR reduction.
             # TODO should we move this purge call to local_skysub_extract??
@@ -371,7 +371,7 @@ class PypeItSetup(object):
                            format=format, overwrite=True)
 
     def run(self, setup_only=False, calibration_check=False,
-            use_header_id=False, sort_dir=None, write_bkg_pairs=False):
+            use_header_id=False, sort_dir=None, write_bkg_pairs=False, known_configs=None):
         """
         Once instantiated, this is the main method used to construct the
         object.
@@ -412,6 +412,13 @@ class PypeItSetup(object):
                 the metadata table (:attr:`fitstbl`).
             sort_dir (:obj:`str`, optional):
                 The directory to put the '.sorted' file.
+            write_bkg_pairs (:obj:`bool`, optional):
+                Include the background-pair columns in the '.sorted'
+                file.
+            known_configs (:obj:`dict`, optional):
+                Configurations identified by an earlier setup, whose
+                identifiers are kept; see
+                :func:`pypeit.metadata.PypeItMetaData.unique_configurations`.
 
         Returns:
             :class:`pypeit.par.pypeitpar.PypeItPar`,
@@ -436,7 +443,8 @@ class PypeItSetup(object):
         # Determine the configurations and assign each frame to the
         # specified configuration
         ignore_frames=['bias', 'dark']
-        cfgs = self.fitstbl.unique_configurations(ignore_frames=ignore_frames)
+        cfgs = self.fitstbl.unique_configurations(ignore_frames=ignore_frames,
+                                                  known=known_configs)
         self.fitstbl.set_configurations(cfgs, ignore_frames=ignore_frames)
 
         # Assign frames to calibration groups
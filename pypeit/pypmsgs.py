@@ -125,15 +125,20 @@ class Messages:
             clean_msg = self._cleancolors(_msg)
             self._log.write(clean_msg+'\n' if last else clean_msg)
 
-    def _initialize_log_file(self, log=None):
+    def _initialize_log_file(self, log=None, mode='w'):
         """
         Expects self._log is already None.
+
+        With ``mode='a'``, the messages are appended to an existing log
+        file without a new header.
         """
         if log is None:
             return
 
         # Initialize the log
-        self._log = open(log, 'w')
+        self._log = open(log, mode)
+        if mode == 'a':
+            return
 
         self._log.write("------------------------------------------------------\n\n")
 #        self._log.write("PypeIt was last updated {0:s}\n".format(self._last_updated))
@@ -158,11 +163,19 @@ class Messages:
         if colors:
             self.enablecolors()
 
-    def reset_log_file(self, log):
+    def reset_log_file(self, log, mode='w'):
         if self._log:
             self._log.close()
             self._log = None
-        self._initialize_log_file(log=log)
+        self._initialize_log_file(log=log, mode=mode)
+
+    def flush(self):
+        """
+        Flush the log file, e.g. before forking processes that would
+        otherwise also write its buffered messages.
+        """
+        if self._log:
+            self._log.flush()
 
     # Headers and usage
     # TODO: Move this to the ARMED class...
@@ -3,6 +3,7 @@ import inspect
 import numpy as np
 import os
 import copy
+import functools
 
 from astropy import stats
 from abc import ABCMeta
@@ -100,6 +101,8 @@ class Reduce(object):
         self.tslits_dict = tslits_dict
         self.mask = mask
         self.slitmask = pixels.tslits2mask(self.tslits_dict)
+        # Pixels and bounding boxes of each slit
+        self.slit_index = pixels.SlitIndex.from_tslits_dict(self.tslits_dict)
         # Now add the slitmask to the mask (i.e. post CR rejection in proc)
         self.mask = processimages.ProcessImages.update_mask_slitmask(self.mask, self.slitmask)
         self.maskslits=None
@@ -286,30 +289,39 @@ class Reduce(object):
 
         # Mask objects using the skymask? If skymask has been set by objfinding, and masking is requested, then do so
         skymask_now = skymask if (skymask is not None) else np.ones_like(self.sciimg, dtype=bool)
-        # Loop on slits
+        # Each slit is fit using only the columns that contain it.  The
+        # fits are independent, so they can be farmed out to a pool of
+        # processes; the results are the same for any number of processes.
+        skysub_func = functools.partial(skysub.global_skysub, sigrej=sigrej,
+                                        bsp=self.redux_par['bspline_spacing'],
+                                        no_poly=self.redux_par['no_poly'],
+                                        pos_mask=(not self.ir_redux), show_fit=show_fit)
+        slit_args = []
+        spat_ranges = []
         for slit in gdslits:
-            msgs.info("Global sky subtraction for slit: {:d}".format(slit))
-            thismask = (self.slitmask == slit)
-            inmask = (self.mask == 0) & thismask & skymask_now
-            # Find sky
-            self.global_sky[thismask] = skysub.global_skysub(self.sciimg, self.sciivar,
-                                                             self.tilts, thismask,
-                                                             self.tslits_dict['slit_left'][:,slit],
-                                                             self.tslits_dict['slit_righ'][:,slit],
-                                                             inmask=inmask,
-                                                             sigrej=sigrej,
-                                                             bsp=self.redux_par['bspline_spacing'],
-                                                             no_poly=self.redux_par['no_poly'],
-                                                             pos_mask = (not self.ir_redux),
-                                                             show_fit=show_fit)
+            slit_left = self.tslits_dict['slit_left'][:,slit]
+            slit_righ = self.tslits_dict['slit_righ'][:,slit]
+            x0, x1 = self.slit_index.spat_range(slit, slit_left, slit_righ)
+            thismask = self.slit_index.mask(slit, bbox=(slice(None), slice(x0,x1)))
+            inmask = (self.mask[:,x0:x1] == 0) & thismask & skymask_now[:,x0:x1]
+            slit_args += [(self.sciimg[:,x0:x1], self.sciivar[:,x0:x1], self.tilts[:,x0:x1], thismask,
+                           slit_left - x0, slit_righ - x0, inmask)]
+            spat_ranges += [(x0, x1)]
+        nproc = 1 if show_fit else self.par['rdx']['nproc']
+        msgs.info("Global sky subtraction for {:d} slits using {:d} process(es)".format(len(gdslits), nproc))
+        slit_skies = utils.pool_map(skysub_func, slit_args, nproc=nproc)
+        # Assemble the sky image
+        for slit, (x0, x1), args, sky in zip(gdslits, spat_ranges, slit_args, slit_skies):
+            self.global_sky[:,x0:x1][args[3]] = sky
             # Mask if something went wrong
-            if np.sum(self.global_sky[thismask]) == 0.:
+            if np.sum(sky) == 0.:
                 self.maskslits[slit] = True
 
         if update_crmask:
             self.crmask = processimages.ProcessImages.build_crmask(self.sciimg - self.global_sky, self.proc_par,
                                                                    self.det, self.spectrograph, ivar = self.sciivar,
-                                                                   binning=self.binning)
+                                                                   binning=self.binning,
+                                                                   nthreads=self.par['rdx']['nproc'])
             # Rebuild the mask with this new crmask
             self.mask = processimages.ProcessImages.update_mask_cr(self.mask, self.crmask)
 
@@ -337,6 +349,98 @@ class Reduce(object):
 
         return None, None, None, None, None
 
+    def boxcar_radius_pix(self):
+        """
+        Boxcar radius in pixels of each slit
+
+        Returns:
+            ndarray: Boxcar radius for each slit
+        """
+        platescale = self.spectrograph.detector[self.det-1]['platescale']
+        return np.full(self.tslits_dict['slit_left'].shape[1],
+                       self.redux_par['boxcar_radius']/platescale)
+
+    def quick_extract(self, sciimg, sciivar, waveimg, global_sky, rn2img, sobjs, maskslits=None,
+                      show=False):
+        """
+        Quick-look extraction of the objects on the global sky model
+
+        Latency-oriented alternative to :func:`local_skysub_extract`:
+        there is no local sky subtraction nor profile fitting; each
+        object is optimally extracted with a Gaussian profile of the
+        FWHM measured by the object finding, and boxcar extracted.
+
+        Args:
+            sciimg (ndarray): Science image
+            sciivar (ndarray): Inverse variance of the science image
+            waveimg (ndarray): Wavelength map
+            global_sky (ndarray): Global sky model
+            rn2img (ndarray): Read noise squared image
+            sobjs (SpecObjs): Objects found
+            maskslits (ndarray, optional): Slits to skip
+
+        Returns:
+            Same as :func:`local_skysub_extract`: the sky, object and
+            inverse variance models, the output mask and the extracted
+            objects
+        """
+        self.sciimg = sciimg
+        self.sciivar = sciivar
+        self.waveimg = waveimg
+        self.global_sky = global_sky
+        self.rn2img = rn2img
+
+        self.maskslits = self.maskslits if maskslits is None else maskslits
+        gdslits = np.where(np.invert(self.maskslits))[0]
+        box_rad = self.boxcar_radius_pix()
+
+        self.outmask = np.copy(self.mask)
+        self.objmodel = np.zeros_like(self.sciimg)
+        self.skymodel = np.copy(self.global_sky)
+        self.ivarmodel = np.copy(self.sciivar)
+
+        self.sobjs = sobjs.copy()
+        nspat = self.sciimg.shape[1]
+        for slit in gdslits:
+            thisobj = np.where(self.sobjs.slitid == slit)[0]
+            if len(thisobj) == 0 or self.slit_index.npix[slit] == 0:
+                continue
+            msgs.info("Quick-look extraction for slit: {:d}".format(slit))
+            # Work on the columns of the slit, widened to hold the boxcar
+            # apertures; the extraction needs all the spectral rows
+            traces = np.array([self.sobjs[iobj].trace_spat for iobj in thisobj])
+            x0 = int(np.clip(min(self.slit_index.spat_min[slit],
+                                 np.floor(traces.min() - box_rad[slit]) - 1), 0, nspat))
+            x1 = int(np.clip(max(self.slit_index.spat_max[slit] + 1,
+                                 np.ceil(traces.max() + box_rad[slit]) + 2), 0, nspat))
+            box = (slice(None), slice(x0, x1))
+            thismask = self.slit_index.mask(slit, bbox=box)
+            inmask = (self.mask[box] == 0) & thismask
+            spat_vec = np.arange(x0, x1)
+            for iobj in thisobj:
+                sobj = self.sobjs[iobj]
+                sigma_x = (spat_vec[None,:] - sobj.trace_spat[:,None])/(sobj.fwhm/2.3548)
+                profile = thismask*np.exp(-0.5*sigma_x**2)/np.sqrt(2.0*np.pi)*(sigma_x**2 < 25.)
+                # Extract on the sub-images, with the trace shifted accordingly
+                trace_spat = sobj.trace_spat
+                sobj.trace_spat = trace_spat - x0
+                try:
+                    extract.extract_optimal(self.sciimg[box], self.sciivar[box], inmask,
+                                            self.waveimg[box], self.global_sky[box],
+                                            self.rn2img[box], profile, box_rad[slit], sobj)
+                finally:
+                    sobj.trace_spat = trace_spat
+                norm = np.sum(profile, axis=1)
+                self.objmodel[box] += (sobj.optimal['COUNTS']/(norm + (norm == 0.)))[:,None]*profile
+
+        # Step
+        self.steps.append(inspect.stack()[0][3])
+
+        if show:
+            self.show('local', sobjs = self.sobjs, slits= True)
+
+        return self.skymodel, self.objmodel, self.ivarmodel, self.outmask, self.sobjs
+
 
     def flexure_correct(self, sobjs, basename):
         """ Correct for flexure
@@ -576,7 +680,7 @@ class MultiSlit(Reduce):
         for slit in gdslits:
             qa_title ="Finding objects on slit # {:d}".format(slit)
             msgs.info(qa_title)
-            thismask = (self.slitmask == slit)
+            thismask = self.slit_index.full_mask(slit)
             inmask = (self.mask == 0) & thismask
             # Find objects
             specobj_dict = {'setup': self.setup, 'slitid': slit, 'orderindx': 999,
@@ -664,19 +768,21 @@ class MultiSlit(Reduce):
             msgs.info("Local sky subtraction and extraction for slit: {:d}".format(slit))
             thisobj = (self.sobjs.slitid == slit) # indices of objects for this slit
             if np.any(thisobj):
-                thismask = (self.slitmask == slit) # pixels for this slit
-                # True  = Good, False = Bad for inmask
-                inmask = (self.mask == 0) & thismask
-                # Local sky subtraction and extraction
-                self.skymodel[thismask], self.objmodel[thismask], self.ivarmodel[thismask], \
-                    self.extractmask[thismask] = skysub.local_skysub_extract(
-                    self.sciimg, self.sciivar, self.tilts, self.waveimg, self.global_sky, self.rn2img,
-                    thismask, self.tslits_dict['slit_left'][:,slit], self.tslits_dict['slit_righ'][:, slit],
-                    self.sobjs[thisobj], spat_pix=spat_pix, model_full_slit=self.redux_par['model_full_slit'],
+                # Local sky subtraction and extraction on the columns of the slit
+                box, thismask, skymodel, objmodel, ivarmodel, extractmask = \
+                    skysub.local_skysub_extract_slit(
+                    self.slit_index, slit, self.sciimg, self.sciivar, self.tilts, self.waveimg,
+                    self.global_sky, self.rn2img, self.mask, self.tslits_dict['slit_left'][:,slit],
+                    self.tslits_dict['slit_righ'][:, slit], self.sobjs[thisobj], spat_pix=spat_pix,
+                    model_full_slit=self.redux_par['model_full_slit'],
                     box_rad=self.redux_par['boxcar_radius']/self.spectrograph.detector[self.det-1]['platescale'],
                     sigrej=self.redux_par['sky_sigrej'],
                     model_noise=model_noise, std=std, bsp=self.redux_par['bspline_spacing'],
-                    sn_gauss=self.redux_par['sn_gauss'], inmask=inmask, show_profile=show_profile)
+                    sn_gauss=self.redux_par['sn_gauss'], show_profile=show_profile)
+                self.skymodel[box][thismask] = skymodel
+                self.objmodel[box][thismask] = objmodel
+                self.ivarmodel[box][thismask] = ivarmodel
+                self.extractmask[box][thismask] = extractmask
 
         # Set the bit for pixels which were masked by the extraction.
         # For extractmask, True = Good, False = Bad
@@ -787,6 +893,16 @@ class Echelle(Reduce):
 
         return self.skymodel, self.objmodel, self.ivarmodel, self.outmask, self.sobjs
 
+    def boxcar_radius_pix(self):
+        """
+        Boxcar radius in pixels of each order
+
+        Returns:
+            ndarray: Boxcar radius for each order
+        """
+        return self.redux_par['boxcar_radius'] \
+                    / self.spectrograph.order_platescale(binning=self.binning)
+
 
 
 def instantiate_me(spectrograph, tslits_dict, mask, par, **kwargs):
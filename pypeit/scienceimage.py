@@ -28,6 +28,8 @@ class ScienceImage(processimages.ProcessImages):
       tilts from WaveTilts class
       used for sky subtraction and object finding
     det : int
+    nproc : int
+      Number of threads used to reject cosmic rays
     bpm : ndarray
       Bad pixel mask
     objtype : str
@@ -77,7 +79,8 @@ class ScienceImage(processimages.ProcessImages):
     frametype = 'science'
 
     # TODO: Merge into a single parset, one for procing, and one for scienceimage
-    def __init__(self, spectrograph, file_list, bg_file_list = [], ir_redux=False, det=1, binning=None, par=None):
+    def __init__(self, spectrograph, file_list, bg_file_list = [], ir_redux=False, det=1, binning=None, par=None,
+                 nproc=1):
 
 
         # Setup the parameters sets for this object. NOTE: This uses objtype, not frametype!
@@ -100,6 +103,8 @@ class ScienceImage(processimages.ProcessImages):
             msgs.error('IR reductions require that bg files are specified')
         self.det = det
         self.binning = binning
+        # Number of threads for the cosmic-ray rejection
+        self.nproc = nproc
 
         # Set some detector parameters that we will need
         self.saturation = self.spectrograph.detector[self.det - 1]['saturation']
@@ -191,7 +196,8 @@ class ScienceImage(processimages.ProcessImages):
         weights = np.ones(nsci)/float(nsci)
         sciimg_stack, sciivar_stack, rn2img_stack, crmask_stack, mask_stack = \
         self.read_stack(file_list, self.bias, self.pixel_flat, self.bpm, self.det, self.par['process'], self.spectrograph,
-                            illum_flat=self.illum_flat, reject_cr=reject_cr, binning=self.binning)
+                            illum_flat=self.illum_flat, reject_cr=reject_cr, binning=self.binning,
+                            nthreads=self.nproc)
 
         # ToDO The bitmask is not being properly propagated here!
 
@@ -248,7 +254,8 @@ class ScienceImage(processimages.ProcessImages):
         sciivar = utils.calc_ivar(varcomb)*outmask_comb
         rn2img = rn2img_sci + rn2img_bg
         # Now reject CRs again on the differenced image
-        crmask_diff = self.build_crmask(sciimg, self.par['process'], self.det, self.spectrograph, ivar=sciivar, binning=self.binning)
+        crmask_diff = self.build_crmask(sciimg, self.par['process'], self.det, self.spectrograph, ivar=sciivar,
+                                        binning=self.binning, nthreads=self.nproc)
         # crmask_eff assumes evertything masked in the outmask_comb is a CR in the individual images
         crmask = crmask_diff | np.invert(outmask_comb)
         # Create a mask for this image now
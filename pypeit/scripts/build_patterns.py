@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+#
+# See top-level LICENSE file for Copyright information
+#
+# -*- coding: utf-8 -*-
+
+"""
+This script prebuilds the ThAr pattern stores used by the kdtree
+wavelength calibration
+"""
+
+
+def parser(options=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Prebuild the ThAr pattern stores used by the '
+                                                 'kdtree wavelength calibration',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument('--polygon', type=int, nargs='+', default=[3, 4, 5],
+                        help='Number of sides of the patterns')
+    parser.add_argument('--numsearch', type=int, nargs='+', default=[10],
+                        help='Number of adjacent lines used to build the patterns')
+    parser.add_argument('--path', type=str, default=None,
+                        help='Directory for the stores; default is the line list directory')
+    parser.add_argument('--overwrite', default=False, action='store_true',
+                        help='Rebuild the stores that already exist')
+
+    if options is None:
+        args = parser.parse_args()
+    else:
+        args = parser.parse_args(options)
+    return args
+
+
+def main(args):
+    import os
+    import itertools
+
+    from pypeit import msgs
+    from pypeit.core.wavecal import kdtree_generator
+    from pypeit.core.wavecal import waveio
+
+    for polygon, numsearch in itertools.product(args.polygon, args.numsearch):
+        files = waveio.pattern_store_files(polygon, numsearch, path=args.path)
+        if os.path.isfile(files['cells']) and not args.overwrite:
+            msgs.info('Pattern store exists: {0:s}'.format(files['cells']))
+            continue
+        msgs.info('Building the pattern store for polygon={0:d}, numsearch={1:d}'.format(
+                  polygon, numsearch))
+        kdtree_generator.build_pattern_store(polygon, numsearch=numsearch, path=args.path)
+        msgs.info('Wrote {0:s}'.format(files['cells']))
@@ -46,8 +46,19 @@ def parser(options=None):
 #                       help='Run pypeit only as a check on the calibrations')
     group.add_argument('-d', '--detector', default=None, help='Detector to limit reductions on.  If the output files exist and -o is used, the outputs for the input detector will be replaced.')
 
-#    parser.add_argument('-q', '--quick', default=False, help='Quick reduction',
-#                        action='store_true')
+    parser.add_argument('-q', '--quicklook', default=False, action='store_true',
+                        help='Latency-oriented reduction: single pass of object finding and sky '
+                             'subtraction, no local sky subtraction (sets [scienceimage] '
+                             'quicklook)')
+    parser.add_argument('-w', '--watch', default=None, type=str,
+                        help='After reducing the PypeIt file, watch this raw-data directory and '
+                             'reduce each new science frame as it is written, reusing the '
+                             'calibrations in memory')
+    parser.add_argument('--poll', default=5., type=float,
+                        help='Time in seconds between two searches for new frames with --watch')
+    parser.add_argument('--max_idle', default=None, type=float,
+                        help='Stop watching after this many seconds without new frames.  Default '
+                             'is to watch until interrupted.')
 #    parser.add_argument('-c', '--cpus', default=False, action='store_true',
 #                         help='Number of CPUs for parallel processing')
 #    parser.print_help()
@@ -95,8 +106,13 @@ def main(args):
     if args.detector is not None:
         msgs.info("Restricting reductions to detector={}".format(args.detector))
         pypeIt.par['rdx']['detnum'] = int(args.detector)
+    if args.quicklook:
+        msgs.info("Quick-look reduction")
+        pypeIt.par['scienceimage']['quicklook'] = True
 
     pypeIt.reduce_all()
+    if args.watch is not None:
+        pypeIt.watch(args.watch, poll=args.poll, max_idle=args.max_idle)
     msgs.info('Data reduction complete')
     # QA HTML
     msgs.info('Generating QA HTML')
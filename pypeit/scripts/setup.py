@@ -36,6 +36,11 @@ def parser(options=None):
                         help='Generate the PypeIt files and folders by input configuration. [all or A,B or B,D,E or E]')
     parser.add_argument('-b', '--background', default=False, action='store_true',
                         help='Include the background-pair columns for the user to edit')
+    parser.add_argument('-u', '--update', default=False, action='store_true',
+                        help='Update the previous setup in the output path: only new or '
+                             'modified files are read, the configurations keep their '
+                             'identifiers, and the PypeIt files of all configurations are '
+                             'written unless -c is given.')
     parser.add_argument('-v', '--verbosity', type=int, default=2,
                         help='Level of verbosity from 0 to 2; default is 2.')
 #    parser.add_argument('-q', '--quick', default=False, help='Quick reduction',
@@ -54,6 +59,7 @@ def main(args):
 
     from pypeit import msgs
     from pypeit.pypeitsetup import PypeItSetup
+    from pypeit.metadata import MetadataIndex
 
     # Check that the spectrograph is provided if using a file root
     if args.root is not None:
@@ -79,13 +85,40 @@ def main(args):
         # Should never reach here
         raise IOError('Need to set -r !!')
 
+    # Cache the headers so that re-running the setup only reads new or
+    # modified files
+    if ps.par['rdx']['header_cache'] is None:
+        ps.par['rdx']['header_cache'] = os.path.join(sort_dir, 'header_cache.json.gz')
+
+    # Index the metadata of the files and their configurations, such
+    # that the setup can be updated as new files are added
+    if ps.par['rdx']['metadata_index'] is None:
+        ps.par['rdx']['metadata_index'] = os.path.join(sort_dir, 'metadata_index.db')
+    known_configs = None
+    cfg_split = args.cfg_split
+    if args.update:
+        index = MetadataIndex(ps.par['rdx']['metadata_index'])
+        known_configs = index.get_configurations(args.spectrograph)
+        index.close()
+        if cfg_split is None:
+            cfg_split = 'all'
+
     # Run the setup
-    ps.run(setup_only=True, sort_dir=sort_dir, write_bkg_pairs=args.background)
+    ps.run(setup_only=True, sort_dir=sort_dir, write_bkg_pairs=args.background,
+           known_configs=known_configs)
+
+    # Keep the identifiers of the known configurations that no longer
+    # have any frames
+    configs = {} if known_configs is None else dict(known_configs)
+    configs.update(ps.fitstbl.configs)
+    index = MetadataIndex(ps.par['rdx']['metadata_index'])
+    index.set_configurations(configs, args.spectrograph)
+    index.close()
 
     # Use PypeItMetaData to write the complete PypeIt file
-    if args.cfg_split is not None:
+    if cfg_split is not None:
         pypeit_file = os.path.join(output_path, '{0}.pypeit'.format(args.spectrograph))
-        config_list = [item.strip() for item in args.cfg_split.split(',')]
+        config_list = [item.strip() for item in cfg_split.split(',')]
         ps.fitstbl.write_pypeit(pypeit_file, cfg_lines=ps.user_cfg, write_bkg_pairs=args.background,
                                 configs=config_list)
     return 0
@@ -4,6 +4,7 @@ from __future__ import absolute_import, division, print_function
 
 import os
 import warnings
+from concurrent import futures
 
 from abc import ABCMeta
 from pkg_resources import resource_filename
@@ -15,6 +16,7 @@ from linetools.spectra import xspectrum1d
 
 from pypeit import msgs
 from pypeit.core import parse
+from pypeit.core import load
 from pypeit.par import pypeitpar
 from pypeit.core import pixels
 from pypeit.metadata import PypeItMetaData
@@ -114,7 +116,7 @@ class Spectrograph(object):
 #    def _set_calib_par(self, user_supplied=None):
 #        pass
 
-    def load_raw_frame(self, raw_file, det=None):
+    def load_raw_frame(self, raw_file, det=None, dtype=np.float64):
         """
         Load the image (converted to np.float) and primary header of the input file
 
@@ -127,10 +129,12 @@ class Spectrograph(object):
               Extension in the FITS list for the data
             det: int, optional
               Desired detector
+            dtype: numpy dtype, optional
+              Floating point type of the returned image
 
         Returns:
             img: ndarray
-              Converted to np.float and transposed if necessary
+              Converted to dtype and transposed if necessary
             head0: Header
 
         """
@@ -142,7 +146,7 @@ class Spectrograph(object):
                                                 det=_det)
 
         # Turn to float
-        img = raw_img.astype(np.float)
+        img = raw_img.astype(dtype)
         # Transpose?
         if self.detector[_det-1]['specaxis'] == 1:
             img = img.T
@@ -598,29 +602,102 @@ class Spectrograph(object):
         """
         Read the header data from all the extensions in the file.
 
+        The file is opened only once; see
+        :func:`pypeit.core.load.load_headers`.
+
         Args:
             filename (:obj:`str`):
                 Name of the file to read.
             strict (:obj:`bool`, optional):
-                Function will fault if :func:`fits.getheader` fails to
-                read any of the headers.  Set to False to report a
-                warning and continue.
+                Function will fault if any of the headers cannot be
+                read.  Set to False to report a warning and continue.
 
         Returns:
             list: Returns a list of :attr:`numhead` :obj:`fits.Header`
             objects with the extension headers.
         """
-        headarr = ['None']*self.numhead
+        return self._check_headarr(filename, load.load_headers(filename, self.numhead),
+                                   strict=strict)
+
+    def get_headarrs(self, file_list, strict=True, nthreads=1, cache_file=None):
+        """
+        Read the header data from all the extensions of many files.
+
+        The headers of each file are read in a single pass through the
+        file, and the files can be read by a pool of threads.  The
+        headers can also be kept in a persistent cache (see
+        :class:`pypeit.core.load.HeaderCache`), such that only new or
+        modified files are read.
+
+        Args:
+            file_list (list):
+                Names of the files to read.
+            strict (:obj:`bool`, optional):
+                Function will fault if any of the headers cannot be
+                read.  Set to False to report a warning and continue.
+            nthreads (:obj:`int`, optional):
+                Number of threads used to read the files.
+            cache_file (:obj:`str`, optional):
+                Name of the header cache file.  If None, no cache is
+                used.
+
+        Returns:
+            list: List with the :attr:`numhead` headers of each file;
+            see :func:`get_headarr`.
+        """
+        cache = None if cache_file is None else load.HeaderCache(cache_file)
+        headarrs = [None]*len(file_list)
+        if cache is not None:
+            headarrs = [cache.get(ifile, self.numhead) for ifile in file_list]
+        toread = [i for i, headarr in enumerate(headarrs) if headarr is None]
+        if cache is not None:
+            msgs.info('Found the headers of {0}/{1} files in {2}'.format(
+                      len(file_list)-len(toread), len(file_list), cache_file))
+
+        # Read the rest of the files
+        if nthreads is not None and nthreads > 1 and len(toread) > 1:
+            with futures.ThreadPoolExecutor(max_workers=nthreads) as executor:
+                read = list(executor.map(load.load_headers, [file_list[i] for i in toread],
+                                         [self.numhead]*len(toread)))
+        else:
+            read = [load.load_headers(file_list[i], self.numhead) for i in toread]
+        for i, headarr in zip(toread, read):
+            headarrs[i] = headarr
+            # Only cache files with all the headers
+            if cache is not None and not any([h is None for h in headarr]):
+                cache.set(file_list[i], headarr)
+        if cache is not None:
+            cache.write()
+
+        return [self._check_headarr(ifile, headarr, strict=strict)
+                    for ifile, headarr in zip(file_list, headarrs)]
+
+    def _check_headarr(self, filename, headarr, strict=True):
+        """
+        Report the headers of a file that could not be read.
+
+        Args:
+            filename (:obj:`str`):
+                Name of the file.
+            headarr (list):
+                Headers read by :func:`pypeit.core.load.load_headers`.
+            strict (:obj:`bool`, optional):
+                Fault if any of the headers is missing.  Set to False
+                to report a warning and continue.
+
+        Returns:
+            list: The headers, with 'None' for those missing.
+        """
         for k in range(self.numhead):
-            try:
-                headarr[k] = fits.getheader(filename, ext=k)
-            except:
-                if strict:
-                    msgs.error("Header error in extension {0} in {1}.".format(k, filename))
-                else:
-                    msgs.warn('Bad header in extension {0} in {1}'.format(k, filename) 
-                              + msgs.newline() + 'Proceeding on the hopes this was a '
-                              + 'calibration file, otherwise consider removing.')
+            if headarr[k] is not None:
+                continue
+            headarr[k] = 'None'
+            if strict:
+                msgs.error("Header error in extension {0} in {1}.".format(k, filename))
+            else:
+                msgs.warn('Bad header in extension {0} in {1}'.format(k, filename) 
+                          + msgs.newline() + 'Proceeding on the hopes this was a '
+                          + 'calibration file, otherwise consider removing.')
         return headarr
 
 #    def get_match_criteria(self):
@@ -8,6 +8,7 @@ from __future__ import unicode_literals
 # TEST_UNICODE_LITERALS
 
 import os
+import pickle
 
 import pytest
 import glob
@@ -180,3 +181,45 @@ def test_waveimg(multi_caliBrate):
     assert mswave.shape == (2048,350)
 
 
+
+
+def test_calibration_cache():
+    image = lambda value: np.full((10,10), value)
+    cache = calibrations.CalibrationCache(maxmem=2.5*image(0.).nbytes)
+    cache.set('A_1_01', 1, 'arc', image(1.))
+    cache.set('A_1_01', 1, 'tilts', ({'tilts': image(2.), 'func2d': 'legendre2d'},
+                                     np.zeros(3, dtype=bool)))
+    assert ('A_1_01', 1, 'tilts') in cache and cache.nbytes == 2*image(0.).nbytes + 3
+    assert cache.get('A_1_01', 1, 'arc')[0,0] == 1.
+    # The tilts were the least recently used
+    cache.set('A_1_02', 2, 'arc', image(3.))
+    assert ('A_1_01', 1, 'tilts') not in cache and cache.evicted('A_1_01', 1, 'tilts')
+    assert len(cache) == 2 and cache.nbytes <= cache.maxmem
+    with pytest.raises(KeyError):
+        cache.get('A_1_01', 1, 'tilts')
+    # Split and merge by detector
+    cache_det = cache.subset(2)
+    assert cache_det.keys() == [('A_1_02', 2, 'arc')]
+    assert cache.subset(1).evicted('A_1_01', 1, 'tilts')
+    cache_det.set('A_1_02', 2, 'bpm', image(0))
+    misses = cache.misses
+    cache.update(cache_det)
+    assert ('A_1_02', 2, 'bpm') in cache and ('A_1_01', 1, 'arc') not in cache
+    # Only the new calibration is merged
+    assert cache.misses == misses + 1
+    # The cache can be sent to another process
+    assert pickle.loads(pickle.dumps(cache_det)).keys() == cache_det.keys()
+
+
+def test_arc_cache(multi_caliBrate):
+    multi_caliBrate.msbias = 'overscan'
+    arc = multi_caliBrate.get_arc()
+    assert multi_caliBrate.get_arc() is arc
+    # Drop the arc from memory; it is rebuilt as the master was not saved
+    multi_caliBrate.calib_cache.maxmem = 0
+    multi_caliBrate.shape = (2048,350)
+    multi_caliBrate.get_bpm()
+    assert multi_caliBrate.calib_cache.evicted(multi_caliBrate.arc_master_key, 1, 'arc')
+    assert multi_caliBrate.check_for_previous('arc', multi_caliBrate.arc_master_key) \
+                == (False, False)
+    assert np.array_equal(multi_caliBrate.get_arc(), arc)
@@ -0,0 +1,55 @@
+# Module to run tests on combining frames
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+
+import pytest
+import numpy as np
+
+from pypeit.core import combine
+
+
+def fake_frames(nframes=7, shape=(50,40), seed=1):
+    rng = np.random.RandomState(seed)
+    frames = 1000. + 30.*rng.normal(size=shape+(nframes,))
+    # Cosmic rays, saturated pixels and a fully saturated pixel
+    frames[rng.randint(0, shape[0], 20), rng.randint(0, shape[1], 20),
+           rng.randint(0, nframes, 20)] = 5e4
+    frames[3,4,:] = 7e4
+    frames[10,12,2] = 7e4
+    return frames
+
+
+@pytest.mark.parametrize('method,replace', [('weightmean', 'maxnonsat'), ('median', 'median'),
+                                            ('mean', 'weightmean')])
+def test_comb_frames_maxmem(method, replace):
+    frames = fake_frames()
+    kwargs = dict(saturation=6e4, method=method, cosmics=20., replace=replace)
+    comb_frame = combine.comb_frames(frames.copy(), **kwargs)
+    # Combine three rows at a time
+    maxmem = 3*combine._COMB_WORKSPACE*frames.shape[1]*frames.shape[2]*frames.itemsize
+    assert combine.comb_block_rows(frames.shape[1], frames.shape[2], frames.dtype, maxmem) == 3
+    _frames = frames.copy()
+    assert np.array_equal(combine.comb_frames(_frames, maxmem=maxmem, **kwargs), comb_frame)
+    # Input is not changed when combining in blocks
+    assert np.array_equal(_frames, frames)
+    # A list of frames is always combined in blocks
+    assert np.array_equal(combine.comb_frames([frames[:,:,i] for i in range(frames.shape[2])],
+                                              **kwargs), comb_frame)
+
+
+def test_comb_frames_memmap():
+    frames = fake_frames().astype(np.float32)
+    comb_frame = combine.comb_frames(frames.copy(), saturation=6e4, cosmics=20.)
+    assert comb_frame.dtype == np.float32
+    ofile = os.path.join(os.path.dirname(__file__), 'files', 'test_comb_frames.npy')
+    np.save(ofile, frames)
+    _frames = np.load(ofile, mmap_mode='r')
+    _comb_frame = combine.comb_frames(_frames, saturation=6e4, cosmics=20., maxmem=1)
+    del _frames
+    os.remove(ofile)
+    assert _comb_frame.dtype == np.float32
+    assert np.array_equal(_comb_frame, comb_frame)
@@ -0,0 +1,148 @@
+# Module to run tests on the extraction core methods
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+from pypeit import reduce
+from pypeit import specobjs
+from pypeit.core import extract
+from pypeit.core import pixels
+from pypeit.core import skysub
+from pypeit.spectrographs.util import load_spectrograph
+from pypeit.tests.test_pixels import fake_tslits_dict
+
+
+def window_sum(image, left, right, weight_image=None):
+    """Brute force sum of the pixels in the window of a single trace."""
+    nspec, nspat = image.shape
+    x = np.arange(nspat)
+    fext = np.zeros(nspec)
+    wimg = np.ones_like(image) if weight_image is None else weight_image
+    for i in range(nspec):
+        # Overlap of each pixel with the window
+        frac = np.clip(np.fmin(x+0.5, right[i]) - np.fmax(x-0.5, left[i]), 0, 1)
+        num = np.sum(frac*wimg[i]*image[i])
+        if weight_image is None:
+            fext[i] = num
+        else:
+            den = np.sum(frac*wimg[i])
+            fext[i] = num/den if den > 0 else 0.
+    return fext
+
+
+def test_extract_asymbox2():
+    rng = np.random.RandomState(1)
+    nspec, nspat, ntrace = 50, 60, 4
+    image = rng.normal(size=(nspec, nspat)) + 10.
+    cen = np.linspace(8., nspat-8., ntrace)[None,:] \
+            + 2*np.sin(np.arange(nspec)/10.)[:,None]
+    left = cen - rng.uniform(1., 4., size=cen.shape)
+    right = cen + rng.uniform(1., 4., size=cen.shape)
+    # A window partly off the image
+    left[:5,0] = -3.2
+
+    fext = extract.extract_asymbox2(image, left, right)
+    assert fext.shape == (nspec, ntrace)
+    for i in range(ntrace):
+        assert np.allclose(fext[:,i], window_sum(image, left[:,i], right[:,i]))
+        # Single traces
+        assert np.allclose(extract.extract_asymbox2(image, left[:,i], right[:,i]), fext[:,i])
+
+    # With a weight image
+    weight_image = rng.uniform(size=image.shape)
+    fext = extract.extract_asymbox2(image, left, right, weight_image=weight_image)
+    for i in range(ntrace):
+        assert np.allclose(fext[:,i], window_sum(image, left[:,i], right[:,i],
+                                                 weight_image=weight_image))
+
+    # Explicit spectral positions
+    ycen = np.outer(np.arange(nspec)[::-1], np.ones(ntrace))
+    fext = extract.extract_asymbox2(image, left, right, ycen=ycen)
+    assert np.allclose(fext[:,1], window_sum(image[::-1], left[:,1], right[:,1]))
+
+
+def test_quick_extract():
+    # Gaussian object on a flat sky in the second of three slits
+    spectrograph = load_spectrograph('shane_kast_blue')
+    par = spectrograph.default_pypeit_par()
+    tslits_dict = fake_tslits_dict(nspec=400, nspat=200, nslits=3)
+    nspec, nspat = 400, 200
+    trace = (tslits_dict['slit_left'][:,1] + tslits_dict['slit_righ'][:,1])/2.
+    objimg = 500.*np.exp(-0.5*((np.arange(nspat)[None,:] - trace[:,None])/2.)**2)
+    sky = np.full((nspec, nspat), 100.)
+    sciimg = sky + objimg + np.random.RandomState(1).normal(size=sky.shape)*np.sqrt(sky+objimg)
+    sciivar = 1./(sky+objimg)
+    waveimg = np.outer(4000. + np.arange(nspec), np.ones(nspat))
+
+    sobj = specobjs.SpecObj(sciimg.shape, (0.3,0.5), nspec/2., slitid=1, objtype='science',
+                            pypeline='MultiSlit')
+    sobj.trace_spat = trace
+    sobj.trace_spec = np.arange(nspec, dtype=float)
+    sobj.fwhm = 4.7
+    redux = reduce.instantiate_me(spectrograph, tslits_dict, np.zeros(sciimg.shape, dtype=int),
+                                  par, det=1, objtype='science', setup='A')
+    skymodel, objmodel, ivarmodel, outmask, sobjs \
+            = redux.quick_extract(sciimg, sciivar, waveimg, sky, np.full(sky.shape, 16.),
+                                  specobjs.SpecObjs(specobjs=[sobj]))
+    assert sobjs.nobj == 1 and sobjs[0].trace_spat is not sobj.trace_spat
+    flux = np.sum(objimg, axis=1)
+    assert np.abs(np.median(sobjs[0].optimal['COUNTS']/flux) - 1.) < 0.02
+    assert np.allclose(sobjs[0].optimal['WAVE'], waveimg[:,0])
+    assert sobjs[0].boxcar['BOX_RADIUS'] == par['scienceimage']['boxcar_radius'] \
+                / spectrograph.detector[0]['platescale']
+    assert np.array_equal(skymodel, sky)
+    assert np.all(objmodel[redux.slitmask != 1] == 0)
+
+
+def test_local_skysub_extract_slit():
+    # Gaussian object on a sky gradient in the second of three slits
+    tslits_dict = fake_tslits_dict(nspec=200, nspat=200, nslits=3)
+    nspec, nspat = 200, 200
+    slit_left, slit_righ = tslits_dict['slit_left'][:,1], tslits_dict['slit_righ'][:,1]
+    trace = (slit_left + slit_righ)/2. + 3.3
+    spat_img = np.outer(np.ones(nspec), np.arange(nspat))
+    tilts = np.outer(np.arange(nspec), np.ones(nspat))/(nspec-1)
+    objimg = 500.*np.exp(-0.5*((spat_img - trace[:,None])/2.)**2)
+    sky = 100. + 50.*np.sin(20*tilts)
+    rng = np.random.RandomState(1)
+    sciimg = sky + objimg + rng.normal(size=sky.shape)*np.sqrt(sky+objimg)
+    sciivar = 1./(sky+objimg)
+    waveimg = 4000. + 1000.*tilts
+    rn2img = np.full(sky.shape, 16.)
+    mask = (rng.uniform(size=sky.shape) < 0.002).astype(int)
+
+    def make_sobjs():
+        sobj = specobjs.SpecObj(sciimg.shape, (0.3,0.5), nspec/2., slitid=1, objtype='science',
+                                pypeline='MultiSlit')
+        sobj.trace_spat = trace.copy()
+        sobj.trace_spec = np.arange(nspec, dtype=float)
+        sobj.spat_pixpos = trace[nspec//2]
+        sobj.fwhm = 4.7
+        sobj.maskwidth = 12.
+        return specobjs.SpecObjs(specobjs=[sobj])
+
+    # Same results as on the full images
+    slitmask = pixels.tslits2mask(tslits_dict)
+    thismask = slitmask == 1
+    sobjs = make_sobjs()
+    full = skysub.local_skysub_extract(sciimg, sciivar, tilts, waveimg, sky, rn2img, thismask,
+                                       slit_left, slit_righ, sobjs, inmask=(mask == 0) & thismask,
+                                       box_rad=5., niter=2)
+    slit_index = pixels.SlitIndex.from_tslits_dict(tslits_dict)
+    sobjs_slit = make_sobjs()
+    box, slit_mask, *slit = skysub.local_skysub_extract_slit(slit_index, 1, sciimg, sciivar, tilts,
+                                                             waveimg, sky, rn2img, mask, slit_left,
+                                                             slit_righ, sobjs_slit, box_rad=5.,
+                                                             niter=2)
+    assert box[1].stop - box[1].start < nspat
+    assert np.array_equal(slit_mask, thismask[box])
+    for f, s in zip(full, slit):
+        assert np.allclose(f, s, rtol=1e-8, atol=1e-8)
+    assert np.allclose(sobjs_slit[0].trace_spat, sobjs[0].trace_spat)
+    assert sobjs_slit[0].min_spat == sobjs[0].min_spat
+    assert sobjs_slit[0].max_spat == sobjs[0].max_spat
+    assert np.allclose(sobjs_slit[0].optimal['COUNTS'], sobjs[0].optimal['COUNTS'])
+    assert np.allclose(sobjs_slit[0].boxcar['COUNTS'], sobjs[0].boxcar['COUNTS'])
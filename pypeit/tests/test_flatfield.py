@@ -17,6 +17,8 @@ import numpy as np
 from pypeit.tests.tstutils import dev_suite_required, load_kast_blue_masters
 from pypeit import flatfield
 from pypeit.par import pypeitpar
+from pypeit.spectrographs.util import load_spectrograph
+from pypeit.tests.test_pixels import fake_tslits_dict
 
 def data_path(filename):
     data_dir = os.path.join(os.path.dirname(__file__), 'files')
@@ -65,3 +67,43 @@ def test_run():
     mspixelflatnrm, msillumflat = flatField.run()
     assert np.isclose(np.median(mspixelflatnrm), 1.0)
 
+
+def fake_flat(nslits=4, nspec=400, nspat=240):
+    tslits_dict = fake_tslits_dict(nspec=nspec, nspat=nspat, nslits=nslits)
+    spec = np.arange(nspec)
+    spat = np.arange(nspat)
+    blaze = 1e4*np.exp(-0.5*((spec-nspec/2)/(nspec/2.))**2)
+    flat = np.full((nspec, nspat), 10.)
+    for slit in range(nslits):
+        x = (spat[None,:] - tslits_dict['slit_left'][:,slit,None]) \
+                / (tslits_dict['slit_righ'][:,slit,None] - tslits_dict['slit_left'][:,slit,None])
+        inslit = (x > 0) & (x < 1)
+        flat[inslit] = (blaze[:,None]*(1.+0.05*x))[inslit]
+    flat *= 1. + 0.01*np.random.RandomState(1).normal(size=flat.shape)
+    # Untilted lines
+    coeffs = np.zeros((3,3,nslits))
+    coeffs[:2,0,:] = 0.5
+    tilts_dict = {'tilts': np.outer(spec/(nspec-1.), np.ones(nspat)), 'coeffs': coeffs,
+                  'slitcen': 0.5*(tslits_dict['slit_left']+tslits_dict['slit_righ']),
+                  'func2d': 'legendre2d'}
+    return flat, tslits_dict, tilts_dict
+
+
+def test_run_nproc():
+    spectrograph = load_spectrograph('shane_kast_blue')
+    par = pypeitpar.FrameGroupPar('pixelflat')
+    output = []
+    for nproc in [1, 2]:
+        flat, tslits_dict, tilts_dict = fake_flat()
+        flatField = flatfield.FlatField(spectrograph, par, det=1, tilts_dict=tilts_dict,
+                                        tslits_dict=tslits_dict,
+                                        flatpar=pypeitpar.FlatFieldPar(nproc=nproc))
+        flatField.rawflatimg = flat
+        mspixelflatnrm, msillumflat = flatField.run()
+        output += [(mspixelflatnrm, msillumflat, flatField.flat_model, tslits_dict['slit_left'],
+                    tilts_dict['tilts'])]
+    assert np.isclose(np.median(output[0][0]), 1.0)
+    # The result is independent of the number of processes
+    for serial, parallel in zip(*output):
+        assert np.array_equal(serial, parallel)
+
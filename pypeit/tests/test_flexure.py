@@ -48,3 +48,21 @@ def test_flex_shift():
 #    pyplot.show()
     assert np.abs(flex_dict['shift'] - 43.7) < 0.1
 
+
+
+def test_archive_sky(monkeypatch):
+    monkeypatch.setattr(wave, '_archive_skies', {})
+    obj_spec = readspec(data_path('obj_lrisb_600_sky.fits'))
+    arx_file = pypeit.__path__[0]+'/data/sky_spec/sky_LRISb_600.fits'
+    # Loaded and characterized once
+    arx_sky = wave.load_archive_sky(arx_file)
+    assert wave.load_archive_sky(arx_file) is arx_sky
+    # Lower resolution objects, so that the archive is smoothed
+    obj_specs = [obj_spec.gauss_smooth(fwhm) for fwhm in [10., 10., 12.]]
+    flex_dicts = arx_sky.flex_shift(obj_specs, mxshft=60)
+    assert len(arx_sky._smoothed) == 2
+    for obj, flex_dict in zip(obj_specs, flex_dicts):
+        assert np.abs(flex_dict['shift'] - 43.7) < 0.3
+        # Same as one at a time with the exact kernel
+        single = wave.flex_shift(obj, readspec(arx_file), mxshft=60)
+        assert np.abs(flex_dict['shift'] - single['shift']) < 0.01
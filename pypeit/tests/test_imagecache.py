@@ -0,0 +1,89 @@
+# Module to run tests on the cache of derived images
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pytest
+import numpy as np
+
+from pypeit import imagecache
+from pypeit.core import tracewave
+
+
+class Counter(object):
+    def __init__(self, func):
+        self.func = func
+        self.ncalls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.ncalls += 1
+        return self.func(*args, **kwargs)
+
+
+def test_fingerprint():
+    coeffs = np.arange(12.).reshape(3,4)
+    assert imagecache.fingerprint(coeffs, 'legendre2d') \
+                == imagecache.fingerprint(coeffs.copy(), 'legendre2d')
+    assert imagecache.fingerprint(coeffs, 'legendre2d') \
+                != imagecache.fingerprint(coeffs.T, 'legendre2d')
+    assert imagecache.fingerprint(coeffs, 'legendre2d') \
+                != imagecache.fingerprint(coeffs.astype(np.float32), 'legendre2d')
+    assert imagecache.fingerprint({'a':1, 'b':[2., None]}) \
+                == imagecache.fingerprint({'b':[2., None], 'a':1})
+    with pytest.raises(TypeError):
+        imagecache.fingerprint(object())
+
+
+def test_cache_tilts():
+    cache = imagecache.ImageCache()
+    coeffs = np.zeros((4,3))
+    coeffs[1,0] = 1.
+    func = Counter(tracewave.fit2tilts)
+    tilts = cache.get('tilts', 'A_1_01', func, args=((100,50), coeffs, 'legendre2d'))
+    assert np.array_equal(tilts, tracewave.fit2tilts((100,50), coeffs, 'legendre2d'))
+    assert not tilts.flags.writeable
+    assert cache.get('tilts', 'A_1_01', func, args=((100,50), coeffs.copy(), 'legendre2d')) \
+                is tilts
+    assert func.ncalls == 1 and cache.hits == 1
+    # New coefficients or calibration group
+    coeffs[2,1] = 0.1
+    cache.get('tilts', 'A_1_01', func, args=((100,50), coeffs, 'legendre2d'))
+    cache.get('tilts', 'B_1_01', func, args=((100,50), coeffs, 'legendre2d'))
+    assert func.ncalls == 3 and len(cache) == 3
+    cache.clear('B_1_01')
+    assert len(cache) == 2
+
+
+def test_lru():
+    image = lambda value: np.full((10,10), value)
+    cache = imagecache.ImageCache(maxmem=2.5*image(0.).nbytes)
+    for value in [0., 1., 0., 2.]:
+        cache.get('wave', 'A_1_01', image, args=(value,))
+    # 1. was the least recently used
+    assert cache.misses == 3 and len(cache) == 2
+    assert cache.nbytes <= cache.maxmem
+    func = Counter(image)
+    cache.get('wave', 'A_1_01', func, args=(0.,))
+    cache.get('wave', 'A_1_01', func, args=(1.,))
+    assert func.ncalls == 1
+    # Images without a master key are not cached
+    cache.get('wave', None, func, args=(0.,))
+    assert func.ncalls == 2 and len(cache) == 2
+
+
+def test_spill(tmpdir):
+    ximg = lambda n: (np.linspace(0., 1., n), np.arange(n) % 2 == 0)
+    cache = imagecache.ImageCache(spill_dir=str(tmpdir))
+    _ximg, _edgmask = cache.get('ximg', 'A_1_01', ximg, args=(20,))
+    assert isinstance(_ximg, np.memmap) and not _edgmask.flags.writeable
+    assert np.array_equal(_edgmask, ximg(20)[1])
+    assert len(tmpdir.listdir()) == 2
+    assert cache.nbytes == 0
+
+    # A new cache finds the images on disk
+    func = Counter(ximg)
+    cache = imagecache.ImageCache(spill_dir=str(tmpdir))
+    _ximg, _edgmask = cache.get('ximg', 'A_1_01', func, args=(20,))
+    assert func.ncalls == 0
+    assert np.array_equal(_ximg, ximg(20)[0])
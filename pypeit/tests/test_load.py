@@ -54,3 +54,24 @@ def test_load_1dspec():
     assert isinstance(spec2, XSpectrum1D)
 
 
+
+
+def test_load_headers():
+    from pypeit.spectrographs.util import load_spectrograph
+    spectrograph = load_spectrograph('shane_kast_blue')
+    kast_files = [data_path('b1.fits.gz'), data_path('b27.fits.gz')]
+    headarr = spectrograph.get_headarr(kast_files[0])
+    assert len(headarr) == spectrograph.numhead
+    assert headarr[0]['OBJECT'] == 'Arcs'
+
+    # Threaded read and the header cache
+    cache_file = data_path('test_header_cache.json.gz')
+    if os.path.isfile(cache_file):
+        os.remove(cache_file)
+    for i in range(2):
+        headarrs = spectrograph.get_headarrs(kast_files, nthreads=2, cache_file=cache_file)
+        assert os.path.isfile(cache_file)
+        assert headarrs[0][0] == headarr[0]
+        assert headarrs[1][0]['OBJECT'] == spectrograph.get_headarr(kast_files[1])[0]['OBJECT']
+    assert len(load.HeaderCache(cache_file).cache) == 2
+    os.remove(cache_file)
@@ -5,17 +5,27 @@ from __future__ import unicode_literals
 
 import os
 import glob
+import shutil
 import pytest
 
 import numpy as np
 
+from astropy.io import fits
+
 from pypeit.par.util import parse_pypeit_file
 from pypeit.pypeitsetup import PypeItSetup
 from pypeit.tests.tstutils import dev_suite_required
-from pypeit.metadata import PypeItMetaData
+from pypeit.metadata import PypeItMetaData, MetadataIndex
+from pypeit import msgs
+from pypeit.pypeit import poll_raw_files, append_raw_files
 from pypeit.spectrographs.util import load_spectrograph
 
 
+def data_path(filename):
+    data_dir = os.path.join(os.path.dirname(__file__), 'files')
+    return os.path.join(data_dir, filename)
+
+
 @dev_suite_required
 def test_lris_red_multi_400():
     file_list = glob.glob(os.path.join(os.environ['PYPEIT_DEV'], 'RAW_DATA', 'Keck_LRIS_red',
@@ -128,3 +138,89 @@ def test_lris_blue_pypeit_overwrite():
     assert fitstbl['target'][0] != fitstbl_usr['target'][0], \
             'Fits header value and input pypeit file value expected to be different.'
 
+
+def test_metadata_index(tmpdir):
+    kast_files = [data_path('b1.fits.gz'), data_path('b27.fits.gz')]
+    index_file = str(tmpdir.join('metadata_index.db'))
+    cfg_lines = ['[rdx]', 'spectrograph = shane_kast_blue',
+                 'metadata_index = {0}'.format(index_file)]
+    tables = []
+    for i in range(2):
+        ps = PypeItSetup(kast_files, cfg_lines=cfg_lines)
+        tables += [ps.build_fitstbl()]
+    # The second table is built from the index
+    index = MetadataIndex(index_file)
+    assert all([row is not None for row in index.get_rows(kast_files, 'shane_kast_blue')])
+    assert all([row is None for row in index.get_rows(kast_files, 'shane_kast_red')])
+    index.close()
+    assert tables[0].colnames == tables[1].colnames
+    for key in tables[0].colnames:
+        assert tables[0][key].dtype == tables[1][key].dtype
+        assert np.all(tables[0][key] == tables[1][key])
+
+    # Known configurations keep their identifiers, and new
+    # configurations get the unused identifiers
+    ps.get_frame_types(flag_unknown=True)
+    cfg = ps.fitstbl.get_configuration(0)
+    other = dict(cfg, dispname='none')
+    assert list(ps.fitstbl.unique_configurations(known={'A': other, 'B': cfg}).keys()) == ['B']
+    assert list(ps.fitstbl.unique_configurations(force=True, known={'A': other}).keys()) == ['B']
+    assert list(ps.fitstbl.unique_configurations(force=True, known={'B': other}).keys()) == ['A']
+
+
+def test_append_frames(tmpdir, monkeypatch):
+    ps = PypeItSetup([data_path('b1.fits.gz'), data_path('b27.fits.gz')],
+                     cfg_lines=['[rdx]', 'spectrograph = shane_kast_blue'])
+    ps.run(setup_only=True)
+    os.remove('shane_kast_blue.sorted')
+    fitstbl = ps.fitstbl
+    nrows = len(fitstbl)
+    sci = np.where(fitstbl.find_frames('science'))[0][0]
+
+    # New frames are found once their size is stable
+    sizes = {}
+    assert poll_raw_files(str(tmpdir), sizes) == []
+    new_file = str(tmpdir.join('b28.fits.gz'))
+    shutil.copy(data_path('b27.fits.gz'), new_file)
+    shutil.copy(data_path('b1.fits.gz'), str(tmpdir.join('b29.fits.gz')))
+    assert poll_raw_files(str(tmpdir), sizes) == []
+    new_files = poll_raw_files(str(tmpdir), sizes)
+    assert len(new_files) == 2
+    assert poll_raw_files(str(tmpdir), sizes) == []
+    # Files removed between the search and the size check are skipped
+    shutil.copy(data_path('b1.fits.gz'), str(tmpdir.join('b30.fits.gz')))
+    poll_raw_files(str(tmpdir), sizes)
+    os.remove(str(tmpdir.join('b30.fits.gz')))
+    glob_files = glob.glob(os.path.join(str(tmpdir), '*.fits*')) + [str(tmpdir.join('b30.fits.gz'))]
+    monkeypatch.setattr(glob, 'glob', lambda pattern: glob_files)
+    assert poll_raw_files(str(tmpdir), sizes) == []
+    monkeypatch.undo()
+
+    # Only the science frame is appended, in the calibration group of
+    # the other science frame
+    indx = fitstbl.append_frames(new_files)
+    assert np.array_equal(indx, [nrows])
+    assert len(fitstbl) == nrows+1
+    assert fitstbl['filename'][nrows] == 'b28.fits.gz'
+    for key in ['setup', 'calib', 'calibbit', 'frametype']:
+        assert fitstbl[key][nrows] == fitstbl[key][sci]
+    assert fitstbl['comb_id'][nrows] == np.amax(fitstbl['comb_id'][:nrows])+1
+    assert fitstbl.frame_paths(nrows) == new_file
+
+    # A foreign file in the watched directory is skipped, without
+    # losing the log or the next frames
+    foreign_file = str(tmpdir.join('foreign.fits'))
+    fits.PrimaryHDU(np.zeros((4,4))).writeto(foreign_file)
+    next_file = str(tmpdir.join('b31.fits.gz'))
+    shutil.copy(data_path('b27.fits.gz'), next_file)
+    logname = str(tmpdir.join('watch.log'))
+    msgs.reset_log_file(logname)
+    indx = append_raw_files(fitstbl, [foreign_file, next_file], logname=logname)
+    msgs.info('Still logging')
+    msgs.reset_log_file(None)
+    assert np.array_equal(indx, [nrows+1])
+    assert fitstbl['filename'][nrows+1] == 'b31.fits.gz'
+    with open(logname) as f:
+        log = f.read()
+    assert 'Skipping {0}'.format(foreign_file) in log
+    assert 'Still logging' in log
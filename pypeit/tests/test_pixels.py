@@ -0,0 +1,87 @@
+"""
+Module to run tests on pixels module
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import copy
+
+import numpy as np
+
+from pypeit.core import pixels
+
+
+def fake_tslits_dict(nspec=500, nspat=300, nslits=5, pad=2):
+    spec = np.arange(nspec)
+    slit_left = np.array([10 + 55*i + 3*np.sin(spec/80. + i) for i in range(nslits)]).T
+    slit_righ = slit_left + 45.5
+    spec_min = np.zeros(nslits)
+    spec_min[-1] = 100.5
+    spec_max = np.full(nslits, nspec-1.)
+    return dict(slit_left=slit_left, slit_righ=slit_righ, nslits=nslits, nspec=nspec,
+                nspat=nspat, spec_min=spec_min, spec_max=spec_max, pad=pad)
+
+
+def test_tslits2mask():
+    tslits_dict = fake_tslits_dict()
+    slitmask = pixels.tslits2mask(tslits_dict)
+    # Brute force over the full image
+    spat_img, spec_img = np.meshgrid(np.arange(tslits_dict['nspat']), np.arange(tslits_dict['nspec']))
+    for slit in range(tslits_dict['nslits']):
+        thismask = (spat_img > tslits_dict['slit_left'][:,slit,None] - tslits_dict['pad']) \
+                        & (spat_img < tslits_dict['slit_righ'][:,slit,None] + tslits_dict['pad']) \
+                        & (spec_img >= tslits_dict['spec_min'][slit]) \
+                        & (spec_img <= tslits_dict['spec_max'][slit])
+        # Later slits take precedence
+        later = slitmask > slit
+        assert np.array_equal(thismask & np.invert(later), slitmask == slit)
+
+
+def test_slit_index():
+    tslits_dict = fake_tslits_dict()
+    slitmask = pixels.tslits2mask(tslits_dict)
+    slit_index = pixels.SlitIndex.from_tslits_dict(tslits_dict)
+    img = np.random.RandomState(42).normal(size=slitmask.shape)
+    for slit in range(tslits_dict['nslits']):
+        thismask = slitmask == slit
+        assert np.array_equal(img.ravel()[slit_index.pixels(slit)], img[thismask])
+        assert np.array_equal(slit_index.full_mask(slit), thismask)
+        bbox = slit_index.bbox(slit)
+        assert np.sum(thismask[bbox]) == np.sum(thismask)
+        assert np.array_equal(slit_index.mask(slit), thismask[bbox])
+        x0, x1 = slit_index.spat_range(slit, tslits_dict['slit_left'][:,slit],
+                                       tslits_dict['slit_righ'][:,slit])
+        assert np.array_equal(slit_index.mask(slit, bbox=(slice(None), slice(x0,x1))),
+                              thismask[:,x0:x1])
+    assert slit_index.spec_min[-1] == 101
+
+
+def test_slit_layout():
+    tslits_dict = fake_tslits_dict()
+    # Overlapping padded slits
+    tslits_dict['slit_righ'][:,1] += 10
+    tslits_dict['slit_left'][:50,2] = np.nan
+    layout = pixels.slit_layout(tslits_dict, pad=3)
+    # Cached
+    assert pixels.slit_layout(tslits_dict, pad=3) is layout
+    slitmask = pixels.tslits2mask(tslits_dict, pad=3)
+    assert np.array_equal(slitmask, layout.slitmask)
+    slit_index = pixels.SlitIndex(slitmask, nslits=tslits_dict['nslits'])
+    for slit in range(tslits_dict['nslits']):
+        assert np.array_equal(layout.mask(slit), slitmask == slit)
+        assert np.array_equal(layout.pixels(slit), slit_index.pixels(slit))
+    # Brute force of one slit
+    spat_img = np.arange(tslits_dict['nspat'])[None,:]
+    thismask = (spat_img > tslits_dict['slit_left'][:,2,None] - 3) \
+                    & (spat_img < tslits_dict['slit_righ'][:,2,None] + 3)
+    assert np.array_equal(np.sort(layout.interval_pixels(2)), np.where(thismask.ravel())[0])
+
+    # The cache is reset when the slit edges change and is not copied
+    _tslits_dict = copy.deepcopy(tslits_dict)
+    assert len(_tslits_dict['slit_layout']) == 0
+    tslits_dict['slit_left'][:,0] += 1
+    assert pixels.slit_layout(tslits_dict, pad=3) is not layout
+    assert np.array_equal(pixels.slit_layout(tslits_dict, pad=3).slitmask,
+                          pixels.SlitLayout.from_tslits_dict(tslits_dict, pad=3).slitmask)
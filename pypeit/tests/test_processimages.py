@@ -87,3 +87,32 @@ def test_combine(deimos_flat_files):
     assert deimos_flats.stack.shape == (4096,2048)
 
 
+
+
+def test_float32():
+    kast_files = [os.path.join(os.path.dirname(__file__), 'files', f)
+                    for f in ['b1.fits.gz', 'b27.fits.gz']]
+    stacks = {}
+    for dtype in ['float64', 'float32']:
+        _par = pypeitpar.ProcessImagesPar(dtype=dtype)
+        kastb = processimages.ProcessImages('shane_kast_blue', _par, files=kast_files)
+        stacks[dtype] = kastb.process(bias_subtract='overscan', trim=True)
+        assert kastb.proc_images.dtype == np.dtype(dtype)
+        assert stacks[dtype].dtype == np.dtype(dtype)
+        assert kastb.build_rn2img().dtype == np.dtype(dtype)
+    assert np.allclose(stacks['float32'], stacks['float64'], rtol=1e-5, atol=1e-2)
+
+
+def test_combine_maxmem():
+    kast_files = [os.path.join(os.path.dirname(__file__), 'files', f)
+                    for f in ['b1.fits.gz', 'b27.fits.gz']]
+    kastb = processimages.ProcessImages('shane_kast_blue', par, files=kast_files)
+    stack = kastb.process(bias_subtract='overscan', trim=True)
+    # Stream the images through a memory-mapped stack and combine them
+    # in blocks of rows
+    _par = pypeitpar.ProcessImagesPar(combine_maxmem=1e-3)
+    kastb = processimages.ProcessImages('shane_kast_blue', _par, files=kast_files)
+    _stack = kastb.process(bias_subtract='overscan', trim=True)
+    assert isinstance(kastb.proc_images, np.memmap)
+    assert kastb.raw_images == [None, None]
+    assert np.array_equal(stack, _stack)
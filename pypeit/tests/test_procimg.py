@@ -0,0 +1,85 @@
+# Module to run tests on the image processing core methods
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pytest
+import numpy as np
+
+from scipy import signal, ndimage
+
+from pypeit import utils
+from pypeit.core import procimg
+
+
+def fake_science(nspec=256, nspat=128, seed=1234):
+    rng = np.random.RandomState(seed)
+    spec = np.arange(nspec, dtype=float)[:,None]
+    spat = np.arange(nspat, dtype=float)[None,:]
+    img = 100. + 2000.*np.exp(-0.5*((spec-nspec/3.)/1.5)**2) \
+                + 500.*np.exp(-0.5*((spat-nspat/2.)/3.)**2)
+    img += rng.normal(size=img.shape)*np.sqrt(img)
+    ncr = nspec*nspat//500
+    img[rng.randint(0, nspec, ncr), rng.randint(0, nspat, ncr)] += rng.uniform(500., 2e4, ncr)
+    return img
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_lacosmic_laplacian(dtype):
+    img = fake_science().astype(dtype)
+    # As done by the original L.A.Cosmic implementation
+    laplkernel = np.array([[0.0, -1.0, 0.0], [-1.0, 4.0, -1.0], [0.0, -1.0, 0.0]])
+    conved = signal.convolve2d(utils.subsample(img), laplkernel, mode="same", boundary="symm")
+    lplus = utils.rebin_evlist(conved.clip(min=0.0), np.array(conved.shape)/2.0)
+    assert np.array_equal(procimg.lacosmic_laplacian(img), lplus)
+
+
+def test_median_filter():
+    img = fake_science()
+    img[10:12,:] = 0.
+    for size in [3, 5, 7]:
+        assert np.array_equal(procimg.median_filter(img, size),
+                              ndimage.median_filter(img, size=size, mode='mirror'))
+    # NaNs and small images fall back to scipy
+    img[5,5] = np.nan
+    assert np.array_equal(procimg.median_filter(img, 5),
+                          ndimage.median_filter(img, size=5, mode='mirror'), equal_nan=True)
+    assert np.array_equal(procimg.median_filter(img[:2,:2], 5),
+                          ndimage.median_filter(img[:2,:2], size=5, mode='mirror'),
+                          equal_nan=True)
+
+
+def test_grow_masked():
+    rng = np.random.RandomState(1)
+    img = (rng.uniform(size=(40,30)) > 0.97).astype(float)
+    grow = 1.5
+    # Brute force
+    _img = img.copy()
+    for x, y in zip(*np.where(img == 1.)):
+        for i in range(img.shape[0]):
+            for j in range(img.shape[1]):
+                if (i-x)**2 + (j-y)**2 <= grow**2:
+                    _img[i,j] = 1.
+    assert np.array_equal(procimg.grow_masked(img, grow, 1.), _img)
+
+
+def test_lacosmic():
+    img = fake_science()
+    kwargs = dict(grow=1.5, sigclip=4.5, sigfrac=0.3, objlim=3., maxiter=2)
+    crmask = procimg.lacosmic(1, img, 65535., 0.86, **kwargs)
+    assert np.sum(crmask) > 0
+    # Same mask as the original implementation
+    assert np.array_equal(crmask, procimg.lacosmic(1, img, 65535., 0.86, fast=False, **kwargs))
+    var = np.abs(img) + 16.
+    assert np.array_equal(procimg.lacosmic(1, img, 65535., 0.86, varframe=var, **kwargs),
+                          procimg.lacosmic(1, img, 65535., 0.86, varframe=var, fast=False,
+                                           **kwargs))
+
+
+def test_nthreads():
+    img = fake_science()
+    assert np.array_equal(procimg.median_filter(img, 5, nthreads=3),
+                          procimg.median_filter(img, 5))
+    assert np.array_equal(procimg.lacosmic_laplacian(img, nthreads=3),
+                          procimg.lacosmic_laplacian(img))
@@ -1,6 +1,7 @@
 # Module to run tests on pyidl functions
 
 import numpy as np
+from pypeit.core import pydl
 from pypeit.core.pydl import bspline
 import pytest
 
@@ -26,3 +27,66 @@ def test_bsplinetodict():
 
     assert np.max(np.array(bspline_dict['breakpoints'])-bspline_fromdict.breakpoints) == 0.
 
+
+
+def test_cholesky_solvers():
+    """ Test that the LAPACK banded Cholesky backend reproduces the
+    reference python implementation.
+    """
+    rng = np.random.RandomState(1234)
+    x = np.sort(rng.uniform(0., 1000., 5000))
+    y = 100.*np.sin(x/30.) + 500. + rng.normal(0., 5., x.size)
+    invvar = np.full(x.size, 1./25.)
+
+    yfit = {}
+    coeff = {}
+    for solver in ['python', 'lapack']:
+        sset = bspline(x, nord=4, bkspace=2.)
+        action, lower, upper = sset.action(x)
+        err, yfit[solver] = sset.workit(x, y, invvar, action, lower, upper, solver=solver)
+        assert err == 0
+        coeff[solver] = sset.coeff.copy()
+    assert np.allclose(yfit['python'], yfit['lapack'], rtol=1e-10, atol=1e-8)
+    assert np.allclose(coeff['python'], coeff['lapack'], rtol=1e-10, atol=1e-8)
+
+    # Failures should be flagged at the same column
+    alpha = np.zeros((4, 20))
+    alpha[0,:16] = 1.
+    alpha[1,:15] = 0.1
+    alpha[0,7] = 1e-3
+    alpha[1,6] = 0.5
+    assert pydl.cholesky_band(alpha)[0] == pydl.cholesky_band_lapack(alpha)[0]
+
+    with pytest.raises(ValueError):
+        bspline(x, bkspace=2.).fit(x, y, invvar, solver='bogus')
+
+
+def test_band_normal_equations():
+    """ Test the vectorized assembly of the banded normal equations
+    against a dense least-squares calculation.
+    """
+    rng = np.random.RandomState(42)
+    x = np.sort(rng.uniform(0., 100., 2000))
+    y = np.cos(x/5.) + rng.normal(0., 0.1, x.size)
+    invvar = rng.uniform(50., 150., x.size)
+    invvar[rng.uniform(size=x.size) < 0.1] = 0.
+
+    sset = bspline(x, nord=4, bkspace=1.)
+    action, lower, upper = sset.action(x)
+    nfull = sset.coeff.size
+    sqrt_invvar = np.sqrt(invvar)
+    a2 = action*sqrt_invvar[:,None]
+    alpha, beta = pydl.band_normal_equations(a2, a2, y*sqrt_invvar, lower, upper, 1, nfull)
+
+    # Dense design matrix
+    design = np.zeros((x.size, nfull))
+    kk, rows = pydl.band_rows(lower, upper)
+    for i in range(sset.nord):
+        design[rows, kk+i] = action[rows,i]
+    normal = np.dot(design.T*invvar, design)
+    rhs = np.dot(design.T, y*invvar)
+    bw = sset.nord
+    for j in range(bw):
+        assert np.allclose(alpha[j,:nfull-j], np.diag(normal, -j))
+    assert np.allclose(beta[:nfull], rhs)
+    assert np.all(alpha[:,nfull:] == 0.)
@@ -45,6 +45,12 @@ def test_spectrographs():
 def test_reduce():
     pypeitpar.ReducePar()
 
+def test_reduce_nproc():
+    p = pypeitpar.ReducePar()
+    assert p['nproc'] == 1 and p['det_nproc'] == 1, 'Default should be serial'
+    with pytest.raises(ValueError):
+        pypeitpar.ReducePar(det_nproc=0)
+
 def test_wavelengthsolution():
     pypeitpar.WavelengthSolutionPar()
 
@@ -67,6 +67,29 @@ def test_setup_made_pypeit_file():
     assert setups[0] == 'A'
 
 
+def test_update_setup(tmpdir):
+    """ Test updating the setup as files are added
+    """
+    rawdir = tmpdir.mkdir('raw')
+    shutil.copy(data_path('b1.fits.gz'), str(rawdir))
+    droot = os.path.join(str(rawdir), 'b')
+    output_path = str(tmpdir)
+    pargs = setup.parser(['-r', droot, '-s', 'shane_kast_blue', '--extension=fits.gz',
+                          '--output_path={:s}'.format(output_path)])
+    setup.main(pargs)
+    assert os.path.isfile(os.path.join(output_path, 'setup_files', 'metadata_index.db'))
+
+    # Add a file and update
+    shutil.copy(data_path('b27.fits.gz'), str(rawdir))
+    pargs = setup.parser(['-r', droot, '-s', 'shane_kast_blue', '--extension=fits.gz',
+                          '--output_path={:s}'.format(output_path), '--update'])
+    setup.main(pargs)
+    pypeit_file = os.path.join(output_path, 'shane_kast_blue_A', 'shane_kast_blue_A.pypeit')
+    cfg_lines, data_files, frametype, usrdata, setups = parse_pypeit_file(pypeit_file)
+    assert len(data_files) == 2
+    assert setups == ['A']
+
+
 @dev_suite_required
 def test_setup_keck_lris_red():
     droot = os.path.join(os.environ['PYPEIT_DEV'], 'RAW_DATA/Keck_LRIS_red/multi_400_8500_d560')
@@ -135,3 +135,28 @@ def test_chk_deimos_slits():
         traceSlits.run(show=False, plate_scale=plate_scale, write_qa=False)
         # Test
         assert traceSlits.nslit == norig
+
+
+def test_centroid_kernels():
+    rng = np.random.RandomState(1)
+    nspec, nspat = 200, 100
+    spat = np.arange(nspat)[None,:]
+    image = 50.*np.exp(-0.5*((spat-40.3)/2.)**2) + rng.normal(size=(nspec, nspat))
+    invvar = np.ones_like(image)
+    invvar[rng.rand(nspec, nspat) < 0.02] = 0.
+    # Traces on the line, off the line, and running off the image
+    xinit = np.column_stack([np.full(nspec, 40.), np.full(nspec, 60.5),
+                             np.linspace(-3., nspat+3., nspec)])
+    for _invvar in [None, invvar]:
+        for radius in [3.0, 2.2]:
+            xnew, xerr = trace_slits.trace_fweight(image, xinit, radius=radius, invvar=_invvar)
+            _xnew, _xerr = trace_slits.trace_fweight(image, xinit, radius=radius, invvar=_invvar,
+                                                     fast=False)
+            assert np.array_equal(xnew, _xnew) and np.array_equal(xerr, _xerr)
+        xnew, xerr = trace_slits.trace_gweight(image, xinit, sigma=1.3, invvar=_invvar)
+        _xnew, _xerr = trace_slits.trace_gweight(image, xinit, sigma=1.3, invvar=_invvar,
+                                                 fast=False)
+        assert np.array_equal(xnew, _xnew) and np.array_equal(xerr, _xerr)
+    # Flagged centroids are reset to the input trace
+    assert np.any(xerr == 999.) and np.all(xnew[xerr == 999.] == xinit[xerr == 999.])
+    assert np.all(np.abs(xnew[xerr[:,0] < 999.,0] - 40.3) < 1.)
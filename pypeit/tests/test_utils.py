@@ -43,3 +43,53 @@ def test_calc_ivar():
     res = utils.calc_ivar(x)
     assert np.array_equal(res, np.array([0.0, 0.0, 0.0, 10.0, 1.0]))
     assert np.array_equal(utils.calc_ivar(res), np.array([0.0, 0.0, 0.0, 0.1, 1.0]))
+
+
+def test_bspline_profile_incremental():
+    """ Incremental updates of the normal equations should reproduce
+    the full refit in each rejection iteration
+    """
+    rng = np.random.RandomState(3)
+    npix = 20000
+    x = np.sort(rng.uniform(0., 1000., npix))
+    y = 100.*np.sin(x/30.) + 500. + rng.normal(0., 5., npix)
+    cr = rng.uniform(size=npix) < 0.01
+    y[cr] += rng.uniform(50., 1000., np.sum(cr))
+    ivar = np.full(npix, 1./25.)
+    basis = np.ones_like(y)
+
+    fits = {}
+    for incremental in [False, True]:
+        fits[incremental] = utils.bspline_profile(x, y, ivar, basis, upper=3, lower=3,
+                                                  incremental=incremental,
+                                                  kwargs_bspline={'bkspace': 0.6},
+                                                  kwargs_reject={'groupbadpix': True, 'maxrej': 10})
+    assert np.array_equal(fits[True][1], fits[False][1])
+    assert np.allclose(fits[True][2], fits[False][2], rtol=1e-8, atol=1e-6)
+    assert fits[True][4] == fits[False][4]
+
+
+def test_pool_map():
+    """ Results should not depend on the number of processes
+    """
+    arglist = [(np.arange(10)*i,) for i in range(5)]
+    serial = utils.pool_map(np.sum, arglist)
+    assert serial == [45*i for i in range(5)]
+    assert utils.pool_map(np.sum, arglist, nproc=2) == serial
+
+
+@pytest.mark.parametrize('func', ['polynomial2d', 'legendre2d', 'chebyshev2d'])
+def test_func_val_2d(func, monkeypatch):
+    rng = np.random.RandomState(2)
+    c = rng.normal(size=(5,3))
+    x = np.linspace(0., 1., 51)
+    x2 = np.linspace(0.2, 0.9, 23)
+    x2_img, x_img = np.meshgrid(x2, x)
+    model = utils.func_val(c, x_img, func, x2=x2_img)
+    # Separable evaluation on the grid
+    assert np.allclose(utils.func_val_grid(c, x, x2, func), model, rtol=0, atol=1e-12)
+    # Chunked evaluation, including the default scaling over all points
+    monkeypatch.setattr(utils, '_FUNC_VAL_CHUNK', 100)
+    assert np.array_equal(utils.func_val(c, x_img, func, x2=x2_img), model)
+    assert np.array_equal(utils.func_val(c, x_img.ravel(), func, x2=x2_img.ravel()),
+                          model.ravel())
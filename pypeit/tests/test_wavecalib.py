@@ -8,6 +8,8 @@ from __future__ import unicode_literals
 # TEST_UNICODE_LITERALS
 
 import os
+import json
+import shutil
 
 import pytest
 import glob
@@ -16,9 +18,15 @@ import numpy as np
 from astropy.table import Table
 
 from pypeit import wavecalib
+from pypeit.core.wavecal import autoid
+from pypeit.core.wavecal import kdtree_generator
+from pypeit.core.wavecal import waveio
+from pypeit.core.wavecal import wvutils
+from pypeit.par import pypeitpar
 from pypeit.metadata import PypeItMetaData
 from pypeit.tests.tstutils import dev_suite_required
 from pypeit.spectrographs import util
+from pypeit.scripts import build_patterns
 
 
 
@@ -263,3 +271,102 @@ def test_wavecalib_general():
         assert grade
 
 '''
+
+
+def test_holy_grail_nproc():
+    # Kastb 600 grism
+    with open(data_path('kastb_600_PYPIT.json'), 'r') as f:
+        spec = np.array(json.load(f)['spec'])
+    spec = np.tile(spec[:,None], (1,2))
+    results = []
+    for nproc in [1,2]:
+        par = pypeitpar.WavelengthSolutionPar(lamps=['CdI', 'HeI', 'HgI'], sigdetect=5.,
+                                              rms_threshold=0.2, nonlinear_counts=5.6e4,
+                                              nproc=nproc)
+        results += [autoid.HolyGrail(spec, par=par).get_results()[1]]
+    # The parallel search gives the same solutions
+    for slit in ['0', '1']:
+        assert results[0][slit]['rms'] < 0.2
+        assert results[0][slit]['rms'] == results[1][slit]['rms']
+        assert np.array_equal(results[0][slit]['pixel_fit'], results[1][slit]['pixel_fit'])
+        assert np.array_equal(results[0][slit]['fitc'], results[1][slit]['fitc'])
+
+
+def test_arxiv_features(tmpdir, monkeypatch):
+    # Keep the feature cache out of the package data
+    shutil.copy(os.path.join(waveio.reid_arxiv_path, 'keck_nires.json'), str(tmpdir))
+    monkeypatch.setattr(waveio, 'reid_arxiv_path', str(tmpdir))
+    monkeypatch.setattr(autoid, '_arxiv_features_cache', {})
+    features = autoid.load_arxiv_features('keck_nires.json', 1500, sigdetect=5., fwhm=5.)
+    assert os.path.isfile(waveio.reid_arxiv_features_file('keck_nires.json', 1500, 5., 1e10, 5.))
+    # Loaded once per process
+    assert autoid.load_arxiv_features('keck_nires.json', 1500, sigdetect=5., fwhm=5.) is features
+    # and read back from the cache file
+    autoid._arxiv_features_cache.clear()
+    cached = autoid.load_arxiv_features('keck_nires.json', 1500, sigdetect=5., fwhm=5.)
+    assert cached is not features
+    for key in ['spec', 'wave_soln', 'spec_cont_sub', 'spec_xcorr', 'wvc', 'disp']:
+        assert np.array_equal(cached[key], features[key])
+    assert sorted(cached['det'].keys()) == sorted(features['det'].keys())
+    for key in features['det'].keys():
+        assert np.array_equal(cached['det'][key], features['det'][key])
+
+    # Reidentification with the features is the same as with the arxiv spectra
+    spec = 1.05*features['spec'][:,2] + 10.
+    line_list = waveio.load_line_lists(['OH_NIRES'])
+    subset = autoid.select_arxiv_features(features, 2)
+    det, _, patt_dict = autoid.reidentify(spec, subset['spec'], subset['wave_soln'], line_list, 1,
+                                          sigdetect=5., fwhm=5.)
+    det_f, _, patt_dict_f = autoid.reidentify(spec, None, None, line_list, 1, sigdetect=5.,
+                                              fwhm=5., features=subset)
+    assert np.array_equal(det, det_f)
+    assert patt_dict['nmatch'] > 10
+    assert patt_dict['nmatch'] == patt_dict_f['nmatch']
+    assert np.array_equal(patt_dict['IDs'], patt_dict_f['IDs'])
+
+
+def test_xcorr_shift_stretch():
+    # Fake arc with lines of random amplitude
+    rng = np.random.RandomState(1234)
+    nspec = 1024
+    pix = np.arange(nspec)
+    arc = np.zeros(nspec)
+    for cen, amp in zip(rng.uniform(20, nspec-20, 40), rng.uniform(100., 1000., 40)):
+        arc += amp*np.exp(-0.5*((pix-cen)/1.5)**2)
+    arc_ss = wvutils.shift_and_stretch(arc, 12.3, 1.013) + rng.normal(size=nspec)
+    success, shift, stretch, corr, shift_cc, corr_cc \
+            = wvutils.xcorr_shift_stretch(arc_ss, arc, fwhm=3.5)
+    assert success == 1
+    assert np.absolute(shift-12.3) < 0.2
+    # The stretch is discretized by shift_and_stretch
+    assert int(nspec*stretch) == int(nspec*1.013)
+    assert corr > 0.99 and corr >= corr_cc
+    # As good as differential evolution
+    _, _, _, corr_de, _, _ = wvutils.xcorr_shift_stretch(arc_ss, arc, fwhm=3.5, seed=1,
+                                                         method='differential_evolution')
+    assert corr >= corr_de - 1e-4
+
+
+def test_pattern_store(tmpdir, monkeypatch):
+    # Keep the pattern stores out of the package data
+    monkeypatch.setattr(waveio, '_pattern_stores', {})
+    build_patterns.main(build_patterns.parser(['--polygon', '3', '4', '--numsearch', '4',
+                                               '--path', str(tmpdir)]))
+    for polygon in [3, 4]:
+        files = waveio.pattern_store_files(polygon, 4, path=str(tmpdir))
+        assert all([os.path.isfile(f) for f in files.values()])
+        store, index = waveio.load_tree(polygon=polygon, numsearch=4, path=str(tmpdir))
+        # Memory-mapped, and loaded once per process
+        assert not store.pattern.flags.writeable
+        assert waveio.load_tree(polygon=polygon, numsearch=4, path=str(tmpdir))[0] is store
+        assert index.shape == (store.pattern.shape[0], polygon)
+        # Same matches as the KD tree
+        rng = np.random.RandomState(polygon)
+        detlines = np.sort(rng.uniform(0., 2048., 40))
+        generator = kdtree_generator.trigon if polygon == 3 else kdtree_generator.tetragon
+        pattern, _ = generator(detlines, 7, 1024.)
+        res, residx = store.query(pattern, 5./2048)
+        from scipy.spatial import cKDTree
+        matches = cKDTree(pattern).query_ball_tree(store.tree, r=5./2048)
+        assert len(res) == sum([len(m) for m in matches])
+        assert set(zip(res, residx)) == set([(j, i) for i, m in enumerate(matches) for j in m])
@@ -17,6 +17,8 @@ from pypeit.tests.tstutils import dev_suite_required, load_kast_blue_masters
 from pypeit import wavetilts
 from pypeit.core import tracewave, pixels
 from pypeit.par import pypeitpar
+from pypeit.spectrographs.util import load_spectrograph
+from pypeit.tests.test_pixels import fake_tslits_dict
 
 
 def data_path(filename):
@@ -82,3 +84,52 @@ def test_run(master_dir):
     tilts_dict, mask = waveTilts.run(doqa=False)
     assert isinstance(tilts_dict['tilts'], np.ndarray)
 
+
+def fake_arc(nslits=3, nspec=600, nspat=200, nlines=15):
+    tslits_dict = fake_tslits_dict(nspec=nspec, nspat=nspat, nslits=nslits)
+    tslits_dict['spec_min'][:] = 0
+    tslits_dict['slitcen'] = 0.5*(tslits_dict['slit_left'] + tslits_dict['slit_righ'])
+    rng = np.random.RandomState(3)
+    spec = np.arange(nspec)[:,None]
+    spat = np.arange(nspat)[None,:]
+    arc = np.full((nspec, nspat), 20.)
+    # Lines tilted by 0.02 pixel per spatial pixel
+    for line in np.linspace(30, nspec-30, nlines):
+        arc += rng.uniform(2e3, 2e4)*np.exp(-0.5*((spec - line - 0.02*(spat-nspat/2))/1.5)**2)
+    arc += rng.normal(size=arc.shape)*np.sqrt(arc+25.)
+    return arc, tslits_dict
+
+
+def test_trace_tilts_crude():
+    arc, tslits_dict = fake_arc(nslits=1)
+    arc_trans, inmask_trans = arc.T, np.ones(arc.T.shape)
+    lines_spec = np.linspace(30, arc.shape[0]-30, 15)
+    spat_min = np.full(lines_spec.size, 10)
+    spat_max = np.full(lines_spec.size, arc.shape[1]+10)
+    spat_max[:3] = 150
+    for fwhm in [3.0, 2.7]:
+        tilts_crude = tracewave.trace_tilts_crude(arc_trans, inmask_trans, lines_spec, spat_min,
+                                                  spat_max, fwhm)
+        # Tracing the lines together gives the same traces as one at a time
+        for iline in range(lines_spec.size):
+            lo, hi = spat_min[iline], min(spat_max[iline], arc.shape[1]-1)
+            single = tracewave.trace_tilts_crude(arc_trans[lo:hi+1], inmask_trans[lo:hi+1],
+                                                 lines_spec[iline:iline+1], [0], [hi-lo], fwhm)
+            assert np.array_equal(tilts_crude[iline], single[0])
+        assert np.all(np.abs(np.diff(tilts_crude[5]) - 0.02) < 0.1)
+
+
+def test_run_nproc():
+    spectrograph = load_spectrograph('shane_kast_blue')
+    wavepar = pypeitpar.WavelengthSolutionPar()
+    output = []
+    for nproc in [1, 2]:
+        arc, tslits_dict = fake_arc()
+        waveTilts = wavetilts.WaveTilts(arc, tslits_dict, spectrograph,
+                                        pypeitpar.WaveTiltsPar(nproc=nproc), wavepar, det=1)
+        tilts_dict, mask = waveTilts.run(doqa=False)
+        output += [tilts_dict]
+    assert not np.any(mask)
+    # The result is independent of the number of processes
+    for key in output[0].keys():
+        assert np.array_equal(output[0][key], output[1][key])
@@ -2,6 +2,10 @@
 
 import itertools
 import matplotlib
+import os
+import shutil
+import tempfile
+from concurrent import futures
 
 import numpy as np
 
@@ -18,6 +22,77 @@ from bisect import insort, bisect_left
 from pypeit.core import pydl
 from pypeit import msgs
 
+def pool_map(func, arglist, nproc=1):
+    """
+    Apply a function to a list of argument tuples, optionally using a pool of processes
+
+    The results are always returned in the order of arglist, so the
+    output is independent of nproc.
+
+    Args:
+        func: callable
+           Function to call; must be picklable (i.e. defined at module level) if nproc > 1
+        arglist: list of tuples
+           Positional arguments for each call of func
+        nproc: int, optional
+           Number of processes to use.  If 1 (or None), the calls are done serially in this process.
+
+    Returns:
+        list: Output of func for each item in arglist
+    """
+    if nproc is None or nproc <= 1 or len(arglist) <= 1:
+        return [func(*args) for args in arglist]
+    with futures.ProcessPoolExecutor(max_workers=min(nproc, len(arglist))) as executor:
+        jobs = [executor.submit(func, *args) for args in arglist]
+        return [job.result() for job in jobs]
+
+
+class SharedArrays(object):
+    """
+    Read-only arrays shared with the processes of :func:`pool_map`
+    without pickling them.
+
+    The arrays are written once to `.npy` files in a temporary directory
+    and each process memory-maps them, so they are shared through the
+    page cache.  Only the file names are pickled, so pass the
+    SharedArrays object itself in the pool_map arguments::
+
+        with utils.SharedArrays(flat=flat) as shared:
+            utils.pool_map(func, [(shared, slit) for slit in slits], nproc=4)
+
+    and use ``shared['flat']`` in func.  The directory is removed by
+    :func:`close`, or on leaving the ``with`` block.
+
+    Args:
+        **arrays: The arrays to share, by name.
+    """
+    def __init__(self, **arrays):
+        self._tmpdir = tempfile.mkdtemp(prefix='pypeit_shared_')
+        self.files = {}
+        for name, array in arrays.items():
+            self.files[name] = os.path.join(self._tmpdir, name+'.npy')
+            np.save(self.files[name], array)
+
+    def __getitem__(self, name):
+        return np.load(self.files[name], mmap_mode='r')
+
+    def __getstate__(self):
+        # The processes do not own the files
+        return {'_tmpdir': None, 'files': self.files}
+
+    def close(self):
+        """Remove the files."""
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 def wavegrid(wave_min, wave_max, dwave, osamp=1.0):
     """
     Utility routine to generate a uniform grid of wavelengths
@@ -305,7 +380,7 @@ def bspline_fit(x,y,order=3,knots=None,everyn=20,xmin=None,xmax=None,w=None,bksp
 # and make them explicit
 def bspline_profile(xdata, ydata, invvar, profile_basis, inmask = None, upper=5, lower=5,
                     maxiter=25, nord = 4, bkpt=None, fullbkpt=None,
-                    relative=None, kwargs_bspline={}, kwargs_reject={}):
+                    relative=None, incremental=True, kwargs_bspline={}, kwargs_reject={}):
     """
     Create a B-spline in the least squares sense with rejection, using a model profile
 
@@ -335,6 +410,10 @@ def bspline_profile(xdata, ydata, invvar, profile_basis, inmask = None, upper=5,
      relative : class:`numpy.ndarray`
         Array of integer indices to be used for computing the reduced chi^2 of the fits, which then is used as a scale factor for
          the upper,lower rejection thresholds
+     incremental : bool, optional
+         After the first fit of a rejection sequence, update the banded normal equations using only the pixels
+         whose mask changed in the previous iteration instead of rebuilding them from all the pixels.  The
+         result is identical to a full rebuild up to round-off.
      kwargs_bspline : dict
        Passed to bspline
      kwargs_reject : dict
@@ -440,9 +519,24 @@ def bspline_profile(xdata, ydata, invvar, profile_basis, inmask = None, upper=5,
                 for ipoly in range(npoly):
                     action[:, np.arange(nord)*npoly + ipoly] *= bf1
                 del bf1 # Clear the memory
+                # The normal equations have to be rebuilt for a new action matrix
+                normal = None
             if np.sum(np.isfinite(action) is False) > 0:
                 msgs.error("Infinities in action matrix, wavelengths may be very messed up!!!")
-            error, yfit = sset.workit(xdata, ydata, invvar*maskwork,action, laction, uaction)
+            weight = invvar*maskwork
+            if incremental:
+                if normal is None:
+                    normal = sset.normal_equations(ydata, weight, action, laction, uaction)
+                else:
+                    # Add/remove the pixels whose rejection status changed
+                    changed = np.where(weight != fit_weight)[0]
+                    if changed.size > 0:
+                        dalpha, dbeta = sset.normal_equations(ydata, weight - fit_weight, action, laction,
+                                                              uaction, rows=changed)
+                        normal = (normal[0] + dalpha, normal[1] + dbeta)
+                fit_weight = weight
+            error, yfit = sset.workit(xdata, ydata, weight, action, laction, uaction,
+                                      normal=normal if incremental else None)
         iiter += 1
         if error == -2:
             msgs.warn(" All break points have been dropped!! Fit failed, I hope you know what you are doing")
@@ -660,11 +754,21 @@ def func_fit(x, y, func, deg, x2 = None, minx=None, maxx=None, minx2=None, maxx2
                    "Please choose from 'polynomial', 'legendre', 'chebyshev','bspline'")
 
 
+# Maximum number of points evaluated at once by the 2d fits in
+# func_val; larger inputs are evaluated in chunks to bound the size of
+# the temporary arrays
+_FUNC_VAL_CHUNK = 2**18
+
+
 def func_val(c, x, func, x2 = None, minx=None, maxx=None, minx2=None, maxx2=None):
     """ Generic routine to return an evaluated function
     Functional forms include:
       polynomial, legendre, chebyshev, bspline, gauss
 
+    2d polynomial, legendre and chebyshev fits of more than
+    _FUNC_VAL_CHUNK points are evaluated in chunks.  For points on a
+    regular grid, use :func:`func_val_grid` instead.
+
     Parameters
     ----------
     c : ndarray
@@ -681,6 +785,9 @@ def func_val(c, x, func, x2 = None, minx=None, maxx=None, minx2=None, maxx2=None
     """
     # For two-d fits x = x, y = x2, y = z
     if ('2d' in func) and (x2 is not None):
+        if func[:-2] in _vander_2d and np.broadcast(x, x2).size > _FUNC_VAL_CHUNK:
+            return _func_val_2d_chunked(c, x, func, x2, minx=minx, maxx=maxx, minx2=minx2,
+                                        maxx2=maxx2)
         # Is this a 2d fit?
         if func[:-2] == "polynomial":
             return np.polynomial.polynomial.polyval2d(x, x2, c)
@@ -737,6 +844,71 @@ def func_val(c, x, func, x2 = None, minx=None, maxx=None, minx2=None, maxx2=None
                    "Please choose from 'polynomial', 'legendre', 'chebyshev', 'bspline'")
 
 
+def _func_val_2d_chunked(c, x, func, x2, minx=None, maxx=None, minx2=None, maxx2=None):
+    """
+    Evaluate a 2d fit in chunks of at most _FUNC_VAL_CHUNK points along
+    the first axis of the (broadcast) input coordinates.
+    """
+    x, x2 = np.broadcast_arrays(x, x2)
+    # The default scaling uses the extent of all the points, not just
+    # those of a chunk
+    if func[:-2] != 'polynomial':
+        if minx is None or maxx is None:
+            minx, maxx = np.min(x), np.max(x)
+        if minx2 is None or maxx2 is None:
+            minx2, maxx2 = np.min(x2), np.max(x2)
+    if x.ndim == 0:
+        return func_val(c, x, func, x2=x2, minx=minx, maxx=maxx, minx2=minx2, maxx2=maxx2)
+    values = np.empty(x.shape, dtype=np.result_type(x, x2, c, 1.0))
+    nrow = max(_FUNC_VAL_CHUNK*x.shape[0]//x.size, 1)
+    for i in range(0, x.shape[0], nrow):
+        values[i:i+nrow] = func_val(c, x[i:i+nrow], func, x2=x2[i:i+nrow], minx=minx, maxx=maxx,
+                                    minx2=minx2, maxx2=maxx2)
+    return values
+
+
+# Vandermonde matrices of the 2d fits in func_val
+_vander_2d = {'polynomial': np.polynomial.polynomial.polyvander,
+              'legendre': np.polynomial.legendre.legvander,
+              'chebyshev': np.polynomial.chebyshev.chebvander}
+
+
+def func_val_grid(c, x, x2, func, minx=None, maxx=None, minx2=None, maxx2=None):
+    """
+    Evaluate a 2d fit on the grid of points defined by the vectors x and
+    x2, i.e. ``values[i,j] = func_val(c, x[i], func, x2=x2[j], ...)``.
+
+    The 2d polynomial, legendre and chebyshev models are separable, so
+    this is evaluated as the product of the two small basis matrices
+    with the coefficients, ``B(x) @ c @ B(x2).T``, without the image
+    sized temporaries of :func:`func_val`.  For example, the tilts image
+    of a detector is ``func_val_grid(coeff2, spec_vec, spat_vec, func2d,
+    ...)``.
+
+    Args:
+        c (ndarray): 2d coefficients, shape (deg+1, deg2+1)
+        x (ndarray): 1d coordinates along the first axis of the grid
+        x2 (ndarray): 1d coordinates along the second axis of the grid
+        func (str): 'polynomial2d', 'legendre2d' or 'chebyshev2d'
+        minx, maxx, minx2, maxx2 (float, optional):
+            Scaling of x and x2 for legendre and chebyshev fits; as for
+            :func:`func_val`, they default to the extent of x and x2.
+
+    Returns:
+        ndarray: Model values, shape (x.size, x2.size)
+    """
+    if func[-2:] != '2d' or func[:-2] not in _vander_2d:
+        msgs.error("Function {0:s} has not yet been implemented for 2d grid fits".format(func))
+    x = np.atleast_1d(x).astype(float)
+    x2 = np.atleast_1d(x2).astype(float)
+    if func[:-2] != 'polynomial':
+        x = scale_minmax(x, minx=minx, maxx=maxx)
+        x2 = scale_minmax(x2, minx=minx2, maxx=maxx2)
+    c = np.asarray(c)
+    vander = _vander_2d[func[:-2]]
+    return np.dot(np.dot(vander(x, c.shape[0]-1), c), vander(x2, c.shape[1]-1).T)
+
+
 def calc_fit_rms(xfit, yfit, fit, func, minx=None, maxx=None, weights=None):
     """ Simple RMS calculation
 
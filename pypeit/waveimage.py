@@ -11,6 +11,7 @@ from pypeit import msgs
 from pypeit import utils
 from pypeit import masterframe
 from pypeit import ginga
+from pypeit import imagecache
 from pypeit.core import pixels
 
 from pypeit import debugger
@@ -57,7 +58,12 @@ class WaveImage(masterframe.MasterFrame):
         self.tilts = tilts
         self.wv_calib = wv_calib
         self.spectrograph = spectrograph
-        self.slitmask = pixels.tslits2mask(self.tslits_dict) if tslits_dict is not None else None
+        self.slitmask = imagecache.image_cache.get('slitmask', master_key, pixels.tslits2mask,
+                                                   args=(self.tslits_dict,),
+                                                   inputs=(pixels.tslits_fingerprint(self.tslits_dict),)) \
+                            if tslits_dict is not None else None
+        self.slit_index = pixels.SlitIndex.from_tslits_dict(self.tslits_dict) \
+                            if tslits_dict is not None else None
         self.par = wv_calib['par'] if wv_calib is not None else None
 
         # Optional parameters
@@ -73,13 +79,30 @@ class WaveImage(masterframe.MasterFrame):
         """
         Main algorithm to build the wavelength image
 
+        The image is held in memory for reuse by
+        :class:`pypeit.calibrations.Calibrations`, so it is not cached
+        here.
+
         Returns:
             ndarray: Wavelength image
 
         """
+        self.wave = self._eval_wave()
+        # Step
+        self.steps.append(inspect.stack()[0][3])
+        # Return
+        return self.wave
+
+    def _eval_wave(self):
+        """
+        Evaluate the wavelength solutions of all the good slits.
+
+        Returns:
+            ndarray: Wavelength image
+        """
         # Loop on slits
         ok_slits = np.where(~self.maskslits)[0]
-        self.wave = np.zeros_like(self.tilts)
+        wave = np.zeros_like(self.tilts)
         nspec =self.slitmask.shape[0]
 
         # Error checking on the wv_calib
@@ -94,24 +117,24 @@ class WaveImage(masterframe.MasterFrame):
 
         # Unpack some 2-d fit parameters if this is echelle
         for slit in ok_slits:
-            thismask = (self.slitmask == slit)
+            # Gather only the pixels in this slit
+            thispix = self.slit_index.pixels(slit)
+            thistilts = np.take(self.tilts, thispix)
             if self.par['echelle']:
                 order = self.spectrograph.slit2order(slit)
-                # evaluate solution
-                tmpwv = utils.func_val(self.wv_calib['fit2d']['coeffs'], self.tilts[thismask], self.wv_calib['fit2d']['func2d'],
-                                       x2=np.ones_like(self.tilts[thismask])*order,
-                                       minx=self.wv_calib['fit2d']['min_spec'], maxx=self.wv_calib['fit2d']['max_spec'],
-                                       minx2=self.wv_calib['fit2d']['min_order'], maxx2=self.wv_calib['fit2d']['max_order'])/order
+                # evaluate solution; the order is constant, so this is a grid with a single column
+                tmpwv = utils.func_val_grid(self.wv_calib['fit2d']['coeffs'], thistilts, order,
+                                            self.wv_calib['fit2d']['func2d'],
+                                            minx=self.wv_calib['fit2d']['min_spec'], maxx=self.wv_calib['fit2d']['max_spec'],
+                                            minx2=self.wv_calib['fit2d']['min_order'],
+                                            maxx2=self.wv_calib['fit2d']['max_order'])[:,0]/order
             else:
                 iwv_calib = self.wv_calib[str(slit)]
-                tmpwv = utils.func_val(iwv_calib['fitc'], self.tilts[thismask], iwv_calib['function'],
+                tmpwv = utils.func_val(iwv_calib['fitc'], thistilts, iwv_calib['function'],
                                        minx=iwv_calib['fmin'], maxx=iwv_calib['fmax'])
-            self.wave[thismask] = tmpwv
+            wave.flat[thispix] = tmpwv
 
-        # Step
-        self.steps.append(inspect.stack()[0][3])
-        # Return
-        return self.wave
+        return wave
 
     def show(self, item='wave'):
         """
@@ -10,6 +10,7 @@ import numpy as np
 from astropy.io import fits
 
 from pypeit import msgs
+from pypeit import utils
 from pypeit import masterframe
 from pypeit import ginga
 from pypeit.core import arc
@@ -86,6 +87,8 @@ class WaveTilts(masterframe.MasterFrame):
             self.slit_righ = arc.resize_slits2arc(self.shape_arc, self.shape_science, self.tslits_dict['slit_righ'])
             self.slitcen   = arc.resize_slits2arc(self.shape_arc, self.shape_science, self.tslits_dict['slitcen'])
             self.slitmask  = arc.resize_mask2arc(self.shape_arc, self.slitmask_science)
+            self.slit_index = pixels.SlitIndex(self.slitmask, nslits=self.nslits)
+            self.slit_index_science = pixels.SlitIndex(self.slitmask_science, nslits=self.nslits)
             self.inmask = (arc.resize_mask2arc(self.shape_arc, inmask)) & (self.msarc < self.nonlinear_counts)
         else:
             self.slitmask_science = None
@@ -96,6 +99,8 @@ class WaveTilts(masterframe.MasterFrame):
             self.slit_righ = None
             self.slitcen = None
             self.slitmask = None
+            self.slit_index = None
+            self.slit_index_science = None
             self.inmask = None
 
         # Key Internals
@@ -290,35 +295,69 @@ class WaveTilts(masterframe.MasterFrame):
         #if show:
         #    viewer,ch = ginga.show_image(self.msarc*(self.slitmask > -1),chname='tilts')
 
-        # Loop on all slits
-        for slit in gdslits:
-            msgs.info('Computing tilts for slit {:d}/{:d}'.format(slit,self.nslits-1))
-            # Identify lines for tracing tilts
-            self.lines_spec, self.lines_spat = self.find_lines(self.arccen[:,slit], self.slitcen[:,slit], slit, debug=debug)
-
-            thismask = self.slitmask == slit
-            # Trace
-            self.trace_dict = self.trace_tilts(self.msarc, self.lines_spec, self.lines_spat, thismask, self.slitcen[:,slit])
-            #if show:
-            #    ginga.show_tilts(viewer, ch, self.trace_dict)
-
-            self.spat_order[slit] = self._parse_param(self.par, 'spat_order', slit)
-            self.spec_order[slit] = self._parse_param(self.par, 'spec_order', slit)
-            # 2D model of the tilts, includes construction of QA
-            coeff_out = self.fit_tilts(self.trace_dict, thismask, self.slitcen[:,slit], self.spat_order[slit],
-                                       self.spec_order[slit], slit,doqa=doqa, show_QA = show, debug=show)
+        # Trace and fit the tilts of all slits, in parallel if requested
+        nproc = 1 if (show or debug) else self.par['nproc']
+        msgs.info('Computing tilts for {:d} slits using {:d} process(es)'.format(len(gdslits), nproc))
+        images = utils.SharedArrays(msarc=self.msarc, inmask=self.inmask, slitmask=self.slitmask) \
+                    if nproc > 1 else None
+        try:
+            slit_args = [(self._slit_copy(strip=nproc > 1), images, slit, doqa, show, debug) for slit in gdslits]
+            slit_tilts = utils.pool_map(_slit_tilts, slit_args, nproc=nproc)
+        finally:
+            if images is not None:
+                images.close()
+
+        for slit, result in zip(gdslits, slit_tilts):
+            self.lines_spec, self.lines_spat, self.trace_dict = result['lines_spec'], result['lines_spat'], \
+                                                                 result['trace_dict']
+            self.all_fit_dict[slit] = result['fit_dict']
+            self.all_trace_dict[slit] = result['trace_dict_out']
+            self.steps += result['steps']
+            self.spat_order[slit] = result['spat_order']
+            self.spec_order[slit] = result['spec_order']
+            coeff_out = result['coeff']
             self.coeffs[0:self.spec_order[slit]+1, 0:self.spat_order[slit]+1 , slit] = coeff_out
             # Tilts are created with the size of the original slitmask, which corresonds to the same binning
-            # as the science images, trace images, and pixelflats etc.
-            self.tilts = tracewave.fit2tilts(self.slitmask_science.shape, coeff_out, self.par['func2d'])
+            # as the science images, trace images, and pixelflats etc. They are only evaluated in the bounding
+            # box of the slit.
+            bbox = self.slit_index_science.bbox(slit)
+            tilts = tracewave.fit2tilts(self.slitmask_science.shape, coeff_out, self.par['func2d'], bbox=bbox)
             # Save to final image
-            thismask_science = self.slitmask_science == slit
-            self.final_tilts[thismask_science] = self.tilts[thismask_science]
+            thismask_science = self.slit_index_science.mask(slit)
+            self.final_tilts[bbox][thismask_science] = tilts[thismask_science]
+
+        self.tilts = self.final_tilts
 
         self.tilts_dict = {'tilts':self.final_tilts, 'coeffs':self.coeffs, 'slitcen': self.slitcen, 'func2d':self.par['func2d'],
                            'nslit': self.nslits, 'spat_order': self.spat_order, 'spec_order': self.spec_order}
         return self.tilts_dict, maskslits
 
+    def _slit_copy(self, strip=False):
+        """
+        Shallow copy of this object used to trace and fit the tilts of
+        one slit (see :func:`_slit_tilts`), with its own lists of steps
+        and fits.
+
+        Args:
+            strip (bool, optional):
+                Drop the images from the copy, so that it is cheap to
+                send to another process.  They are then read from the
+                :class:`pypeit.utils.SharedArrays` given to
+                :func:`_slit_tilts`.
+
+        Returns:
+            :class:`WaveTilts`: The copy
+        """
+        wavetilts = copy.copy(self)
+        wavetilts.steps = []
+        wavetilts.all_fit_dict = [None]*self.nslits
+        wavetilts.all_trace_dict = [None]*self.nslits
+        if strip:
+            for attr in ['msarc', 'inmask', 'slitmask', 'slitmask_science', 'slit_index',
+                         'slit_index_science', 'tslits_dict', 'bpm', 'final_tilts', 'tilts']:
+                setattr(wavetilts, attr, None)
+        return wavetilts
+
     def load_master(self, filename, exten=0, force=False):
         """
         Load the master frame
@@ -529,3 +568,46 @@ def load_tilts(filename):
     tilts_dict, _ = waveTilts.load_master(filename)
     return tilts_dict['tilts']
 
+
+def _slit_tilts(wavetilts, images, slit, doqa, show, debug):
+    """
+    Find, trace and fit the arc lines of one slit.
+
+    Args:
+        wavetilts (:class:`WaveTilts`):
+            Copy of the WaveTilts object for this slit; see
+            :func:`WaveTilts._slit_copy`.
+        images (:class:`pypeit.utils.SharedArrays`):
+            The arc image, input mask and slitmask, if they were stripped
+            from wavetilts; otherwise None.
+        slit (int):
+            Slit index
+
+    Returns:
+        dict: The lines, trace and fit dictionaries, the 2D fit
+        coefficients and orders, and the steps performed.
+    """
+    if images is not None:
+        wavetilts.msarc = images['msarc']
+        wavetilts.inmask = images['inmask']
+        wavetilts.slitmask = images['slitmask']
+    msgs.info('Computing tilts for slit {:d}/{:d}'.format(slit, wavetilts.nslits-1))
+    # Identify lines for tracing tilts
+    lines_spec, lines_spat = wavetilts.find_lines(wavetilts.arccen[:,slit], wavetilts.slitcen[:,slit], slit,
+                                                  debug=debug)
+    thismask = wavetilts.slitmask == slit
+    # Trace
+    trace_dict = wavetilts.trace_tilts(wavetilts.msarc, lines_spec, lines_spat, thismask,
+                                       wavetilts.slitcen[:,slit])
+    #if show:
+    #    ginga.show_tilts(viewer, ch, self.trace_dict)
+
+    spat_order = wavetilts._parse_param(wavetilts.par, 'spat_order', slit)
+    spec_order = wavetilts._parse_param(wavetilts.par, 'spec_order', slit)
+    # 2D model of the tilts, includes construction of QA
+    coeff_out = wavetilts.fit_tilts(trace_dict, thismask, wavetilts.slitcen[:,slit], spat_order, spec_order, slit,
+                                    doqa=doqa, show_QA=show, debug=show)
+    return dict(lines_spec=lines_spec, lines_spat=lines_spat, trace_dict=trace_dict,
+                fit_dict=wavetilts.all_fit_dict[slit], trace_dict_out=wavetilts.all_trace_dict[slit],
+                coeff=coeff_out, spat_order=spat_order, spec_order=spec_order, steps=wavetilts.steps)
+